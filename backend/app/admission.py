@@ -0,0 +1,288 @@
+"""Admission control: per-route-class concurrency limits and per-caller rate limits.
+
+Every request is put in a route class by path prefix. Each class has its own
+concurrency limit and a bounded FIFO wait queue with a deadline. Expensive calls
+such as password hashing on ``/api/auth/login`` therefore queue behind each other
+and cannot take over the worker from cheap ones. ``/healthz`` and ``/metrics``
+are never limited. When a class's queue is full, the request is rejected at once
+with 503 and ``Retry-After``. A request still queued at its deadline gets the same
+answer, so callers never wait in a queue that would make them time out anyway.
+
+Rate limiting is a token bucket per caller, kept in a sharded in-memory store.
+The caller is the user behind an app-prefix token or an access token already in
+the verified cache, and the client address for everything else. No token is
+decoded here, so a forged token can only spend its sender's address bucket.
+Callers over their rate get 429 with ``Retry-After``.
+
+All state is per worker process: with N launcher workers the effective limits
+are N times the configured ones.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Mapping, Sequence, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .auth import access_token_cache
+from .observability.metrics import (
+    admission_in_flight,
+    admission_queue_depth,
+    admission_queue_wait_seconds,
+    admission_shed_total,
+)
+from .observability.middleware import is_warmup
+
+EXEMPT = "exempt"
+
+# First matching prefix wins; paths matching none fall into "default".
+ROUTE_CLASS_RULES: Sequence[Tuple[str, str]] = (
+    ("/healthz", EXEMPT),
+    ("/metrics", EXEMPT),
+    ("/api/auth/mqtt", "default"),
+    ("/api/auth/", "auth"),
+    ("/admin/", "admin"),
+    ("/api/v1/", "tree"),
+)
+
+
+@dataclass(frozen=True)
+class ClassLimits:
+    concurrency: int
+    queue: int
+    timeout_ms: float
+
+
+DEFAULT_LIMITS: Dict[str, ClassLimits] = {
+    "auth": ClassLimits(concurrency=4, queue=32, timeout_ms=2000),
+    "tree": ClassLimits(concurrency=32, queue=256, timeout_ms=2000),
+    "admin": ClassLimits(concurrency=2, queue=0, timeout_ms=0),
+    "default": ClassLimits(concurrency=64, queue=512, timeout_ms=2000),
+}
+
+
+def classify(path: str, rules: Sequence[Tuple[str, str]] = ROUTE_CLASS_RULES) -> str:
+    for prefix, route_class in rules:
+        if path.startswith(prefix):
+            return route_class
+    return "default"
+
+
+def merge_limits(overrides: Mapping[str, Mapping[str, float]]) -> Dict[str, ClassLimits]:
+    """Apply ``{"auth": {"concurrency": 8}}``-style overrides on top of :data:`DEFAULT_LIMITS`."""
+    limits = dict(DEFAULT_LIMITS)
+    for name, values in overrides.items():
+        base = limits.get(name, DEFAULT_LIMITS["default"])
+        unknown = set(values) - {"concurrency", "queue", "timeout_ms"}
+        if unknown:
+            raise ValueError(f"Unknown admission limit keys for {name}: {sorted(unknown)}")
+        limits[name] = ClassLimits(
+            concurrency=int(values.get("concurrency", base.concurrency)),
+            queue=int(values.get("queue", base.queue)),
+            timeout_ms=float(values.get("timeout_ms", base.timeout_ms)),
+        )
+    return limits
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ConcurrencyGate:
+    """Counting semaphore with a bounded FIFO wait queue and a per-waiter deadline.
+
+    Only used from the event loop thread. A released slot goes straight to the
+    oldest live waiter, so a newly arrived request cannot take it first.
+    """
+
+    def __init__(self, name: str, limits: ClassLimits) -> None:
+        self.name = name
+        self.limits = limits
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._in_flight = admission_in_flight.labels(name)
+        self._depth = admission_queue_depth.labels(name)
+        self._wait = admission_queue_wait_seconds.labels(name)
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self.active < self.limits.concurrency and not self._waiters:
+            self.active += 1
+            self._in_flight.set(self.active)
+            self._wait.observe(0.0)
+            return
+        if len(self._waiters) >= self.limits.queue:
+            raise Rejected("queue_full", self._retry_after())
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._depth.set(len(self._waiters))
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.limits.timeout_ms / 1000)
+        except BaseException as exc:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the deadline hit or the client left.
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(future)
+                except ValueError:
+                    pass
+            self._depth.set(len(self._waiters))
+            if isinstance(exc, asyncio.TimeoutError):
+                raise Rejected("timeout", self._retry_after()) from None
+            raise
+        self._wait.observe(time.perf_counter() - started)
+
+    def release(self) -> None:
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                self._depth.set(len(self._waiters))
+                return
+        self._depth.set(0)
+        self.active -= 1
+        self._in_flight.set(self.active)
+
+    def _retry_after(self) -> float:
+        return max(1.0, self.limits.timeout_ms / 1000)
+
+
+class ShardedTokenBuckets:
+    """Token buckets keyed by caller, spread over independently locked shards.
+
+    Each shard is an LRU capped at ``max_keys_per_shard``. An evicted caller comes
+    back with a full bucket, which only matters to callers that have been idle
+    longer than every other key in their shard.
+    """
+
+    def __init__(self, rate: float, burst: float, shards: int = 64, max_keys_per_shard: int = 4096) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_keys_per_shard = max_keys_per_shard
+        self._shards: List[OrderedDict[str, List[float]]] = [OrderedDict() for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def take(self, key: str, now: float | None = None) -> float:
+        """Spend one token; return 0 when allowed, else seconds until a token is available."""
+        now = time.monotonic() if now is None else now
+        index = hash(key) % len(self._shards)
+        shard = self._shards[index]
+        with self._locks[index]:
+            bucket = shard.get(key)
+            if bucket is None:
+                bucket = [self.burst, now]
+                shard[key] = bucket
+                if len(shard) > self.max_keys_per_shard:
+                    shard.popitem(last=False)
+            else:
+                shard.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+                return 0.0
+            return (1.0 - bucket[0]) / self.rate
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+def _caller_key(scope: Scope, token_prefix: str) -> str:
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                if token.startswith(token_prefix) and len(token) > len(token_prefix):
+                    return "user:" + token[len(token_prefix) :]
+                user_id = access_token_cache.peek(token)
+                if user_id is not None:
+                    return "user:" + user_id
+            break
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class AdmissionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        limits: Mapping[str, ClassLimits],
+        buckets: ShardedTokenBuckets | None = None,
+        token_prefix: str = "user_",
+    ) -> None:
+        self.app = app
+        self.gates = {name: ConcurrencyGate(name, class_limits) for name, class_limits in limits.items()}
+        self.buckets = buckets
+        self.token_prefix = token_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or is_warmup(scope):
+            await self.app(scope, receive, send)
+            return
+        route_class = classify(scope["path"])
+        if route_class == EXEMPT:
+            await self.app(scope, receive, send)
+            return
+
+        if self.buckets is not None:
+            wait = self.buckets.take(_caller_key(scope, self.token_prefix))
+            if wait:
+                admission_shed_total.labels(route_class, "rate_limited").inc()
+                await _reject(send, 429, "Rate limit exceeded", wait)
+                return
+
+        gate = self.gates.get(route_class) or self.gates["default"]
+        try:
+            await gate.acquire()
+        except Rejected as exc:
+            admission_shed_total.labels(route_class, exc.reason).inc()
+            await _reject(send, 503, "Server overloaded, retry later", exc.retry_after)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+
+async def _reject(send: Send, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+__all__ = [
+    "AdmissionMiddleware",
+    "ClassLimits",
+    "ConcurrencyGate",
+    "DEFAULT_LIMITS",
+    "ROUTE_CLASS_RULES",
+    "Rejected",
+    "ShardedTokenBuckets",
+    "classify",
+    "merge_limits",
+]
@@ -1,61 +1,277 @@
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 import secrets
+import time
 import uuid
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 
-from .config import settings
+from . import config
+from .invalidation import InvalidationBus, get_bus
 from .models import User, UserInDB
+from .observability.metrics import auth_cache_events_total
+from .revocation import REVOCATION_TOPIC, RevocationList
 from .user_repository import BaseUserRepository, InMemoryUserRepository, SQLiteUserRepository
 
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256", "bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 
+# jose (via cryptography) and passlib add ~60 ms to import; load them on first use.
+@lru_cache(maxsize=None)
+def pwd_context() -> "CryptContext":
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["pbkdf2_sha256", "bcrypt"], deprecated="auto")
+
+
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
 
 
 def _create_token(data: dict, expires_delta: timedelta, token_type: str) -> str:
+    from jose import jwt
+
     to_encode = data.copy()
     to_encode.update({"exp": datetime.now(timezone.utc) + expires_delta, "type": token_type})
-    return jwt.encode(to_encode, settings.jwt_secret, algorithm=settings.jwt_algorithm)
+    return jwt.encode(to_encode, config.settings.jwt_secret, algorithm=config.settings.jwt_algorithm)
+
+
+def new_token_family() -> str:
+    return secrets.token_hex(8)
 
 
-def create_access_token(user_id: str) -> str:
-    expire = timedelta(minutes=settings.access_token_expire_minutes)
-    return _create_token({"sub": user_id}, expire, "access")
+def create_access_token(user_id: str, family: str | None = None) -> str:
+    """Mint an access token; ``family`` ties it to a login, so revoking the family revokes it too."""
+    expire = timedelta(minutes=config.settings.access_token_expire_minutes)
+    claims = {"sub": user_id, "fam": family} if family else {"sub": user_id}
+    return _create_token(claims, expire, "access")
 
 
-def create_refresh_token(user_id: str) -> str:
-    expire = timedelta(minutes=settings.refresh_token_expire_minutes)
-    return _create_token({"sub": user_id, "jti": secrets.token_hex(8)}, expire, "refresh")
+def create_refresh_token(user_id: str, family: str | None = None) -> str:
+    """Mint a refresh token; ``family`` carries over on rotation, a new login starts a new family."""
+    expire = timedelta(minutes=config.settings.refresh_token_expire_minutes)
+    claims = {"sub": user_id, "jti": secrets.token_hex(8), "fam": family or new_token_family()}
+    return _create_token(claims, expire, "refresh")
 
 
 def decode_token(token: str) -> dict:
+    from jose import JWTError, jwt
+
     try:
-        return jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+        return jwt.decode(token, config.settings.jwt_secret, algorithms=[config.settings.jwt_algorithm])
     except JWTError as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from exc
 
 
 def get_user_repository() -> BaseUserRepository:
-    backend = settings.user_repository_backend.lower()
+    backend = config.settings.user_repository_backend.lower()
     if backend == "sqlite":
         return SQLiteUserRepository("users.db")
     return InMemoryUserRepository()
 
 
-user_repo: BaseUserRepository = get_user_repository()
+_user_repo: BaseUserRepository | None = None
+
+
+def get_user_repo() -> BaseUserRepository:
+    """The process-wide user repository, opened on first use."""
+    global _user_repo
+    if _user_repo is None:
+        _user_repo = get_user_repository()
+    return _user_repo
+
+
+def reset_user_repo() -> None:
+    global _user_repo, _revocations
+    _user_repo = None
+    _revocations = None
+
+
+_revocations: RevocationList | None = None
+
+
+def get_revocations() -> RevocationList:
+    global _revocations
+    if _revocations is None:
+        settings = config.settings
+        _revocations = RevocationList(
+            get_user_repo(), settings.revocation_bloom_capacity, settings.revocation_bloom_error_rate
+        )
+    return _revocations
+
+
+def _family_expiry() -> float:
+    # A family lives as long as the newest token rotated into it could.
+    return time.time() + config.settings.refresh_token_expire_minutes * 60
+
+
+def rotate_refresh_token(payload: dict) -> str | None:
+    """Spend a decoded refresh token and return its family for the replacement token.
+
+    Each refresh token is good for one rotation. Presenting one that was already
+    rotated means two parties hold the family, so the whole family is revoked and
+    the legitimate holder has to sign in again as well.
+    """
+    jti = payload.get("jti")
+    if not jti:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+    # Tokens minted before families existed start a new family on their first rotation.
+    family = payload.get("fam")
+    revocations = get_revocations()
+    # Logging out a token minted before families revokes the token itself.
+    if revocations.is_revoked(family or jti):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+    if not revocations.spend(jti, payload.get("exp") or _family_expiry()):
+        if family:
+            revocations.revoke(family, _family_expiry())
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token reuse detected")
+    return family
+
+
+def reject_revoked_access(payload: dict) -> None:
+    """401 for an access token whose login family was logged out or caught reusing a refresh token."""
+    family = payload.get("fam")
+    if family and get_revocations().is_revoked(family):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+
+
+def revoke_refresh_family(payload: dict) -> None:
+    revocations = get_revocations()
+    if payload.get("fam"):
+        revocations.revoke(payload["fam"], _family_expiry())
+    elif payload.get("jti"):
+        revocations.revoke(payload["jti"], payload.get("exp") or _family_expiry())
+
+
+# Invalidation-bus topic for "this user's cached identity is stale"; the key is the user id.
+USER_TOPIC = "users"
+
+
+class AccessTokenCache:
+    """LRU of verified access tokens, so repeat requests skip JWT decoding and the user lookup.
+
+    Off unless ``APP_AUTH_CACHE_TTL_SECONDS`` is set. Entries live until the token expires
+    or ``ttl_seconds`` passes, whichever is sooner, or until the invalidation bus carries a
+    ``users`` event for their user or a revocation of their token family. Events are queued
+    by the bus thread and applied by the next ``get``/``put``; ``generation`` lets a caller
+    that looked a user up before an event arrived avoid caching the stale result.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int) -> None:
+        self._entries: OrderedDict[str, tuple[float, User, str | None]] = OrderedDict()
+        self._pending: deque[tuple[str, str | None]] = deque()
+        self._bus: InvalidationBus | None = None
+        self.generation = 0
+        self.configure(max_entries, ttl_seconds)
+        self._hit = auth_cache_events_total.labels("hit")
+        self._miss = auth_cache_events_total.labels("miss")
+        self._expired = auth_cache_events_total.labels("expired")
+        self._evicted = auth_cache_events_total.labels("evicted")
+
+    def configure(self, max_entries: int, ttl_seconds: int) -> None:
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries.clear()
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl_seconds > 0 and self._max_entries > 0
+
+    def invalidate(self, topic: str, key: str | None) -> None:
+        self.generation += 1
+        self._pending.append((topic, key))
+
+    def _apply_invalidations(self) -> None:
+        users: set[str] = set()
+        families: set[str] = set()
+        while self._pending:
+            topic, key = self._pending.popleft()
+            if key is None:
+                self._entries.clear()
+                users.clear()
+                families.clear()
+            else:
+                (users if topic == USER_TOPIC else families).add(key)
+        if users or families:
+            stale = [
+                token
+                for token, (_, user, family) in self._entries.items()
+                if user.id in users or family in families
+            ]
+            for token in stale:
+                del self._entries[token]
+
+    def get(self, token: str) -> User | None:
+        if self._pending:
+            self._apply_invalidations()
+        entry = self._entries.get(token)
+        if entry is None:
+            self._miss.inc()
+            return None
+        expires_at, user, _ = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(token, None)
+            self._expired.inc()
+            return None
+        self._entries.move_to_end(token)
+        self._hit.inc()
+        return user
+
+    def peek(self, token: str) -> str | None:
+        """User id behind an already verified, unexpired token, without touching LRU order or stats."""
+        entry = self._entries.get(token)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1].id
+
+    def put(
+        self,
+        token: str,
+        user: User,
+        token_expires_at: float | None = None,
+        generation: int | None = None,
+        family: str | None = None,
+    ) -> None:
+        if not self.enabled:
+            return
+        bus = get_bus()
+        if bus is not self._bus:
+            bus.subscribe(USER_TOPIC, self.invalidate)
+            bus.subscribe(REVOCATION_TOPIC, self.invalidate)
+            self._bus = bus
+        if self._pending:
+            self._apply_invalidations()
+        if generation is not None and generation != self.generation:
+            return
+        ttl = self._ttl_seconds
+        if token_expires_at is not None:
+            ttl = min(ttl, token_expires_at - time.time())
+        if ttl <= 0:
+            return
+        self._entries[token] = (time.monotonic() + ttl, user, family)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evicted.inc()
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def counts(self) -> dict[str, int]:
+        return {"entries": len(self._entries)}
+
+
+access_token_cache = AccessTokenCache(config.settings.auth_cache_max_entries, config.settings.auth_cache_ttl_seconds)
 
 
 async def get_current_user(token: str | None = Depends(oauth2_scheme)) -> User:
@@ -69,8 +285,9 @@ async def get_current_user(token: str | None = Depends(oauth2_scheme)) -> User:
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+    reject_revoked_access(payload)
 
-    user = user_repo.get_by_id(user_id)
+    user = get_user_repo().get_by_id(user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return User(id=user.id, username=user.username, email=user.email)
@@ -84,4 +301,4 @@ def create_user(username: str, password: str, email: Optional[str] = None, googl
         hashed_password=hash_password(password),
         google_sub=google_sub,
     )
-    return user_repo.create_user(user)
+    return get_user_repo().create_user(user)
@@ -1,3 +1,12 @@
+from . import settings as _settings_module
 from .settings import AppSettings as Settings, settings
 
-__all__ = ["Settings", "settings"]
+
+def configure(new_settings: Settings) -> Settings:
+    """Make ``new_settings`` the process-wide settings read by every subsystem."""
+    global settings
+    settings = _settings_module.settings = new_settings
+    return settings
+
+
+__all__ = ["Settings", "configure", "settings"]
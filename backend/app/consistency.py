@@ -0,0 +1,86 @@
+"""Read-your-writes for clients whose requests land on different workers.
+
+Each worker caches hierarchy reads and drops the cache when the invalidation bus
+reports a write. Another worker's write reaches it one poll interval later, so a
+client that writes on one worker and reads on the next could briefly see its old
+data.
+
+A hierarchy write therefore answers with ``X-Consistency-Token``: the bus position
+of its invalidation event. A client that sends the token back on later requests gets
+reads that skip the cache on any worker whose bus has not reached that position
+yet. Those reads go to the database, where the committed write is already visible.
+Clients that never send the token are unaffected.
+"""
+
+from __future__ import annotations
+
+from contextvars import ContextVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+HEADER = "x-consistency-token"
+_HEADER_BYTES = HEADER.encode("latin-1")
+
+
+class _Tokens:
+    """Mutable per-request holder, so writes on threadpool threads (copied contexts) still report back."""
+
+    __slots__ = ("required", "written")
+
+    def __init__(self, required: int) -> None:
+        self.required = required
+        self.written = 0
+
+
+_current: ContextVar[_Tokens | None] = ContextVar("consistency_tokens", default=None)
+
+
+def required_position() -> int:
+    tokens = _current.get()
+    return tokens.required if tokens is not None else 0
+
+
+def record_write(position: int | None) -> None:
+    tokens = _current.get()
+    if tokens is not None and position:
+        tokens.written = max(tokens.written, position)
+        tokens.required = max(tokens.required, position)
+
+
+def _parse(value: bytes) -> int:
+    try:
+        return max(0, int(value))
+    except ValueError:
+        return 0
+
+
+class ConsistencyMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        required = 0
+        for name, value in scope["headers"]:
+            if name == _HEADER_BYTES:
+                required = _parse(value)
+                break
+        tokens = _Tokens(required)
+        reset = _current.set(tokens)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and tokens.written:
+                headers = list(message.get("headers", []))
+                headers.append((_HEADER_BYTES, str(tokens.written).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(reset)
+
+
+__all__ = ["HEADER", "ConsistencyMiddleware", "record_write", "required_position"]
@@ -1,48 +1,105 @@
-from .repositories import get_repository_provider
+"""Service wiring, built on first access.
+
+Routers read ``container.location_service`` and friends at request time; the
+repository provider (and with it the SQLAlchemy engine for the sqlite backend)
+is only created when the first of those attributes is touched.
+"""
+
+from typing import Any, Callable, Dict, TypeVar
+
+from . import config
+from .invalidation import get_bus
+from .observability.context import run_in_threadpool
+from .observability.repository import instrument_provider
+from .observability.tracing import TracedProxy, tracer
+from .presence import build_tracker
+from .repositories import RepositoryProvider, get_repository_provider
+from .repositories.cached import CachingRepositoryProvider
 from .services.area_service import AreaService
 from .services.building_service import BuildingService
 from .services.location_service import LocationService
+from .services.search_service import SearchService
 from .services.zone_device_service import ZoneDeviceService
 from .services.zone_service import ZoneService
 
-repository_provider = get_repository_provider()
-
-location_service = LocationService(repository_provider.locations)
-building_service = BuildingService(repository_provider.locations, repository_provider.buildings)
-zone_service = ZoneService(
-    repository_provider.locations,
-    repository_provider.buildings,
-    repository_provider.zones,
-)
-area_service = AreaService(
-    repository_provider.locations,
-    repository_provider.buildings,
-    repository_provider.zones,
-    repository_provider.areas,
-)
-zone_device_service = ZoneDeviceService(
-    repository_provider.zones,
-    repository_provider.zone_devices,
-)
+T = TypeVar("T")
+
+_components: Dict[str, Any] | None = None
+
+
+def build_repository_provider() -> RepositoryProvider:
+    settings = config.settings
+    provider = get_repository_provider()
+    # The memory backend is its own cache; only shared storage gets a read cache (and needs the bus).
+    if settings.hierarchy_cache_enabled and settings.storage_backend.lower() == "sqlite":
+        provider = CachingRepositoryProvider(provider, get_bus(), settings.hierarchy_cache_max_entries)
+    return instrument_provider(provider) if settings.metrics_enabled else provider
+
+
+def traced(service, name: str):
+    return TracedProxy(service, name, tracer) if config.settings.tracing_enabled else service
+
+
+def _build() -> Dict[str, Any]:
+    provider = build_repository_provider()
+    return {
+        "repository_provider": provider,
+        "location_service": traced(LocationService(provider.locations), "LocationService"),
+        "building_service": traced(BuildingService(provider.locations, provider.buildings), "BuildingService"),
+        "zone_service": traced(
+            ZoneService(provider.locations, provider.buildings, provider.zones),
+            "ZoneService",
+        ),
+        "area_service": traced(
+            AreaService(provider.locations, provider.buildings, provider.zones, provider.areas),
+            "AreaService",
+        ),
+        "zone_device_service": traced(
+            ZoneDeviceService(
+                provider.locations, provider.buildings, provider.zones, provider.zone_devices, build_tracker()
+            ),
+            "ZoneDeviceService",
+        ),
+        "search_service": traced(SearchService(provider.search), "SearchService"),
+    }
+
+
+def __getattr__(name: str) -> Any:
+    global _components
+    if _components is None:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        _components = _build()
+    try:
+        return _components[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+
+async def write(call: Callable[..., T], *args: Any) -> T:
+    """Run a hierarchy or device write from an async route.
+
+    SQLite writes wait for a group commit, so they go to the threadpool. Meanwhile the
+    event loop keeps serving and concurrent writes can join the same batch. Memory
+    writes stay inline; the in-memory store relies on the event loop being its only writer.
+    """
+    if config.settings.storage_backend.lower() == "sqlite":
+        return await run_in_threadpool(call, *args)
+    return call(*args)
+
+
+def is_initialized() -> bool:
+    return _components is not None
 
 
 def reset_repositories() -> None:
-    global repository_provider, location_service, building_service, zone_service, area_service, zone_device_service
-    repository_provider = get_repository_provider()
-    location_service = LocationService(repository_provider.locations)
-    building_service = BuildingService(repository_provider.locations, repository_provider.buildings)
-    zone_service = ZoneService(
-        repository_provider.locations,
-        repository_provider.buildings,
-        repository_provider.zones,
-    )
-    area_service = AreaService(
-        repository_provider.locations,
-        repository_provider.buildings,
-        repository_provider.zones,
-        repository_provider.areas,
-    )
-    zone_device_service = ZoneDeviceService(
-        repository_provider.zones,
-        repository_provider.zone_devices,
-    )
+    """Drop the wired services; the next access rebuilds them from the current settings."""
+    global _components
+    if _components is not None:
+        provider = _components["repository_provider"]
+        for hook in ("clear", "close"):
+            method = getattr(provider, hook, None)
+            if callable(method):
+                method()
+    _components = None
+    get_repository_provider.cache_clear()
@@ -1,15 +1,15 @@
 from dataclasses import dataclass, field
-from typing import List
+from typing import List, Tuple
 
 
-@dataclass
+@dataclass(slots=True)
 class Area:
     id: str
     name: str
     zone_id: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Zone:
     id: str
     name: str
@@ -17,7 +17,7 @@ class Zone:
     areas: List[Area] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class Building:
     id: str
     name: str
@@ -25,8 +25,16 @@ class Building:
     zones: List[Zone] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class Location:
     id: str
     name: str
     buildings: List[Building] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class SearchHit:
+    id: str
+    name: str
+    # (id, name) of each node from the location down to the hit; the depth gives the kind.
+    path: List[Tuple[str, str]] = field(default_factory=list)
@@ -0,0 +1,11 @@
+import sys
+from uuid import uuid4
+
+
+def new_id() -> str:
+    return str(uuid4())
+
+
+def intern_id(value: str) -> str:
+    """Share one string object per ID so child entities don't each keep a copy of their parent's ID."""
+    return sys.intern(value)
@@ -59,3 +59,16 @@ class AreaResponse(BaseModel):
 
 class AreaUpdateRequest(BaseModel):
     name: str | None = Field(default=None, min_length=1)
+
+
+class SearchPathSegment(BaseModel):
+    kind: str
+    id: str
+    name: str
+
+
+class SearchResult(BaseModel):
+    kind: str
+    id: str
+    name: str
+    path: List[SearchPathSegment]
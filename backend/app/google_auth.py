@@ -0,0 +1,147 @@
+"""Google sign-in: local ID-token verification against Google's published keys.
+
+ID tokens are RS256 JWTs. They are checked here against the JWKS key set, with no
+call to Google per sign-in. The key set is cached for as long as Google's
+``Cache-Control: max-age`` allows. The lifespan refreshes it shortly before
+expiry, so sign-ins do not wait on the fetch. A token signed with a key id the
+cache does not know triggers one early refresh, at most every
+``MIN_REFRESH_INTERVAL`` seconds, which covers Google rotating its keys. If a
+refresh fails, the previous keys are used and the next attempt waits
+``MIN_REFRESH_INTERVAL`` seconds, so sign-ins do not each block on a failing
+fetch. Concurrent sign-ins share one refresh.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from typing import TYPE_CHECKING, Dict, List
+
+from . import config
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger("backend.google_auth")
+
+GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
+GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v2/userinfo"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+MIN_REFRESH_INTERVAL = 60.0
+CLOCK_SKEW_SECONDS = 30
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def google_audiences() -> List[str]:
+    """Client ids whose ID tokens we accept: the web client plus any configured app clients."""
+    settings = config.settings
+    audiences = [settings.google_client_id] if settings.google_client_id else []
+    return audiences + [client_id for client_id in settings.oauth_client_ids.values() if client_id]
+
+
+class JWKSCache:
+    def __init__(self, url: str, default_max_age: float) -> None:
+        self.configure(url, default_max_age)
+
+    def configure(self, url: str, default_max_age: float) -> None:
+        self.url = url
+        self.default_max_age = default_max_age
+        self._keys: Dict[str, dict] = {}
+        self._fetched_at = float("-inf")
+        self._expires_at = 0.0
+        self._refreshing = asyncio.Lock()
+        self.fetches = 0
+
+    @property
+    def expires_in(self) -> float:
+        return self._expires_at - time.monotonic()
+
+    async def refresh(self, client: "httpx.AsyncClient") -> None:
+        self._fetched_at = time.monotonic()
+        response = await client.get(self.url)
+        response.raise_for_status()
+        keys = {key["kid"]: key for key in response.json()["keys"] if "kid" in key}
+        match = _MAX_AGE.search(response.headers.get("cache-control", ""))
+        max_age = float(match.group(1)) if match else self.default_max_age
+        self._keys = keys
+        self._expires_at = self._fetched_at + max_age
+        self.fetches += 1
+
+    async def get_key(self, client: "httpx.AsyncClient", kid: str) -> dict | None:
+        if self._stale(kid):
+            async with self._refreshing:
+                if self._stale(kid):  # unless a sign-in that held the lock refreshed meanwhile
+                    await self._try_refresh(client)
+        if not self._keys:
+            raise LookupError("Google signing keys unavailable")
+        return self._keys.get(kid)
+
+    def _stale(self, kid: str) -> bool:
+        now = time.monotonic()
+        return now >= self._expires_at or (kid not in self._keys and now - self._fetched_at >= MIN_REFRESH_INTERVAL)
+
+    async def _try_refresh(self, client: "httpx.AsyncClient") -> None:
+        try:
+            await self.refresh(client)
+        except Exception:
+            self._expires_at = time.monotonic() + MIN_REFRESH_INTERVAL
+            logger.warning("refreshing Google signing keys failed; using cached keys", exc_info=True)
+
+    async def keep_fresh(self, client: "httpx.AsyncClient", lead_seconds: float = 60.0) -> None:
+        """Refresh ahead of expiry for as long as the app runs (a lifespan background task)."""
+        while True:
+            try:
+                if self.expires_in <= lead_seconds:
+                    await self.refresh(client)
+                delay = max(self.expires_in - lead_seconds, MIN_REFRESH_INTERVAL)
+            except Exception:
+                logger.warning("prefetching Google signing keys failed", exc_info=True)
+                delay = MIN_REFRESH_INTERVAL
+            await asyncio.sleep(delay)
+
+
+google_keys = JWKSCache(config.settings.google_jwks_url, config.settings.google_jwks_max_age_seconds)
+
+
+async def verify_id_token(client: "httpx.AsyncClient", token: str, access_token: str | None = None) -> dict:
+    """Return the claims of a valid Google ID token for one of our client ids; ValueError otherwise."""
+    from jose import JWTError, jwt
+
+    audiences = google_audiences()
+    if not audiences:
+        raise LookupError("Google sign-in not configured")
+    try:
+        header = jwt.get_unverified_header(token)
+    except JWTError as exc:
+        raise ValueError("Malformed ID token") from exc
+    key = await google_keys.get_key(client, header.get("kid", ""))
+    if key is None:
+        raise ValueError("Unknown ID token signing key")
+    try:
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            issuer=GOOGLE_ISSUERS,
+            access_token=access_token,
+            options={"verify_aud": False, "verify_at_hash": access_token is not None, "leeway": CLOCK_SKEW_SECONDS},
+        )
+    except JWTError as exc:
+        raise ValueError("Invalid ID token") from exc
+    # jose accepts tokens without an ``aud`` claim, so check it here.
+    if claims.get("aud") not in audiences or not claims.get("sub"):
+        raise ValueError("ID token was not issued for this application")
+    return claims
+
+
+__all__ = [
+    "GOOGLE_TOKEN_URL",
+    "GOOGLE_USERINFO_URL",
+    "JWKSCache",
+    "google_audiences",
+    "google_keys",
+    "verify_id_token",
+]
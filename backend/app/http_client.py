@@ -0,0 +1,47 @@
+"""The app's shared outbound HTTP client.
+
+One keep-alive ``httpx.AsyncClient`` per app: calls to the same host reuse pooled
+connections, so the TLS handshake happens once rather than per request. The lifespan
+opens it when something at startup needs it (Google key prefetch) and closes it on
+shutdown; otherwise it is opened on first use.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from fastapi import FastAPI
+
+from . import config
+from .observability.tracing import tracer
+
+if TYPE_CHECKING:
+    import httpx
+
+
+def build_http_client() -> "httpx.AsyncClient":
+    import httpx
+
+    from .observability.http_tracing import TracingTransport
+
+    settings = config.settings
+    limits = httpx.Limits(max_connections=50, max_keepalive_connections=10, keepalive_expiry=60)
+    transport = httpx.AsyncHTTPTransport(limits=limits, retries=1)
+    return httpx.AsyncClient(transport=TracingTransport(transport, tracer), timeout=settings.http_timeout_seconds)
+
+
+def get_http_client(app: FastAPI) -> "httpx.AsyncClient":
+    client = getattr(app.state, "http_client", None)
+    if client is None:
+        client = app.state.http_client = build_http_client()
+    return client
+
+
+async def close_http_client(app: FastAPI) -> None:
+    client = getattr(app.state, "http_client", None)
+    if client is not None:
+        app.state.http_client = None
+        await client.aclose()
+
+
+__all__ = ["build_http_client", "close_http_client", "get_http_client"]
@@ -0,0 +1,186 @@
+"""Cache invalidation events shared between the workers of one deployment.
+
+``publish(topic, key)`` notifies local subscribers immediately. With a bus path
+configured it also appends a row to a small SQLite change table. Every process
+runs a poller thread that checks ``PRAGMA data_version``, a counter that only
+moves when another connection commits, so an idle poll costs a few microseconds.
+When the counter moves, the poller reads the new rows in sequence order and
+delivers them to its subscribers. Delivery latency is therefore about one poll
+interval.
+
+Subscribers are called from the poller thread. They must be cheap and thread-safe,
+typically by bumping a generation counter or handing keys to the owning thread.
+``key=None`` means "everything under this topic". It is delivered when a poller
+finds that rows it never saw have already been pruned.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from collections import defaultdict
+from typing import Callable, DefaultDict, List, Optional
+
+from . import config
+
+logger = logging.getLogger("backend.invalidation")
+
+Subscriber = Callable[[str, Optional[str]], None]
+
+# Rows kept behind the newest one; a poller further behind than this invalidates whole topics.
+RETAINED_CHANGES = 10_000
+_PRUNE_EVERY = 1_000
+
+
+class InvalidationBus:
+    """In-process bus: subscribers hear about changes made by this process only."""
+
+    def __init__(self) -> None:
+        self._subscribers: DefaultDict[str, List[Subscriber]] = defaultdict(list)
+
+    def subscribe(self, topic: str, callback: Subscriber) -> None:
+        self._subscribers[topic].append(callback)
+
+    def unsubscribe(self, topic: str, callback: Subscriber) -> None:
+        callbacks = self._subscribers.get(topic, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def publish(self, topic: str, key: str | None = None) -> int | None:
+        """Deliver the event; returns its bus position when other workers will see it."""
+        self._deliver(topic, key)
+        return None
+
+    def caught_up(self, position: int) -> bool:
+        """Whether every event up to ``position`` has been delivered in this process."""
+        return True
+
+    def _deliver(self, topic: str, key: str | None) -> None:
+        for callback in self._subscribers.get(topic, ()):
+            try:
+                callback(topic, key)
+            except Exception:  # one broken subscriber must not starve the others
+                logger.exception("invalidation subscriber failed for %s/%s", topic, key)
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteInvalidationBus(InvalidationBus):
+    def __init__(self, path: str, poll_interval: float = 0.005) -> None:
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._writer = self._connect()
+        self._writer.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                key TEXT,
+                origin TEXT NOT NULL
+            );
+            """
+        )
+        self._write_lock = threading.Lock()
+        self._published = 0
+        row = self._writer.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        self._last_seq = row[0] if row else 0
+        self._stop = threading.Event()
+        self._poller = threading.Thread(target=self._poll_loop, name="invalidation-poller", daemon=True)
+        self._poller.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def publish(self, topic: str, key: str | None = None) -> int | None:
+        self._deliver(topic, key)
+        with self._write_lock:
+            cursor = self._writer.execute(
+                "INSERT INTO changes (topic, key, origin) VALUES (?, ?, ?)", (topic, key, self.origin)
+            )
+            self._published += 1
+            if self._published % _PRUNE_EVERY == 0:
+                self._writer.execute(
+                    "DELETE FROM changes WHERE seq < (SELECT MAX(seq) FROM changes) - ?", (RETAINED_CHANGES,)
+                )
+        return cursor.lastrowid
+
+    def caught_up(self, position: int) -> bool:
+        return position <= self._last_seq
+
+    def _poll_loop(self) -> None:
+        reader = self._connect()
+        version = None
+        try:
+            while not self._stop.wait(self.poll_interval):
+                current = reader.execute("PRAGMA data_version").fetchone()[0]
+                if current == version:
+                    continue
+                version = current
+                try:
+                    self._drain(reader)
+                except sqlite3.Error:
+                    logger.exception("reading invalidation events failed")
+        finally:
+            reader.close()
+
+    def _drain(self, reader: sqlite3.Connection) -> None:
+        rows = reader.execute(
+            "SELECT seq, topic, key, origin FROM changes WHERE seq > ? ORDER BY seq", (self._last_seq,)
+        ).fetchall()
+        if not rows:
+            return
+        if rows[0][0] > self._last_seq + 1:
+            # Writes are serialized and committed one row at a time, so a hole means pruned rows.
+            for topic in list(self._subscribers):
+                self._deliver(topic, None)
+        for seq, topic, key, origin in rows:
+            if origin != self.origin:
+                self._deliver(topic, key)
+            self._last_seq = seq
+
+    def close(self) -> None:
+        self._stop.set()
+        self._poller.join(timeout=1.0)
+        with self._write_lock:
+            self._writer.close()
+
+
+_bus: InvalidationBus | None = None
+_bus_lock = threading.Lock()
+
+
+def build_bus() -> InvalidationBus:
+    settings = config.settings
+    if not settings.invalidation_bus_path:
+        return InvalidationBus()
+    return SQLiteInvalidationBus(settings.invalidation_bus_path, settings.invalidation_poll_interval_ms / 1000)
+
+
+def get_bus() -> InvalidationBus:
+    """The process-wide bus, created on first use (after any launcher fork)."""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = build_bus()
+    return _bus
+
+
+def reset_bus() -> None:
+    global _bus
+    with _bus_lock:
+        if _bus is not None:
+            _bus.close()
+        _bus = None
+
+
+__all__ = ["InvalidationBus", "SQLiteInvalidationBus", "get_bus", "reset_bus"]
@@ -0,0 +1,237 @@
+"""Production entry point: a pre-forking master around uvicorn workers.
+
+Run from the repository root::
+
+    python -m backend.app.launcher --workers 4 --port 8000
+
+The master binds the listening socket once and forks ``--workers`` children that
+all accept from it, so the kernel spreads connections across them and a crashed
+worker is replaced without dropping the port. Each worker serves with uvloop and
+httptools when they are installed and runs :mod:`backend.app.warmup` during its
+lifespan startup, before it starts accepting. SIGTERM/SIGINT on the master
+forwards SIGTERM to every worker; uvicorn then stops accepting, finishes in-flight
+requests for up to ``--graceful-timeout`` seconds and exits. Workers still alive
+after that are killed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import importlib.util
+import logging
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+logger = logging.getLogger("backend.launcher")
+
+# Extra time the master allows on top of the workers' own drain timeout before SIGKILL.
+KILL_GRACE_SECONDS = 5.0
+# A worker that dies sooner than this after starting is restarted after a pause, not in a hot loop.
+MIN_WORKER_UPTIME_SECONDS = 1.0
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def event_loop_choice() -> str:
+    return "uvloop" if _installed("uvloop") else "asyncio"
+
+
+def http_choice() -> str:
+    return "httptools" if _installed("httptools") else "h11"
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve(sock: socket.socket, graceful_timeout: int, warmup: bool, log_level: str) -> None:
+    """Worker body: build the app from the environment's settings and serve ``sock`` until told to stop."""
+    import uvicorn
+
+    from .config import Settings
+    from .main import create_app
+
+    settings = Settings()
+    settings.warmup_on_startup = warmup
+    config = uvicorn.Config(
+        create_app(settings),
+        loop=event_loop_choice(),
+        http=http_choice(),
+        lifespan="on",
+        timeout_graceful_shutdown=graceful_timeout,
+        log_level=log_level,
+        access_log=False,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _exit_worker(_signum: int, _frame=None) -> None:
+    os._exit(0)
+
+
+class Master:
+    def __init__(self, sock: socket.socket, workers: int, graceful_timeout: int, warmup: bool, log_level: str) -> None:
+        self.sock = sock
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.warmup = warmup
+        self.log_level = log_level
+        self.children: Dict[int, tuple[int, float]] = {}
+        self._stop_requested = False
+        self._deadline: float | None = None
+
+    def spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            # uvicorn re-raises the signal it drained on once it returns; exit cleanly instead of dying by it.
+            signal.signal(signal.SIGTERM, _exit_worker)
+            signal.signal(signal.SIGINT, _exit_worker)
+            code = 0
+            try:
+                serve(self.sock, self.graceful_timeout, self.warmup, self.log_level)
+            except BaseException:
+                logger.exception("worker %d crashed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = (slot, time.monotonic())
+        logger.info("started worker %d (pid %d)", slot, pid)
+
+    def request_stop(self, signum: int, _frame=None) -> None:
+        if self._stop_requested:
+            return
+        self._stop_requested = True
+        logger.info("received %s, draining %d workers", signal.Signals(signum).name, len(self.children))
+
+    def _drain(self) -> None:
+        # New connections must not queue on a socket nobody will accept from any more.
+        self.sock.close()
+        for pid in self.children:
+            self._signal(pid, signal.SIGTERM)
+        self._deadline = time.monotonic() + self.graceful_timeout + KILL_GRACE_SECONDS
+
+    def _signal(self, pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _reap(self) -> None:
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            child = self.children.pop(pid, None)
+            if child is None:
+                continue
+            slot, started = child
+            code = os.waitstatus_to_exitcode(status)
+            if self._stop_requested:
+                logger.info("worker %d (pid %d) exited with %d", slot, pid, code)
+                continue
+            logger.warning("worker %d (pid %d) died with %d; restarting", slot, pid, code)
+            if time.monotonic() - started < MIN_WORKER_UPTIME_SECONDS:
+                time.sleep(MIN_WORKER_UPTIME_SECONDS)
+            self.spawn(slot)
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        for slot in range(self.workers):
+            self.spawn(slot)
+        while self.children:
+            self._reap()
+            if self._stop_requested and self._deadline is None:
+                self._drain()
+            if self._deadline is not None and time.monotonic() > self._deadline:
+                for pid in list(self.children):
+                    logger.warning("worker pid %d did not drain in time; killing", pid)
+                    self._signal(pid, signal.SIGKILL)
+                self._deadline = float("inf")
+            time.sleep(0.05)
+        return 0
+
+
+def _prepare_shared_state(settings) -> None:
+    """Point every worker at one invalidation bus and warn about per-process primary stores."""
+    if not settings.invalidation_bus_path:
+        path = os.path.join(tempfile.gettempdir(), f"backend-invalidation-{os.getpid()}.sqlite")
+        os.environ["APP_INVALIDATION_BUS_PATH"] = path
+        atexit.register(_remove_bus_files, path)
+        logger.info("invalidation bus at %s", path)
+    if settings.storage_backend.lower() == "memory" or settings.user_repository_backend.lower() == "memory":
+        logger.warning(
+            "memory storage keeps a separate copy of the data in every worker; "
+            "use STORAGE_BACKEND=sqlite and USER_REPOSITORY=sqlite with more than one worker"
+        )
+
+
+def _remove_bus_files(path: str) -> None:
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.unlink(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    """Command-line options over the settings' defaults; ``workers`` comes back resolved, never 0."""
+    from .config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument("--workers", type=int, default=settings.workers, help="0 means one per CPU")
+    parser.add_argument("--graceful-timeout", type=int, default=settings.graceful_timeout_seconds)
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--no-warmup", action="store_true", help="accept traffic without priming routes first")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    args.workers = args.workers or os.cpu_count() or 1
+    return args
+
+
+def main(argv: List[str] | None = None) -> int:
+    from .config import settings
+
+    args = parse_args(argv)
+    workers = args.workers
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(name)s %(message)s")
+    if workers > 1:
+        _prepare_shared_state(settings)
+    sock = bind_socket(args.host, args.port, args.backlog)
+    logger.info(
+        "listening on %s:%d with %d workers (loop=%s, http=%s)",
+        args.host,
+        sock.getsockname()[1],
+        workers,
+        event_loop_choice(),
+        http_choice(),
+    )
+    # Import the app in the master so workers share the loaded modules copy-on-write;
+    # create_app() itself runs per worker, after the fork.
+    from . import main as _app_module  # noqa: F401
+
+    return Master(sock, workers, args.graceful_timeout, not args.no_warmup, args.log_level).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,42 @@
+import asyncio
 import inspect
 import secrets
 from contextlib import asynccontextmanager
 
-import httpx
-from fastapi import Body, Depends, FastAPI, HTTPException, Request, status
+from fastapi import APIRouter, Body, Depends, FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
-from .auth import create_access_token, create_refresh_token, create_user, decode_token, user_repo, verify_password
-from .config import settings
+from . import config, container
+from .admission import AdmissionMiddleware, ShardedTokenBuckets, merge_limits
+from .consistency import HEADER as CONSISTENCY_HEADER
+from .consistency import ConsistencyMiddleware
+from .auth import (
+    access_token_cache,
+    create_access_token,
+    create_refresh_token,
+    create_user,
+    decode_token,
+    get_user_repo,
+    new_token_family,
+    reject_revoked_access,
+    reset_user_repo,
+    revoke_refresh_family,
+    rotate_refresh_token,
+    verify_password,
+)
+from .config import Settings
+from .google_auth import GOOGLE_TOKEN_URL, GOOGLE_USERINFO_URL, google_audiences, google_keys, verify_id_token
+from .http_client import close_http_client, get_http_client
+from .invalidation import reset_bus
+from .observability.context import RequestContextMiddleware
+from .observability.loop_lag import monitor_event_loop_lag
+from .observability.metrics import registry as metrics_registry
+from .observability.middleware import MetricsMiddleware
+from .observability.slow_queries import slow_query_log
+from .observability.sql import QueryStatsMiddleware
+from .observability.tracing import TracingMiddleware, tracer
 from .models import (
     DeviceCreateRequest,
     DeviceListResponse,
@@ -18,27 +46,46 @@ from .models import (
     RefreshRequest,
     TokenResponse,
     User,
+    UserInDB,
 )
+from .presence import PresenceTracker, build_tracker, record_heartbeat
 from .repositories.device_repository import DeviceRepository, InMemoryDeviceRepository
-from .routers import areas, buildings, locations, zone_devices, zones
+from .routers import admin, areas, buildings, locations, search, subtree_devices, zone_devices, zones
 from .services.hivemq_client import build_mqtt_credentials, device_topics
+from .warmup import warmup
 
 security = HTTPBearer(auto_error=False)
+router = APIRouter()
+
+USERNAME_ALLOCATION_ATTEMPTS = 3
 
 
 def build_device_repository() -> DeviceRepository:
-    if settings.database_backend == "memory":
+    backend = config.settings.database_backend
+    if backend == "memory":
         return InMemoryDeviceRepository()
-    raise ValueError(f"Unsupported database backend: {settings.database_backend}")
+    raise ValueError(f"Unsupported database backend: {backend}")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    app.state.settings = settings
     app.state.device_repository = build_device_repository()
+    app.state.device_presence = build_tracker()
+    lag_monitor = key_refresher = None
     try:
+        # Started inside the try, so a failing warmup still cancels them.
+        if app.state.settings.metrics_enabled:
+            lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+        if google_audiences():
+            key_refresher = asyncio.create_task(google_keys.keep_fresh(get_http_client(app)))
+        if app.state.settings.warmup_on_startup:
+            await warmup(app)
         yield
     finally:
+        for task in (lag_monitor, key_refresher):
+            if task is not None:
+                task.cancel()
+        await close_http_client(app)
         repository = app.state.device_repository
         shutdown = getattr(repository, "close", None)
         if callable(shutdown):
@@ -51,8 +98,12 @@ def get_device_repository(request: Request) -> DeviceRepository:
     return request.app.state.device_repository
 
 
+def get_device_presence(request: Request) -> PresenceTracker:
+    return request.app.state.device_presence
+
+
 def _user_from_prefix_token(token: str) -> User | None:
-    prefix = settings.app_token_prefix
+    prefix = config.settings.app_token_prefix
     if not token.startswith(prefix):
         return None
     user_id = token[len(prefix) :]
@@ -62,16 +113,23 @@ def _user_from_prefix_token(token: str) -> User | None:
 
 
 def _user_from_jwt(token: str) -> User:
+    cached = access_token_cache.get(token) if access_token_cache.enabled else None
+    if cached is not None:
+        return cached
+    generation = access_token_cache.generation
     payload = decode_token(token)
     if payload.get("type") != "access":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token type")
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
-    user = user_repo.get_by_id(user_id)
+    reject_revoked_access(payload)
+    user = get_user_repo().get_by_id(user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return User(id=user.id, username=user.username, email=user.email)
+    current = User(id=user.id, username=user.username, email=user.email)
+    access_token_cache.put(token, current, payload.get("exp"), generation, payload.get("fam"))
+    return current
 
 
 async def get_current_user(
@@ -87,30 +145,31 @@ async def get_current_user(
     return _user_from_jwt(token)
 
 
-app = FastAPI(title="Smart Domotics Broker API", version="0.2.0", lifespan=lifespan)
+@router.get("/healthz")
+async def healthcheck() -> dict:
+    return {"status": "ok"}
+
+
+def _metrics_access(credentials: HTTPAuthorizationCredentials | None = Depends(security)) -> None:
+    if not config.settings.metrics_public:
+        admin.require_admin(credentials)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.cors_allowed_origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-api_prefix = "/api/v1"
-app.include_router(locations.router, prefix=api_prefix)
-app.include_router(buildings.router, prefix=api_prefix)
-app.include_router(zones.router, prefix=api_prefix)
-app.include_router(areas.router, prefix=api_prefix)
-app.include_router(zone_devices.router, prefix=api_prefix)
+@router.get("/metrics", include_in_schema=False, dependencies=[Depends(_metrics_access)])
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
 
-@app.get("/healthz")
-async def healthcheck() -> dict:
-    return {"status": "ok"}
+def _token_pair(user_id: str, family: str | None = None) -> TokenResponse:
+    """Access and refresh tokens of one family, so logging out revokes both."""
+    family = family or new_token_family()
+    return TokenResponse(
+        access_token=create_access_token(user_id, family),
+        refresh_token=create_refresh_token(user_id, family),
+    )
 
 
-@app.post("/api/auth/register", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/api/auth/register", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
 async def register_user(request: RegisterRequest) -> TokenResponse:
     username = request.username or request.name or request.email.split("@", 1)[0]
     try:
@@ -118,9 +177,7 @@ async def register_user(request: RegisterRequest) -> TokenResponse:
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
-    access_token = create_access_token(user.id)
-    refresh_token = create_refresh_token(user.id)
-    return TokenResponse(access_token=access_token, refresh_token=refresh_token)
+    return _token_pair(user.id)
 
 
 async def _get_login_payload(request: Request) -> tuple[str, str]:
@@ -139,57 +196,76 @@ async def _get_login_payload(request: Request) -> tuple[str, str]:
     raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid login payload")
 
 
-@app.post("/api/auth/login", response_model=TokenResponse)
+@router.post("/api/auth/login", response_model=TokenResponse)
 async def login(payload: tuple[str, str] = Depends(_get_login_payload)) -> TokenResponse:
     identifier, password = payload
-    user = user_repo.get_by_username(identifier) or user_repo.get_by_email(identifier)
+    user = get_user_repo().get_by_username(identifier) or get_user_repo().get_by_email(identifier)
     if not user or not verify_password(password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
-    return TokenResponse(
-        access_token=create_access_token(user.id),
-        refresh_token=create_refresh_token(user.id),
-    )
+    return _token_pair(user.id)
 
 
-@app.post("/api/auth/refresh", response_model=TokenResponse)
-async def refresh_token(request: RefreshRequest) -> TokenResponse:
-    from jose import JWTError, jwt
-
-    try:
-        payload = jwt.decode(request.refresh_token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-    except JWTError as exc:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from exc
-
+def _decode_refresh_token(token: str) -> dict:
+    payload = decode_token(token)
     if payload.get("type") != "refresh":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token type")
+    return payload
 
+
+@router.post("/api/auth/refresh", response_model=TokenResponse)
+async def refresh_token(request: RefreshRequest) -> TokenResponse:
+    payload = _decode_refresh_token(request.refresh_token)
     user_id = payload.get("sub")
-    if not user_id or not user_repo.get_by_id(user_id):
+    if not user_id or not get_user_repo().get_by_id(user_id):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    family = rotate_refresh_token(payload)
 
-    return TokenResponse(
-        access_token=create_access_token(user_id),
-        refresh_token=create_refresh_token(user_id),
-    )
+    return _token_pair(user_id, family)
 
 
-@app.get("/api/profile", response_model=User)
+@router.post("/api/auth/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(request: RefreshRequest) -> None:
+    revoke_refresh_family(_decode_refresh_token(request.refresh_token))
+
+
+@router.get("/api/profile", response_model=User)
 async def profile(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 
-def _unique_username(base: str) -> str:
-    candidate = base
-    suffix = 1
-    while user_repo.get_by_username(candidate):
-        candidate = f"{base}{suffix}"
-        suffix += 1
-    return candidate
+def _google_user(claims: dict) -> UserInDB:
+    google_sub = claims.get("sub")
+    email = claims.get("email")
+    name = claims.get("name") or email or "google_user"
+
+    repo = get_user_repo()
+    user = repo.get_by_google_sub(google_sub) if google_sub else None
+    if user:
+        return user
+    username_base = email.split("@", 1)[0] if email and "@" in email else google_sub or name
+    for _ in range(USERNAME_ALLOCATION_ATTEMPTS):
+        # Another sign-up may claim the allocated name before our insert; allocate again.
+        username = repo.allocate_username(username_base)
+        try:
+            return create_user(username=username, password=secrets.token_urlsafe(12), email=email, google_sub=google_sub)
+        except ValueError as exc:
+            error = exc
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(error))
+
+
+async def _verified_google_claims(client, id_token: str, access_token: str | None = None) -> dict:
+    try:
+        return await verify_id_token(client, id_token, access_token)
+    except LookupError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(exc)) from exc
 
 
-@app.get("/api/auth/google/callback", response_model=TokenResponse)
-async def google_callback(code: str):
+@router.get("/api/auth/google/callback", response_model=TokenResponse)
+async def google_callback(code: str, request: Request):
+    settings = config.settings
     if not settings.google_client_id or not settings.google_client_secret:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Google OAuth not configured")
 
@@ -201,64 +277,57 @@ async def google_callback(code: str):
         "grant_type": "authorization_code",
     }
 
-    async with httpx.AsyncClient() as client:
-        token_resp = await client.post("https://oauth2.googleapis.com/token", data=token_payload)
-        if token_resp.status_code != 200:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Google token exchange failed")
-        token_data = token_resp.json()
-        google_access_token = token_data.get("access_token")
-        if not google_access_token:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Google token missing")
-
+    client = get_http_client(request.app)
+    token_resp = await client.post(GOOGLE_TOKEN_URL, data=token_payload)
+    if token_resp.status_code != 200:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Google token exchange failed")
+    token_data = token_resp.json()
+    google_access_token = token_data.get("access_token")
+    if not google_access_token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Google token missing")
+
+    if token_data.get("id_token"):
+        claims = await _verified_google_claims(client, token_data["id_token"], google_access_token)
+    else:
+        # Only without the openid scope: fall back to a second round trip for the profile.
         userinfo_resp = await client.get(
-            "https://www.googleapis.com/oauth2/v2/userinfo",
-            headers={"Authorization": f"Bearer {google_access_token}"},
+            GOOGLE_USERINFO_URL, headers={"Authorization": f"Bearer {google_access_token}"}
         )
-
         if userinfo_resp.status_code != 200:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Failed to fetch Google profile")
         userinfo = userinfo_resp.json()
+        claims = {"sub": userinfo.get("id"), "email": userinfo.get("email"), "name": userinfo.get("name")}
 
-    google_sub = userinfo.get("id")
-    email = userinfo.get("email")
-    name = userinfo.get("name") or email or "google_user"
-
-    user = user_repo.get_by_google_sub(google_sub) if google_sub else None
-    if not user:
-        username_base = email.split("@", 1)[0] if email and "@" in email else google_sub or name
-        username = _unique_username(username_base)
-        generated_password = secrets.token_urlsafe(12)
-        user = create_user(username=username, password=generated_password, email=email, google_sub=google_sub)
-
-    return TokenResponse(access_token=create_access_token(user.id), refresh_token=create_refresh_token(user.id))
+    user = _google_user(claims)
+    return _token_pair(user.id)
 
 
-@app.post("/api/auth/google", response_model=TokenResponse)
-async def google_sign_in(payload: dict = Body(...)) -> TokenResponse:
+@router.post("/api/auth/google", response_model=TokenResponse)
+async def google_sign_in(request: Request, payload: dict = Body(...)) -> TokenResponse:
     id_token = payload.get("id_token")
     if not id_token:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing id_token")
-    username = _unique_username("google_user")
-    user = create_user(username=username, password=secrets.token_urlsafe(12), email=None, google_sub=id_token)
-    return TokenResponse(access_token=create_access_token(user.id), refresh_token=create_refresh_token(user.id))
+    claims = await _verified_google_claims(get_http_client(request.app), id_token)
+    user = _google_user(claims)
+    return _token_pair(user.id)
 
 
-@app.post("/api/auth/oauth/callback", response_model=TokenResponse)
-async def oauth_callback(payload: dict = Body(...)) -> TokenResponse:
+@router.post("/api/auth/oauth/callback", response_model=TokenResponse)
+async def oauth_callback(request: Request, payload: dict = Body(...)) -> TokenResponse:
     code = payload.get("code")
     if not code:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Missing code")
-    return await google_callback(code)
+    return await google_callback(code, request)
 
 
-@app.post("/api/auth/mqtt", response_model=MQTTCredentialsResponse)
+@router.post("/api/auth/mqtt", response_model=MQTTCredentialsResponse)
 async def issue_mqtt_credentials(user: User = Depends(get_current_user)) -> MQTTCredentialsResponse:
     creds = build_mqtt_credentials(user.id)
     creds["client_id"] = f"{user.username}-app"
     return MQTTCredentialsResponse(**creds)
 
 
-@app.post("/api/devices", response_model=DeviceResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/api/devices", response_model=DeviceResponse, status_code=status.HTTP_201_CREATED)
 async def register_device(
     payload: DeviceCreateRequest,
     user: User = Depends(get_current_user),
@@ -275,25 +344,128 @@ async def register_device(
     )
 
 
-@app.get("/api/devices", response_model=DeviceListResponse)
+@router.get("/api/devices", response_model=DeviceListResponse)
 async def list_devices(
     user: User = Depends(get_current_user),
     repo: DeviceRepository = Depends(get_device_repository),
+    presence: PresenceTracker = Depends(get_device_presence),
 ) -> DeviceListResponse:
     devices = [
-        DeviceResponse(device_id=device.id, name=device.name, topics=device_topics(user.id, device.id))
+        DeviceResponse(
+            device_id=device.id,
+            name=device.name,
+            topics=device_topics(user.id, device.id),
+            online=presence.is_online((user.id, device.id)),
+        )
         for device in repo.list_devices(user.id)
     ]
     return DeviceListResponse(devices=devices)
 
 
-@app.delete("/api/devices/{device_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.post("/api/devices/{device_id}/heartbeat", status_code=status.HTTP_204_NO_CONTENT)
+async def device_heartbeat(
+    device_id: str,
+    user: User = Depends(get_current_user),
+    repo: DeviceRepository = Depends(get_device_repository),
+    presence: PresenceTracker = Depends(get_device_presence),
+) -> None:
+    """Mark the device online for the presence timeout; MQTT traffic does the same via the admin bridge."""
+    if not record_heartbeat(presence, repo, user.id, device_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Device not found")
+
+
+@router.delete("/api/devices/{device_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_device(
     device_id: str,
     user: User = Depends(get_current_user),
     repo: DeviceRepository = Depends(get_device_repository),
+    presence: PresenceTracker = Depends(get_device_presence),
 ) -> None:
     try:
         repo.delete_device(user.id, device_id)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    presence.forget((user.id, device_id))
+
+
+def _apply_settings(settings: Settings) -> None:
+    config.configure(settings)
+    reset_user_repo()
+    container.reset_repositories()
+    reset_bus()
+    access_token_cache.configure(settings.auth_cache_max_entries, settings.auth_cache_ttl_seconds)
+    slow_query_log.resize(settings.slow_query_log_size)
+    tracer.configure(settings.tracing_sample_rate, settings.tracing_max_traces)
+    google_keys.configure(settings.google_jwks_url, settings.google_jwks_max_age_seconds)
+
+
+def create_app(settings: Settings | None = None) -> FastAPI:
+    """Build the ASGI app.
+
+    Passing ``settings`` makes them the process-wide configuration and drops any
+    already-initialized user store, repositories and caches. Storage, password
+    hashing, JWT and outbound HTTP are all set up on first use rather than here,
+    so the app is ready to serve as soon as the routes are registered.
+    """
+    if settings is not None:
+        _apply_settings(settings)
+    settings = config.settings
+
+    app = FastAPI(title="Smart Domotics Broker API", version="0.2.0", lifespan=lifespan)
+    app.state.settings = settings
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_allowed_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[CONSISTENCY_HEADER],
+    )
+    if settings.invalidation_bus_path:
+        app.add_middleware(ConsistencyMiddleware)
+    if settings.metrics_enabled:
+        app.add_middleware(
+            QueryStatsMiddleware,
+            budget=settings.sql_query_budget,
+            repeat_threshold=settings.sql_repeat_threshold,
+            slow_request_threshold=settings.slow_request_threshold_ms / 1000,
+            slow_log=slow_query_log,
+        )
+    if settings.admission_enabled:
+        buckets = None
+        if settings.rate_limit_per_second > 0:
+            buckets = ShardedTokenBuckets(settings.rate_limit_per_second, settings.rate_limit_burst)
+        app.add_middleware(
+            AdmissionMiddleware,
+            limits=merge_limits(settings.admission_limits),
+            buckets=buckets,
+            token_prefix=settings.app_token_prefix,
+        )
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
+    if settings.tracing_enabled:
+        app.add_middleware(TracingMiddleware, tracer=tracer)
+    app.add_middleware(RequestContextMiddleware)
+
+    api_prefix = "/api/v1"
+    app.include_router(locations.router, prefix=api_prefix)
+    app.include_router(buildings.router, prefix=api_prefix)
+    app.include_router(zones.router, prefix=api_prefix)
+    app.include_router(areas.router, prefix=api_prefix)
+    app.include_router(zone_devices.router, prefix=api_prefix)
+    app.include_router(subtree_devices.router, prefix=api_prefix)
+    app.include_router(search.router, prefix=api_prefix)
+    app.include_router(admin.router)
+    app.include_router(router)
+    return app
+
+
+def __getattr__(name: str) -> FastAPI:
+    # ``uvicorn backend.app.main:app`` keeps working, but importing this module for
+    # ``create_app`` (tests, the launcher, benchmarks) does not build a throwaway app.
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from typing import List, Optional
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, constr, validator
 
 
 class User(BaseModel):
@@ -51,6 +51,8 @@ class Device(BaseModel):
     owner_id: str | None = None
     zone_id: str | None = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    tags: List[str] = Field(default_factory=list)
+    capabilities: List[str] = Field(default_factory=list)
 
 
 class DeviceCreateRequest(BaseModel):
@@ -64,6 +66,7 @@ class DeviceResponse(BaseModel):
     name: str
     zone_id: str | None = None
     topics: List[str]
+    online: bool = False
 
 
 class DeviceListResponse(BaseModel):
@@ -151,12 +154,59 @@ class ZoneResponse(Zone):
     pass
 
 
+# Tags and capabilities: "lighting", "dimmable", "sensor:temperature".
+Label = constr(min_length=1, max_length=64, regex=r"^[a-z0-9][a-z0-9._:-]*$")
+
+
 class ZoneDeviceCreate(BaseModel):
     device_id: str = Field(..., min_length=1)
     name: str = Field(..., min_length=1)
+    tags: List[Label] = Field(default_factory=list, max_items=32)
+    capabilities: List[Label] = Field(default_factory=list, max_items=32)
+
+    @validator("tags", "capabilities", pre=True, each_item=True)
+    def lowercase(cls, value: object) -> object:
+        return value.strip().lower() if isinstance(value, str) else value
+
+    @validator("tags", "capabilities")
+    def drop_repeats(cls, value: List[str]) -> List[str]:
+        return list(dict.fromkeys(value))
 
 
 class ZoneDeviceResponse(BaseModel):
     device_id: str
     name: str
     zone_id: str
+    tags: List[str] = []
+    capabilities: List[str] = []
+    online: bool = False
+
+
+class ZoneDevicePage(BaseModel):
+    items: List[ZoneDeviceResponse]
+    next_cursor: str | None = None
+
+
+class ZoneDeviceQueryPage(BaseModel):
+    items: List[ZoneDeviceResponse]
+    count: int
+    next_cursor: str | None = None
+
+
+class ZonePresence(BaseModel):
+    zone_id: str
+    online: int
+
+
+class PresenceSummary(BaseModel):
+    online: int
+    zones: List[ZonePresence]
+
+
+class HeartbeatBatch(BaseModel):
+    topics: List[str] = Field(..., max_items=10_000)
+
+
+class HeartbeatBatchResult(BaseModel):
+    accepted: int
+    ignored: int
@@ -0,0 +1 @@
+"""Runtime instrumentation for the Smart Domotics backend."""
@@ -0,0 +1,97 @@
+"""Map running asyncio tasks to the request they serve.
+
+Samplers and diagnostics run outside the request's context (often on another
+thread), so context variables are out of reach; they look the task up here instead.
+Work a request hands to the threadpool through :func:`run_in_threadpool` is looked
+up by thread: the request's scope rides along in the context copy the worker thread
+runs in, and the thread registers it for as long as the call lasts. The ASGI scope
+is stored rather than the route because the router fills in ``scope["route"]`` only
+after this middleware has run.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, TypeVar
+
+from starlette.concurrency import run_in_threadpool as _run_in_threadpool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .middleware import route_template
+
+T = TypeVar("T")
+
+_task_scopes: Dict[asyncio.Task, Scope] = {}
+_thread_scopes: Dict[int, Scope] = {}
+_request_scope: ContextVar[Scope | None] = ContextVar("request_scope", default=None)
+
+
+def _route(scope: Scope) -> str:
+    return f"{scope['method']} {route_template(scope)}"
+
+
+def route_for_task(task: asyncio.Task | None) -> str | None:
+    scope = _task_scopes.get(task) if task is not None else None
+    return None if scope is None else _route(scope)
+
+
+def route_for_thread(thread_id: int) -> str | None:
+    """Route of the request whose :func:`run_in_threadpool` call the thread is running, if any."""
+    scope = _thread_scopes.get(thread_id)
+    return None if scope is None else _route(scope)
+
+
+async def run_in_threadpool(call: Callable[..., T], *args: Any) -> T:
+    """Starlette's ``run_in_threadpool``, with the worker thread attributed to the calling request."""
+    return await _run_in_threadpool(_attributed, call, *args)
+
+
+def _attributed(call: Callable[..., T], *args: Any) -> T:
+    scope = _request_scope.get()
+    if scope is None:
+        return call(*args)
+    thread_id = threading.get_ident()
+    _thread_scopes[thread_id] = scope
+    try:
+        return call(*args)
+    finally:
+        _thread_scopes.pop(thread_id, None)
+
+
+def current_task_of(loop: asyncio.AbstractEventLoop) -> asyncio.Task | None:
+    """The task ``loop`` is running right now; with an explicit loop this works from another thread."""
+    return asyncio.current_task(loop)
+
+
+def active_request_count() -> int:
+    return len(_task_scopes)
+
+
+class RequestContextMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        task = asyncio.current_task() if scope["type"] == "http" else None
+        if task is None:
+            await self.app(scope, receive, send)
+            return
+        _task_scopes[task] = scope
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
+            _task_scopes.pop(task, None)
+
+
+__all__ = [
+    "RequestContextMiddleware",
+    "active_request_count",
+    "current_task_of",
+    "route_for_task",
+    "route_for_thread",
+    "run_in_threadpool",
+]
@@ -0,0 +1,128 @@
+"""tracemalloc snapshots, snapshot diffs and live-object census for leak hunting."""
+
+from __future__ import annotations
+
+import gc
+import itertools
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Iterable, List
+
+GROUPINGS = ("lineno", "filename", "module")
+
+
+def _module_for(filename: str) -> str:
+    path = Path(filename)
+    for entry in sorted((p for p in sys.path if p), key=len, reverse=True):
+        try:
+            relative = path.relative_to(entry)
+        except ValueError:
+            continue
+        parts = list(relative.with_suffix("").parts)
+        if parts and parts[-1] == "__init__":
+            parts.pop()
+        return ".".join(parts) or filename
+    return filename
+
+
+class HeapSnapshots:
+    def __init__(self, max_snapshots: int = 4) -> None:
+        self._snapshots: OrderedDict[int, tuple[dict, tracemalloc.Snapshot]] = OrderedDict()
+        self._ids = itertools.count(1)
+        self._max_snapshots = max_snapshots
+        self._lock = Lock()
+
+    def take(self, label: str = "", frames: int = 1) -> dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            )
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        meta = {
+            "id": next(self._ids),
+            "label": label,
+            "timestamp": time.time(),
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "traceback_limit": snapshot.traceback_limit,
+        }
+        with self._lock:
+            self._snapshots[meta["id"]] = (meta, snapshot)
+            while len(self._snapshots) > self._max_snapshots:
+                self._snapshots.popitem(last=False)
+        return meta
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            return [meta for meta, _ in self._snapshots.values()]
+
+    def _get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        with self._lock:
+            entry = self._snapshots.get(snapshot_id)
+        if entry is None:
+            raise KeyError(f"Snapshot {snapshot_id} not found")
+        return entry[1]
+
+    def diff(self, base_id: int, target_id: int, group_by: str = "lineno", limit: int = 25) -> List[dict]:
+        if group_by not in GROUPINGS:
+            raise ValueError(f"group_by must be one of {', '.join(GROUPINGS)}")
+        base, target = self._get(base_id), self._get(target_id)
+        key_type = "filename" if group_by == "module" else group_by
+        stats = target.compare_to(base, key_type)
+        rows: Dict[str, dict] = {}
+        for stat in stats:
+            frame = stat.traceback[0]
+            if group_by == "module":
+                key = _module_for(frame.filename)
+            elif group_by == "filename":
+                key = frame.filename
+            else:
+                key = f"{frame.filename}:{frame.lineno}"
+            row = rows.setdefault(key, {"location": key, "size_diff": 0, "size": 0, "count_diff": 0, "count": 0})
+            row["size_diff"] += stat.size_diff
+            row["size"] += stat.size
+            row["count_diff"] += stat.count_diff
+            row["count"] += stat.count
+        ranked = sorted(rows.values(), key=lambda row: abs(row["size_diff"]), reverse=True)
+        return ranked[:limit]
+
+    def clear(self, stop_tracing: bool = True) -> None:
+        with self._lock:
+            self._snapshots.clear()
+        if stop_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def count_live_objects(types: Iterable[type]) -> Dict[str, int]:
+    """Instances per type among GC-tracked objects; walks the whole heap, so keep it off hot paths."""
+    wanted = {cls: 0 for cls in types}
+    for obj in gc.get_objects():
+        cls = type(obj)
+        if cls in wanted:
+            wanted[cls] += 1
+    return {f"{cls.__module__}.{cls.__qualname__}": count for cls, count in wanted.items()}
+
+
+def store_counts(stores: Dict[str, Any]) -> Dict[str, Any]:
+    counts: Dict[str, Any] = {}
+    for name, store in stores.items():
+        reporter = getattr(store, "counts", None)
+        if callable(reporter):
+            counts[name] = reporter()
+        elif store is not None and hasattr(store, "__len__"):
+            counts[name] = {"entries": len(store)}
+    return counts
+
+
+heap_snapshots = HeapSnapshots()
+
+__all__ = ["GROUPINGS", "HeapSnapshots", "count_live_objects", "heap_snapshots", "store_counts"]
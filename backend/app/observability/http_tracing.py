@@ -0,0 +1,29 @@
+"""httpx transport that records outbound calls as client spans.
+
+Kept apart from :mod:`.tracing` so that importing the tracer does not pull in httpx.
+"""
+
+from __future__ import annotations
+
+import httpx
+
+from .tracing import SPAN_KIND_CLIENT, Tracer
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """httpx transport wrapper giving each outbound request a client span."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, tracer: Tracer) -> None:
+        self._inner = inner
+        self._tracer = tracer
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attributes = {"http.method": request.method, "http.url": str(request.url.copy_with(query=None))}
+        with self._tracer.span(f"HTTP {request.method} {request.url.host}", SPAN_KIND_CLIENT, **attributes) as span:
+            response = await self._inner.handle_async_request(request)
+            if span is not None:
+                span.attributes["http.status_code"] = response.status_code
+            return response
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+import asyncio
+
+from .metrics import event_loop_lag_seconds
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """Record how late each scheduled wakeup runs; blocking handlers show up as lag."""
+    loop = asyncio.get_running_loop()
+    lag = event_loop_lag_seconds.labels()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag.observe(max(0.0, loop.time() - scheduled))
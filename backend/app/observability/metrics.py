@@ -0,0 +1,344 @@
+"""Prometheus-compatible metrics with per-thread accumulation.
+
+Every metric child keeps one accumulator cell per writing thread. A thread only ever
+mutates its own cell, so increments need no lock and cannot lose updates when the
+threadpool and the event loop record concurrently; ``/metrics`` sums the cells at
+scrape time, which is the only place that pays for aggregation.
+"""
+
+from __future__ import annotations
+
+import math
+from bisect import bisect_left
+from threading import Lock, get_ident
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class _Cells:
+    __slots__ = ("_cells", "_size")
+
+    def __init__(self, size: int) -> None:
+        self._cells: Dict[int, List[float]] = {}
+        self._size = size
+
+    def cell(self) -> List[float]:
+        cell = self._cells.get(get_ident())
+        if cell is None:
+            cell = self._cells.setdefault(get_ident(), [0.0] * self._size)
+        return cell
+
+    def total(self) -> List[float]:
+        totals = [0.0] * self._size
+        for cell in list(self._cells.values()):
+            for index, value in enumerate(cell):
+                totals[index] += value
+        return totals
+
+    def reset(self) -> None:
+        self._cells = {}
+
+
+class _CounterChild:
+    __slots__ = ("_cells",)
+
+    def __init__(self) -> None:
+        self._cells = _Cells(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._cells.cell()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._cells.total()[0]
+
+
+class _GaugeChild:
+    __slots__ = ("_cells", "_base")
+
+    def __init__(self) -> None:
+        self._cells = _Cells(1)
+        self._base = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._cells.cell()[0] += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._cells.cell()[0] -= amount
+
+    def set(self, value: float) -> None:
+        self._cells.reset()
+        self._base = value
+
+    @property
+    def value(self) -> float:
+        return self._base + self._cells.total()[0]
+
+
+class _HistogramChild:
+    __slots__ = ("_cells", "_buckets")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self._buckets = buckets
+        # One slot per bucket, one for +Inf, one for the running sum.
+        self._cells = _Cells(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        cell = self._cells.cell()
+        cell[bisect_left(self._buckets, value)] += 1
+        cell[-1] += value
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        totals = self._cells.total()
+        cumulative: List[float] = []
+        running = 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _label_text(self, values: Tuple[str, ...], extra: Iterable[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values: Tuple[str, ...], child) -> List[str]:
+        return [f"{self.name}{self._label_text(values)} {_format(child.value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_child(self, values: Tuple[str, ...], child: _HistogramChild) -> List[str]:
+        cumulative, count, total = child.snapshot()
+        lines = []
+        for bound, bucket_count in zip(self.buckets + (math.inf,), cumulative):
+            label = self._label_text(values, [("le", _format(bound))])
+            lines.append(f"{self.name}_bucket{label} {_format(bucket_count)}")
+        lines.append(f"{self.name}_sum{self._label_text(values)} {_format(total)}")
+        lines.append(f"{self.name}_count{self._label_text(values)} {_format(count)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP responses by route template and status code.", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")
+)
+http_requests_in_flight = registry.gauge("http_requests_in_flight", "HTTP requests currently being served.")
+repository_calls_total = registry.counter(
+    "repository_calls_total", "Repository method calls.", ("repository", "method", "outcome")
+)
+repository_call_duration_seconds = registry.histogram(
+    "repository_call_duration_seconds",
+    "Repository method latency.",
+    ("repository", "method"),
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0),
+)
+auth_cache_events_total = registry.counter(
+    "auth_cache_events_total", "Access-token cache lookups by result.", ("result",)
+)
+hierarchy_cache_events_total = registry.counter(
+    "hierarchy_cache_events_total", "Hierarchy read-cache lookups and invalidations by result.", ("result",)
+)
+token_revocation_checks_total = registry.counter(
+    "token_revocation_checks_total",
+    "Refresh-token revocation checks by outcome (negative = answered by the Bloom filter alone).",
+    ("result",),
+)
+sqlite_busy_retries_total = registry.counter(
+    "sqlite_busy_retries_total", "Units of work re-run after SQLite stayed locked past its busy timeout."
+)
+sqlite_wal_checkpoints_total = registry.counter(
+    "sqlite_wal_checkpoints_total", "Background WAL checkpoints by mode and outcome.", ("mode", "result")
+)
+sqlite_wal_pages = registry.gauge("sqlite_wal_pages", "Frames in the WAL after the last background checkpoint.")
+sqlite_group_commit_batch_size = registry.histogram(
+    "sqlite_group_commit_batch_size",
+    "Writes committed together by the SQLite group-commit writer.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+admission_shed_total = registry.counter(
+    "admission_shed_total", "Requests rejected by admission control.", ("route_class", "reason")
+)
+admission_queue_wait_seconds = registry.histogram(
+    "admission_queue_wait_seconds",
+    "Time admitted requests waited for a concurrency slot.",
+    ("route_class",),
+    buckets=(0.0, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+admission_in_flight = registry.gauge(
+    "admission_in_flight", "Requests holding a concurrency slot.", ("route_class",)
+)
+admission_queue_depth = registry.gauge(
+    "admission_queue_depth", "Requests waiting for a concurrency slot.", ("route_class",)
+)
+event_loop_lag_seconds = registry.histogram(
+    "event_loop_lag_seconds",
+    "Delay between a scheduled event-loop wakeup and when it actually ran.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "admission_in_flight",
+    "admission_queue_depth",
+    "admission_queue_wait_seconds",
+    "admission_shed_total",
+    "auth_cache_events_total",
+    "event_loop_lag_seconds",
+    "hierarchy_cache_events_total",
+    "http_request_duration_seconds",
+    "http_requests_in_flight",
+    "http_requests_total",
+    "registry",
+    "repository_call_duration_seconds",
+    "repository_calls_total",
+    "sqlite_busy_retries_total",
+    "sqlite_group_commit_batch_size",
+    "sqlite_wal_checkpoints_total",
+    "sqlite_wal_pages",
+    "token_revocation_checks_total",
+]
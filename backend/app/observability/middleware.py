@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import http_request_duration_seconds, http_requests_in_flight, http_requests_total
+
+# ASGI scope extension marking the launcher's pre-traffic warmup requests.
+WARMUP_EXTENSION = "backend.warmup"
+
+
+def is_warmup(scope: Scope) -> bool:
+    return WARMUP_EXTENSION in scope.get("extensions", ())
+
+
+def route_template(scope: Scope) -> str:
+    """Route path template (``/api/v1/locations/{location_id}``) to keep label cardinality bounded."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if path is not None else "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or is_warmup(scope):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = http_requests_in_flight.labels()
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            method = scope["method"]
+            route = route_template(scope)
+            http_request_duration_seconds.labels(method, route).observe(elapsed)
+            http_requests_total.labels(method, route, str(status_code)).inc()
+
+
+__all__ = ["MetricsMiddleware", "WARMUP_EXTENSION", "is_warmup", "route_template"]
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import time
+from functools import wraps
+from typing import Any, Callable
+
+from .metrics import repository_call_duration_seconds, repository_calls_total
+from .tracing import is_tracing, tracer
+
+PROVIDER_MEMBERS = ("locations", "buildings", "zones", "areas", "zone_devices", "search")
+
+
+class InstrumentedRepository:
+    """Proxy that times every public method call on the wrapped repository."""
+
+    def __init__(self, repository: Any, name: str) -> None:
+        self._repository = repository
+        self._name = name
+        self._wrapped: dict[str, Callable[..., Any]] = {}
+
+    def __getattr__(self, attribute: str) -> Any:
+        wrapped = self._wrapped.get(attribute)
+        if wrapped is not None:
+            return wrapped
+        value = getattr(self._repository, attribute)
+        if attribute.startswith("_") or not callable(value):
+            return value
+        wrapped = self._wrapped[attribute] = self._instrument(attribute, value)
+        return wrapped
+
+    def _instrument(self, method: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        duration = repository_call_duration_seconds.labels(self._name, method)
+        ok = repository_calls_total.labels(self._name, method, "ok")
+        error = repository_calls_total.labels(self._name, method, "error")
+        span_name = f"{self._name}.{method}"
+
+        @wraps(func)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                if is_tracing():
+                    with tracer.span(span_name, component="repository"):
+                        result = func(*args, **kwargs)
+                else:
+                    result = func(*args, **kwargs)
+            except Exception:
+                error.inc()
+                raise
+            finally:
+                duration.observe(time.perf_counter() - start)
+            ok.inc()
+            return result
+
+        return timed
+
+    @property
+    def wrapped(self) -> Any:
+        return self._repository
+
+
+class InstrumentedRepositoryProvider:
+    def __init__(self, provider: Any) -> None:
+        self._provider = provider
+        for member in PROVIDER_MEMBERS:
+            setattr(self, member, InstrumentedRepository(getattr(provider, member), member))
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._provider, attribute)
+
+    @property
+    def wrapped(self) -> Any:
+        return self._provider
+
+
+def instrument_provider(provider: Any) -> InstrumentedRepositoryProvider:
+    if isinstance(provider, InstrumentedRepositoryProvider):
+        return provider
+    return InstrumentedRepositoryProvider(provider)
+
+
+__all__ = ["InstrumentedRepository", "InstrumentedRepositoryProvider", "instrument_provider"]
@@ -0,0 +1,109 @@
+"""Ring buffer of slow requests with the SQL they ran and SQLite's query plans."""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Dict, List
+
+from .. import config
+from .sql import QueryStats, statement_shape
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+_SKIPPED_PREFIXES = ("PRAGMA", "EXPLAIN", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+
+def parameter_shape(parameters: Any) -> str:
+    """Describe bound parameters by type only, so the log never holds user data."""
+    if parameters is None:
+        return "()"
+    if isinstance(parameters, list):
+        inner = parameter_shape(parameters[0]) if parameters else "()"
+        return f"{len(parameters)}x{inner}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+
+
+def explain_query_plan(engine: Engine, statement: str, parameters: Any) -> List[str]:
+    if engine.dialect.name != "sqlite" or statement.lstrip().upper().startswith(_SKIPPED_PREFIXES):
+        return []
+    if isinstance(parameters, list):
+        parameters = parameters[0] if parameters else ()
+    try:
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+    except Exception as exc:  # the plan is diagnostic only; never fail the caller over it
+        return [f"unavailable: {exc}"]
+    depth: Dict[int, int] = {0: -1}
+    lines = []
+    for node_id, parent_id, _, detail in rows:
+        depth[node_id] = depth.get(parent_id, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+class SlowQueryLog:
+    def __init__(self, max_entries: int = 100, max_statements: int = 20) -> None:
+        self._entries: deque[dict] = deque(maxlen=max_entries)
+        self._max_statements = max_statements
+        self._lock = Lock()
+
+    def capture(self, method: str, route: str, request_duration: float, stats: QueryStats) -> dict:
+        grouped: Dict[str, dict] = {}
+        for query in stats.queries:
+            shape = statement_shape(query.statement)
+            entry = grouped.get(shape)
+            if entry is None:
+                entry = grouped[shape] = {
+                    "statement": shape,
+                    "parameters": parameter_shape(query.parameters),
+                    "executions": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "_sample": query,
+                }
+            entry["executions"] += 1
+            entry["total_ms"] += query.duration * 1000
+            if query.duration * 1000 >= entry["max_ms"]:
+                entry["max_ms"] = query.duration * 1000
+                entry["_sample"] = query
+        statements = sorted(grouped.values(), key=lambda item: item["total_ms"], reverse=True)[: self._max_statements]
+        for item in statements:
+            sample = item.pop("_sample")
+            item["total_ms"] = round(item["total_ms"], 3)
+            item["max_ms"] = round(item["max_ms"], 3)
+            item["plan"] = explain_query_plan(sample.engine, sample.statement, sample.parameters) if sample.engine else []
+        record = {
+            "timestamp": time.time(),
+            "method": method,
+            "route": route,
+            "duration_ms": round(request_duration * 1000, 3),
+            "query_count": stats.count,
+            "query_ms": round(stats.duration * 1000, 3),
+            "statements": statements,
+        }
+        with self._lock:
+            self._entries.append(record)
+        return record
+
+    def entries(self) -> List[dict]:
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def resize(self, max_entries: int) -> None:
+        with self._lock:
+            if self._entries.maxlen != max_entries:
+                self._entries = deque(self._entries, maxlen=max_entries)
+
+
+slow_query_log = SlowQueryLog(config.settings.slow_query_log_size)
+
+__all__ = ["SlowQueryLog", "explain_query_plan", "parameter_shape", "slow_query_log"]
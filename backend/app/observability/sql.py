@@ -0,0 +1,195 @@
+"""Per-request SQL statement accounting for SQLAlchemy engines.
+
+``instrument_engine`` hooks the cursor events once per engine. Statements are only
+recorded while a :class:`QueryStats` is active in the current context, which
+``QueryStatsMiddleware`` does per HTTP request and ``track_queries`` does for tests
+and scripts; outside of that the hooks cost a context-variable lookup.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .context import run_in_threadpool
+from .middleware import route_template
+from .tracing import SPAN_KIND_CLIENT, is_tracing, tracer
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("backend.sql")
+
+_current_stats: ContextVar["QueryStats | None"] = ContextVar("query_stats", default=None)
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalise a statement so executions differing only in IN-list length compare equal."""
+    return _IN_LIST.sub("(?, ...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+@dataclass(slots=True)
+class QueryRecord:
+    statement: str
+    duration: float
+    parameters: Any = None
+    engine: Engine | None = None
+
+
+@dataclass
+class QueryStats:
+    queries: List[QueryRecord] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    def record(self, statement: str, duration: float, parameters: Any = None, engine: Engine | None = None) -> None:
+        self.queries.append(QueryRecord(statement, duration, parameters, engine))
+        self.duration += duration
+
+    def shape_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for query in self.queries:
+            shape = statement_shape(query.statement)
+            counts[shape] = counts.get(shape, 0) + 1
+        return counts
+
+    def repeated_shapes(self, threshold: int) -> Dict[str, int]:
+        """Statement shapes executed at least ``threshold`` times, the usual N+1 signature."""
+        return {shape: count for shape, count in self.shape_counts().items() if count >= threshold}
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+
+
+def current_stats() -> QueryStats | None:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+    """Fail when the block runs more than ``limit`` statements; intended for tests."""
+    with track_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        listing = "\n".join(f"  {count}x {shape}" for shape, count in stats.shape_counts().items())
+        raise AssertionError(f"Expected at most {limit} queries, ran {stats.count}:\n{listing}")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current_stats.get() is not None or is_tracing():
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration, parameters, conn.engine)
+    if is_tracing():
+        tracer.record(
+            f"{conn.engine.dialect.name} query",
+            int(duration * 1_000_000_000),
+            SPAN_KIND_CLIENT,
+            **{"db.system": conn.engine.dialect.name, "db.statement": statement_shape(statement)},
+        )
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    from sqlalchemy import event
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+
+def query_count_from_response(headers: Any) -> int:
+    """Read the statement count back out of a response's ``Server-Timing`` header."""
+    match = re.search(r'db;[^,]*desc="(\d+) queries"', headers.get("server-timing", ""))
+    return int(match.group(1)) if match else 0
+
+
+class QueryStatsMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        budget: int = 0,
+        repeat_threshold: int = 5,
+        slow_request_threshold: float = 0.0,
+        slow_log: Any = None,
+    ) -> None:
+        self.app = app
+        self.budget = budget
+        self.repeat_threshold = repeat_threshold
+        self.slow_request_threshold = slow_request_threshold
+        self.slow_log = slow_log
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        with track_queries() as stats:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                self._report(scope, stats)
+        elapsed = time.perf_counter() - start
+        if self.slow_log is not None and stats.count and elapsed >= self.slow_request_threshold:
+            await run_in_threadpool(self.slow_log.capture, scope["method"], route_template(scope), elapsed, stats)
+
+    def _report(self, scope: Scope, stats: QueryStats) -> None:
+        if not stats.count:
+            return
+        route = f"{scope['method']} {route_template(scope)}"
+        logger.debug("%s ran %d queries in %.2f ms", route, stats.count, stats.duration * 1000)
+        if self.budget and stats.count > self.budget:
+            logger.warning("%s exceeded query budget: %d > %d", route, stats.count, self.budget)
+        for shape, count in stats.repeated_shapes(self.repeat_threshold).items():
+            logger.warning("%s repeated statement %d times (possible N+1): %s", route, count, shape)
+
+
+__all__ = [
+    "QueryStats",
+    "QueryStatsMiddleware",
+    "assert_max_queries",
+    "current_stats",
+    "instrument_engine",
+    "query_count_from_response",
+    "statement_shape",
+    "track_queries",
+]
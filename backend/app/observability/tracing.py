@@ -0,0 +1,301 @@
+"""In-process request tracing with an OpenTelemetry-compatible JSON export.
+
+The middleware opens a root span per sampled request; service, repository and
+outbound HTTP calls open child spans through the current context. Unsampled
+requests carry a sentinel, so nested ``span()`` calls cost one context-variable
+lookup. Finished traces go to a bounded ring buffer read by ``/admin/traces``.
+"""
+
+from __future__ import annotations
+
+import random
+import secrets
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from threading import Lock
+from typing import Any, Callable, Dict, Iterator, List
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .. import config
+from .middleware import route_template
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+
+@dataclass(slots=True)
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    name: str
+    kind: int
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+    _start_perf: int = 0
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1_000_000
+
+
+@dataclass(slots=True)
+class _TraceState:
+    spans: List[Span]
+    current: Span
+
+
+_NOT_SAMPLED = object()
+_state: ContextVar[Any] = ContextVar("trace_state", default=None)
+
+
+class Tracer:
+    def __init__(self, sample_rate: float = 0.0, max_traces: int = 1000) -> None:
+        self.sample_rate = sample_rate
+        self._traces: deque[List[Span]] = deque(maxlen=max_traces)
+        self._lock = Lock()
+
+    def configure(self, sample_rate: float, max_traces: int) -> None:
+        with self._lock:
+            self.sample_rate = sample_rate
+            if self._traces.maxlen != max_traces:
+                self._traces = deque(self._traces, maxlen=max_traces)
+
+    def _new_span(self, name: str, kind: int, trace_id: str, parent_id: str | None, attributes: Dict[str, Any]) -> Span:
+        return Span(
+            trace_id=trace_id,
+            span_id=secrets.token_hex(8),
+            parent_id=parent_id,
+            name=name,
+            kind=kind,
+            start_ns=time.time_ns(),
+            attributes=attributes,
+            _start_perf=time.perf_counter_ns(),
+        )
+
+    @contextmanager
+    def trace(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_SERVER,
+        attributes: Dict[str, Any] | None = None,
+        parent: tuple[str, str, bool] | None = None,
+    ) -> Iterator[Span | None]:
+        """Root span. ``parent`` is ``(trace_id, span_id, sampled)`` from an incoming ``traceparent``."""
+        sampled = parent[2] if parent else random.random() < self.sample_rate
+        if not sampled:
+            token = _state.set(_NOT_SAMPLED)
+            try:
+                yield None
+            finally:
+                _state.reset(token)
+            return
+        trace_id, parent_id = (parent[0], parent[1]) if parent else (secrets.token_hex(16), None)
+        root = self._new_span(name, kind, trace_id, parent_id, dict(attributes or {}))
+        spans = [root]
+        token = _state.set(_TraceState(spans, root))
+        try:
+            yield root
+        except BaseException as exc:
+            root.error = repr(exc)
+            raise
+        finally:
+            _state.reset(token)
+            root.end_ns = root.start_ns + time.perf_counter_ns() - root._start_perf
+            with self._lock:
+                self._traces.append(spans)
+
+    @contextmanager
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any) -> Iterator[Span | None]:
+        state = _state.get()
+        if state is None or state is _NOT_SAMPLED:
+            yield None
+            return
+        parent = state.current
+        child = self._new_span(name, kind, parent.trace_id, parent.span_id, attributes)
+        state.spans.append(child)
+        # A fresh state per span keeps concurrent child tasks from clobbering each other's parent.
+        token = _state.set(_TraceState(state.spans, child))
+        try:
+            yield child
+        except BaseException as exc:
+            child.error = repr(exc)
+            raise
+        finally:
+            _state.reset(token)
+            child.end_ns = child.start_ns + time.perf_counter_ns() - child._start_perf
+
+    def record(self, name: str, duration_ns: int, kind: int = SPAN_KIND_INTERNAL, **attributes: Any) -> None:
+        """Attach an already-finished child span (e.g. from a driver callback) to the current trace."""
+        state = _state.get()
+        if state is None or state is _NOT_SAMPLED:
+            return
+        end_ns = time.time_ns()
+        parent = state.current
+        state.spans.append(
+            Span(
+                trace_id=parent.trace_id,
+                span_id=secrets.token_hex(8),
+                parent_id=parent.span_id,
+                name=name,
+                kind=kind,
+                start_ns=end_ns - duration_ns,
+                end_ns=end_ns,
+                attributes=attributes,
+            )
+        )
+
+    def traced(self, name: str, kind: int = SPAN_KIND_INTERNAL) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            @wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not is_tracing():
+                    return func(*args, **kwargs)
+                with self.span(name, kind):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def traces(self, limit: int = 100, min_duration_ms: float = 0.0) -> List[List[Span]]:
+        with self._lock:
+            snapshot = list(self._traces)
+        selected = [spans for spans in reversed(snapshot) if spans[0].duration_ms >= min_duration_ms]
+        return selected[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+
+def is_tracing() -> bool:
+    state = _state.get()
+    return state is not None and state is not _NOT_SAMPLED
+
+
+class TracedProxy:
+    """Wrap every public method of ``target`` in a span named ``<prefix>.<method>``."""
+
+    def __init__(self, target: Any, prefix: str, tracer: Tracer) -> None:
+        self._target = target
+        self._prefix = prefix
+        self._tracer = tracer
+        self._wrapped: Dict[str, Callable[..., Any]] = {}
+
+    def __getattr__(self, attribute: str) -> Any:
+        wrapped = self._wrapped.get(attribute)
+        if wrapped is not None:
+            return wrapped
+        value = getattr(self._target, attribute)
+        if attribute.startswith("_") or not callable(value):
+            return value
+        wrapped = self._wrapped[attribute] = self._tracer.traced(f"{self._prefix}.{attribute}")(value)
+        return wrapped
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str, bool] | None:
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+class TracingMiddleware:
+    def __init__(self, app: ASGIApp, tracer: Tracer) -> None:
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        attributes = {"http.method": scope["method"], "http.target": scope.get("path", "")}
+        with self.tracer.trace(f"HTTP {scope['method']}", SPAN_KIND_SERVER, attributes, parent) as root:
+            if root is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    root.attributes["http.status_code"] = message["status"]
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-trace-id", root.trace_id.encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = route_template(scope)
+                root.name = f"{scope['method']} {route}"
+                root.attributes["http.route"] = route
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def export_otlp(traces: List[List[Span]], service_name: str = "smart-domotics-backend") -> Dict[str, Any]:
+    """Render traces in the OTLP/JSON ``ExportTraceServiceRequest`` shape."""
+    spans = []
+    for trace in traces:
+        for span in trace:
+            item: Dict[str, Any] = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": span.kind,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            }
+            if span.parent_id:
+                item["parentSpanId"] = span.parent_id
+            spans.append(item)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+                "scopeSpans": [{"scope": {"name": "backend.app"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+tracer = Tracer(config.settings.tracing_sample_rate, config.settings.tracing_max_traces)
+
+__all__ = [
+    "Span",
+    "TracedProxy",
+    "Tracer",
+    "TracingMiddleware",
+    "export_otlp",
+    "is_tracing",
+    "parse_traceparent",
+    "tracer",
+]
@@ -0,0 +1,158 @@
+"""Device presence from heartbeats, with expiry on a timing wheel.
+
+A device is online from a heartbeat until ``timeout`` seconds pass without
+another one. Each online device sits in the wheel slot of the tick its deadline
+falls in; a heartbeat moves it to a later slot. Advancing the clock empties the
+slots of the ticks that have passed, so expiry costs one set pop per device that
+actually goes offline, however many devices are online. The wheel has one slot
+per tick of the timeout plus spares, so live deadlines never share a slot with
+older ones and no multi-level wheel is needed.
+
+Expiry runs on every heartbeat and read, catching up on the ticks elapsed since
+the last one, so no background sweep is needed. A pause longer than the wheel
+costs one pass over the slots.
+
+Presence lives in the process that received the heartbeats. It is not persisted,
+and workers started by the prefork launcher each track their own. The tracker is
+not thread-safe: every call comes from the event loop, never from threadpool work
+such as ``container.write``.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import Callable, Dict, Hashable, Iterable, List, Set, Tuple
+
+from . import config
+from .repositories.device_repository import DeviceRepository
+
+# (group, device id): a zone id for zone devices, an owner id for registered devices.
+Key = Tuple[str, str]
+
+
+class PresenceTracker:
+    def __init__(
+        self, timeout_seconds: float = 90.0, tick_seconds: float = 1.0, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.timeout_seconds = timeout_seconds
+        self.tick_seconds = tick_seconds
+        self._clock = clock
+        self._span = max(1, math.ceil(timeout_seconds / tick_seconds))
+        self._slots: List[Set[Key]] = [set() for _ in range(self._span + 2)]
+        self._peaks = [0] * len(self._slots)
+        self._deadlines: Dict[Key, int] = {}
+        self._online: Dict[Hashable, int] = {}
+        self._tick = self._tick_of(clock())
+
+    def heartbeat(self, key: Key) -> bool:
+        """Mark ``key`` online until ``timeout_seconds`` from now; True if it was offline."""
+        self.advance()
+        deadline = self._tick + self._span
+        previous = self._deadlines.get(key)
+        if previous == deadline:
+            return False
+        slots, peaks = self._slots, self._peaks
+        if previous is None:
+            self._online[key[0]] = self._online.get(key[0], 0) + 1
+        else:
+            index = previous % len(slots)
+            slot = slots[index]
+            slot.discard(key)
+            # Sets never shrink, and expiring a slot walks its whole table: rebuild it once most entries moved on.
+            if len(slot) < peaks[index] >> 2:
+                slots[index] = set(slot)
+                peaks[index] = len(slot)
+        index = deadline % len(slots)
+        slot = slots[index]
+        slot.add(key)
+        if len(slot) > peaks[index]:
+            peaks[index] = len(slot)
+        self._deadlines[key] = deadline
+        return previous is None
+
+    def is_online(self, key: Key) -> bool:
+        self.advance()
+        return key in self._deadlines
+
+    def online_count(self, group: str) -> int:
+        self.advance()
+        return self._online.get(group, 0)
+
+    def online_counts(self, groups: Iterable[str]) -> Dict[str, int]:
+        self.advance()
+        return {group: self._online.get(group, 0) for group in groups}
+
+    def forget(self, key: Key) -> None:
+        """Drop ``key`` at once, e.g. when its device is deleted."""
+        deadline = self._deadlines.pop(key, None)
+        if deadline is not None:
+            self._slots[deadline % len(self._slots)].discard(key)
+            self._went_offline(key)
+
+    def advance(self) -> int:
+        """Expire the devices whose deadline has passed; returns how many went offline."""
+        target = self._tick_of(self._clock())
+        if target <= self._tick:
+            return 0
+        slots, deadlines = self._slots, self._deadlines
+        expired = 0
+        # Past a full turn every slot is due once; the rest of the gap has nothing left to expire.
+        for tick in range(self._tick + 1, self._tick + 1 + min(target - self._tick, len(slots))):
+            slot = slots[tick % len(slots)]
+            for key in slot:
+                del deadlines[key]
+                self._went_offline(key)
+            expired += len(slot)
+            slot.clear()
+            self._peaks[tick % len(slots)] = 0
+        self._tick = target
+        return expired
+
+    def clear(self) -> None:
+        for slot in self._slots:
+            slot.clear()
+        self._peaks = [0] * len(self._slots)
+        self._deadlines.clear()
+        self._online.clear()
+
+    def counts(self) -> dict[str, int]:
+        return {"online": len(self._deadlines), "groups": len(self._online)}
+
+    def _went_offline(self, key: Key) -> None:
+        remaining = self._online[key[0]] - 1
+        if remaining:
+            self._online[key[0]] = remaining
+        else:
+            del self._online[key[0]]
+
+    def _tick_of(self, now: float) -> int:
+        return int(now // self.tick_seconds)
+
+
+def build_tracker() -> PresenceTracker:
+    settings = config.settings
+    return PresenceTracker(settings.presence_timeout_seconds, settings.presence_tick_seconds)
+
+
+def record_heartbeat(tracker: PresenceTracker, repository: DeviceRepository, owner_id: str, device_id: str) -> bool:
+    """Heartbeat a registered device; False if the owner has no such device.
+
+    Only a device coming online is looked up, so steady heartbeats never touch the repository.
+    """
+    key = (owner_id, device_id)
+    if not tracker.is_online(key) and repository.get_device(owner_id, device_id) is None:
+        return False
+    tracker.heartbeat(key)
+    return True
+
+
+def topic_device(topic: str) -> Key | None:
+    """``(user_id, device_id)`` of a registered device's MQTT topic, ``users/{user}/devices/{device}/...``."""
+    parts = topic.split("/", 4)
+    if len(parts) < 4 or parts[0] != "users" or parts[2] != "devices" or not parts[1] or not parts[3]:
+        return None
+    return parts[1], parts[3]
+
+
+__all__ = ["Key", "PresenceTracker", "build_tracker", "record_heartbeat", "topic_device"]
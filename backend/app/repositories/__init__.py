@@ -3,20 +3,28 @@
 from functools import lru_cache
 from pathlib import Path
 
-from ..config import settings
+from .. import config
 from .base import RepositoryProvider, ZoneRepository
 from .memory import create_in_memory_provider
-from .sqlalchemy import create_sqlite_provider
+from .sqlite_profile import SQLiteProfile
 from .zone_device_repository import ZoneDeviceRepository
 
 
+def create_sqlite_provider(db_url: str, profile: SQLiteProfile | None = None) -> RepositoryProvider:
+    # SQLAlchemy costs ~130 ms to import; memory-backed processes never pay it.
+    from .sqlalchemy import create_sqlite_provider as create
+
+    return create(db_url, profile)
+
+
 @lru_cache
 def get_repository_provider() -> RepositoryProvider:
+    settings = config.settings
     backend = settings.storage_backend.lower()
     if backend == "sqlite":
         db_path = Path(settings.sqlite_db_path)
         db_url = f"sqlite:///{db_path}"
-        return create_sqlite_provider(db_url)
+        return create_sqlite_provider(db_url, SQLiteProfile.from_settings(settings))
     if backend == "memory":
         return create_in_memory_provider()
     raise ValueError(f"Unknown storage backend: {backend}")
@@ -24,6 +32,7 @@ def get_repository_provider() -> RepositoryProvider:
 
 __all__ = [
     "RepositoryProvider",
+    "SQLiteProfile",
     "ZoneRepository",
     "ZoneDeviceRepository",
     "get_repository_provider",
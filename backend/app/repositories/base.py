@@ -3,7 +3,8 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 from typing import List, Protocol
 
-from ..domain.entities import Area, Building, Location, Zone
+from ..domain.entities import Area, Building, Location, SearchHit, Zone
+from .path_index import Path
 from .zone_device_repository import ZoneDeviceRepository
 
 
@@ -42,6 +43,11 @@ class BuildingRepository(ABC):
     def list_for_location(self, location_id: str) -> List[Building]:
         raise NotImplementedError
 
+    @abstractmethod
+    def list_under(self, path: Path) -> List[Building]:
+        """Every building under ``path`` (``(location_id,)``), in path order."""
+        raise NotImplementedError
+
     @abstractmethod
     def update(self, building: Building) -> Building:
         raise NotImplementedError
@@ -64,6 +70,11 @@ class ZoneRepository(ABC):
     def list_for_building(self, building_id: str) -> List[Zone]:
         raise NotImplementedError
 
+    @abstractmethod
+    def list_under(self, path: Path) -> List[Zone]:
+        """Every zone under ``path``, an ancestor id chain from the location down, in path order."""
+        raise NotImplementedError
+
     @abstractmethod
     def update(self, zone: Zone) -> Zone:
         raise NotImplementedError
@@ -86,6 +97,11 @@ class AreaRepository(ABC):
     def list_for_zone(self, zone_id: str) -> List[Area]:
         raise NotImplementedError
 
+    @abstractmethod
+    def list_under(self, path: Path) -> List[Area]:
+        """Every area under ``path``, an ancestor id chain from the location down, in path order."""
+        raise NotImplementedError
+
     @abstractmethod
     def update(self, area: Area) -> Area:
         raise NotImplementedError
@@ -95,9 +111,17 @@ class AreaRepository(ABC):
         raise NotImplementedError
 
 
+class SearchRepository(ABC):
+    @abstractmethod
+    def search(self, query: str, limit: int = 20) -> List[SearchHit]:
+        """Locations, buildings, zones and areas whose names match ``query``, best first."""
+        raise NotImplementedError
+
+
 class RepositoryProvider(Protocol):
     locations: LocationRepository
     buildings: BuildingRepository
     zones: ZoneRepository
     areas: AreaRepository
     zone_devices: ZoneDeviceRepository
+    search: SearchRepository
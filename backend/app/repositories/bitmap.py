@@ -0,0 +1,209 @@
+"""Compressed bitmaps of dense ordinals, laid out like Roaring bitmaps.
+
+An ordinal's high 16 bits pick a chunk and its low 16 bits are stored in that
+chunk's container. A container is a sorted ``array('H')`` while the chunk holds
+at most ``ARRAY_MAX`` values (two bytes each), and a Python int used as a
+65536-bit bitset (8 KiB) once it holds more. Empty chunks cost nothing.
+
+Set algebra works chunk by chunk. Two bitsets combine in C with one ``&``, ``|``
+or ``& ~``, so intersecting two million-device bitmaps touches 16 chunks rather
+than a million ordinals; only array containers are walked in Python, and they
+hold at most ``ARRAY_MAX`` values.
+"""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, Union
+
+ARRAY_MAX = 4096
+_CHUNK_BYTES = 1 << 13
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256))
+
+Container = Union[array, int]
+
+
+def _to_bits(values: Iterable[int]) -> int:
+    buffer = bytearray(_CHUNK_BYTES)
+    for value in values:
+        buffer[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def _bit_values(bits: int) -> Iterator[int]:
+    for index, byte in enumerate(bits.to_bytes(_CHUNK_BYTES, "little")):
+        if byte:
+            base = index << 3
+            for bit in _BYTE_BITS[byte]:
+                yield base + bit
+
+
+def _normalize(container: Container) -> Container:
+    """The compact form for ``container``'s cardinality: an array when it is small enough."""
+    if type(container) is int and container.bit_count() <= ARRAY_MAX:
+        return array("H", _bit_values(container))
+    return container
+
+
+def _filter(values: array, bits: int, keep: bool) -> array:
+    data = bits.to_bytes(_CHUNK_BYTES, "little")
+    return array("H", [value for value in values if bool(data[value >> 3] >> (value & 7) & 1) is keep])
+
+
+def _and(a: Container, b: Container) -> Container:
+    if type(a) is int and type(b) is int:
+        return _normalize(a & b)
+    if type(a) is int:
+        a, b = b, a
+    if type(b) is int:
+        return _filter(a, b, True)
+    return array("H", sorted(set(a).intersection(b)))
+
+
+def _or(a: Container, b: Container) -> Container:
+    if type(a) is int or type(b) is int:
+        return (a if type(a) is int else _to_bits(a)) | (b if type(b) is int else _to_bits(b))
+    union = set(a).union(b)
+    return _to_bits(union) if len(union) > ARRAY_MAX else array("H", sorted(union))
+
+
+def _andnot(a: Container, b: Container) -> Container:
+    if type(a) is int:
+        return _normalize(a & ~(b if type(b) is int else _to_bits(b)))
+    if type(b) is int:
+        return _filter(a, b, False)
+    removed = set(b)
+    return array("H", [value for value in a if value not in removed])
+
+
+def _cardinality(container: Container) -> int:
+    return container.bit_count() if type(container) is int else len(container)
+
+
+class Bitmap:
+    """A set of non-negative ints supporting ``&``, ``|``, ``-`` and ordered iteration."""
+
+    __slots__ = ("_chunks",)
+
+    def __init__(self, ordinals: Iterable[int] = ()) -> None:
+        self._chunks: Dict[int, Container] = {}
+        for ordinal in ordinals:
+            self.add(ordinal)
+
+    def add(self, ordinal: int) -> None:
+        high, low = ordinal >> 16, ordinal & 0xFFFF
+        container = self._chunks.get(high)
+        if container is None:
+            self._chunks[high] = array("H", [low])
+        elif type(container) is int:
+            self._chunks[high] = container | 1 << low
+        else:
+            at = bisect_left(container, low)
+            if at < len(container) and container[at] == low:
+                return
+            container.insert(at, low)
+            if len(container) > ARRAY_MAX:
+                self._chunks[high] = _to_bits(container)
+
+    def discard(self, ordinal: int) -> None:
+        high, low = ordinal >> 16, ordinal & 0xFFFF
+        container = self._chunks.get(high)
+        if container is None:
+            return
+        if type(container) is int:
+            container &= ~(1 << low)
+            # Half the threshold, so a chunk hovering around it is not converted back and forth.
+            self._chunks[high] = _normalize(container) if container.bit_count() <= ARRAY_MAX // 2 else container
+            return
+        at = bisect_left(container, low)
+        if at < len(container) and container[at] == low:
+            del container[at]
+            if not container:
+                del self._chunks[high]
+
+    def __contains__(self, ordinal: int) -> bool:
+        container = self._chunks.get(ordinal >> 16)
+        if container is None:
+            return False
+        low = ordinal & 0xFFFF
+        if type(container) is int:
+            return bool(container >> low & 1)
+        at = bisect_left(container, low)
+        return at < len(container) and container[at] == low
+
+    def __len__(self) -> int:
+        return sum(map(_cardinality, self._chunks.values()))
+
+    def __bool__(self) -> bool:
+        return bool(self._chunks)
+
+    def __iter__(self) -> Iterator[int]:
+        return self.iter_from(0)
+
+    def iter_from(self, start: int) -> Iterator[int]:
+        """Ordinals ``>= start`` in ascending order."""
+        first = start >> 16
+        for high in sorted(key for key in self._chunks if key >= first):
+            container = self._chunks[high]
+            base = high << 16
+            values = _bit_values(container) if type(container) is int else container
+            if high == first:
+                low = start & 0xFFFF
+                values = (value for value in values if value >= low)
+            for value in values:
+                yield base + value
+
+    def __and__(self, other: Bitmap) -> Bitmap:
+        small, large = (self, other) if len(self._chunks) <= len(other._chunks) else (other, self)
+        result = Bitmap()
+        for high, container in small._chunks.items():
+            partner = large._chunks.get(high)
+            if partner is not None:
+                result._put(high, _and(container, partner))
+        return result
+
+    def __or__(self, other: Bitmap) -> Bitmap:
+        result = Bitmap()
+        result._chunks = {high: _copy(container) for high, container in self._chunks.items()}
+        result |= other
+        return result
+
+    def __ior__(self, other: Bitmap) -> Bitmap:
+        for high, container in other._chunks.items():
+            mine = self._chunks.get(high)
+            self._chunks[high] = _copy(container) if mine is None else _or(mine, container)
+        return self
+
+    def __sub__(self, other: Bitmap) -> Bitmap:
+        result = Bitmap()
+        for high, container in self._chunks.items():
+            partner = other._chunks.get(high)
+            result._put(high, _copy(container) if partner is None else _andnot(container, partner))
+        return result
+
+    def __isub__(self, other: Bitmap) -> Bitmap:
+        for high, container in other._chunks.items():
+            mine = self._chunks.get(high)
+            if mine is not None:
+                self._put(high, _andnot(mine, container))
+        return self
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Bitmap) and list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"Bitmap({len(self)} ordinals in {len(self._chunks)} chunks)"
+
+    def _put(self, high: int, container: Container) -> None:
+        if container:
+            self._chunks[high] = container
+        else:
+            self._chunks.pop(high, None)
+
+
+def _copy(container: Container) -> Container:
+    return container if type(container) is int else array("H", container)
+
+
+__all__ = ["ARRAY_MAX", "Bitmap"]
@@ -0,0 +1,160 @@
+"""Read-through cache over a repository provider, kept coherent through the invalidation bus.
+
+Any hierarchy write publishes on the ``hierarchy`` topic and every worker drops its
+whole cache. Writes are rare next to browsing, and a location read returns the
+entire subtree, so per-entity keys would need each write's full parent chain to
+be correct. A generation counter stops a read that raced with an invalidation from
+storing its now-stale result. Results are kept pickled and every hit unpickles its
+own copy, so a caller editing a returned entity cannot change what the next caller
+reads. Reads by a client holding a consistency token the bus has not reached yet
+bypass the cache (see :mod:`..consistency`).
+"""
+
+from __future__ import annotations
+
+import pickle
+from functools import wraps
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from .. import consistency
+from ..invalidation import InvalidationBus
+from ..observability.metrics import hierarchy_cache_events_total
+
+CACHE_TOPIC = "hierarchy"
+HIERARCHY_MEMBERS = ("locations", "buildings", "zones", "areas")
+READ_METHODS = frozenset({"get", "list", "list_for_location", "list_for_building", "list_for_zone", "list_under"})
+WRITE_METHODS = frozenset({"create", "update", "delete"})
+
+_MISSING = object()
+
+
+class HierarchyCache:
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries: Dict[Hashable, Any] = {}
+        self._lock = Lock()
+        self._hit = hierarchy_cache_events_total.labels("hit")
+        self._miss = hierarchy_cache_events_total.labels("miss")
+        self._invalidated = hierarchy_cache_events_total.labels("invalidated")
+
+    def lookup(self, key: Hashable) -> Any:
+        value = self._entries.get(key, _MISSING)
+        if value is _MISSING:
+            self._miss.inc()
+            return value
+        self._hit.inc()
+        return pickle.loads(value)
+
+    def store(self, key: Hashable, value: Any, generation: int) -> None:
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if generation != self.generation:
+                return
+            if len(self._entries) >= self.max_entries:
+                self._entries = {}
+            self._entries[key] = value
+
+    def invalidate(self, _topic: str | None = None, _key: str | None = None) -> None:
+        # Called from the bus poller thread as well as request threads.
+        with self._lock:
+            self.generation += 1
+            self._entries = {}
+        self._invalidated.inc()
+
+    def counts(self) -> dict[str, int]:
+        return {"entries": len(self._entries), "generation": self.generation}
+
+
+class CachedRepository:
+    def __init__(self, repository: Any, name: str, cache: HierarchyCache, bus: InvalidationBus) -> None:
+        self._repository = repository
+        self._name = name
+        self._cache = cache
+        self._bus = bus
+        self._wrapped: dict[str, Callable[..., Any]] = {}
+
+    def __getattr__(self, attribute: str) -> Any:
+        wrapped = self._wrapped.get(attribute)
+        if wrapped is not None:
+            return wrapped
+        value = getattr(self._repository, attribute)
+        if attribute in READ_METHODS:
+            wrapped = self._wrapped[attribute] = self._read_through(attribute, value)
+        elif attribute in WRITE_METHODS:
+            wrapped = self._wrapped[attribute] = self._write_through(value)
+        else:
+            return value
+        return wrapped
+
+    def _read_through(self, method: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        cache = self._cache
+
+        @wraps(func)
+        def cached(*args: Any) -> Any:
+            if not self._bus.caught_up(consistency.required_position()):
+                # The client has seen a write this worker has not heard about yet.
+                return func(*args)
+            key: Tuple[Hashable, ...] = (self._name, method, *args)
+            value = cache.lookup(key)
+            if value is _MISSING:
+                generation = cache.generation
+                value = func(*args)
+                cache.store(key, value, generation)
+            return value
+
+        return cached
+
+    def _write_through(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(func)
+        def write(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return func(*args, **kwargs)
+            finally:
+                # Publish even on failure: a partially applied write must not leave stale reads behind.
+                consistency.record_write(self._bus.publish(CACHE_TOPIC))
+
+        return write
+
+    @property
+    def wrapped(self) -> Any:
+        return self._repository
+
+
+class CachingRepositoryProvider:
+    def __init__(self, provider: Any, bus: InvalidationBus, max_entries: int = 10_000) -> None:
+        self._provider = provider
+        self._bus = bus
+        self.cache = HierarchyCache(max_entries)
+        bus.subscribe(CACHE_TOPIC, self.cache.invalidate)
+        for member in HIERARCHY_MEMBERS:
+            setattr(self, member, CachedRepository(getattr(provider, member), member, self.cache, bus))
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._provider, attribute)
+
+    def counts(self) -> dict[str, Any]:
+        inner = getattr(self._provider, "counts", None)
+        counts = dict(inner()) if callable(inner) else {}
+        counts["hierarchy_cache"] = self.cache.counts()
+        return counts
+
+    def clear(self) -> None:
+        inner = getattr(self._provider, "clear", None)
+        if callable(inner):
+            inner()
+        self.cache.invalidate()
+
+    def close(self) -> None:
+        self._bus.unsubscribe(CACHE_TOPIC, self.cache.invalidate)
+        inner = getattr(self._provider, "close", None)
+        if callable(inner):
+            inner()
+
+    @property
+    def wrapped(self) -> Any:
+        return self._provider
+
+
+__all__ = ["CACHE_TOPIC", "CachedRepository", "CachingRepositoryProvider", "HierarchyCache"]
@@ -4,6 +4,7 @@ from abc import ABC, abstractmethod
 from typing import Dict, List
 
 from ..models import Device
+from .records import DeviceRecord
 
 
 class DeviceRepository(ABC):
@@ -15,6 +16,10 @@ class DeviceRepository(ABC):
     def list_devices(self, owner_id: str) -> List[Device]:
         raise NotImplementedError
 
+    @abstractmethod
+    def get_device(self, owner_id: str, device_id: str) -> Device | None:
+        raise NotImplementedError
+
     @abstractmethod
     def delete_device(self, owner_id: str, device_id: str) -> None:
         raise NotImplementedError
@@ -28,18 +33,22 @@ class DeviceRepository(ABC):
 
 class InMemoryDeviceRepository(DeviceRepository):
     def __init__(self) -> None:
-        self._devices: Dict[str, Dict[str, Device]] = {}
+        self._devices: Dict[str, Dict[str, DeviceRecord]] = {}
 
     def create_device(self, owner_id: str, device_id: str, name: str) -> Device:
         owner_devices = self._devices.setdefault(owner_id, {})
         if device_id in owner_devices:
             raise ValueError("Device already exists")
         device = Device(id=device_id, name=name, owner_id=owner_id)
-        owner_devices[device_id] = device
+        owner_devices[device_id] = DeviceRecord.from_device(device)
         return device
 
     def list_devices(self, owner_id: str) -> List[Device]:
-        return list(self._devices.get(owner_id, {}).values())
+        return [record.to_device() for record in self._devices.get(owner_id, {}).values()]
+
+    def get_device(self, owner_id: str, device_id: str) -> Device | None:
+        record = self._devices.get(owner_id, {}).get(device_id)
+        return None if record is None else record.to_device()
 
     def delete_device(self, owner_id: str, device_id: str) -> None:
         owner_devices = self._devices.get(owner_id, {})
@@ -50,5 +59,8 @@ class InMemoryDeviceRepository(DeviceRepository):
     def clear(self) -> None:
         self._devices.clear()
 
+    def counts(self) -> dict[str, int]:
+        return {"owners": len(self._devices), "devices": sum(len(devices) for devices in self._devices.values())}
+
 
 __all__ = ["DeviceRepository", "InMemoryDeviceRepository"]
@@ -0,0 +1,189 @@
+"""Group commit: concurrent writes share one SQLite transaction.
+
+A commit costs the same whether it carries one row or hundreds. It appends a commit
+frame to the WAL and, depending on ``synchronous``, fsyncs. When every request
+commits on its own, write throughput tops out at commits per second, not rows per
+second.
+
+:class:`GroupCommitWriter` runs every repository write on one writer thread:
+
+* callers enqueue a unit of work, ``work(session) -> result``, and block on a future;
+* the writer takes whatever queued up while it was committing the previous batch,
+  optionally waits up to ``window`` for more (at most ``max_batch``), and runs them
+  all in one ``BEGIN IMMEDIATE`` transaction. If a unit raises (``KeyError``,
+  ``ValueError``, an integrity error), the batch is rolled back and re-run with each
+  unit in its own SAVEPOINT, so the failed unit is rolled back alone and only its
+  caller sees the exception;
+* after ``COMMIT`` returns, every future in the batch resolves.
+
+No caller returns before its write is committed. Durability is therefore exactly
+what the connection's ``synchronous`` setting gives a single commit. A batch that
+stays locked past the busy timeout is re-run whole under the profile's
+:class:`~.sqlite_profile.BusyRetry`.
+
+:class:`InlineWriter` is the one-transaction-per-call behaviour, with the same
+interface.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Tuple, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..observability.metrics import sqlite_group_commit_batch_size
+from .sqlite_profile import BusyRetry, is_busy_error
+
+T = TypeVar("T")
+Work = Callable[[Session], Any]
+
+
+class InlineWriter:
+    """Commits every unit of work in its own transaction on the caller's thread."""
+
+    def __init__(self, session_factory: Callable[[], Session], retry: BusyRetry) -> None:
+        self._session_factory = session_factory
+        self._retry = retry
+
+    def execute(self, work: Callable[[Session], T]) -> T:
+        return self._retry.run(lambda: self._run(work), is_busy_error)
+
+    def _run(self, work: Callable[[Session], T]) -> T:
+        with self._session_factory() as session:
+            result = work(session)
+            session.commit()
+            return result
+
+    def close(self) -> None:
+        pass
+
+
+class _UnitFailed(Exception):
+    pass
+
+
+@dataclass
+class _Pending:
+    work: Work
+    # The caller's context, so query stats and trace spans land on the request that asked.
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+    future: Future = field(default_factory=Future)
+
+
+class GroupCommitWriter:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        retry: BusyRetry,
+        window: float = 0.0,
+        max_batch: int = 256,
+    ) -> None:
+        self._session_factory = session_factory
+        self._retry = retry
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "queue.SimpleQueue[_Pending | None]" = queue.SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, work: Work) -> Future:
+        if self._closed:
+            raise RuntimeError("SQLite writer is closed")
+        pending = _Pending(work)
+        self._queue.put(pending)
+        return pending.future
+
+    def execute(self, work: Callable[[Session], T]) -> T:
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("A unit of work cannot wait on the writer it runs on")
+        return self.submit(work).result()
+
+    def close(self) -> None:
+        """Commit everything already queued, then stop the writer thread."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join(timeout=10)
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stopping = self._collect(first)
+            self._commit(batch)
+            if stopping:
+                return
+
+    def _collect(self, first: _Pending) -> Tuple[List[_Pending], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                pending = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is None:
+                return batch, True
+            batch.append(pending)
+        return batch, False
+
+    def _commit(self, batch: List[_Pending]) -> None:
+        try:
+            outcomes = self._retry.run(lambda: self._apply(batch), is_busy_error)
+        except BaseException as exc:  # the transaction itself failed: nobody's write landed
+            for pending in batch:
+                pending.future.set_exception(exc)
+            return
+        sqlite_group_commit_batch_size.observe(len(batch))
+        for pending, (ok, value) in zip(batch, outcomes):
+            if ok:
+                pending.future.set_result(value)
+            else:
+                pending.future.set_exception(value)
+
+    def _apply(self, batch: List[_Pending]) -> List[Tuple[bool, Any]]:
+        # Units almost never fail, so first run the batch without per-unit savepoints
+        # (they cost a round trip and a flush each). If one does fail, roll back and
+        # run the batch again with every unit in its own savepoint.
+        try:
+            return self._transaction(batch, isolate=False)
+        except _UnitFailed as failed:
+            if len(batch) == 1:
+                return [(False, failed.__cause__)]
+            return self._transaction(batch, isolate=True)
+
+    def _transaction(self, batch: List[_Pending], isolate: bool) -> List[Tuple[bool, Any]]:
+        outcomes: List[Tuple[bool, Any]] = []
+        with self._session_factory() as session:
+            # Take the write lock up front; without an explicit BEGIN the first SAVEPOINT
+            # would open the transaction and its RELEASE would commit it.
+            session.execute(text("BEGIN IMMEDIATE"))
+            for pending in batch:
+                if not isolate:
+                    try:
+                        outcomes.append((True, pending.context.run(pending.work, session)))
+                    except Exception as exc:
+                        if is_busy_error(exc):
+                            raise
+                        raise _UnitFailed from exc
+                    continue
+                try:
+                    with session.begin_nested():
+                        outcomes.append((True, pending.context.run(pending.work, session)))
+                except Exception as exc:
+                    outcomes.append((False, exc))
+            session.commit()
+        return outcomes
+
+
+__all__ = ["GroupCommitWriter", "InlineWriter"]
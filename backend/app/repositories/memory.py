@@ -1,25 +1,89 @@
 from __future__ import annotations
 
-from typing import Dict
-from uuid import uuid4
+from typing import Dict, Iterable, Iterator
 
 from ..domain.entities import Area, Building, Location, Zone
+from ..domain.ids import new_id
 from .base import AreaRepository, BuildingRepository, LocationRepository, RepositoryProvider, ZoneRepository
+from .path_index import ChildIndex, Path
+from .search_index import InMemorySearchIndex
 from .zone_device_repository import InMemoryZoneDeviceRepository
 
 
 class InMemoryDataStore:
-    def __init__(self) -> None:
+    def __init__(self, devices: InMemoryZoneDeviceRepository | None = None) -> None:
         self.locations: Dict[str, Location] = {}
         self.buildings: Dict[str, Building] = {}
         self.zones: Dict[str, Zone] = {}
         self.areas: Dict[str, Area] = {}
+        # Sorted child ids per level (see path_index); subtree reads and deletes walk down these.
+        self.building_children = ChildIndex()
+        self.zone_children = ChildIndex()
+        self.area_children = ChildIndex()
+        self._levels = (self.building_children, self.zone_children, self.area_children)
+        self.search = InMemorySearchIndex()
+        self.devices = devices if devices is not None else InMemoryZoneDeviceRepository(self.zone_path)
+
+    def zone_path(self, zone_id: str) -> Path | None:
+        zone = self.zones.get(zone_id)
+        building = self.buildings.get(zone.building_id) if zone else None
+        return (building.location_id, building.id, zone.id) if building else None
+
+    def paths_under(self, path: Path, depth: int) -> Iterator[Path]:
+        """Paths ``depth`` ids long (2 buildings, 3 zones, 4 areas) at or under ``path``, in path order."""
+        levels = self._levels
+        if not path or len(path) > depth or path[0] not in self.locations:
+            return iter(())
+        if not all(levels[i].contains(path[i], path[i + 1]) for i in range(len(path) - 1)):
+            return iter(())
+        paths: Iterable[Path] = (tuple(path),)
+        for children in levels[len(path) - 1 : depth - 1]:
+            paths = _expand(paths, children)
+        return iter(paths)
+
+    def remove_subtree(self, path: Path) -> None:
+        """Drop every building, zone and area at or under ``path``, and the zones' devices."""
+        areas, zones, buildings = (list(self.paths_under(path, depth)) for depth in (4, 3, 2))
+        for found in areas:
+            del self.areas[found[-1]]
+            self.search.discard(found)
+        for found in zones:
+            del self.zones[found[-1]]
+            self.area_children.pop(found[-1])
+            self.devices.delete_by_zone(found[-1])
+            self.search.discard(found)
+        for found in buildings:
+            del self.buildings[found[-1]]
+            self.zone_children.pop(found[-1])
+            self.search.discard(found)
+        if len(path) == 1:
+            self.building_children.pop(path[0])
+        else:
+            self._levels[len(path) - 2].discard(path[-2], path[-1])
 
     def clear(self) -> None:
         self.locations.clear()
         self.buildings.clear()
         self.zones.clear()
         self.areas.clear()
+        self.building_children.clear()
+        self.zone_children.clear()
+        self.area_children.clear()
+        self.search.clear()
+
+    def counts(self) -> dict[str, int]:
+        return {
+            "locations": len(self.locations),
+            "buildings": len(self.buildings),
+            "zones": len(self.zones),
+            "areas": len(self.areas),
+        }
+
+
+def _expand(paths: Iterable[Path], children: ChildIndex) -> Iterator[Path]:
+    for path in paths:
+        for child in children.get(path[-1]):
+            yield path + (child,)
 
 
 class InMemoryLocationRepository(LocationRepository):
@@ -27,9 +91,10 @@ class InMemoryLocationRepository(LocationRepository):
         self._store = store
 
     def create(self, name: str) -> Location:
-        location_id = str(uuid4())
+        location_id = new_id()
         location = Location(id=location_id, name=name)
         self._store.locations[location_id] = location
+        self._store.search.add((location_id,), name)
         return location
 
     def get(self, location_id: str) -> Location | None:
@@ -42,14 +107,14 @@ class InMemoryLocationRepository(LocationRepository):
         if location.id not in self._store.locations:
             raise KeyError("Location not found")
         self._store.locations[location.id] = location
+        self._store.search.add((location.id,), location.name)
         return location
 
     def delete(self, location_id: str) -> None:
         if location_id not in self._store.locations:
             raise KeyError("Location not found")
-        building_ids = [b.id for b in self._store.buildings.values() if b.location_id == location_id]
-        for building_id in building_ids:
-            InMemoryBuildingRepository(self._store).delete(building_id)
+        self._store.remove_subtree((location_id,))
+        self._store.search.discard((location_id,))
         del self._store.locations[location_id]
 
 
@@ -58,12 +123,15 @@ class InMemoryBuildingRepository(BuildingRepository):
         self._store = store
 
     def create(self, name: str, location_id: str) -> Building:
-        if location_id not in self._store.locations:
+        location = self._store.locations.get(location_id)
+        if location is None:
             raise ValueError("Location not found")
-        building_id = str(uuid4())
-        building = Building(id=building_id, name=name, location_id=location_id)
+        building_id = new_id()
+        building = Building(id=building_id, name=name, location_id=location.id)
         self._store.buildings[building_id] = building
-        self._store.locations[location_id].buildings.append(building)
+        self._store.building_children.add(location.id, building_id)
+        self._store.search.add((location.id, building_id), name)
+        location.buildings.append(building)
         return building
 
     def get(self, building_id: str) -> Building | None:
@@ -72,10 +140,14 @@ class InMemoryBuildingRepository(BuildingRepository):
     def list_for_location(self, location_id: str) -> list[Building]:
         return [b for b in self._store.buildings.values() if b.location_id == location_id]
 
+    def list_under(self, path: Path) -> list[Building]:
+        return [self._store.buildings[found[-1]] for found in self._store.paths_under(path, 2)]
+
     def update(self, building: Building) -> Building:
         if building.id not in self._store.buildings:
             raise KeyError("Building not found")
         self._store.buildings[building.id] = building
+        self._store.search.add((building.location_id, building.id), building.name)
         location = self._store.locations.get(building.location_id)
         if location:
             location.buildings = [b for b in location.buildings if b.id != building.id] + [building]
@@ -85,13 +157,10 @@ class InMemoryBuildingRepository(BuildingRepository):
         building = self._store.buildings.get(building_id)
         if building is None:
             raise KeyError("Building not found")
-        zone_ids = [z.id for z in self._store.zones.values() if z.building_id == building_id]
-        for zone_id in zone_ids:
-            InMemoryZoneRepository(self._store).delete(zone_id)
+        self._store.remove_subtree((building.location_id, building_id))
         location = self._store.locations.get(building.location_id)
         if location:
             location.buildings = [b for b in location.buildings if b.id != building_id]
-        del self._store.buildings[building_id]
 
 
 class InMemoryZoneRepository(ZoneRepository):
@@ -99,12 +168,15 @@ class InMemoryZoneRepository(ZoneRepository):
         self._store = store
 
     def create(self, name: str, building_id: str) -> Zone:
-        if building_id not in self._store.buildings:
+        building = self._store.buildings.get(building_id)
+        if building is None:
             raise ValueError("Building not found")
-        zone_id = str(uuid4())
-        zone = Zone(id=zone_id, name=name, building_id=building_id)
+        zone_id = new_id()
+        zone = Zone(id=zone_id, name=name, building_id=building.id)
         self._store.zones[zone_id] = zone
-        building = self._store.buildings[building_id]
+        path = (building.location_id, building.id, zone_id)
+        self._store.zone_children.add(building.id, zone_id)
+        self._store.search.add(path, name)
         building.zones.append(zone)
         return zone
 
@@ -114,10 +186,14 @@ class InMemoryZoneRepository(ZoneRepository):
     def list_for_building(self, building_id: str) -> list[Zone]:
         return [z for z in self._store.zones.values() if z.building_id == building_id]
 
+    def list_under(self, path: Path) -> list[Zone]:
+        return [self._store.zones[found[-1]] for found in self._store.paths_under(path, 3)]
+
     def update(self, zone: Zone) -> Zone:
         if zone.id not in self._store.zones:
             raise KeyError("Zone not found")
         self._store.zones[zone.id] = zone
+        self._store.search.add(self._store.zone_path(zone.id), zone.name)
         building = self._store.buildings.get(zone.building_id)
         if building:
             building.zones = [z for z in building.zones if z.id != zone.id] + [zone]
@@ -127,13 +203,18 @@ class InMemoryZoneRepository(ZoneRepository):
         zone = self._store.zones.get(zone_id)
         if zone is None:
             raise KeyError("Zone not found")
-        area_ids = [a.id for a in self._store.areas.values() if a.zone_id == zone_id]
-        for area_id in area_ids:
-            InMemoryAreaRepository(self._store).delete(area_id)
+        path = self._store.zone_path(zone_id)
+        if path is not None:
+            self._store.remove_subtree(path)
+        else:
+            # Its building is gone, so there is no subtree to walk; drop what hangs off the zone id directly.
+            for area_id in self._store.area_children.pop(zone_id):
+                self._store.areas.pop(area_id, None)
+            self._store.devices.delete_by_zone(zone_id)
+            del self._store.zones[zone_id]
         building = self._store.buildings.get(zone.building_id)
         if building:
             building.zones = [z for z in building.zones if z.id != zone_id]
-        del self._store.zones[zone_id]
 
 
 class InMemoryAreaRepository(AreaRepository):
@@ -141,12 +222,15 @@ class InMemoryAreaRepository(AreaRepository):
         self._store = store
 
     def create(self, name: str, zone_id: str) -> Area:
-        if zone_id not in self._store.zones:
+        zone = self._store.zones.get(zone_id)
+        if zone is None:
             raise ValueError("Zone not found")
-        area_id = str(uuid4())
-        area = Area(id=area_id, name=name, zone_id=zone_id)
+        area_id = new_id()
+        area = Area(id=area_id, name=name, zone_id=zone.id)
         self._store.areas[area_id] = area
-        zone = self._store.zones[zone_id]
+        path = self._store.zone_path(zone.id) + (area_id,)
+        self._store.area_children.add(zone.id, area_id)
+        self._store.search.add(path, name)
         zone.areas.append(area)
         return area
 
@@ -156,10 +240,16 @@ class InMemoryAreaRepository(AreaRepository):
     def list_for_zone(self, zone_id: str) -> list[Area]:
         return [a for a in self._store.areas.values() if a.zone_id == zone_id]
 
+    def list_under(self, path: Path) -> list[Area]:
+        return [self._store.areas[found[-1]] for found in self._store.paths_under(path, 4)]
+
     def update(self, area: Area) -> Area:
         if area.id not in self._store.areas:
             raise KeyError("Area not found")
         self._store.areas[area.id] = area
+        zone_path = self._store.zone_path(area.zone_id)
+        if zone_path is not None:
+            self._store.search.add(zone_path + (area.id,), area.name)
         zone = self._store.zones.get(area.zone_id)
         if zone:
             zone.areas = [a for a in zone.areas if a.id != area.id] + [area]
@@ -172,20 +262,29 @@ class InMemoryAreaRepository(AreaRepository):
         zone = self._store.zones.get(area.zone_id)
         if zone:
             zone.areas = [a for a in zone.areas if a.id != area_id]
+        self._store.area_children.discard(area.zone_id, area_id)
+        zone_path = self._store.zone_path(area.zone_id)
+        if zone_path is not None:
+            self._store.search.discard(zone_path + (area_id,))
         del self._store.areas[area_id]
 
 
 class InMemoryRepositoryProvider:
     def __init__(self) -> None:
         self._store = InMemoryDataStore()
+        self.zone_devices = self._store.devices
+        self.search = self._store.search
         self.locations = InMemoryLocationRepository(self._store)
         self.buildings = InMemoryBuildingRepository(self._store)
         self.zones = InMemoryZoneRepository(self._store)
         self.areas = InMemoryAreaRepository(self._store)
-        self.zone_devices = InMemoryZoneDeviceRepository()
 
     def clear(self) -> None:
         self._store.clear()
+        self.zone_devices.clear()
+
+    def counts(self) -> dict[str, dict[str, int]]:
+        return {"hierarchy": self._store.counts(), "zone_devices": self.zone_devices.counts()}
 
 
 def create_in_memory_provider() -> RepositoryProvider:
@@ -0,0 +1,198 @@
+"""Materialized hierarchy paths and the in-memory index over them.
+
+A node's path is its ancestors' ids from the location down, followed by its own
+id: an area is ``(location_id, building_id, zone_id, area_id)`` and a zone device
+``(location_id, building_id, zone_id, device_id)``. Nodes never move, so a path is
+fixed at create time. Everything under ``prefix`` sorts in one contiguous run
+starting at ``prefix``, which makes a subtree of any depth and size a single range
+scan of a sorted index.
+
+SQLite keeps ``path_text(path)`` (``/loc/bld/zone/area``) in an indexed ``path``
+column and scans ``text_range(prefix)``. The in-memory hierarchy keeps no path
+tuples: a :class:`ChildIndex` per level holds each parent's sorted child ids, and a
+subtree scan walks down from the prefix, yielding paths in the same order. Zone
+devices keep theirs in a :class:`PathIndex`.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+Path = Tuple[str, ...]
+SEPARATOR = "/"
+# Sorts after every id: ids are uuids or client-chosen strings well below U+10FFFF.
+HIGH = "\U0010ffff"
+
+
+def path_text(path: Sequence[str]) -> str:
+    return "".join(SEPARATOR + part for part in path)
+
+
+def parse_text(text: str, depth: int) -> Path:
+    """Inverse of ``path_text`` for a node ``depth`` levels down; only the last id may contain a separator."""
+    return tuple(text[len(SEPARATOR) :].split(SEPARATOR, depth - 1))
+
+
+def text_range(prefix: Sequence[str]) -> tuple[str, str]:
+    """Half-open ``[low, high)`` bounds of the text paths strictly below ``prefix``."""
+    return text_bounds(path_text(prefix))
+
+
+def text_bounds(text: str) -> tuple[str, str]:
+    # "0" is the character right after "/", so "/a/" <= path < "/a0" covers "/a/..." and nothing else.
+    return text + SEPARATOR, text + chr(ord(SEPARATOR) + 1)
+
+
+class PathIndex:
+    """Sorted set of paths with prefix scans, kept in bounded chunks.
+
+    Any comparable keys work: the search index keeps its vocabulary of bare words in one.
+
+    One flat sorted list would shift every later entry on each insert, which is
+    milliseconds per insert at a million nodes. Keys instead live in sorted chunks
+    of ``chunk_size`` to ``2 * chunk_size`` entries, with ``_maxes`` holding each
+    chunk's last key, so an insert or removal bisects twice and moves one chunk.
+    """
+
+    def __init__(self, chunk_size: int = 512) -> None:
+        self._chunk_size = chunk_size
+        self._chunks: List[List[Path]] = []
+        self._maxes: List[Path] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, path: Path) -> None:
+        if not self._chunks:
+            self._chunks.append([path])
+            self._maxes.append(path)
+            self._len = 1
+            return
+        index = min(bisect_left(self._maxes, path), len(self._maxes) - 1)
+        chunk = self._chunks[index]
+        position = bisect_left(chunk, path)
+        if position < len(chunk) and chunk[position] == path:
+            return
+        chunk.insert(position, path)
+        self._maxes[index] = chunk[-1]
+        self._len += 1
+        if len(chunk) > 2 * self._chunk_size:
+            tail = chunk[self._chunk_size :]
+            del chunk[self._chunk_size :]
+            self._chunks.insert(index + 1, tail)
+            self._maxes[index] = chunk[-1]
+            self._maxes.insert(index + 1, tail[-1])
+
+    def discard(self, path: Path) -> None:
+        index = bisect_left(self._maxes, path)
+        if index == len(self._maxes):
+            return
+        chunk = self._chunks[index]
+        position = bisect_left(chunk, path)
+        if position < len(chunk) and chunk[position] == path:
+            self._remove(index, position, position + 1)
+
+    def scan(self, prefix: Sequence[str], after: Path | None = None) -> Iterator[Path]:
+        """Yield ``prefix`` itself, if present, and every path below it, in order.
+
+        With ``after``, start right past that path instead: the keyset cursor of a paged scan.
+        """
+        low = tuple(prefix)
+        high = low + (HIGH,)
+        if after is not None and after >= low:
+            return self.irange(after, high, inclusive=False)
+        return self.irange(low, high)
+
+    def irange(self, low: Path, high: Path, inclusive: bool = True) -> Iterator[Path]:
+        """Yield the keys in ``[low, high)`` in order, or in ``(low, high)`` when not ``inclusive``."""
+        find = bisect_left if inclusive else bisect_right
+        index = find(self._maxes, low)
+        if index == len(self._maxes):
+            return
+        position = find(self._chunks[index], low)
+        for chunk in self._chunks[index:]:
+            for path in chunk[position:] if position else chunk:
+                if path >= high:
+                    return
+                yield path
+            position = 0
+
+    def discard_under(self, prefix: Sequence[str]) -> List[Path]:
+        """Remove and return ``prefix`` and every path below it."""
+        removed = list(self.scan(prefix))
+        if removed:
+            low = removed[0]
+            index = bisect_left(self._maxes, low)
+            position = bisect_left(self._chunks[index], low)
+            remaining = len(removed)
+            while remaining:
+                chunk = self._chunks[index]
+                end = min(len(chunk), position + remaining)
+                remaining -= end - position
+                if self._remove(index, position, end):
+                    index += 1
+                position = 0
+        return removed
+
+    def clear(self) -> None:
+        self._chunks.clear()
+        self._maxes.clear()
+        self._len = 0
+
+    def _remove(self, index: int, start: int, end: int) -> bool:
+        """Delete ``chunk[start:end]``; False when that emptied the chunk and dropped it."""
+        chunk = self._chunks[index]
+        del chunk[start:end]
+        self._len -= end - start
+        if not chunk:
+            del self._chunks[index]
+            del self._maxes[index]
+            return False
+        self._maxes[index] = chunk[-1]
+        return True
+
+
+class ChildIndex:
+    """Sorted child ids per parent id: one list slot per node, where a ``PathIndex`` holds a tuple.
+
+    Each parent's children sit in one flat list, so an insert shifts the parent's
+    siblings only: a few thousand at most under one building or zone.
+    """
+
+    def __init__(self) -> None:
+        self._children: Dict[str, List[str]] = {}
+
+    def add(self, parent: str, child: str) -> None:
+        children = self._children.setdefault(parent, [])
+        position = bisect_left(children, child)
+        if position == len(children) or children[position] != child:
+            children.insert(position, child)
+
+    def discard(self, parent: str, child: str) -> None:
+        children = self._children.get(parent)
+        if children is None:
+            return
+        position = bisect_left(children, child)
+        if position < len(children) and children[position] == child:
+            del children[position]
+            if not children:
+                del self._children[parent]
+
+    def contains(self, parent: str, child: str) -> bool:
+        children = self._children.get(parent, ())
+        position = bisect_left(children, child)
+        return position < len(children) and children[position] == child
+
+    def get(self, parent: str) -> Sequence[str]:
+        return self._children.get(parent, ())
+
+    def pop(self, parent: str) -> List[str]:
+        return self._children.pop(parent, [])
+
+    def clear(self) -> None:
+        self._children.clear()
+
+
+__all__ = ["HIGH", "ChildIndex", "Path", "PathIndex", "SEPARATOR", "parse_text", "path_text", "text_bounds", "text_range"]
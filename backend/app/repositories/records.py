@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Tuple
+
+from ..domain.ids import intern_id
+from ..models import Device
+
+
+@dataclass(slots=True)
+class DeviceRecord:
+    """Compact storage form of :class:`Device` for the in-memory stores.
+
+    A pydantic model carries an instance ``__dict__`` plus ``__fields_set__`` per
+    device; stores keep this slotted record instead and rebuild the model on read.
+    """
+
+    id: str
+    name: str
+    owner_id: str | None
+    zone_id: str | None
+    created_at: datetime
+    tags: Tuple[str, ...] = ()
+    capabilities: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_device(cls, device: Device) -> DeviceRecord:
+        return cls(
+            id=device.id,
+            name=device.name,
+            owner_id=intern_id(device.owner_id) if device.owner_id else device.owner_id,
+            zone_id=intern_id(device.zone_id) if device.zone_id else device.zone_id,
+            created_at=device.created_at,
+            tags=tuple(map(intern_id, device.tags)),
+            capabilities=tuple(map(intern_id, device.capabilities)),
+        )
+
+    def to_device(self) -> Device:
+        return Device.construct(
+            id=self.id,
+            name=self.name,
+            owner_id=self.owner_id,
+            zone_id=self.zone_id,
+            created_at=self.created_at,
+            tags=list(self.tags),
+            capabilities=list(self.capabilities),
+        )
+
+
+__all__ = ["DeviceRecord"]
@@ -0,0 +1,243 @@
+"""Name search over the hierarchy: query parsing, ranking and the in-memory index.
+
+A query matches names containing all of its words. Every word but the last must
+match a whole name word, and the last may be a prefix of one, so results follow
+the user while they type ("meeting room 3" finds "Meeting Room 3B"). Words are
+runs of letters and digits, compared case- and accent-insensitively after
+``tokenize`` folds them (casefold, then NFKD without combining marks, so "Straße"
+matches "strasse" and "ﬁ" matches "fi"). SQLite indexes the same folded words,
+so both backends agree on what matches.
+
+Neither backend ranks every match. bm25 over the hundreds of thousands of names a
+one-word query can match costs over 50 ms at a million names. Both collect the
+first ``CANDIDATES`` matches, oldest first, and sort them with ``rank_key``:
+names matching more query words exactly come first, then shorter names. A query
+broad enough to exceed the window gets a sample and should be refined.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from functools import partial
+from heapq import merge
+from itertools import chain
+from typing import Callable, Dict, Iterator, List, Sequence
+
+from ..domain.entities import SearchHit
+from .base import SearchRepository
+from .path_index import HIGH, Path, PathIndex
+
+CANDIDATES = 1000
+_SET_FACTOR = 16
+_WORD = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    if text.isascii():
+        return _WORD.findall(text.lower())
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    return _WORD.findall("".join(char for char in folded if not unicodedata.combining(char)))
+
+
+def _contains(postings: Sequence[int], ordinal: int) -> bool:
+    at = bisect_left(postings, ordinal)
+    return at < len(postings) and postings[at] == ordinal
+
+
+def rank_key(words: Sequence[str], name: str) -> tuple:
+    name_words = set(tokenize(name))
+    return (-sum(word in name_words for word in words), len(name), name.casefold())
+
+
+def matches(words: Sequence[str], name: str) -> bool:
+    name_words = tokenize(name)
+    exact, last = words[:-1], words[-1]
+    return all(word in name_words for word in exact) and any(word.startswith(last) for word in name_words)
+
+
+def to_hit(path: Path, names: Sequence[str]) -> SearchHit:
+    """``names`` holds the name of each node along ``path``, the hit's own last."""
+    return SearchHit(id=path[-1], name=names[-1], path=list(zip(path, names)))
+
+
+class InMemorySearchIndex(SearchRepository):
+    """Inverted index from name words to node ordinals, with a sorted vocabulary for prefixes.
+
+    Each node gets a dense ordinal into flat per-node lists of its id, its parent's
+    id and its name; a hit's path is rebuilt by following parent ids, so no node
+    keeps a path tuple. Posting lists are append-only ``array('I')`` of ordinals,
+    four bytes per word of a name; a word only one name has, like most numbers,
+    maps to its bare ordinal instead. A removed or renamed node leaves its old
+    ordinal dead: a posting list is compacted once half of it is dead, and the live
+    nodes are renumbered once the dead outnumber them.
+    """
+
+    def __init__(self) -> None:
+        self._ordinals: Dict[str, int] = {}
+        self._ids: List[str | None] = []
+        self._parents: List[str | None] = []
+        self._names: List[str | None] = []
+        self._postings: Dict[str, array | int] = {}
+        self._dead: Dict[str, int] = {}
+        self._vocabulary = PathIndex()  # of the words themselves
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def add(self, path: Path, name: str) -> None:
+        self.discard(path)
+        ordinal = len(self._names)
+        self._ordinals[path[-1]] = ordinal
+        self._ids.append(path[-1])
+        self._parents.append(path[-2] if len(path) > 1 else None)
+        self._names.append(name)
+        for word in set(tokenize(name)):
+            postings = self._postings.get(word)
+            if postings is None:
+                self._postings[word] = ordinal
+                self._vocabulary.add(word)
+            elif isinstance(postings, int):
+                self._postings[word] = array("I", (postings, ordinal))
+            else:
+                postings.append(ordinal)
+
+    def discard(self, path: Path) -> None:
+        ordinal = self._ordinals.pop(path[-1], None)
+        if ordinal is None:
+            return
+        name = self._names[ordinal]
+        self._ids[ordinal] = self._parents[ordinal] = self._names[ordinal] = None
+        for word in set(tokenize(name)):
+            postings = self._postings[word]
+            if isinstance(postings, int):
+                self._drop(word)
+                continue
+            dead = self._dead[word] = self._dead.get(word, 0) + 1
+            if dead * 2 >= len(postings):
+                self._compact(word, postings)
+        if len(self._names) - len(self._ordinals) > len(self._ordinals):
+            self._renumber()
+
+    def search(self, query: str, limit: int = 20) -> List[SearchHit]:
+        words = tokenize(query)
+        if not words:
+            return []
+        names = self._names
+        found: List[int] = []
+        previous = None
+        for ordinal in self._candidates(words):
+            if ordinal == previous:  # a name with two words sharing the prefix
+                continue
+            previous = ordinal
+            if names[ordinal] is not None:
+                found.append(ordinal)
+                if len(found) == CANDIDATES:
+                    break
+        found.sort(key=lambda ordinal: rank_key(words, names[ordinal]))
+        return [self._hit(ordinal) for ordinal in found[:limit]]
+
+    def clear(self) -> None:
+        self._ordinals.clear()
+        self._ids.clear()
+        self._parents.clear()
+        self._names.clear()
+        self._postings.clear()
+        self._dead.clear()
+        self._vocabulary.clear()
+
+    def _candidates(self, words: List[str]) -> Iterator[int]:
+        """Ordinals of matching names, oldest first, possibly repeated or dead.
+
+        Each query word contributes a group of posting lists: its own list, or for the
+        last word the lists of every vocabulary word it prefixes. The group with the
+        fewest postings drives, and each of its ordinals is probed in the other groups:
+        in a set of the group's postings while that stays within a few times the
+        driver's size, otherwise by binary search in the group's single list (ordinals
+        only grow, and renumbering keeps their order, so every list is sorted) or, for a
+        broad prefix, against the name.
+        """
+        groups = [[self._posting(word)] for word in words[:-1]]
+        last = words[-1]
+        groups.append([self._posting(key) for key in self._vocabulary.irange(last, last + HIGH)])
+        groups.sort(key=lambda group: sum(map(len, group)))
+        if not all(any(group) for group in groups):
+            return iter(())
+        driver, others = groups[0], groups[1:]
+        budget = _SET_FACTOR * sum(map(len, driver))
+        probes: List[Callable[[int], bool]] = []
+        for group in others:
+            # Only the first probe sees every driver ordinal, so a set pays for itself there; later
+            # probes see the few survivors and bisect a single list instead of hashing all of it.
+            if sum(map(len, group)) <= budget and (not probes or len(group) > 1):
+                probes.append(set(chain.from_iterable(group)).__contains__)
+            elif len(group) == 1:
+                probes.append(partial(_contains, group[0]))
+            else:
+                # A short prefix ("m") expands to a large share of the portfolio; check names instead.
+                probes = [partial(self._matches, words)]
+                break
+        if len(driver) == 1:
+            ordinals: Iterator[int] = iter(driver[0])
+        else:
+            # Sorting concatenated sorted runs is a cheap merge in C; a lone prefix merges lazily instead.
+            ordinals = iter(sorted(chain.from_iterable(driver))) if probes else merge(*driver)
+        for probe in probes:  # most selective first; set probes filter without a Python frame per ordinal
+            ordinals = filter(probe, ordinals)
+        return ordinals
+
+    def _posting(self, word: str) -> Sequence[int]:
+        postings = self._postings.get(word, ())
+        return (postings,) if isinstance(postings, int) else postings
+
+    def _matches(self, words: List[str], ordinal: int) -> bool:
+        name = self._names[ordinal]
+        return name is not None and matches(words, name)
+
+    def _hit(self, ordinal: int) -> SearchHit:
+        ids: List[str] = []
+        names: List[str] = []
+        at: int | None = ordinal
+        while at is not None:
+            ids.append(self._ids[at])
+            names.append(self._names[at])
+            parent = self._parents[at]
+            at = None if parent is None else self._ordinals.get(parent)
+        return to_hit(tuple(reversed(ids)), names[::-1])
+
+    def _compact(self, word: str, postings: array) -> None:
+        names = self._names
+        postings[:] = array("I", [ordinal for ordinal in postings if names[ordinal] is not None])
+        self._dead.pop(word, None)
+        if len(postings) == 1:
+            self._postings[word] = postings[0]
+        elif not postings:
+            self._drop(word)
+
+    def _drop(self, word: str) -> None:
+        del self._postings[word]
+        self._dead.pop(word, None)
+        self._vocabulary.discard(word)
+
+    def _renumber(self) -> None:
+        """Give the live nodes dense ordinals again, keeping their order."""
+        names = self._names
+        live = [ordinal for ordinal, name in enumerate(names) if name is not None]
+        renumbered = array("I", bytes(4 * len(names)))
+        for new, old in enumerate(live):
+            renumbered[old] = new
+        for word, postings in self._postings.items():
+            if isinstance(postings, int):  # dropped with its node, so always live
+                self._postings[word] = renumbered[postings]
+            else:
+                postings[:] = array("I", [renumbered[ordinal] for ordinal in postings if names[ordinal] is not None])
+        self._ids = [self._ids[ordinal] for ordinal in live]
+        self._parents = [self._parents[ordinal] for ordinal in live]
+        self._names = [names[ordinal] for ordinal in live]
+        self._ordinals = {node_id: ordinal for ordinal, node_id in enumerate(self._ids)}
+        self._dead.clear()
+
+
+__all__ = ["CANDIDATES", "InMemorySearchIndex", "matches", "rank_key", "to_hit", "tokenize"]
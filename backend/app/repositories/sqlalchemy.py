@@ -1,16 +1,60 @@
 from __future__ import annotations
 
-from typing import Callable
+import functools
+from datetime import timezone
+from typing import Any, Callable, Sequence
 from uuid import uuid4
 
-from sqlalchemy import Column, ForeignKey, String, create_engine, select
-from sqlalchemy.orm import Session, declarative_base, relationship, sessionmaker, selectinload
-
-from ..domain.entities import Area, Building, Location, Zone
-from .base import AreaRepository, BuildingRepository, LocationRepository, RepositoryProvider, ZoneRepository
-from .zone_device_repository import InMemoryZoneDeviceRepository
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    UniqueConstraint,
+    create_engine,
+    delete,
+    exists,
+    func,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, aliased, declarative_base, relationship, sessionmaker, selectinload
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from ..domain.entities import Area, Building, Location, SearchHit, Zone
+from ..models import Device
+from ..observability.sql import instrument_engine
+from .base import (
+    AreaRepository,
+    BuildingRepository,
+    LocationRepository,
+    RepositoryProvider,
+    SearchRepository,
+    ZoneRepository,
+)
+from .group_commit import GroupCommitWriter, InlineWriter
+from .path_index import Path, parse_text, path_text, text_bounds
+from .search_index import CANDIDATES, rank_key, to_hit, tokenize
+from .sqlite_profile import BusyRetry, SQLiteProfile, WalCheckpointer, apply_profile, is_busy_error
+from .zone_device_repository import ZoneDeviceRepository
 
 Base = declarative_base()
+Writer = GroupCommitWriter | InlineWriter
+
+
+def busy_retry(method):
+    """Re-run a read when SQLite is still locked after its busy timeout; writers retry their own units of work."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._retry.run(lambda: method(self, *args, **kwargs), is_busy_error)
+
+    return wrapper
 
 
 class LocationModel(Base):
@@ -18,7 +62,9 @@ class LocationModel(Base):
 
     id = Column(String, primary_key=True)
     name = Column(String, nullable=False)
-    buildings = relationship("BuildingModel", back_populates="location", cascade="all, delete-orphan")
+    buildings = relationship(
+        "BuildingModel", back_populates="location", cascade="all, delete-orphan", passive_deletes=True
+    )
 
 
 class BuildingModel(Base):
@@ -26,9 +72,10 @@ class BuildingModel(Base):
 
     id = Column(String, primary_key=True)
     name = Column(String, nullable=False)
-    location_id = Column(String, ForeignKey("locations.id", ondelete="CASCADE"), nullable=False)
+    location_id = Column(String, ForeignKey("locations.id", ondelete="CASCADE"), nullable=False, index=True)
+    path = Column(String, nullable=False, index=True)
     location = relationship("LocationModel", back_populates="buildings")
-    zones = relationship("ZoneModel", back_populates="building", cascade="all, delete-orphan")
+    zones = relationship("ZoneModel", back_populates="building", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class ZoneModel(Base):
@@ -36,9 +83,10 @@ class ZoneModel(Base):
 
     id = Column(String, primary_key=True)
     name = Column(String, nullable=False)
-    building_id = Column(String, ForeignKey("buildings.id", ondelete="CASCADE"), nullable=False)
+    building_id = Column(String, ForeignKey("buildings.id", ondelete="CASCADE"), nullable=False, index=True)
+    path = Column(String, nullable=False, index=True)
     building = relationship("BuildingModel", back_populates="zones")
-    areas = relationship("AreaModel", back_populates="zone", cascade="all, delete-orphan")
+    areas = relationship("AreaModel", back_populates="zone", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class AreaModel(Base):
@@ -46,22 +94,155 @@ class AreaModel(Base):
 
     id = Column(String, primary_key=True)
     name = Column(String, nullable=False)
-    zone_id = Column(String, ForeignKey("zones.id", ondelete="CASCADE"), nullable=False)
+    zone_id = Column(String, ForeignKey("zones.id", ondelete="CASCADE"), nullable=False, index=True)
+    path = Column(String, nullable=False, index=True)
     zone = relationship("ZoneModel", back_populates="areas")
 
 
+class ZoneDeviceModel(Base):
+    __tablename__ = "zone_devices"
+    # Device ids are unique per zone; the unique key doubles as the zone_id index.
+    __table_args__ = (UniqueConstraint("zone_id", "id"), {"sqlite_autoincrement": True})
+
+    # The label rows' reference to the device. AUTOINCREMENT never hands out a deleted device's number again.
+    ordinal = Column(Integer, primary_key=True)
+    zone_id = Column(String, ForeignKey("zones.id", ondelete="CASCADE"), nullable=False)
+    id = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    owner_id = Column(String)
+    created_at = Column(DateTime, nullable=False)
+    path = Column(String, nullable=False, index=True)
+    tags = Column(JSON, nullable=False, default=list)
+    capabilities = Column(JSON, nullable=False, default=list)
+
+    __mapper_args__ = {"primary_key": [zone_id, id]}
+
+
+class ZoneDeviceLabelModel(Base):
+    """One row per tag or capability of a zone device.
+
+    The key puts the device's path after the label, so "devices with this label under this node"
+    is one range scan and counting them never touches zone_devices. ``device`` is the device's
+    ``zone_devices.ordinal``, which ``match_under`` pages by; a trigger drops the rows with their
+    device, however it is deleted.
+    """
+
+    __tablename__ = "zone_device_labels"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    kind = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)
+    path = Column(String, primary_key=True)
+    device = Column(Integer, nullable=False, index=True)
+
+
+_LABELS_DDL = (
+    "CREATE TRIGGER IF NOT EXISTS zone_devices_labels_ad AFTER DELETE ON zone_devices BEGIN"
+    " DELETE FROM zone_device_labels WHERE device = old.ordinal; END",
+)
+
+
+class SearchNodeModel(Base):
+    """Name of every location, building, zone and area, by path; the ``search_names`` FTS5 index reads it."""
+
+    __tablename__ = "search_nodes"
+
+    id = Column(Integer, primary_key=True)
+    path = Column(String, nullable=False, unique=True)
+    name = Column(String, nullable=False)
+    # The name as ``tokenize`` splits it, space-separated; FTS5 indexes this rather than the name.
+    words = Column(String, nullable=False, server_default="")
+
+
+# External-content FTS5 table over search_nodes.words, kept in step by triggers, so repositories only touch
+# search_nodes. The words are folded in Python, the same way queries and the memory index fold them; the ascii
+# tokenizer then only splits on the spaces between them and leaves every non-ASCII letter as it is.
+_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_names USING fts5(words, content='search_nodes', content_rowid='id',"
+    " tokenize='ascii', prefix='1 2 3')",
+    "CREATE TRIGGER IF NOT EXISTS search_nodes_ai AFTER INSERT ON search_nodes BEGIN"
+    " INSERT INTO search_names(rowid, words) VALUES (new.id, new.words); END",
+    "CREATE TRIGGER IF NOT EXISTS search_nodes_ad AFTER DELETE ON search_nodes BEGIN"
+    " INSERT INTO search_names(search_names, rowid, words) VALUES ('delete', old.id, old.words); END",
+    "CREATE TRIGGER IF NOT EXISTS search_nodes_au AFTER UPDATE OF words ON search_nodes BEGIN"
+    " INSERT INTO search_names(search_names, rowid, words) VALUES ('delete', old.id, old.words);"
+    " INSERT INTO search_names(rowid, words) VALUES (new.id, new.words); END",
+)
+
+
+def search_words(name: str) -> str:
+    return " ".join(tokenize(name))
+
+
+def index_name(session: Session, path: str, name: str) -> None:
+    session.add(SearchNodeModel(path=path, name=name, words=search_words(name)))
+
+
+def rename(session: Session, path: str, name: str) -> None:
+    stmt = update(SearchNodeModel).where(SearchNodeModel.path == path).values(name=name, words=search_words(name))
+    session.execute(stmt, execution_options={"synchronize_session": False})
+
+
+def unindex_subtree(session: Session, path: str) -> None:
+    low, high = text_bounds(path)
+    condition = (SearchNodeModel.path == path) | ((SearchNodeModel.path >= low) & (SearchNodeModel.path < high))
+    session.execute(delete(SearchNodeModel).where(condition), execution_options={"synchronize_session": False})
+
+
+# Children of each hierarchy table and the column pointing at the parent, for subtree deletes.
+_CHILDREN: dict[Any, tuple[tuple[Any, Any], ...]] = {
+    LocationModel: ((BuildingModel, BuildingModel.location_id),),
+    BuildingModel: ((ZoneModel, ZoneModel.building_id),),
+    ZoneModel: ((AreaModel, AreaModel.zone_id), (ZoneDeviceModel, ZoneDeviceModel.zone_id)),
+}
+
+
+def under(model: Any, path: Path) -> Any:
+    """Condition for the rows of ``model`` below ``path``: one range scan of its ``path`` index."""
+    low, high = text_bounds(path_text(path))
+    return (model.path >= low) & (model.path < high)
+
+
+def delete_subtree(session: Session, model: Any, condition: Any) -> None:
+    """Delete the matching rows of ``model`` and everything under them.
+
+    Each table gets one set-based DELETE, leaves first, whose WHERE clause nests
+    the parent id subqueries (``zone_id IN (SELECT id FROM zones WHERE building_id IN
+    (...))``). With the parent-id indexes, the cost follows the subtree size. No
+    rows are loaded into the session, and nothing depends on ``PRAGMA foreign_keys``.
+    The declared ``ON DELETE CASCADE`` stays as a backstop for writes from outside
+    the app.
+    """
+    children = _CHILDREN.get(model, ())
+    if children:
+        ids = select(model.id).where(condition)
+        for child, parent_column in children:
+            delete_subtree(session, child, parent_column.in_(ids))
+    session.execute(delete(model).where(condition), execution_options={"synchronize_session": False})
+
+
 class SQLiteLocationRepository(LocationRepository):
-    def __init__(self, session_factory: Callable[[], Session]):
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        retry: BusyRetry = BusyRetry(attempts=0),
+        writer: Writer | None = None,
+    ):
         self._session_factory = session_factory
+        self._retry = retry
+        self._writer = writer or InlineWriter(session_factory, retry)
 
     def create(self, name: str) -> Location:
-        with self._session_factory() as session:
-            location = LocationModel(id=str(uuid4()), name=name)
+        def work(session: Session) -> Location:
+            location = LocationModel(id=str(uuid4()), name=name, buildings=[])
             session.add(location)
-            session.commit()
-            session.refresh(location)
+            index_name(session, path_text((location.id,)), name)
+            session.flush()
             return self._to_entity(location)
 
+        return self._writer.execute(work)
+
+    @busy_retry
     def get(self, location_id: str) -> Location | None:
         with self._session_factory() as session:
             stmt = (
@@ -76,6 +257,7 @@ class SQLiteLocationRepository(LocationRepository):
             location = session.execute(stmt).scalars().first()
             return self._to_entity(location) if location else None
 
+    @busy_retry
     def list(self) -> list[Location]:
         with self._session_factory() as session:
             stmt = select(LocationModel).options(
@@ -86,22 +268,27 @@ class SQLiteLocationRepository(LocationRepository):
             return [self._to_entity(loc) for loc in session.execute(stmt).scalars().all()]
 
     def update(self, location: Location) -> Location:
-        with self._session_factory() as session:
+        def work(session: Session) -> Location:
             model = session.get(LocationModel, location.id)
             if model is None:
                 raise KeyError("Location not found")
             model.name = location.name
-            session.commit()
-            session.refresh(model)
+            rename(session, path_text((model.id,)), model.name)
+            session.flush()
             return self._to_entity(model)
 
+        return self._writer.execute(work)
+
     def delete(self, location_id: str) -> None:
-        with self._session_factory() as session:
-            location = session.get(LocationModel, location_id)
-            if location is None:
+        def work(session: Session) -> None:
+            if session.get(LocationModel, location_id) is None:
                 raise KeyError("Location not found")
-            session.delete(location)
-            session.commit()
+            delete_subtree(session, LocationModel, LocationModel.id == location_id)
+            unindex_subtree(session, path_text((location_id,)))
+            # Objects other units in this batch loaded may now be gone; make later units reload.
+            session.expunge_all()
+
+        self._writer.execute(work)
 
     def _to_entity(self, model: LocationModel) -> Location:
         return Location(
@@ -112,19 +299,31 @@ class SQLiteLocationRepository(LocationRepository):
 
 
 class SQLiteBuildingRepository(BuildingRepository):
-    def __init__(self, session_factory: Callable[[], Session]):
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        retry: BusyRetry = BusyRetry(attempts=0),
+        writer: Writer | None = None,
+    ):
         self._session_factory = session_factory
+        self._retry = retry
+        self._writer = writer or InlineWriter(session_factory, retry)
 
     def create(self, name: str, location_id: str) -> Building:
-        with self._session_factory() as session:
+        def work(session: Session) -> Building:
             if session.get(LocationModel, location_id) is None:
                 raise ValueError("Location not found")
-            building = BuildingModel(id=str(uuid4()), name=name, location_id=location_id)
+            building_id = str(uuid4())
+            path = path_text((location_id, building_id))
+            building = BuildingModel(id=building_id, name=name, location_id=location_id, path=path, zones=[])
             session.add(building)
-            session.commit()
-            session.refresh(building)
+            index_name(session, path, name)
+            session.flush()
             return self._to_entity(building)
 
+        return self._writer.execute(work)
+
+    @busy_retry
     def get(self, building_id: str) -> Building | None:
         with self._session_factory() as session:
             stmt = select(BuildingModel).options(selectinload(BuildingModel.zones).selectinload(ZoneModel.areas)).where(
@@ -133,6 +332,7 @@ class SQLiteBuildingRepository(BuildingRepository):
             building = session.execute(stmt).scalars().first()
             return self._to_entity(building) if building else None
 
+    @busy_retry
     def list_for_location(self, location_id: str) -> list[Building]:
         with self._session_factory() as session:
             stmt = (
@@ -142,23 +342,40 @@ class SQLiteBuildingRepository(BuildingRepository):
             )
             return [self._to_entity(building) for building in session.execute(stmt).scalars().all()]
 
-    def update(self, building: Building) -> Building:
+    @busy_retry
+    def list_under(self, path: Path) -> list[Building]:
         with self._session_factory() as session:
+            stmt = (
+                select(BuildingModel)
+                .options(selectinload(BuildingModel.zones).selectinload(ZoneModel.areas))
+                .where(under(BuildingModel, path))
+                .order_by(BuildingModel.path)
+            )
+            return [self._to_entity(building) for building in session.execute(stmt).scalars().all()]
+
+    def update(self, building: Building) -> Building:
+        def work(session: Session) -> Building:
             model = session.get(BuildingModel, building.id)
             if model is None:
                 raise KeyError("Building not found")
             model.name = building.name
-            session.commit()
-            session.refresh(model)
+            rename(session, model.path, model.name)
+            session.flush()
             return self._to_entity(model)
 
+        return self._writer.execute(work)
+
     def delete(self, building_id: str) -> None:
-        with self._session_factory() as session:
-            building = session.get(BuildingModel, building_id)
-            if building is None:
+        def work(session: Session) -> None:
+            model = session.get(BuildingModel, building_id)
+            if model is None:
                 raise KeyError("Building not found")
-            session.delete(building)
-            session.commit()
+            delete_subtree(session, BuildingModel, BuildingModel.id == building_id)
+            unindex_subtree(session, model.path)
+            # Objects other units in this batch loaded may now be gone; make later units reload.
+            session.expunge_all()
+
+        self._writer.execute(work)
 
     def _to_entity(self, model: BuildingModel) -> Building:
         return self._to_entity_static(model)
@@ -174,47 +391,78 @@ class SQLiteBuildingRepository(BuildingRepository):
 
 
 class SQLiteZoneRepository(ZoneRepository):
-    def __init__(self, session_factory: Callable[[], Session]):
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        retry: BusyRetry = BusyRetry(attempts=0),
+        writer: Writer | None = None,
+    ):
         self._session_factory = session_factory
+        self._retry = retry
+        self._writer = writer or InlineWriter(session_factory, retry)
 
     def create(self, name: str, building_id: str) -> Zone:
-        with self._session_factory() as session:
-            if session.get(BuildingModel, building_id) is None:
+        def work(session: Session) -> Zone:
+            building = session.get(BuildingModel, building_id)
+            if building is None:
                 raise ValueError("Building not found")
-            zone = ZoneModel(id=str(uuid4()), name=name, building_id=building_id)
+            zone_id = str(uuid4())
+            path = building.path + path_text((zone_id,))
+            zone = ZoneModel(id=zone_id, name=name, building_id=building_id, path=path, areas=[])
             session.add(zone)
-            session.commit()
-            session.refresh(zone)
+            index_name(session, path, name)
+            session.flush()
             return self._to_entity(zone)
 
+        return self._writer.execute(work)
+
+    @busy_retry
     def get(self, zone_id: str) -> Zone | None:
         with self._session_factory() as session:
             stmt = select(ZoneModel).options(selectinload(ZoneModel.areas)).where(ZoneModel.id == zone_id)
             zone = session.execute(stmt).scalars().first()
             return self._to_entity(zone) if zone else None
 
+    @busy_retry
     def list_for_building(self, building_id: str) -> list[Zone]:
         with self._session_factory() as session:
             stmt = select(ZoneModel).options(selectinload(ZoneModel.areas)).where(ZoneModel.building_id == building_id)
             return [self._to_entity(zone) for zone in session.execute(stmt).scalars().all()]
 
-    def update(self, zone: Zone) -> Zone:
+    @busy_retry
+    def list_under(self, path: Path) -> list[Zone]:
         with self._session_factory() as session:
+            stmt = (
+                select(ZoneModel)
+                .options(selectinload(ZoneModel.areas))
+                .where(under(ZoneModel, path))
+                .order_by(ZoneModel.path)
+            )
+            return [self._to_entity(zone) for zone in session.execute(stmt).scalars().all()]
+
+    def update(self, zone: Zone) -> Zone:
+        def work(session: Session) -> Zone:
             model = session.get(ZoneModel, zone.id)
             if model is None:
                 raise KeyError("Zone not found")
             model.name = zone.name
-            session.commit()
-            session.refresh(model)
+            rename(session, model.path, model.name)
+            session.flush()
             return self._to_entity(model)
 
+        return self._writer.execute(work)
+
     def delete(self, zone_id: str) -> None:
-        with self._session_factory() as session:
-            zone = session.get(ZoneModel, zone_id)
-            if zone is None:
+        def work(session: Session) -> None:
+            model = session.get(ZoneModel, zone_id)
+            if model is None:
                 raise KeyError("Zone not found")
-            session.delete(zone)
-            session.commit()
+            delete_subtree(session, ZoneModel, ZoneModel.id == zone_id)
+            unindex_subtree(session, model.path)
+            # Objects other units in this batch loaded may now be gone; make later units reload.
+            session.expunge_all()
+
+        self._writer.execute(work)
 
     def _to_entity(self, model: ZoneModel) -> Zone:
         return self._to_entity_static(model)
@@ -230,59 +478,416 @@ class SQLiteZoneRepository(ZoneRepository):
 
 
 class SQLiteAreaRepository(AreaRepository):
-    def __init__(self, session_factory: Callable[[], Session]):
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        retry: BusyRetry = BusyRetry(attempts=0),
+        writer: Writer | None = None,
+    ):
         self._session_factory = session_factory
+        self._retry = retry
+        self._writer = writer or InlineWriter(session_factory, retry)
 
     def create(self, name: str, zone_id: str) -> Area:
-        with self._session_factory() as session:
-            if session.get(ZoneModel, zone_id) is None:
+        def work(session: Session) -> Area:
+            zone = session.get(ZoneModel, zone_id)
+            if zone is None:
                 raise ValueError("Zone not found")
-            area = AreaModel(id=str(uuid4()), name=name, zone_id=zone_id)
+            area_id = str(uuid4())
+            area = AreaModel(id=area_id, name=name, zone_id=zone_id, path=zone.path + path_text((area_id,)))
             session.add(area)
-            session.commit()
-            session.refresh(area)
+            index_name(session, area.path, name)
+            session.flush()
             return Area(id=area.id, name=area.name, zone_id=area.zone_id)
 
+        return self._writer.execute(work)
+
+    @busy_retry
     def get(self, area_id: str) -> Area | None:
         with self._session_factory() as session:
             area = session.get(AreaModel, area_id)
             return Area(id=area.id, name=area.name, zone_id=area.zone_id) if area else None
 
+    @busy_retry
     def list_for_zone(self, zone_id: str) -> list[Area]:
         with self._session_factory() as session:
             stmt = select(AreaModel).where(AreaModel.zone_id == zone_id)
             return [Area(id=a.id, name=a.name, zone_id=a.zone_id) for a in session.execute(stmt).scalars().all()]
 
-    def update(self, area: Area) -> Area:
+    @busy_retry
+    def list_under(self, path: Path) -> list[Area]:
         with self._session_factory() as session:
+            # Subtrees can be large: plain rows skip the identity map, over twice as fast as loading models.
+            stmt = select(AreaModel.id, AreaModel.name, AreaModel.zone_id).where(under(AreaModel, path))
+            rows = session.execute(stmt.order_by(AreaModel.path))
+            return [Area(id=area_id, name=name, zone_id=zone_id) for area_id, name, zone_id in rows]
+
+    def update(self, area: Area) -> Area:
+        def work(session: Session) -> Area:
             model = session.get(AreaModel, area.id)
             if model is None:
                 raise KeyError("Area not found")
             model.name = area.name
-            session.commit()
-            session.refresh(model)
+            rename(session, model.path, model.name)
+            session.flush()
             return Area(id=model.id, name=model.name, zone_id=model.zone_id)
 
+        return self._writer.execute(work)
+
     def delete(self, area_id: str) -> None:
-        with self._session_factory() as session:
+        def work(session: Session) -> None:
             area = session.get(AreaModel, area_id)
             if area is None:
                 raise KeyError("Area not found")
             session.delete(area)
-            session.commit()
+            unindex_subtree(session, area.path)
+
+        self._writer.execute(work)
+
+
+class SQLiteZoneDeviceRepository(ZoneDeviceRepository):
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        retry: BusyRetry = BusyRetry(attempts=0),
+        writer: Writer | None = None,
+    ):
+        self._session_factory = session_factory
+        self._retry = retry
+        self._writer = writer or InlineWriter(session_factory, retry)
+
+    @busy_retry
+    def list_by_zone(self, zone_id: str) -> list[Device]:
+        with self._session_factory() as session:
+            stmt = select(ZoneDeviceModel).where(ZoneDeviceModel.zone_id == zone_id)
+            return [self._to_device(model) for model in session.execute(stmt).scalars().all()]
+
+    @busy_retry
+    def list_under(self, path: Path) -> list[Device]:
+        with self._session_factory() as session:
+            model = ZoneDeviceModel
+            stmt = select(*_device_columns(model)).where(under(model, path)).order_by(model.path)
+            return [self._to_device(row) for row in session.execute(stmt)]
+
+    @busy_retry
+    def page_under(
+        self,
+        path: Path,
+        after: Path | None = None,
+        limit: int = 100,
+        owner_id: str | None = None,
+        name_prefix: str | None = None,
+    ) -> tuple[list[Device], Path | None]:
+        model = ZoneDeviceModel
+        stmt = select(*_device_columns(model), model.path).where(under(model, path))
+        if after is not None:
+            stmt = stmt.where(model.path > path_text(after))
+        if owner_id is not None:
+            stmt = stmt.where(model.owner_id == owner_id)
+        if name_prefix:
+            # substr rather than LIKE: case-sensitive like the in-memory store, and no wildcards to escape.
+            stmt = stmt.where(func.substr(model.name, 1, len(name_prefix)) == name_prefix)
+        with self._session_factory() as session:
+            rows = session.execute(stmt.order_by(model.path).limit(limit + 1)).all()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return [self._to_device(row) for row in rows], parse_text(rows[-1].path, 4) if more else None
+
+    @busy_retry
+    def match_under(
+        self,
+        path: Path,
+        tags: Sequence[str] = (),
+        capabilities: Sequence[str] = (),
+        exclude: Sequence[Path] = (),
+        after: int | None = None,
+        limit: int = 100,
+    ) -> tuple[list[Device], int, int | None]:
+        model = ZoneDeviceModel
+        required = [("capability", value) for value in capabilities] + [("tag", tag) for tag in tags]
+        if required:
+            # Drive from one label's rows under the path; the other labels are key lookups on the same path.
+            driver, ordinal = ZoneDeviceLabelModel, ZoneDeviceLabelModel.device
+            conditions = [driver.kind == required[0][0], driver.value == required[0][1]]
+            for kind, value in required[1:]:
+                other = aliased(ZoneDeviceLabelModel)
+                conditions.append(exists().where(other.kind == kind, other.value == value, other.path == driver.path))
+        else:
+            driver, ordinal, conditions = model, model.ordinal, []
+        conditions.append(under(driver, path))
+        conditions += [~under(driver, excluded) for excluded in exclude]
+        stmt = select(ordinal, *_device_columns(model)).select_from(driver).where(*conditions)
+        if driver is not model:
+            stmt = stmt.join(model, model.ordinal == ordinal)
+        if after is not None:
+            stmt = stmt.where(ordinal > after)
+        with self._session_factory() as session:
+            total = session.scalar(select(func.count()).select_from(driver).where(*conditions))
+            rows = session.execute(stmt.order_by(ordinal).limit(limit + 1)).all()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return [self._to_device(row) for row in rows], total, rows[-1][0] if more else None
+
+    def add(self, device: Device) -> Device:
+        def work(session: Session) -> Device:
+            if session.get(ZoneDeviceModel, (device.zone_id, device.id)) is not None:
+                raise ValueError("Device already exists")
+            zone = session.get(ZoneModel, device.zone_id)
+            if zone is None:
+                raise ValueError("Zone not found")
+            model = ZoneDeviceModel(
+                zone_id=device.zone_id,
+                id=device.id,
+                name=device.name,
+                owner_id=device.owner_id,
+                created_at=device.created_at,
+                path=zone.path + path_text((device.id,)),
+                tags=device.tags,
+                capabilities=device.capabilities,
+            )
+            session.add(model)
+            session.flush()
+            if device.tags or device.capabilities:
+                labels = [("tag", tag) for tag in device.tags] + [("capability", c) for c in device.capabilities]
+                session.add_all(
+                    [
+                        ZoneDeviceLabelModel(kind=kind, value=value, path=model.path, device=model.ordinal)
+                        for kind, value in labels
+                    ]
+                )
+            return device
+
+        return self._writer.execute(work)
+
+    @busy_retry
+    def get(self, zone_id: str, device_id: str) -> Device | None:
+        with self._session_factory() as session:
+            model = session.get(ZoneDeviceModel, (zone_id, device_id))
+            return self._to_device(model) if model else None
+
+    def delete(self, zone_id: str, device_id: str) -> None:
+        def work(session: Session) -> None:
+            model = session.get(ZoneDeviceModel, (zone_id, device_id))
+            if model is None:
+                raise KeyError("Device not found")
+            session.delete(model)
+
+        self._writer.execute(work)
+
+    def delete_by_zone(self, zone_id: str) -> None:
+        self._writer.execute(
+            lambda session: delete_subtree(session, ZoneDeviceModel, ZoneDeviceModel.zone_id == zone_id)
+        )
+
+    @staticmethod
+    def _to_device(model: Any) -> Device:
+        created_at = model.created_at
+        if created_at.tzinfo is None:  # SQLite keeps no offset; devices are stamped in UTC
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return Device.construct(
+            id=model.id,
+            name=model.name,
+            owner_id=model.owner_id,
+            zone_id=model.zone_id,
+            created_at=created_at,
+            tags=model.tags,
+            capabilities=model.capabilities,
+        )
+
+
+def _device_columns(model: Any) -> tuple:
+    """Every column ``_to_device`` reads, for selects that skip building ORM objects."""
+    return model.id, model.name, model.owner_id, model.zone_id, model.created_at, model.tags, model.capabilities
+
+
+# Parent table of each path-carrying table, in backfill order, and the column naming the parent row.
+_PATH_PARENTS = (
+    ("buildings", None, "location_id"),
+    ("zones", "buildings", "building_id"),
+    ("areas", "zones", "zone_id"),
+    ("zone_devices", "zones", "zone_id"),
+)
+
+
+def _backfill_paths(conn) -> None:
+    """Add and fill ``path`` on databases created before the column existed."""
+    for table, parent, parent_id in _PATH_PARENTS:
+        columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+        if "path" in columns:
+            continue
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN path TEXT NOT NULL DEFAULT ''")
+        parent_path = (
+            f"'/' || {parent_id}"
+            if parent is None
+            else f"(SELECT p.path FROM {parent} p WHERE p.id = {table}.{parent_id})"
+        )
+        conn.exec_driver_sql(f"UPDATE {table} SET path = {parent_path} || '/' || id")
+
+
+def _add_label_columns(conn) -> None:
+    """Add the tag and capability columns to zone_devices tables created before they existed."""
+    columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(zone_devices)")}
+    for column in ("tags", "capabilities"):
+        if column not in columns:
+            conn.exec_driver_sql(f"ALTER TABLE zone_devices ADD COLUMN {column} JSON NOT NULL DEFAULT '[]'")
+
+
+def _add_device_ordinals(conn) -> None:
+    """Rebuild zone_devices tables keyed on (zone_id, id) around an explicit ordinal key.
+
+    Label rows used to point at the implicit rowid, which VACUUM may renumber. The rebuild keeps each
+    device's rowid as its ordinal, so the existing label rows stay valid.
+    """
+    columns = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info(zone_devices)")]
+    if "ordinal" in columns:
+        return
+    table = ZoneDeviceModel.__table__
+    metadata = MetaData()
+    ZoneModel.__table__.to_metadata(metadata)  # for the zone_id foreign key to resolve against
+    rebuilt = table.to_metadata(metadata, name="zone_devices_rebuilt")
+    rebuilt.indexes.clear()  # the originals' names are taken until the old table is dropped
+    conn.execute(CreateTable(rebuilt))
+    names = ", ".join(column.name for column in table.columns if column.name != "ordinal")
+    conn.exec_driver_sql(
+        f"INSERT INTO zone_devices_rebuilt (ordinal, {names}) SELECT rowid, {names} FROM zone_devices ORDER BY rowid"
+    )
+    conn.exec_driver_sql("DROP TABLE zone_devices")
+    conn.exec_driver_sql("ALTER TABLE zone_devices_rebuilt RENAME TO zone_devices")
+
+
+class SQLiteSearchRepository(SearchRepository):
+    def __init__(self, session_factory: Callable[[], Session], retry: BusyRetry = BusyRetry(attempts=0)):
+        self._session_factory = session_factory
+        self._retry = retry
+
+    @busy_retry
+    def search(self, query: str, limit: int = 20) -> list[SearchHit]:
+        words = tokenize(query)
+        if not words:
+            return []
+        # Whole words, then the last as a prefix; tokenize leaves only letters and digits inside the quotes.
+        expression = " ".join([f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*'])
+        with self._session_factory() as session:
+            rows = session.execute(
+                text(
+                    "SELECT n.path, n.name FROM search_names JOIN search_nodes n ON n.id = search_names.rowid"
+                    " WHERE search_names MATCH :expression LIMIT :candidates"
+                ),
+                {"expression": expression, "candidates": CANDIDATES},
+            ).all()
+            top = sorted(rows, key=lambda row: rank_key(words, row.name))[:limit]
+            paths = [tuple(row.path[1:].split("/")) for row in top]
+            ancestors = {path_text(path[:depth]) for path in paths for depth in range(1, len(path))}
+            names = {row.path: row.name for row in top}
+            if ancestors:
+                stmt = select(SearchNodeModel.path, SearchNodeModel.name).where(SearchNodeModel.path.in_(ancestors))
+                names.update((path, name) for path, name in session.execute(stmt))
+        return [
+            to_hit(path, [names.get(path_text(path[:end]), "") for end in range(1, len(path) + 1)]) for path in paths
+        ]
+
+
+def _create_search_index(conn) -> None:
+    """Create the FTS5 table and its triggers, filling search_nodes and the index the first time.
+
+    An index built by SQLite's own tokenizer, from before names were folded in Python, is dropped and rebuilt.
+    """
+    existing = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'search_names'").scalar()
+    fresh = existing is None or "tokenize='ascii'" not in existing
+    if fresh:
+        for name in ("search_nodes_ai", "search_nodes_ad", "search_nodes_au"):
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        conn.exec_driver_sql("DROP TABLE IF EXISTS search_names")
+        if "words" not in {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(search_nodes)")}:
+            conn.exec_driver_sql("ALTER TABLE search_nodes ADD COLUMN words VARCHAR NOT NULL DEFAULT ''")
+        conn.exec_driver_sql(
+            "INSERT OR IGNORE INTO search_nodes (path, name)"
+            " SELECT '/' || id, name FROM locations UNION ALL SELECT path, name FROM buildings"
+            " UNION ALL SELECT path, name FROM zones UNION ALL SELECT path, name FROM areas"
+        )
+        rows = conn.exec_driver_sql("SELECT id, name FROM search_nodes").all()
+        if rows:
+            conn.exec_driver_sql(
+                "UPDATE search_nodes SET words = ? WHERE id = ?", [(search_words(name), id_) for id_, name in rows]
+            )
+    for statement in _SEARCH_DDL:
+        conn.exec_driver_sql(statement)
+    if fresh:
+        conn.exec_driver_sql("INSERT INTO search_names(search_names) VALUES ('rebuild')")
+
+
+def create_schema(engine) -> None:
+    try:
+        Base.metadata.create_all(engine)
+    except OperationalError as exc:
+        # Another worker created a table between our existence check and CREATE TABLE.
+        if "already exists" not in str(exc):
+            raise
+        Base.metadata.create_all(engine)
+    # create_all skips existing tables, and with them columns and indexes added since they were created.
+    with engine.begin() as conn:
+        _backfill_paths(conn)
+        _add_label_columns(conn)
+        _add_device_ordinals(conn)
+        _create_search_index(conn)
+        for statement in _LABELS_DDL:
+            conn.exec_driver_sql(statement)
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
 
 
 class SQLiteRepositoryProvider:
-    def __init__(self, database_url: str):
-        self.engine = create_engine(database_url, future=True)
-        Base.metadata.create_all(self.engine)
+    def __init__(self, database_url: str, profile: SQLiteProfile | None = None):
+        self.profile = profile or SQLiteProfile()
+        group_commit = self.profile.group_commit_window_ms is not None
+        # With group commit only the writer thread writes, so it keeps one connection open.
+        engine = create_engine(database_url, future=True, **({"pool_size": 1} if group_commit else {}))
+        apply_profile(engine, self.profile)
+        self.engine = instrument_engine(engine)
+        create_schema(self.engine)
         self._session_factory = sessionmaker(self.engine, expire_on_commit=False)
-        self.locations = SQLiteLocationRepository(self._session_factory)
-        self.buildings = SQLiteBuildingRepository(self._session_factory)
-        self.zones = SQLiteZoneRepository(self._session_factory)
-        self.areas = SQLiteAreaRepository(self._session_factory)
-        self.zone_devices = InMemoryZoneDeviceRepository()
+        path = engine.url.database
+        on_disk = bool(path) and path != ":memory:"
+        self.read_engine = self.engine
+        if self.profile.wal and on_disk and self.profile.read_pool_size > 0:
+            size = self.profile.read_pool_size
+            read_engine = create_engine(database_url, future=True, pool_size=size, max_overflow=size)
+            apply_profile(read_engine, self.profile, read_only=True)
+            self.read_engine = instrument_engine(read_engine)
+        read_session_factory = sessionmaker(self.read_engine, expire_on_commit=False)
+        retry = self.profile.retry
+        self.writer: Writer = (
+            GroupCommitWriter(
+                self._session_factory,
+                retry,
+                self.profile.group_commit_window_ms / 1000,
+                self.profile.group_commit_max_batch,
+            )
+            if group_commit
+            else InlineWriter(self._session_factory, retry)
+        )
+        self.locations = SQLiteLocationRepository(read_session_factory, retry, self.writer)
+        self.buildings = SQLiteBuildingRepository(read_session_factory, retry, self.writer)
+        self.zones = SQLiteZoneRepository(read_session_factory, retry, self.writer)
+        self.areas = SQLiteAreaRepository(read_session_factory, retry, self.writer)
+        self.zone_devices = SQLiteZoneDeviceRepository(read_session_factory, retry, self.writer)
+        self.search = SQLiteSearchRepository(read_session_factory, retry)
+        self.checkpointer = None
+        if self.profile.wal and self.profile.checkpoint_interval_seconds > 0 and on_disk:
+            self.checkpointer = WalCheckpointer(
+                path, self.profile.checkpoint_interval_seconds, self.profile.wal_truncate_pages
+            )
+
+    def close(self) -> None:
+        self.writer.close()
+        if self.checkpointer is not None:
+            self.checkpointer.stop()
+            self.checkpointer = None
+        if self.read_engine is not self.engine:
+            self.read_engine.dispose()
+        self.engine.dispose()
 
 
-def create_sqlite_provider(database_url: str) -> RepositoryProvider:
-    return SQLiteRepositoryProvider(database_url)
+def create_sqlite_provider(database_url: str, profile: SQLiteProfile | None = None) -> RepositoryProvider:
+    return SQLiteRepositoryProvider(database_url, profile)
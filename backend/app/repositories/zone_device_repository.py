@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Dict, List
+from heapq import heappop, heappush
+from typing import Any, Callable, Dict, List, Sequence, Tuple
 
 from ..models import Device
+from .bitmap import Bitmap
+from .path_index import Path, PathIndex
+from .records import DeviceRecord
 
 
 class ZoneDeviceRepository(ABC):
@@ -11,6 +15,43 @@ class ZoneDeviceRepository(ABC):
     def list_by_zone(self, zone_id: str) -> List[Device]:
         raise NotImplementedError
 
+    @abstractmethod
+    def list_under(self, path: Path) -> List[Device]:
+        """Devices of every zone under ``path`` (``(location_id[, building_id[, zone_id]])``), in path order."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def page_under(
+        self,
+        path: Path,
+        after: Path | None = None,
+        limit: int = 100,
+        owner_id: str | None = None,
+        name_prefix: str | None = None,
+    ) -> Tuple[List[Device], Path | None]:
+        """Up to ``limit`` matching devices under ``path`` past the ``after`` cursor, in path order.
+
+        Also returns the path of the last device when more may follow, the ``after`` of the next page.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def match_under(
+        self,
+        path: Path,
+        tags: Sequence[str] = (),
+        capabilities: Sequence[str] = (),
+        exclude: Sequence[Path] = (),
+        after: int | None = None,
+        limit: int = 100,
+    ) -> Tuple[List[Device], int, int | None]:
+        """Devices under ``path`` with every tag and capability given, outside every ``exclude`` subtree.
+
+        Devices come in ordinal order past the ``after`` ordinal. Also returns how many devices match
+        in all and the last device's ordinal when more may follow.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def add(self, device: Device) -> Device:
         raise NotImplementedError
@@ -29,30 +70,183 @@ class ZoneDeviceRepository(ABC):
 
 
 class InMemoryZoneDeviceRepository(ZoneDeviceRepository):
-    def __init__(self) -> None:
-        self._devices: Dict[str, Dict[str, Device]] = {}
+    """Devices by zone, plus a path index and bitmap indexes over dense device ordinals.
+
+    Each device gets an ordinal and ``_records[ordinal]`` holds it until it is deleted;
+    ``_devices`` maps zone and device id to the ordinal. A deleted device's ordinal goes on
+    a free list and the next device added takes the lowest free one, so under churn the
+    records and bitmaps stay as large as the live devices need. Bitmaps of ordinals are kept
+    per tag, per capability and per subtree (every location, building and zone path), so
+    ``match_under`` is set algebra over a handful of bitmaps.
+    """
+
+    def __init__(self, zone_path: Callable[[str], Path | None] | None = None) -> None:
+        self._devices: Dict[str, Dict[str, int]] = {}
+        # Devices are indexed by path only when the hierarchy can resolve their zone's path.
+        self._zone_path = zone_path
+        self._zone_paths: Dict[str, Path] = {}
+        self._paths = PathIndex()
+        self._records: List[DeviceRecord | None] = []
+        self._free: List[int] = []  # heap of the ordinals of deleted devices
+        self._labels: Dict[Tuple[str, str], Bitmap] = {}
+        self._subtrees: Dict[Path, Bitmap] = {}
 
     def list_by_zone(self, zone_id: str) -> List[Device]:
-        return list(self._devices.get(zone_id, {}).values())
+        records = self._records
+        return [records[ordinal].to_device() for ordinal in self._devices.get(zone_id, {}).values()]
+
+    def list_under(self, path: Path) -> List[Device]:
+        records, devices = self._records, self._devices
+        return [records[devices[found[-2]][found[-1]]].to_device() for found in self._paths.scan(path)]
+
+    def page_under(
+        self,
+        path: Path,
+        after: Path | None = None,
+        limit: int = 100,
+        owner_id: str | None = None,
+        name_prefix: str | None = None,
+    ) -> Tuple[List[Device], Path | None]:
+        devices: List[Device] = []
+        last: Path | None = None
+        for found in self._paths.scan(path, after):
+            record = self._records[self._devices[found[-2]][found[-1]]]
+            if owner_id is not None and record.owner_id != owner_id:
+                continue
+            if name_prefix and not record.name.startswith(name_prefix):
+                continue
+            if len(devices) == limit:
+                return devices, last
+            devices.append(record.to_device())
+            last = found
+        return devices, None
+
+    def match_under(
+        self,
+        path: Path,
+        tags: Sequence[str] = (),
+        capabilities: Sequence[str] = (),
+        exclude: Sequence[Path] = (),
+        after: int | None = None,
+        limit: int = 100,
+    ) -> Tuple[List[Device], int, int | None]:
+        required = [self._subtrees.get(path)]
+        required += [self._labels.get(("tag", tag)) for tag in tags]
+        required += [self._labels.get(("capability", capability)) for capability in capabilities]
+        if not all(required):
+            return [], 0, None
+        required.sort(key=len)
+        matched = required[0]
+        for bitmap in required[1:]:  # smallest first, so no intermediate result outgrows it
+            matched = matched & bitmap
+        for excluded in exclude:
+            bitmap = self._subtrees.get(excluded)
+            if bitmap:
+                matched = matched - bitmap
+        devices: List[Device] = []
+        last: int | None = None
+        for ordinal in matched.iter_from(0 if after is None else after + 1):
+            if len(devices) == limit:
+                return devices, len(matched), last
+            devices.append(self._records[ordinal].to_device())
+            last = ordinal
+        return devices, len(matched), None
 
     def add(self, device: Device) -> Device:
-        zone_devices = self._devices.setdefault(device.zone_id or "", {})
+        record = DeviceRecord.from_device(device)
+        zone_id = record.zone_id or ""
+        zone_devices = self._devices.setdefault(zone_id, {})
         if device.id in zone_devices:
             raise ValueError("Device already exists")
-        zone_devices[device.id] = device
+        zone_path = self._zone_paths.get(zone_id)
+        if zone_path is None and self._zone_path is not None:
+            zone_path = self._zone_path(zone_id)
+            if zone_path is not None:
+                self._zone_paths[zone_id] = zone_path
+        if self._free:
+            ordinal = heappop(self._free)
+            self._records[ordinal] = record
+        else:
+            ordinal = len(self._records)
+            self._records.append(record)
+        zone_devices[device.id] = ordinal
+        for key in _label_keys(record):
+            _add(self._labels, key, ordinal)
+        if zone_path is not None:
+            self._paths.add(zone_path + (record.id,))
+            for depth in range(1, len(zone_path) + 1):
+                _add(self._subtrees, zone_path[:depth], ordinal)
         return device
 
     def get(self, zone_id: str, device_id: str) -> Device | None:
-        return self._devices.get(zone_id, {}).get(device_id)
+        ordinal = self._devices.get(zone_id, {}).get(device_id)
+        return None if ordinal is None else self._records[ordinal].to_device()
 
     def delete(self, zone_id: str, device_id: str) -> None:
         zone_devices = self._devices.get(zone_id, {})
         if device_id not in zone_devices:
             raise KeyError("Device not found")
-        del zone_devices[device_id]
+        ordinal = zone_devices.pop(device_id)
+        self._unindex(ordinal)
+        zone_path = self._zone_paths.get(zone_id)
+        if zone_path is not None:
+            self._paths.discard(zone_path + (device_id,))
+            for depth in range(1, len(zone_path) + 1):
+                _discard(self._subtrees, zone_path[:depth], ordinal)
 
     def delete_by_zone(self, zone_id: str) -> None:
-        self._devices.pop(zone_id, None)
+        for ordinal in self._devices.pop(zone_id, {}).values():
+            self._unindex(ordinal)
+        zone_path = self._zone_paths.pop(zone_id, None)
+        if zone_path is not None:
+            self._paths.discard_under(zone_path)
+            # The zone's bitmap is exactly its devices: one subtraction per ancestor instead of one per device.
+            devices = self._subtrees.pop(zone_path, None)
+            for depth in range(1, len(zone_path)):
+                ancestor = self._subtrees.get(zone_path[:depth])
+                if ancestor is not None and devices is not None:
+                    ancestor -= devices
+                    if not ancestor:
+                        del self._subtrees[zone_path[:depth]]
+
+    def clear(self) -> None:
+        self._devices.clear()
+        self._zone_paths.clear()
+        self._paths.clear()
+        self._records.clear()
+        self._free.clear()
+        self._labels.clear()
+        self._subtrees.clear()
+
+    def counts(self) -> dict[str, int]:
+        return {"zones": len(self._devices), "devices": sum(len(devices) for devices in self._devices.values())}
+
+    def _unindex(self, ordinal: int) -> None:
+        """Drop the record and labels of the device at ``ordinal`` and free the ordinal; subtrees are the caller's."""
+        record = self._records[ordinal]
+        self._records[ordinal] = None
+        for key in _label_keys(record):
+            _discard(self._labels, key, ordinal)
+        heappush(self._free, ordinal)
+
+
+def _label_keys(record: DeviceRecord) -> List[Tuple[str, str]]:
+    return [("tag", tag) for tag in record.tags] + [("capability", capability) for capability in record.capabilities]
+
+
+def _add(bitmaps: Dict[Any, Bitmap], key: Any, ordinal: int) -> None:
+    bitmap = bitmaps.get(key)
+    if bitmap is None:
+        bitmap = bitmaps[key] = Bitmap()
+    bitmap.add(ordinal)
+
+
+def _discard(bitmaps: Dict[Any, Bitmap], key: Any, ordinal: int) -> None:
+    bitmap = bitmaps.get(key)
+    if bitmap is not None:
+        bitmap.discard(ordinal)
+        if not bitmap:
+            del bitmaps[key]
 
 
 __all__ = ["ZoneDeviceRepository", "InMemoryZoneDeviceRepository"]
@@ -0,0 +1,135 @@
+"""Revoked refresh-token ids: a Bloom filter in front of the user store.
+
+Every refresh has to prove that its token family has not been revoked. The
+filter answers "definitely not revoked" with a few bit probes. Only ids that
+might be in the set, meaning real revocations and about ``error_rate`` of the
+rest, are looked up in storage. The filter is loaded from the store on first use.
+Other workers' revocations arrive over the invalidation bus within one poll
+interval. Marking the presented token as used is an insert-if-absent into the
+store's spent tokens, which never reach the filter or the bus, so a concurrent
+replay of the same token is caught there and the filter only holds revocations.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+
+from .invalidation import InvalidationBus, get_bus
+from .observability.metrics import token_revocation_checks_total
+from .user_repository import BaseUserRepository
+
+# Invalidation-bus topic; the key is the revoked token or family id.
+REVOCATION_TOPIC = "revoked_tokens"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing of one BLAKE2b digest."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> list[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return [(first + i * step) % size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class RevocationList:
+    def __init__(self, store: BaseUserRepository, capacity: int, error_rate: float = 0.01) -> None:
+        self.store = store
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._bloom = self._load(capacity)
+        self._bus: InvalidationBus | None = None
+        self._negative = token_revocation_checks_total.labels("negative")
+        self._false_positive = token_revocation_checks_total.labels("false_positive")
+        self._revoked = token_revocation_checks_total.labels("revoked")
+
+    def _load(self, capacity: int) -> BloomFilter:
+        bloom = BloomFilter(capacity, self.error_rate)
+        for token_id in self.store.revoked_token_ids():
+            bloom.add(token_id)
+        if bloom.count > capacity:
+            return self._load(bloom.count * 2)
+        return bloom
+
+    def _subscribe(self) -> InvalidationBus:
+        bus = get_bus()
+        if bus is not self._bus:
+            bus.subscribe(REVOCATION_TOPIC, self._on_event)
+            self._bus = bus
+        return bus
+
+    def is_revoked(self, token_id: str) -> bool:
+        self._subscribe()
+        if token_id not in self._bloom:
+            self._negative.inc()
+            return False
+        if self.store.is_token_revoked(token_id):
+            self._revoked.inc()
+            return True
+        self._false_positive.inc()
+        return False
+
+    def revoke(self, token_id: str, expires_at: float) -> bool:
+        """Revoke ``token_id`` everywhere; False if it already was (the caller is replaying it)."""
+        added = self.store.revoke_token(token_id, expires_at)
+        self._remember(token_id)
+        self._subscribe().publish(REVOCATION_TOPIC, token_id)
+        return added
+
+    def spend(self, token_id: str, expires_at: float) -> bool:
+        """Mark a refresh token as rotated; False if it already was (the caller is replaying it).
+
+        Only the store records it: the filter is asked about family ids, and one entry per refresh
+        would only fill it up.
+        """
+        return self.store.spend_token(token_id, expires_at)
+
+    def _remember(self, token_id: str) -> None:
+        with self._lock:
+            if token_id in self._bloom:
+                return
+            self._bloom.add(token_id)
+            if self._bloom.count > self._bloom.capacity:
+                # Past capacity the false-positive rate climbs quickly; rebuild twice as large.
+                self._bloom = self._load(self._bloom.capacity * 2)
+
+    def _on_event(self, _topic: str, token_id: str | None) -> None:
+        if token_id is None:
+            with self._lock:
+                self._bloom = self._load(self._bloom.capacity)
+        else:
+            self._remember(token_id)
+
+    def counts(self) -> dict[str, int]:
+        return {"bloom_entries": self._bloom.count, "bloom_bytes": self._bloom.nbytes}
+
+
+__all__ = ["REVOCATION_TOPIC", "BloomFilter", "RevocationList"]
@@ -0,0 +1,143 @@
+import asyncio
+import secrets
+import threading
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from starlette.concurrency import run_in_threadpool
+
+from .. import auth, config, container
+from ..domain.entities import Area, Building, Location, Zone
+from ..models import Device, HeartbeatBatch, HeartbeatBatchResult, UserInDB
+from ..observability.heap import GROUPINGS, count_live_objects, heap_snapshots, store_counts
+from ..observability.profiler import SamplingProfiler, collapse
+from ..observability.tracing import export_otlp, tracer
+from ..presence import record_heartbeat, topic_device
+from ..repositories.records import DeviceRecord
+from ..observability.slow_queries import slow_query_log
+
+security = HTTPBearer(auto_error=False)
+
+
+def require_admin(credentials: HTTPAuthorizationCredentials | None = Depends(security)) -> None:
+    expected = config.settings.admin_token
+    if not expected:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Admin API disabled")
+    if credentials is None or not secrets.compare_digest(credentials.credentials, expected):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/slow-queries")
+async def list_slow_queries() -> list[dict]:
+    return slow_query_log.entries()
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_slow_queries() -> None:
+    slow_query_log.clear()
+
+
+_profiler_running = False
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(10.0, gt=0, le=120),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    include_idle: bool = False,
+) -> PlainTextResponse:
+    global _profiler_running
+    if _profiler_running:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profile is already running")
+    _profiler_running = True
+    try:
+        profiler = SamplingProfiler(interval=interval_ms / 1000, include_idle=include_idle)
+        stacks = await run_in_threadpool(
+            profiler.run, seconds, asyncio.get_running_loop(), threading.get_ident()
+        )
+    finally:
+        _profiler_running = False
+    return PlainTextResponse(collapse(stacks), headers={"X-Profile-Samples": str(profiler.samples)})
+
+
+@router.post("/heap/snapshots", status_code=status.HTTP_201_CREATED)
+async def take_heap_snapshot(label: str = "", frames: int = Query(1, ge=1, le=64)) -> dict:
+    return await run_in_threadpool(heap_snapshots.take, label, frames)
+
+
+@router.get("/heap/snapshots")
+async def list_heap_snapshots() -> list[dict]:
+    return heap_snapshots.list()
+
+
+@router.delete("/heap/snapshots", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_heap_snapshots() -> None:
+    heap_snapshots.clear()
+
+
+@router.get("/heap/diff")
+async def diff_heap_snapshots(
+    base: int,
+    target: int,
+    group_by: str = Query("lineno", description=f"one of {', '.join(GROUPINGS)}"),
+    limit: int = Query(25, ge=1, le=500),
+) -> list[dict]:
+    try:
+        return await run_in_threadpool(heap_snapshots.diff, base, target, group_by, limit)
+    except KeyError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
+@router.get("/heap/objects")
+async def live_objects(request: Request) -> dict:
+    stores = {
+        "repositories": container.repository_provider if container.is_initialized() else None,
+        "device_repository": getattr(request.app.state, "device_repository", None),
+        "device_presence": getattr(request.app.state, "device_presence", None),
+        "user_repository": auth.get_user_repo(),
+        "access_token_cache": auth.access_token_cache,
+    }
+    entity_types = (Location, Building, Zone, Area, Device, DeviceRecord, UserInDB)
+    return {
+        "entities": await run_in_threadpool(count_live_objects, entity_types),
+        "stores": store_counts(stores),
+    }
+
+
+@router.get("/traces")
+async def list_traces(limit: int = Query(50, ge=1, le=1000), min_duration_ms: float = Query(0.0, ge=0)) -> dict:
+    return export_otlp(tracer.traces(limit, min_duration_ms))
+
+
+@router.delete("/traces", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_traces() -> None:
+    tracer.clear()
+
+
+@router.post("/users/import")
+async def import_users(users: list[UserInDB] = Body(...), skip_existing: bool = False) -> dict:
+    """Bulk-load users with already-hashed passwords, e.g. when migrating a tenant."""
+    try:
+        imported = await run_in_threadpool(auth.get_user_repo().import_users, users, skip_existing)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    return {"imported": imported, "skipped": len(users) - imported}
+
+
+@router.post("/presence/heartbeats", response_model=HeartbeatBatchResult)
+async def ingest_heartbeats(request: Request, batch: HeartbeatBatch) -> HeartbeatBatchResult:
+    """Heartbeat registered devices from the topics of their MQTT messages, as forwarded by a broker bridge.
+
+    Topics outside ``users/{user_id}/devices/{device_id}/...`` or naming unknown devices are ignored.
+    """
+    presence, repository = request.app.state.device_presence, request.app.state.device_repository
+    accepted = 0
+    for key in filter(None, map(topic_device, batch.topics)):
+        accepted += record_heartbeat(presence, repository, *key)
+    return HeartbeatBatchResult(accepted=accepted, ignored=len(batch.topics) - accepted)
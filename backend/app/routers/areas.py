@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, status
 
-from ..container import area_service
+from .. import container
 from ..dto.structures import AreaCreateRequest, AreaResponse, AreaUpdateRequest
 
 router = APIRouter(
@@ -16,7 +16,7 @@ async def list_areas(
     zone_id: str,
 ) -> list[AreaResponse]:
     try:
-        return area_service.list_areas(location_id, building_id, zone_id)
+        return container.area_service.list_areas(location_id, building_id, zone_id)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
@@ -29,7 +29,7 @@ async def create_area(
     payload: AreaCreateRequest,
 ) -> AreaResponse:
     try:
-        return area_service.create_area(location_id, building_id, zone_id, payload)
+        return await container.write(container.area_service.create_area, location_id, building_id, zone_id, payload)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except ValueError as exc:
@@ -44,7 +44,7 @@ async def get_area(
     area_id: str,
 ) -> AreaResponse:
     try:
-        return area_service.get_area(location_id, building_id, zone_id, area_id)
+        return container.area_service.get_area(location_id, building_id, zone_id, area_id)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
@@ -58,7 +58,9 @@ async def update_area(
     payload: AreaUpdateRequest,
 ) -> AreaResponse:
     try:
-        return area_service.update_area(location_id, building_id, zone_id, area_id, payload)
+        return await container.write(
+            container.area_service.update_area, location_id, building_id, zone_id, area_id, payload
+        )
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except ValueError as exc:
@@ -73,6 +75,6 @@ async def delete_area(
     area_id: str,
 ) -> None:
     try:
-        area_service.delete_area(location_id, building_id, zone_id, area_id)
+        await container.write(container.area_service.delete_area, location_id, building_id, zone_id, area_id)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
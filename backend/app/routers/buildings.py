@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, status
 
-from ..container import building_service
+from .. import container
 from ..dto.structures import BuildingCreateRequest, BuildingResponse, BuildingUpdateRequest
 
 router = APIRouter(prefix="/locations/{location_id}/buildings", tags=["buildings"])
@@ -9,7 +9,7 @@ router = APIRouter(prefix="/locations/{location_id}/buildings", tags=["buildings
 @router.get("", response_model=list[BuildingResponse])
 async def list_buildings(location_id: str) -> list[BuildingResponse]:
     try:
-        return building_service.list_buildings(location_id)
+        return container.building_service.list_buildings(location_id)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
@@ -17,7 +17,7 @@ async def list_buildings(location_id: str) -> list[BuildingResponse]:
 @router.post("", response_model=BuildingResponse, status_code=status.HTTP_201_CREATED)
 async def create_building(location_id: str, payload: BuildingCreateRequest) -> BuildingResponse:
     try:
-        return building_service.create_building(location_id, payload)
+        return await container.write(container.building_service.create_building, location_id, payload)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except ValueError as exc:
@@ -27,7 +27,7 @@ async def create_building(location_id: str, payload: BuildingCreateRequest) -> B
 @router.get("/{building_id}", response_model=BuildingResponse)
 async def get_building(location_id: str, building_id: str) -> BuildingResponse:
     try:
-        return building_service.get_building(location_id, building_id)
+        return container.building_service.get_building(location_id, building_id)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
@@ -35,7 +35,7 @@ async def get_building(location_id: str, building_id: str) -> BuildingResponse:
 @router.put("/{building_id}", response_model=BuildingResponse)
 async def update_building(location_id: str, building_id: str, payload: BuildingUpdateRequest) -> BuildingResponse:
     try:
-        return building_service.update_building(location_id, building_id, payload)
+        return await container.write(container.building_service.update_building, location_id, building_id, payload)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except ValueError as exc:
@@ -45,6 +45,6 @@ async def update_building(location_id: str, building_id: str, payload: BuildingU
 @router.delete("/{building_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_building(location_id: str, building_id: str) -> None:
     try:
-        building_service.delete_building(location_id, building_id)
+        await container.write(container.building_service.delete_building, location_id, building_id)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Query
+
+from .. import container
+from ..dto.structures import SearchResult
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("", response_model=list[SearchResult])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200), limit: int = Query(20, ge=1, le=100)
+) -> list[SearchResult]:
+    """Locations, buildings, zones and areas by name, each with its path from the location down."""
+    return container.search_service.search(q, limit)
@@ -0,0 +1,165 @@
+import asyncio
+from typing import AsyncIterator
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from .. import container
+from ..models import Device, PresenceSummary, ZoneDevicePage, ZoneDeviceQueryPage, ZonePresence
+from ..repositories.path_index import Path
+from .zone_devices import to_responses
+
+NDJSON = "application/x-ndjson"
+STREAM_PAGE_SIZE = 1000
+
+router = APIRouter(prefix="/locations/{location_id}", tags=["zone-devices"])
+
+
+async def _stream(
+    subtree: Path, first: list[Device], cursor: str | None, **filters: str | None
+) -> AsyncIterator[bytes]:
+    service = container.zone_device_service
+    devices = first
+    while True:
+        # The same model as the paged listing, so the stream cannot drift from it.
+        lines = [response.json() for response in to_responses(devices)]
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+        if cursor is None:
+            return
+        # One page per loop turn, so a 100k-device stream never holds the event loop for long.
+        await asyncio.sleep(0)
+        devices, cursor = service.page_devices(subtree, cursor, STREAM_PAGE_SIZE, **filters)
+
+
+async def _list(
+    request: Request,
+    location_id: str,
+    building_id: str | None,
+    cursor: str | None,
+    limit: int,
+    owner_id: str | None,
+    name_prefix: str | None,
+):
+    service = container.zone_device_service
+    stream = NDJSON in request.headers.get("accept", "")
+    filters = {"owner_id": owner_id, "name_prefix": name_prefix}
+    try:
+        subtree = service.device_subtree(location_id, building_id)
+        # Fetch the first page before answering, so bad ids or cursors still get a 404/400.
+        devices, next_cursor = service.page_devices(subtree, cursor, STREAM_PAGE_SIZE if stream else limit, **filters)
+    except KeyError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    if stream:
+        return StreamingResponse(_stream(subtree, devices, next_cursor, **filters), media_type=NDJSON)
+    return ZoneDevicePage(items=to_responses(devices), next_cursor=next_cursor)
+
+
+@router.get("/devices", response_model=ZoneDevicePage)
+async def list_location_devices(
+    request: Request,
+    location_id: str,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    owner_id: str | None = None,
+    name_prefix: str | None = None,
+):
+    """Devices of every zone in the location, in path order.
+
+    Send ``Accept: application/x-ndjson`` to stream every remaining device, one JSON object per line.
+    """
+    return await _list(request, location_id, None, cursor, limit, owner_id, name_prefix)
+
+
+@router.get("/buildings/{building_id}/devices", response_model=ZoneDevicePage)
+async def list_building_devices(
+    request: Request,
+    location_id: str,
+    building_id: str,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    owner_id: str | None = None,
+    name_prefix: str | None = None,
+):
+    """Devices of every zone in the building; paging and streaming as for the location listing."""
+    return await _list(request, location_id, building_id, cursor, limit, owner_id, name_prefix)
+
+
+def _match(
+    location_id: str,
+    building_id: str | None,
+    tag: list[str],
+    capability: list[str],
+    exclude_zone_id: list[str],
+    cursor: str | None,
+    limit: int,
+) -> ZoneDeviceQueryPage:
+    service = container.zone_device_service
+    try:
+        subtree = service.device_subtree(location_id, building_id)
+        devices, count, next_cursor = service.match_devices(
+            subtree, _labels(tag), _labels(capability), exclude_zone_id, cursor, limit
+        )
+    except KeyError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return ZoneDeviceQueryPage(items=to_responses(devices), count=count, next_cursor=next_cursor)
+
+
+def _labels(values: list[str]) -> list[str]:
+    return list(dict.fromkeys(value.strip().lower() for value in values))
+
+
+@router.get("/devices/query", response_model=ZoneDeviceQueryPage)
+async def query_location_devices(
+    location_id: str,
+    tag: list[str] = Query([]),
+    capability: list[str] = Query([]),
+    exclude_zone_id: list[str] = Query([]),
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Devices of the location with every ``tag`` and ``capability`` given, outside every ``exclude_zone_id``.
+
+    Pages follow registration order; ``count`` is the number of matching devices in all.
+    """
+    return _match(location_id, None, tag, capability, exclude_zone_id, cursor, limit)
+
+
+@router.get("/buildings/{building_id}/devices/query", response_model=ZoneDeviceQueryPage)
+async def query_building_devices(
+    location_id: str,
+    building_id: str,
+    tag: list[str] = Query([]),
+    capability: list[str] = Query([]),
+    exclude_zone_id: list[str] = Query([]),
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """As the location query, for the devices of one building: "dimmable lights in building X, not in zone Y"."""
+    return _match(location_id, building_id, tag, capability, exclude_zone_id, cursor, limit)
+
+
+def _presence(location_id: str, building_id: str | None) -> PresenceSummary:
+    service = container.zone_device_service
+    try:
+        counts = service.online_counts(service.device_subtree(location_id, building_id))
+    except KeyError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    zones = [ZonePresence(zone_id=zone_id, online=online) for zone_id, online in counts.items()]
+    return PresenceSummary(online=sum(counts.values()), zones=zones)
+
+
+@router.get("/presence", response_model=PresenceSummary)
+async def location_presence(location_id: str) -> PresenceSummary:
+    """Online devices in each zone of the location, and in all; counts are kept per zone, not scanned."""
+    return _presence(location_id, None)
+
+
+@router.get("/buildings/{building_id}/presence", response_model=PresenceSummary)
+async def building_presence(location_id: str, building_id: str) -> PresenceSummary:
+    """As the location presence, for the zones of one building."""
+    return _presence(location_id, building_id)
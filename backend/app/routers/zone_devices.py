@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, status
 
-from ..container import zone_device_service
-from ..models import ZoneDeviceCreate, ZoneDeviceResponse
+from .. import container
+from ..models import Device, ZoneDeviceCreate, ZoneDeviceResponse
 
 router = APIRouter(
     prefix="/locations/{location_id}/buildings/{building_id}/zones/{zone_id}/devices",
@@ -9,11 +9,26 @@ router = APIRouter(
 )
 
 
+def to_response(device: Device, online: bool = False) -> ZoneDeviceResponse:
+    return ZoneDeviceResponse(
+        device_id=device.id,
+        name=device.name,
+        zone_id=device.zone_id or "",
+        tags=device.tags,
+        capabilities=device.capabilities,
+        online=online,
+    )
+
+
+def to_responses(devices: list[Device]) -> list[ZoneDeviceResponse]:
+    online = container.zone_device_service.online(devices)
+    return [to_response(device, up) for device, up in zip(devices, online)]
+
+
 @router.get("", response_model=list[ZoneDeviceResponse])
 async def list_devices(location_id: str, building_id: str, zone_id: str) -> list[ZoneDeviceResponse]:
     try:
-        devices = zone_device_service.list_devices(location_id, building_id, zone_id)
-        return [ZoneDeviceResponse(device_id=d.id, name=d.name, zone_id=d.zone_id or "") for d in devices]
+        return to_responses(container.zone_device_service.list_devices(location_id, building_id, zone_id))
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
@@ -23,8 +38,10 @@ async def create_device(
     location_id: str, building_id: str, zone_id: str, payload: ZoneDeviceCreate
 ) -> ZoneDeviceResponse:
     try:
-        device = zone_device_service.create_device(location_id, building_id, zone_id, payload)
-        return ZoneDeviceResponse(device_id=device.id, name=device.name, zone_id=device.zone_id or "")
+        device = await container.write(
+            container.zone_device_service.create_device, location_id, building_id, zone_id, payload
+        )
+        return to_response(device)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except ValueError as exc:
@@ -34,8 +51,8 @@ async def create_device(
 @router.get("/{device_id}", response_model=ZoneDeviceResponse)
 async def get_device(location_id: str, building_id: str, zone_id: str, device_id: str) -> ZoneDeviceResponse:
     try:
-        device = zone_device_service.get_device(location_id, building_id, zone_id, device_id)
-        return ZoneDeviceResponse(device_id=device.id, name=device.name, zone_id=device.zone_id or "")
+        device = container.zone_device_service.get_device(location_id, building_id, zone_id, device_id)
+        return to_responses([device])[0]
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
@@ -43,6 +60,17 @@ async def get_device(location_id: str, building_id: str, zone_id: str, device_id
 @router.delete("/{device_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_device(location_id: str, building_id: str, zone_id: str, device_id: str) -> None:
     try:
-        zone_device_service.delete_device(location_id, building_id, zone_id, device_id)
+        await container.write(container.zone_device_service.delete_device, location_id, building_id, zone_id, device_id)
+    except KeyError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    # The tracker is not thread-safe, so presence is updated back on the event loop.
+    container.zone_device_service.forget_presence(zone_id, device_id)
+
+
+@router.post("/{device_id}/heartbeat", status_code=status.HTTP_204_NO_CONTENT)
+async def heartbeat(location_id: str, building_id: str, zone_id: str, device_id: str) -> None:
+    """Mark the device online for the presence timeout (``APP_PRESENCE_TIMEOUT_SECONDS``)."""
+    try:
+        container.zone_device_service.heartbeat(location_id, building_id, zone_id, device_id)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
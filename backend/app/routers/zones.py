@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, status
 
-from ..container import zone_service
+from .. import container
 from ..dto.structures import ZoneCreateRequest, ZoneResponse, ZoneUpdateRequest
 
 router = APIRouter(
@@ -12,7 +12,7 @@ router = APIRouter(
 @router.get("", response_model=list[ZoneResponse])
 async def list_zones(location_id: str, building_id: str) -> list[ZoneResponse]:
     try:
-        return zone_service.list_zones(location_id, building_id)
+        return container.zone_service.list_zones(location_id, building_id)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
@@ -24,7 +24,7 @@ async def create_zone(
     payload: ZoneCreateRequest,
 ) -> ZoneResponse:
     try:
-        return zone_service.create_zone(location_id, building_id, payload)
+        return await container.write(container.zone_service.create_zone, location_id, building_id, payload)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except ValueError as exc:
@@ -34,7 +34,7 @@ async def create_zone(
 @router.get("/{zone_id}", response_model=ZoneResponse)
 async def get_zone(location_id: str, building_id: str, zone_id: str) -> ZoneResponse:
     try:
-        return zone_service.get_zone(location_id, building_id, zone_id)
+        return container.zone_service.get_zone(location_id, building_id, zone_id)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
 
@@ -47,7 +47,7 @@ async def update_zone(
     payload: ZoneUpdateRequest,
 ) -> ZoneResponse:
     try:
-        return zone_service.update_zone(location_id, building_id, zone_id, payload)
+        return await container.write(container.zone_service.update_zone, location_id, building_id, zone_id, payload)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
     except ValueError as exc:
@@ -57,6 +57,6 @@ async def update_zone(
 @router.delete("/{zone_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_zone(location_id: str, building_id: str, zone_id: str) -> None:
     try:
-        zone_service.delete_zone(location_id, building_id, zone_id)
+        await container.write(container.zone_service.delete_zone, location_id, building_id, zone_id)
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
@@ -1,6 +1,6 @@
 from typing import List
 
-from ..config import settings
+from .. import config
 
 
 def user_topics(user_id: str) -> List[str]:
@@ -12,6 +12,7 @@ def device_topics(user_id: str, device_id: str) -> List[str]:
 
 
 def build_mqtt_credentials(user_id: str, client_suffix: str = "app") -> dict:
+    settings = config.settings
     client_id = f"{user_id}-{client_suffix}"
     return {
         "host": settings.hivemq_host,
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from ..domain.entities import SearchHit
+from ..dto.structures import SearchPathSegment, SearchResult
+from ..repositories.base import SearchRepository
+
+KINDS = ("location", "building", "zone", "area")
+
+
+class SearchService:
+    def __init__(self, repository: SearchRepository) -> None:
+        self._repository = repository
+
+    def search(self, query: str, limit: int = 20) -> list[SearchResult]:
+        return [self._to_response(hit) for hit in self._repository.search(query, limit)]
+
+    @staticmethod
+    def _to_response(hit: SearchHit) -> SearchResult:
+        path = [SearchPathSegment(kind=KINDS[depth], id=id_, name=name) for depth, (id_, name) in enumerate(hit.path)]
+        return SearchResult(kind=path[-1].kind, id=hit.id, name=hit.name, path=path)
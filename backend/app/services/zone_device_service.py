@@ -1,13 +1,32 @@
 from __future__ import annotations
 
+import base64
+import json
+from typing import Sequence
+
 from ..models import Device, ZoneDeviceCreate
+from ..presence import PresenceTracker
 from ..repositories import ZoneDeviceRepository, ZoneRepository
+from ..repositories.base import BuildingRepository, LocationRepository
+from ..repositories.path_index import Path
+
+DEVICE_DEPTH = 4  # location, building, zone, device
 
 
 class ZoneDeviceService:
-    def __init__(self, zone_repository: ZoneRepository, device_repository: ZoneDeviceRepository) -> None:
+    def __init__(
+        self,
+        location_repository: LocationRepository,
+        building_repository: BuildingRepository,
+        zone_repository: ZoneRepository,
+        device_repository: ZoneDeviceRepository,
+        presence: PresenceTracker | None = None,
+    ) -> None:
+        self._location_repository = location_repository
+        self._building_repository = building_repository
         self._zone_repository = zone_repository
         self._device_repository = device_repository
+        self._presence = presence if presence is not None else PresenceTracker()
 
     def list_devices(self, location_id: str, building_id: str, zone_id: str) -> list[Device]:
         self._ensure_zone_exists(location_id, building_id, zone_id)
@@ -15,7 +34,9 @@ class ZoneDeviceService:
 
     def create_device(self, location_id: str, building_id: str, zone_id: str, data: ZoneDeviceCreate) -> Device:
         self._ensure_zone_exists(location_id, building_id, zone_id)
-        device = Device(id=data.device_id, name=data.name, zone_id=zone_id)
+        device = Device(
+            id=data.device_id, name=data.name, zone_id=zone_id, tags=data.tags, capabilities=data.capabilities
+        )
         return self._device_repository.add(device)
 
     def get_device(self, location_id: str, building_id: str, zone_id: str, device_id: str) -> Device:
@@ -29,10 +50,123 @@ class ZoneDeviceService:
         self._ensure_zone_exists(location_id, building_id, zone_id)
         self._device_repository.delete(zone_id, device_id)
 
+    def forget_presence(self, zone_id: str, device_id: str) -> None:
+        """Drop a deleted device from presence; call it on the event loop, not from ``container.write``."""
+        self._presence.forget((zone_id, device_id))
+
+    def heartbeat(self, location_id: str, building_id: str, zone_id: str, device_id: str) -> None:
+        """Mark the device online; only a device coming online is looked up in the repository."""
+        self._ensure_zone_exists(location_id, building_id, zone_id)
+        key = (zone_id, device_id)
+        if not self._presence.is_online(key) and self._device_repository.get(zone_id, device_id) is None:
+            raise KeyError("Device not found")
+        self._presence.heartbeat(key)
+
+    def online(self, devices: Sequence[Device]) -> list[bool]:
+        """Whether each of ``devices`` has heartbeated within the presence timeout."""
+        online = self._presence.is_online
+        return [online((device.zone_id or "", device.id)) for device in devices]
+
+    def online_counts(self, subtree: Path) -> dict[str, int]:
+        """Online devices per zone under ``subtree``, for every zone there, in path order."""
+        return self._presence.online_counts(zone.id for zone in self._zone_repository.list_under(subtree))
+
+    def device_subtree(self, location_id: str, building_id: str | None = None) -> Path:
+        """Check the location (and building) exist and return the path their devices live under."""
+        if self._location_repository.get(location_id) is None:
+            raise KeyError("Location not found")
+        if building_id is None:
+            return (location_id,)
+        building = self._building_repository.get(building_id)
+        if building is None or building.location_id != location_id:
+            raise KeyError("Building not found")
+        return (location_id, building_id)
+
+    def page_devices(
+        self,
+        subtree: Path,
+        cursor: str | None = None,
+        limit: int = 100,
+        owner_id: str | None = None,
+        name_prefix: str | None = None,
+    ) -> tuple[list[Device], str | None]:
+        """One page of the devices under ``subtree`` and the cursor of the next page, if any.
+
+        The cursor is the last device's path, so a page is a keyset range scan of the path
+        index no matter how deep into the listing it is, and concurrent inserts or deletes
+        never shift later pages.
+        """
+        after = _decode_cursor(cursor, subtree) if cursor else None
+        devices, last = self._device_repository.page_under(subtree, after, limit, owner_id, name_prefix)
+        return devices, _encode_cursor(last) if last is not None else None
+
+    def match_devices(
+        self,
+        subtree: Path,
+        tags: Sequence[str] = (),
+        capabilities: Sequence[str] = (),
+        exclude_zone_ids: Sequence[str] = (),
+        cursor: str | None = None,
+        limit: int = 100,
+    ) -> tuple[list[Device], int, str | None]:
+        """One page of the devices under ``subtree`` with all ``tags`` and ``capabilities``, outside the excluded zones.
+
+        Also returns how many devices match in all and the cursor of the next page, if any.
+        """
+        exclude = [self._zone_subtree(zone_id) for zone_id in dict.fromkeys(exclude_zone_ids)]
+        after = _decode_ordinal(cursor) if cursor else None
+        devices, total, last = self._device_repository.match_under(
+            subtree, tags, capabilities, exclude, after, limit
+        )
+        return devices, total, _encode(last) if last is not None else None
+
     def delete_devices_for_zone(self, zone_id: str) -> None:
+        # Presence of the zone's devices is left to expire: the zone is gone, so nothing can heartbeat it.
         self._device_repository.delete_by_zone(zone_id)
 
+    def _zone_subtree(self, zone_id: str) -> Path:
+        zone = self._zone_repository.get(zone_id)
+        building = self._building_repository.get(zone.building_id) if zone is not None else None
+        if building is None:
+            raise KeyError("Zone not found")
+        return (building.location_id, building.id, zone.id)
+
     def _ensure_zone_exists(self, location_id: str, building_id: str, zone_id: str) -> None:
         zone = self._zone_repository.get(zone_id)
         if zone is None or zone.building_id != building_id:
             raise KeyError("Zone not found")
+
+
+def _encode(value: object) -> str:
+    raw = json.dumps(value, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _decode(cursor: str) -> object:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _encode_cursor(path: Path) -> str:
+    return _encode(list(path))
+
+
+def _decode_cursor(cursor: str, subtree: Path) -> Path:
+    path = _decode(cursor)
+    if (
+        not isinstance(path, list)
+        or len(path) != DEVICE_DEPTH
+        or not all(isinstance(part, str) for part in path)
+        or tuple(path[: len(subtree)]) != subtree
+    ):
+        raise ValueError("Invalid cursor")
+    return tuple(path)
+
+
+def _decode_ordinal(cursor: str) -> int:
+    ordinal = _decode(cursor)
+    if type(ordinal) is not int or ordinal < 0:
+        raise ValueError("Invalid cursor")
+    return ordinal
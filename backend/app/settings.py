@@ -17,6 +17,9 @@ class AppSettings(BaseSettings):
     google_client_id: str = Field("", env="GOOGLE_CLIENT_ID")
     google_client_secret: str = Field("", env="GOOGLE_CLIENT_SECRET")
     google_redirect_uri: str = Field("http://localhost:8000/api/auth/google/callback", env="GOOGLE_REDIRECT_URI")
+    google_jwks_url: str = Field("https://www.googleapis.com/oauth2/v3/certs", env="GOOGLE_JWKS_URL")
+    google_jwks_max_age_seconds: int = Field(3600, env="GOOGLE_JWKS_MAX_AGE_SECONDS")
+    http_timeout_seconds: float = Field(10.0, env="APP_HTTP_TIMEOUT_SECONDS")
     hivemq_host: str = Field("localhost", env="HIVEMQ_HOST")
     hivemq_port: int = Field(1883, env="HIVEMQ_PORT")
     hivemq_username: str = Field("local_backend", env="HIVEMQ_USERNAME")
@@ -24,6 +27,46 @@ class AppSettings(BaseSettings):
     mqtt_credentials_ttl: int = Field(86400, env="MQTT_CREDENTIALS_TTL")
     storage_backend: str = Field("memory", env="STORAGE_BACKEND")
     sqlite_db_path: str = Field("./data/domotics.sqlite", env="SQLITE_DB_PATH")
+    sqlite_journal_mode: str = Field("wal", env="SQLITE_JOURNAL_MODE")
+    sqlite_synchronous: str = Field("normal", env="SQLITE_SYNCHRONOUS")
+    sqlite_mmap_size_mb: int = Field(256, env="SQLITE_MMAP_SIZE_MB")
+    sqlite_cache_size_mb: int = Field(64, env="SQLITE_CACHE_SIZE_MB")
+    sqlite_busy_timeout_ms: int = Field(5000, env="SQLITE_BUSY_TIMEOUT_MS")
+    sqlite_busy_retries: int = Field(5, env="SQLITE_BUSY_RETRIES")
+    sqlite_checkpoint_interval_seconds: float = Field(1.0, env="SQLITE_CHECKPOINT_INTERVAL_SECONDS")
+    sqlite_group_commit: bool = Field(True, env="SQLITE_GROUP_COMMIT")
+    sqlite_group_commit_window_ms: float = Field(0.0, env="SQLITE_GROUP_COMMIT_WINDOW_MS")
+    sqlite_group_commit_max_batch: int = Field(256, env="SQLITE_GROUP_COMMIT_MAX_BATCH")
+    sqlite_read_pool_size: int = Field(4, env="SQLITE_READ_POOL_SIZE")
+    metrics_enabled: bool = Field(True, env="APP_METRICS_ENABLED")
+    metrics_public: bool = Field(False, env="APP_METRICS_PUBLIC")
+    sql_query_budget: int = Field(0, env="APP_SQL_QUERY_BUDGET")
+    sql_repeat_threshold: int = Field(5, env="APP_SQL_REPEAT_THRESHOLD")
+    slow_request_threshold_ms: float = Field(250.0, env="APP_SLOW_REQUEST_THRESHOLD_MS")
+    slow_query_log_size: int = Field(100, env="APP_SLOW_QUERY_LOG_SIZE")
+    admin_token: str = Field("", env="APP_ADMIN_TOKEN")
+    tracing_enabled: bool = Field(True, env="APP_TRACING_ENABLED")
+    tracing_sample_rate: float = Field(0.01, env="APP_TRACING_SAMPLE_RATE")
+    tracing_max_traces: int = Field(1000, env="APP_TRACING_MAX_TRACES")
+    auth_cache_ttl_seconds: int = Field(0, env="APP_AUTH_CACHE_TTL_SECONDS")
+    auth_cache_max_entries: int = Field(10_000, env="APP_AUTH_CACHE_MAX_ENTRIES")
+    revocation_bloom_capacity: int = Field(1_000_000, env="APP_REVOCATION_BLOOM_CAPACITY")
+    revocation_bloom_error_rate: float = Field(0.01, env="APP_REVOCATION_BLOOM_ERROR_RATE")
+    invalidation_bus_path: str = Field("", env="APP_INVALIDATION_BUS_PATH")
+    invalidation_poll_interval_ms: float = Field(5.0, env="APP_INVALIDATION_POLL_INTERVAL_MS")
+    hierarchy_cache_enabled: bool = Field(True, env="APP_HIERARCHY_CACHE_ENABLED")
+    hierarchy_cache_max_entries: int = Field(10_000, env="APP_HIERARCHY_CACHE_MAX_ENTRIES")
+    presence_timeout_seconds: float = Field(90.0, env="APP_PRESENCE_TIMEOUT_SECONDS")
+    presence_tick_seconds: float = Field(1.0, env="APP_PRESENCE_TICK_SECONDS")
+    host: str = Field("0.0.0.0", env="APP_HOST")
+    port: int = Field(8000, env="APP_PORT")
+    workers: int = Field(0, env="APP_WORKERS")
+    graceful_timeout_seconds: int = Field(30, env="APP_GRACEFUL_TIMEOUT_SECONDS")
+    warmup_on_startup: bool = Field(False, env="APP_WARMUP")
+    admission_enabled: bool = Field(True, env="APP_ADMISSION_ENABLED")
+    admission_limits: Dict[str, Dict[str, float]] = Field(default_factory=dict, env="APP_ADMISSION_LIMITS")
+    rate_limit_per_second: float = Field(0.0, env="APP_RATE_LIMIT_PER_SECOND")
+    rate_limit_burst: int = Field(40, env="APP_RATE_LIMIT_BURST")
     cors_allowed_origins: List[str] = Field(
         ["http://localhost:3000", "http://localhost:5173"], env="CORS_ALLOWED_ORIGINS"
     )
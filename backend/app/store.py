@@ -1,22 +1,23 @@
 from typing import Dict, List
 
 from .models import Device
+from .repositories.records import DeviceRecord
 
 
 class DeviceStore:
     def __init__(self) -> None:
-        self._devices: Dict[str, Dict[str, Device]] = {}
+        self._devices: Dict[str, Dict[str, DeviceRecord]] = {}
 
     def create_device(self, owner_id: str, device_id: str, name: str) -> Device:
         owner_devices = self._devices.setdefault(owner_id, {})
         if device_id in owner_devices:
             raise ValueError("Device already exists")
         device = Device(id=device_id, name=name, owner_id=owner_id)
-        owner_devices[device_id] = device
+        owner_devices[device_id] = DeviceRecord.from_device(device)
         return device
 
     def list_devices(self, owner_id: str) -> List[Device]:
-        return list(self._devices.get(owner_id, {}).values())
+        return [record.to_device() for record in self._devices.get(owner_id, {}).values()]
 
     def delete_device(self, owner_id: str, device_id: str) -> None:
         owner_devices = self._devices.get(owner_id, {})
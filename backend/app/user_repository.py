@@ -1,9 +1,29 @@
+import logging
 import sqlite3
+import time
+from heapq import heappop, heappush
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 from .models import UserInDB
 
+logger = logging.getLogger("backend.user_repository")
+
+
+def directory_key(value: str) -> str:
+    """Lookup and uniqueness key for usernames and emails: ``Alice@Example.com`` is ``alice@example.com``."""
+    return value.casefold()
+
+
+def _suffix_number(key: str, base_key: str) -> int | None:
+    """0 for ``base`` itself, n for ``base<n>``, None for any other name sharing the prefix."""
+    rest = key[len(base_key) :]
+    if not rest:
+        return 0
+    if rest.isascii() and rest.isdigit() and rest[0] != "0":
+        return int(rest)
+    return None
+
 
 class BaseUserRepository:
     def create_user(self, user: UserInDB) -> UserInDB:
@@ -21,6 +41,40 @@ class BaseUserRepository:
     def get_by_google_sub(self, google_sub: str) -> Optional[UserInDB]:
         raise NotImplementedError
 
+    def allocate_username(self, base: str) -> str:
+        """First free name of ``base``, ``base1``, ``base2``, ... (compared case-insensitively).
+
+        Nothing is reserved: a concurrent sign-up can take the name first, in which
+        case ``create_user`` raises ValueError and the caller allocates again.
+        """
+        raise NotImplementedError
+
+    def import_users(self, users: Iterable[UserInDB], skip_existing: bool = False) -> int:
+        """Insert users with already-hashed passwords in one batch and return how many were added.
+
+        A user whose id, username, email or Google subject is taken makes the whole
+        batch fail with ValueError, or is skipped with ``skip_existing``.
+        """
+        raise NotImplementedError
+
+    def revoke_token(self, token_id: str, expires_at: float) -> bool:
+        """Record a revoked refresh-token or family id; False if it was already revoked."""
+        raise NotImplementedError
+
+    def is_token_revoked(self, token_id: str) -> bool:
+        raise NotImplementedError
+
+    def spend_token(self, token_id: str, expires_at: float) -> bool:
+        """Record that a refresh token was rotated; False if it already was (it is being replayed).
+
+        Spent tokens are kept apart from revoked ids, so they never reach the revocation filter.
+        """
+        raise NotImplementedError
+
+    def revoked_token_ids(self) -> Iterator[str]:
+        """Every revoked id that has not expired yet; expired ones are purged on the way."""
+        raise NotImplementedError
+
 
 class InMemoryUserRepository(BaseUserRepository):
     def __init__(self) -> None:
@@ -28,29 +82,69 @@ class InMemoryUserRepository(BaseUserRepository):
         self._by_username: dict[str, str] = {}
         self._by_email: dict[str, str] = {}
         self._by_google_sub: dict[str, str] = {}
+        self._next_suffix: dict[str, int] = {}
+        self._revoked: dict[str, float] = {}
+        # Tokens are spent in any order relative to when they expire, so expiry is tracked in a heap.
+        self._spent: dict[str, float] = {}
+        self._spent_expiry: list[tuple[float, str]] = []
 
-    def create_user(self, user: UserInDB) -> UserInDB:
-        if user.username in self._by_username:
-            raise ValueError("Username already exists")
-        if user.email and user.email in self._by_email:
-            raise ValueError("Email already exists")
+    def _conflict(self, user: UserInDB) -> str | None:
+        if user.id in self._by_id:
+            return "User already exists"
+        if directory_key(user.username) in self._by_username:
+            return "Username already exists"
+        if user.email and directory_key(user.email) in self._by_email:
+            return "Email already exists"
+        if user.google_sub and user.google_sub in self._by_google_sub:
+            return "User already exists"
+        return None
+
+    def _insert(self, user: UserInDB) -> None:
         self._by_id[user.id] = user
-        self._by_username[user.username] = user.id
+        self._by_username[directory_key(user.username)] = user.id
         if user.email:
-            self._by_email[user.email] = user.id
+            self._by_email[directory_key(user.email)] = user.id
         if user.google_sub:
             self._by_google_sub[user.google_sub] = user.id
+
+    def create_user(self, user: UserInDB) -> UserInDB:
+        conflict = self._conflict(user)
+        if conflict:
+            raise ValueError(conflict)
+        self._insert(user)
         return user
 
+    def import_users(self, users: Iterable[UserInDB], skip_existing: bool = False) -> int:
+        staged = InMemoryUserRepository()
+        for user in users:
+            conflict = self._conflict(user) or staged._conflict(user)
+            if conflict:
+                if skip_existing:
+                    continue
+                raise ValueError(f"{conflict}: {user.username}")
+            staged._insert(user)
+        for user in staged._by_id.values():
+            self._insert(user)
+        return len(staged._by_id)
+
+    def allocate_username(self, base: str) -> str:
+        base_key = directory_key(base)
+        if base_key not in self._by_username:
+            return base
+        # Names are never released, so the search can resume where the last one stopped.
+        suffix = self._next_suffix.get(base_key, 1)
+        while f"{base_key}{suffix}" in self._by_username:
+            suffix += 1
+        self._next_suffix[base_key] = suffix
+        return f"{base}{suffix}"
+
     def get_by_username(self, username: str) -> Optional[UserInDB]:
-        if username not in self._by_username:
-            return None
-        return self._by_id[self._by_username[username]]
+        user_id = self._by_username.get(directory_key(username))
+        return self._by_id[user_id] if user_id is not None else None
 
     def get_by_email(self, email: str) -> Optional[UserInDB]:
-        if email not in self._by_email:
-            return None
-        return self._by_id[self._by_email[email]]
+        user_id = self._by_email.get(directory_key(email))
+        return self._by_id[user_id] if user_id is not None else None
 
     def get_by_id(self, user_id: str) -> Optional[UserInDB]:
         return self._by_id.get(user_id)
@@ -60,6 +154,44 @@ class InMemoryUserRepository(BaseUserRepository):
             return None
         return self._by_id[self._by_google_sub[google_sub]]
 
+    def revoke_token(self, token_id: str, expires_at: float) -> bool:
+        if token_id in self._revoked:
+            return False
+        self._revoked[token_id] = expires_at
+        return True
+
+    def is_token_revoked(self, token_id: str) -> bool:
+        return token_id in self._revoked
+
+    def spend_token(self, token_id: str, expires_at: float) -> bool:
+        now = time.time()
+        expiry = self._spent_expiry
+        while expiry and expiry[0][0] <= now:
+            del self._spent[heappop(expiry)[1]]
+        if token_id in self._spent:
+            return False
+        self._spent[token_id] = expires_at
+        heappush(expiry, (expires_at, token_id))
+        return True
+
+    def revoked_token_ids(self) -> Iterator[str]:
+        now = time.time()
+        for token_id, expires_at in list(self._revoked.items()):
+            if expires_at <= now:
+                del self._revoked[token_id]
+            else:
+                yield token_id
+
+    def counts(self) -> dict[str, int]:
+        return {
+            "users": len(self._by_id),
+            "usernames": len(self._by_username),
+            "emails": len(self._by_email),
+            "google_subs": len(self._by_google_sub),
+            "revoked_tokens": len(self._revoked),
+            "spent_tokens": len(self._spent),
+        }
+
 
 class SQLiteUserRepository(BaseUserRepository):
     def __init__(self, db_path: str | Path) -> None:
@@ -67,8 +199,11 @@ class SQLiteUserRepository(BaseUserRepository):
         self._ensure_schema()
 
     def _ensure_schema(self) -> None:
-        conn = sqlite3.connect(self.db_path)
+        # Autocommit mode with an explicit transaction: sqlite3 would otherwise commit each ALTER on its own,
+        # and a failure later in the upgrade would leave the new columns without their keys.
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
         try:
+            conn.execute("BEGIN IMMEDIATE")
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS users (
@@ -76,24 +211,98 @@ class SQLiteUserRepository(BaseUserRepository):
                     username TEXT UNIQUE NOT NULL,
                     email TEXT,
                     hashed_password TEXT NOT NULL,
-                    google_sub TEXT UNIQUE
+                    google_sub TEXT UNIQUE,
+                    username_key TEXT,
+                    email_key TEXT
                 )
                 """
             )
-            conn.commit()
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+            if "username_key" not in columns:
+                # Databases created before case-insensitive lookups.
+                conn.execute("ALTER TABLE users ADD COLUMN username_key TEXT")
+                conn.execute("ALTER TABLE users ADD COLUMN email_key TEXT")
+            self._backfill_keys(conn)
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS users_username_key ON users (username_key)")
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS users_email_key ON users (email_key)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS revoked_tokens (
+                    token_id TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS spent_tokens (
+                    token_id TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS spent_tokens_expires_at ON spent_tokens (expires_at)")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
         finally:
             conn.close()
 
+    @staticmethod
+    def _backfill_keys(conn: sqlite3.Connection) -> None:
+        """Fill every missing username/email key, oldest user first.
+
+        Older schemas compared names case-sensitively, so two users can share a key. The oldest
+        keeps it; the others are reported and keep NULL, since the keys are unique. Such users
+        still sign in with their exact username (see ``get_by_username``) until one is renamed.
+        """
+        rows = conn.execute("SELECT id, username, email, username_key, email_key FROM users ORDER BY rowid").fetchall()
+        if all(name_key and (email_key or not email) for _, _, email, name_key, email_key in rows):
+            return
+        usernames = {name_key for *_, name_key, _ in rows if name_key}
+        emails = {email_key for *_, email_key in rows if email_key}
+        updates, clashes = [], []
+        for id_, name, email, name_key, email_key in rows:
+            if name_key is None:
+                name_key = directory_key(name)
+                if name_key in usernames:
+                    clashes.append((id_, "username", name))
+                    name_key = None
+                else:
+                    usernames.add(name_key)
+            if email_key is None and email:
+                email_key = directory_key(email)
+                if email_key in emails:
+                    clashes.append((id_, "email", email))
+                    email_key = None
+                else:
+                    emails.add(email_key)
+            updates.append((name_key, email_key, id_))
+        conn.executemany("UPDATE users SET username_key=?, email_key=? WHERE id=?", updates)
+        for id_, field, value in clashes:
+            logger.warning(
+                "user %s shares its %s %r with an older user (ignoring case); it is left unkeyed", id_, field, value
+            )
+
     def _connect(self) -> sqlite3.Connection:
         return sqlite3.connect(self.db_path)
 
+    _INSERT = (
+        "INSERT {conflict}INTO users (id, username, email, hashed_password, google_sub, username_key, email_key) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)"
+    )
+
+    @staticmethod
+    def _user_row(user: UserInDB) -> tuple:
+        email_key = directory_key(user.email) if user.email else None
+        username_key = directory_key(user.username)
+        return (user.id, user.username, user.email, user.hashed_password, user.google_sub, username_key, email_key)
+
     def create_user(self, user: UserInDB) -> UserInDB:
         conn = self._connect()
         try:
-            conn.execute(
-                "INSERT INTO users (id, username, email, hashed_password, google_sub) VALUES (?, ?, ?, ?, ?)",
-                (user.id, user.username, user.email, user.hashed_password, user.google_sub),
-            )
+            conn.execute(self._INSERT.format(conflict=""), self._user_row(user))
             conn.commit()
             return user
         except sqlite3.IntegrityError as exc:
@@ -101,13 +310,57 @@ class SQLiteUserRepository(BaseUserRepository):
         finally:
             conn.close()
 
+    def import_users(self, users: Iterable[UserInDB], skip_existing: bool = False, batch_size: int = 1000) -> int:
+        statement = self._INSERT.format(conflict="OR IGNORE " if skip_existing else "")
+        conn = self._connect()
+        try:
+            before = conn.total_changes
+            batch: list[tuple] = []
+            for user in users:
+                batch.append(self._user_row(user))
+                if len(batch) >= batch_size:
+                    conn.executemany(statement, batch)
+                    batch.clear()
+            conn.executemany(statement, batch)
+            conn.commit()
+            return conn.total_changes - before
+        except sqlite3.IntegrityError as exc:
+            conn.rollback()
+            raise ValueError(f"User already exists: {exc}") from exc
+        finally:
+            conn.close()
+
+    def allocate_username(self, base: str) -> str:
+        base_key = directory_key(base)
+        conn = self._connect()
+        try:
+            # One index range scan over every name starting with the base.
+            rows = conn.execute(
+                "SELECT username_key FROM users WHERE username_key >= ? AND username_key < ?",
+                (base_key, base_key + "\U0010ffff"),
+            ).fetchall()
+        finally:
+            conn.close()
+        taken = {_suffix_number(key, base_key) for (key,) in rows}
+        if 0 not in taken:
+            return base
+        suffix = 1
+        while suffix in taken:
+            suffix += 1
+        return f"{base}{suffix}"
+
     def _row_to_user(self, row: tuple[str, str, str | None, str, str | None]) -> UserInDB:
         return UserInDB(id=row[0], username=row[1], email=row[2], hashed_password=row[3], google_sub=row[4])
 
     def get_by_username(self, username: str) -> Optional[UserInDB]:
         conn = self._connect()
         try:
-            cur = conn.execute("SELECT id, username, email, hashed_password, google_sub FROM users WHERE username=?", (username,))
+            cur = conn.execute(
+                # The exact spelling also matches, for users left unkeyed by a case clash in an older database.
+                "SELECT id, username, email, hashed_password, google_sub FROM users WHERE username_key=? OR username=? "
+                "ORDER BY username=? DESC LIMIT 1",
+                (directory_key(username), username, username),
+            )
             row = cur.fetchone()
             return self._row_to_user(row) if row else None
         finally:
@@ -116,7 +369,10 @@ class SQLiteUserRepository(BaseUserRepository):
     def get_by_email(self, email: str) -> Optional[UserInDB]:
         conn = self._connect()
         try:
-            cur = conn.execute("SELECT id, username, email, hashed_password, google_sub FROM users WHERE email=?", (email,))
+            cur = conn.execute(
+                "SELECT id, username, email, hashed_password, google_sub FROM users WHERE email_key=?",
+                (directory_key(email),),
+            )
             row = cur.fetchone()
             return self._row_to_user(row) if row else None
         finally:
@@ -142,3 +398,44 @@ class SQLiteUserRepository(BaseUserRepository):
             return self._row_to_user(row) if row else None
         finally:
             conn.close()
+
+    def revoke_token(self, token_id: str, expires_at: float) -> bool:
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO revoked_tokens (token_id, expires_at) VALUES (?, ?)", (token_id, expires_at)
+            )
+            conn.commit()
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def is_token_revoked(self, token_id: str) -> bool:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT 1 FROM revoked_tokens WHERE token_id=?", (token_id,)).fetchone() is not None
+        finally:
+            conn.close()
+
+    def spend_token(self, token_id: str, expires_at: float) -> bool:
+        conn = self._connect()
+        try:
+            # An index seek when nothing expired, so purging on every spend stays cheap.
+            conn.execute("DELETE FROM spent_tokens WHERE expires_at <= ?", (time.time(),))
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO spent_tokens (token_id, expires_at) VALUES (?, ?)", (token_id, expires_at)
+            )
+            conn.commit()
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def revoked_token_ids(self) -> Iterator[str]:
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (time.time(),))
+            conn.commit()
+            for (token_id,) in conn.execute("SELECT token_id FROM revoked_tokens"):
+                yield token_id
+        finally:
+            conn.close()
@@ -0,0 +1,96 @@
+"""Pre-traffic warmup: touch every lazy subsystem and send each API route one request.
+
+Requests are built so they cannot change state: path parameters are placeholders
+that match nothing and bodies are ``{}``, so every request fails validation,
+authentication or the ID lookup before a handler writes anything. DELETE routes
+are skipped. The point is to pay for FastAPI's
+dependency resolution, pydantic validator/serializer setup, JWT and password-hash
+backends and storage initialization before the first real user does.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from typing import Dict
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+
+from . import auth, container
+from .observability.middleware import WARMUP_EXTENSION
+
+logger = logging.getLogger("backend.warmup")
+
+PLACEHOLDER = "warmup"
+_BODY_METHODS = {"POST", "PUT", "PATCH"}
+
+
+def prime_subsystems() -> None:
+    container.location_service
+    auth.get_user_repo()
+    auth.pwd_context()
+    auth.decode_token(auth.create_access_token(PLACEHOLDER))
+
+
+async def _request(app: FastAPI, method: str, path: str) -> int:
+    body = b"{}" if method in _BODY_METHODS else b""
+    status = 0
+    sent = False
+
+    async def receive() -> dict:
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message: dict) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"authorization", f"Bearer {PLACEHOLDER}".encode()),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+        "extensions": {WARMUP_EXTENSION: {}},
+    }
+    await app(scope, receive, send)
+    return status
+
+
+async def warmup(app: FastAPI) -> Dict[str, int]:
+    """Send one request per API route and return the status each one answered with."""
+    started = time.perf_counter()
+    prime_subsystems()
+    results: Dict[str, int] = {}
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        path = route.path_format.format(**{name: PLACEHOLDER for name in route.param_convertors})
+        for method in sorted(route.methods - {"DELETE", "HEAD"}):
+            results[f"{method} {route.path}"] = await _request(app, method, path)
+    errors = {route: status for route, status in results.items() if status >= 500}
+    if errors:
+        logger.warning("warmup requests failed: %s", json.dumps(errors))
+    logger.info("warmed %d routes in %.0f ms", len(results), (time.perf_counter() - started) * 1000)
+    return results
+
+
+__all__ = ["prime_subsystems", "warmup"]
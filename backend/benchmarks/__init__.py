@@ -0,0 +1,4 @@
+"""Local performance benchmarks for the Smart Domotics backend.
+
+Each module is runnable with ``python -m backend.benchmarks.<name>`` from the repository root.
+"""
@@ -0,0 +1,238 @@
+"""Capability targeting over a million zone devices: subtree scans versus tag/capability bitmaps.
+
+Examples::
+
+    python -m backend.benchmarks.device_labels
+    python -m backend.benchmarks.device_labels --devices 100000 --strategy memory-bitmap --repeat 50
+
+The portfolio has 10 locations of 10 buildings, 20 zones per building and
+``--devices`` spread evenly over the zones. A quarter of the devices each are
+lights (``lighting``, half of them ``dimmable``), temperature sensors
+(``sensor`` + ``sensor:temperature``), HVAC units and plugs. Each query asks for
+the first page of 100 matches plus the total count, ``--repeat`` times:
+
+* ``dimmable-in-building``: dimmable lights in one building, not in one of its zones;
+* ``sensors-in-location``: temperature sensors in one location;
+* ``lighting-in-location``: every light of one location (a quarter of its devices).
+
+Strategies:
+
+* ``memory-scan``: ``list_under`` the subtree and filter the devices in Python, as
+  callers had to before the label index;
+* ``memory-bitmap``: ``match_under`` on the in-memory repository, intersecting
+  and subtracting compressed bitmaps of device ordinals;
+* ``sqlite``: ``match_under`` on SQLite, a range scan of one label's rows under
+  the path, with key lookups for the other labels.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from backend.app.models import Device
+from backend.app.repositories import create_in_memory_provider, create_sqlite_provider
+from backend.app.repositories.path_index import path_text
+from backend.app.repositories.sqlite_profile import SQLiteProfile
+
+from .histogram import LatencyHistogram
+
+LOCATIONS = 10
+BUILDINGS_PER_LOCATION = 10
+ZONES_PER_BUILDING = 20
+PAGE = 100
+STRATEGIES = ("memory-scan", "memory-bitmap", "sqlite")
+# Per device kind: tags and capabilities of even and odd devices of that kind.
+KINDS = (
+    ((["lighting"], ["dimmable"]), (["lighting"], [])),
+    ((["sensor"], ["sensor:temperature"]), (["sensor"], ["sensor:temperature", "sensor:humidity"])),
+    ((["hvac"], ["setpoint"]), (["hvac"], ["setpoint"])),
+    ((["plug"], ["metering"]), (["plug"], [])),
+)
+
+
+def _labels(index: int) -> Tuple[List[str], List[str]]:
+    return KINDS[index % 4][index // 4 % 2]
+
+
+def _zones():
+    for loc in range(LOCATIONS):
+        for b in range(BUILDINGS_PER_LOCATION):
+            for z in range(ZONES_PER_BUILDING):
+                yield f"l{loc}", f"l{loc}b{b}", f"l{loc}b{b}z{z}"
+
+
+def _populate_memory(provider, devices: int) -> List[Tuple[str, str, str]]:
+    per_zone = max(1, devices // (LOCATIONS * BUILDINGS_PER_LOCATION * ZONES_PER_BUILDING))
+    paths, locations, buildings = [], {}, {}
+    for loc, bld, zone in _zones():
+        if loc not in locations:
+            locations[loc] = provider.locations.create(loc).id
+        if bld not in buildings:
+            buildings[bld] = provider.buildings.create(bld, locations[loc]).id
+        zone_id = provider.zones.create(zone, buildings[bld]).id
+        paths.append((locations[loc], buildings[bld], zone_id))
+        for d in range(per_zone):
+            tags, capabilities = _labels(d)
+            provider.zone_devices.add(
+                Device(id=f"d{d}", name="Device", zone_id=zone_id, tags=tags, capabilities=capabilities)
+            )
+    return paths
+
+
+def _populate_sql(provider, devices: int) -> List[Tuple[str, str, str]]:
+    from sqlalchemy import insert
+
+    from backend.app.repositories.sqlalchemy import (
+        BuildingModel,
+        LocationModel,
+        ZoneDeviceLabelModel,
+        ZoneDeviceModel,
+        ZoneModel,
+    )
+
+    per_zone = max(1, devices // (LOCATIONS * BUILDINGS_PER_LOCATION * ZONES_PER_BUILDING))
+    now = datetime.now(timezone.utc)
+    paths = list(_zones())
+    with provider.engine.begin() as conn:
+        conn.execute(insert(LocationModel), [{"id": f"l{loc}", "name": f"l{loc}"} for loc in range(LOCATIONS)])
+        buildings = sorted({(loc, bld) for loc, bld, _ in paths})
+        conn.execute(
+            insert(BuildingModel),
+            [{"id": bld, "name": bld, "location_id": loc, "path": path_text((loc, bld))} for loc, bld in buildings],
+        )
+        conn.execute(
+            insert(ZoneModel),
+            [{"id": z, "name": z, "building_id": b, "path": path_text((loc, b, z))} for loc, b, z in paths],
+        )
+        ordinal = 0
+        for loc, bld, zone in paths:
+            rows, labels = [], []
+            for d in range(per_zone):
+                ordinal += 1
+                tags, capabilities = _labels(d)
+                path = path_text((loc, bld, zone, f"d{d}"))
+                rows.append(
+                    {
+                        "ordinal": ordinal,
+                        "zone_id": zone,
+                        "id": f"d{d}",
+                        "name": "Device",
+                        "created_at": now,
+                        "path": path,
+                        "tags": tags,
+                        "capabilities": capabilities,
+                    }
+                )
+                keys = [("tag", tag) for tag in tags] + [("capability", value) for value in capabilities]
+                labels += [{"kind": kind, "value": value, "path": path, "device": ordinal} for kind, value in keys]
+            conn.execute(insert(ZoneDeviceModel), rows)
+            conn.execute(insert(ZoneDeviceLabelModel), labels)
+    return paths
+
+
+def _queries(paths: List[Tuple[str, str, str]]) -> Dict[str, dict]:
+    location, building, zone = paths[len(paths) // 2]
+    return {
+        "dimmable-in-building": {
+            "path": (location, building),
+            "tags": ["lighting"],
+            "capabilities": ["dimmable"],
+            "exclude": [(location, building, zone)],
+        },
+        "sensors-in-location": {"path": (location,), "tags": [], "capabilities": ["sensor:temperature"], "exclude": []},
+        "lighting-in-location": {"path": (location,), "tags": ["lighting"], "capabilities": [], "exclude": []},
+    }
+
+
+def _scan(provider, query: dict) -> Tuple[List[Device], int]:
+    tags, capabilities = set(query["tags"]), set(query["capabilities"])
+    excluded = {path[-1] for path in query["exclude"]}
+    matched = [
+        device
+        for device in provider.zone_devices.list_under(query["path"])
+        if tags.issubset(device.tags) and capabilities.issubset(device.capabilities) and device.zone_id not in excluded
+    ]
+    return matched[:PAGE], len(matched)
+
+
+def _match(provider, query: dict) -> Tuple[List[Device], int]:
+    devices, count, _ = provider.zone_devices.match_under(
+        query["path"], query["tags"], query["capabilities"], query["exclude"], limit=PAGE
+    )
+    return devices, count
+
+
+def _time(call: Callable[[], Tuple[List[Device], int]], repeat: int) -> dict:
+    histogram = LatencyHistogram()
+    count = 0
+    for _ in range(repeat):
+        began = time.perf_counter_ns()
+        _, count = call()
+        histogram.record((time.perf_counter_ns() - began) // 1000)
+    return {"matches": count, **histogram.summary()}
+
+
+def _bitmap_bytes(repository) -> int:
+    bitmaps = list(repository._labels.values()) + list(repository._subtrees.values())
+    return sum(sys.getsizeof(container) for bitmap in bitmaps for container in bitmap._chunks.values())
+
+
+def run_case(strategy: str, devices: int, repeat: int) -> dict:
+    if strategy.startswith("memory"):
+        provider = create_in_memory_provider()
+        started = time.perf_counter()
+        paths = _populate_memory(provider, devices)
+        result = {"build_seconds": round(time.perf_counter() - started, 2)}
+        call = _scan if strategy == "memory-scan" else _match
+        result["bitmap_bytes"] = _bitmap_bytes(provider.zone_devices)
+        result["query_latency_us"] = {
+            name: _time(lambda: call(provider, query), repeat) for name, query in _queries(paths).items()
+        }
+        return result
+    with tempfile.TemporaryDirectory() as tmp:
+        provider = create_sqlite_provider(f"sqlite:///{Path(tmp) / 'labels.sqlite'}", SQLiteProfile())
+        try:
+            started = time.perf_counter()
+            paths = _populate_sql(provider, devices)
+            result = {"build_seconds": round(time.perf_counter() - started, 2)}
+            result["query_latency_us"] = {
+                name: _time(lambda: _match(provider, query), repeat) for name, query in _queries(paths).items()
+            }
+            return result
+        finally:
+            provider.close()
+
+
+def run(strategies: List[str], sizes: List[int], repeat: int) -> dict:
+    results: Dict[str, Dict[str, dict]] = {}
+    for strategy in strategies:
+        for devices in sizes:
+            results.setdefault(strategy, {})[str(devices)] = run_case(strategy, devices, repeat)
+    return {"repeat": repeat, "page": PAGE, "results": results}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategy", action="append", choices=STRATEGIES, dest="strategies")
+    parser.add_argument("--devices", action="append", type=int, dest="sizes")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", type=Path, help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    report = run(args.strategies or list(STRATEGIES), args.sizes or [1_000_000], args.repeat)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload)
+    print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""SQLite create throughput with many concurrent clients: one commit per write versus group commit.
+
+Examples::
+
+    python -m backend.benchmarks.group_commit
+    python -m backend.benchmarks.group_commit --clients 1 --clients 1000 --synchronous full --duration 10
+
+Every client is a thread that keeps calling ``provider.locations.create`` until the
+deadline, much like request threads in one worker. ``inline`` commits each create in
+its own transaction on the calling thread. ``group`` sends creates to the
+group-commit writer, which commits together whatever arrived within the batch
+window. Both runs use the same storage profile otherwise, so each commit is
+equally durable.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from backend.app.observability.metrics import sqlite_group_commit_batch_size
+from backend.app.repositories import create_sqlite_provider
+from backend.app.repositories.sqlite_profile import SQLiteProfile
+
+from .histogram import LatencyHistogram
+
+
+def _profile(commit: str, synchronous: str, window_ms: float) -> SQLiteProfile:
+    return dataclasses.replace(
+        SQLiteProfile(),
+        synchronous=synchronous,
+        group_commit_window_ms=window_ms if commit == "group" else None,
+    )
+
+
+def run_case(commit: str, clients: int, synchronous: str, window_ms: float, duration: float) -> dict:
+    batches = sqlite_group_commit_batch_size.labels()
+    _, batches_before, written_before = batches.snapshot()
+    with tempfile.TemporaryDirectory() as tmp:
+        profile = _profile(commit, synchronous, window_ms)
+        provider = create_sqlite_provider(f"sqlite:///{Path(tmp) / 'creates.sqlite'}", profile)
+        histograms: List[LatencyHistogram] = []
+        counts: List[int] = []
+        errors: List[int] = []
+        start = threading.Barrier(clients + 1)
+        deadline = 0.0
+
+        def client() -> None:
+            latency = LatencyHistogram()
+            created = failed = 0
+            start.wait()
+            while time.perf_counter() < deadline:
+                began = time.perf_counter_ns()
+                try:
+                    provider.locations.create("Bench Location")
+                    created += 1
+                except Exception:
+                    failed += 1
+                latency.record((time.perf_counter_ns() - began) // 1000)
+            histograms.append(latency)
+            counts.append(created)
+            errors.append(failed)
+
+        threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        began = time.perf_counter()
+        deadline = began + duration
+        start.wait()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        provider.close()
+    _, batches_after, written_after = batches.snapshot()
+    latency = LatencyHistogram()
+    for histogram in histograms:
+        latency.merge(histogram)
+    created = sum(counts)
+    commits = batches_after - batches_before if commit == "group" else created
+    return {
+        "creates": created,
+        "errors": sum(errors),
+        "creates_per_second": round(created / elapsed, 1),
+        "commits": commits,
+        "mean_batch": round((written_after - written_before) / commits, 1) if commit == "group" and commits else 1.0,
+        "latency_us": latency.summary(),
+    }
+
+
+def run(commits: List[str], client_counts: List[int], synchronous: str, window_ms: float, duration: float) -> dict:
+    results: Dict[str, Dict[str, dict]] = {}
+    for commit in commits:
+        for clients in client_counts:
+            results.setdefault(commit, {})[str(clients)] = run_case(commit, clients, synchronous, window_ms, duration)
+    return {"synchronous": synchronous, "window_ms": window_ms, "duration_seconds": duration, "results": results}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commit", action="append", choices=["inline", "group"], dest="commits")
+    parser.add_argument("--clients", action="append", type=int, dest="client_counts")
+    parser.add_argument("--synchronous", choices=["normal", "full"], default="normal")
+    parser.add_argument("--window-ms", type=float, default=SQLiteProfile.group_commit_window_ms)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--output", type=Path, help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.commits or ["inline", "group"],
+        args.client_counts or [1, 64, 1000],
+        args.synchronous,
+        args.window_ms,
+        args.duration,
+    )
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload)
+    print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""HDR-style latency histogram.
+
+Values are bucketed log-linearly: every power-of-two range is split into
+``2 ** significant_bits`` equal sub-buckets, so the relative error of any reported
+percentile is bounded (below 1% with the default 7 bits) whatever the magnitude,
+while memory grows only with the number of distinct buckets actually hit.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable
+
+
+class LatencyHistogram:
+    def __init__(self, significant_bits: int = 7) -> None:
+        self._bits = significant_bits
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def _bucket(self, value: int) -> int:
+        shift = value.bit_length() - self._bits
+        if shift <= 0:
+            return value
+        return (value >> shift) << shift
+
+    def record(self, value: int) -> None:
+        value = max(0, int(value))
+        bucket = self._bucket(value)
+        self._counts[bucket] = self._counts.get(bucket, 0) + 1
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: LatencyHistogram) -> None:
+        for bucket, count in other._counts.items():
+            self._counts[bucket] = self._counts.get(bucket, 0) + count
+        if other.count:
+            self.min = other.min if not self.count else min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def percentile(self, q: float) -> int:
+        if not self.count:
+            return 0
+        rank = max(1, round(q / 100 * self.count))
+        seen = 0
+        for bucket in sorted(self._counts):
+            seen += self._counts[bucket]
+            if seen >= rank:
+                return min(bucket, self.max)
+        return self.max
+
+    def summary(self, percentiles: Iterable[float] = (50, 90, 99, 99.9)) -> dict:
+        result = {
+            "count": self.count,
+            "min": self.min,
+            "mean": round(self.total / self.count, 1) if self.count else 0,
+            "max": self.max,
+        }
+        for q in percentiles:
+            result[f"p{q:g}".replace(".", "")] = self.percentile(q)
+        return result
+
+
+__all__ = ["LatencyHistogram"]
@@ -0,0 +1,309 @@
+"""Open-loop load generator for the FastAPI app.
+
+Requests are scheduled at a constant arrival rate and each operation's latency is
+measured from the moment it *should* have started, not from when the generator got
+round to sending it. A stalled server therefore shows up as queueing delay in the
+percentiles instead of silently lowering the offered load (coordinated omission).
+
+By default the app from ``backend.app.main`` is driven in-process through
+``httpx.ASGITransport``; pass ``--url`` to target a running server over real sockets.
+
+Examples::
+
+    python -m backend.benchmarks.load --scenario hierarchy_browse --rate 500 --duration 10
+    python -m backend.benchmarks.load --scenario login_storm --rate 50 --url http://127.0.0.1:8000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, List
+
+import httpx
+
+from .histogram import LatencyHistogram
+
+
+@dataclass
+class LoadRecorder:
+    routes: Dict[str, LatencyHistogram] = field(default_factory=dict)
+    operations: LatencyHistogram = field(default_factory=LatencyHistogram)
+    statuses: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+    late_starts: int = 0
+
+    def record_route(self, route: str, elapsed_ns: int, status: int | str) -> None:
+        histogram = self.routes.get(route)
+        if histogram is None:
+            histogram = self.routes[route] = LatencyHistogram()
+        histogram.record(elapsed_ns // 1000)
+        key = str(status)
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+
+
+class LoadClient:
+    """Thin wrapper over ``httpx.AsyncClient`` that records latency per route template."""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: LoadRecorder) -> None:
+        self._client = client
+        self._recorder = recorder
+
+    async def request(self, method: str, url: str, route: str | None = None, **kwargs) -> httpx.Response:
+        label = f"{method} {route or url}"
+        start = time.perf_counter_ns()
+        try:
+            response = await self._client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self._recorder.record_route(label, time.perf_counter_ns() - start, "error")
+            raise
+        self._recorder.record_route(label, time.perf_counter_ns() - start, response.status_code)
+        return response
+
+
+class Scenario:
+    name = ""
+
+    async def setup(self, client: LoadClient, rng: random.Random) -> None:
+        """Create whatever state the operation needs; not measured."""
+
+    async def operation(self, client: LoadClient, rng: random.Random) -> None:
+        raise NotImplementedError
+
+
+class LoginStorm(Scenario):
+    name = "login_storm"
+
+    def __init__(self, users: int = 20) -> None:
+        self._users = users
+        self._usernames: List[str] = []
+
+    async def setup(self, client: LoadClient, rng: random.Random) -> None:
+        run_id = rng.randrange(1 << 30)
+        for index in range(self._users):
+            username = f"load{run_id}u{index}"
+            await client.request(
+                "POST",
+                "/api/auth/register",
+                json={"username": username, "password": "load-secret", "email": f"{username}@example.com"},
+            )
+            self._usernames.append(username)
+
+    async def operation(self, client: LoadClient, rng: random.Random) -> None:
+        await client.request(
+            "POST",
+            "/api/auth/login",
+            data={"username": rng.choice(self._usernames), "password": "load-secret"},
+        )
+
+
+class HierarchyBrowse(Scenario):
+    name = "hierarchy_browse"
+
+    def __init__(self, buildings: int = 4, zones: int = 5, areas: int = 8) -> None:
+        self._shape = (buildings, zones, areas)
+        self._zones: List[tuple[str, str, str]] = []
+
+    async def setup(self, client: LoadClient, rng: random.Random) -> None:
+        buildings, zones, areas = self._shape
+        location = (await client.request("POST", "/api/v1/locations", json={"name": "Load HQ"})).json()
+        base = f"/api/v1/locations/{location['id']}/buildings"
+        for b_index in range(buildings):
+            building = (await client.request("POST", base, json={"name": f"Building {b_index}"})).json()
+            for z_index in range(zones):
+                zone = (
+                    await client.request("POST", f"{base}/{building['id']}/zones", json={"name": f"Floor {z_index}"})
+                ).json()
+                for a_index in range(areas):
+                    await client.request(
+                        "POST",
+                        f"{base}/{building['id']}/zones/{zone['id']}/areas",
+                        json={"name": f"Room {z_index}{a_index}"},
+                    )
+                self._zones.append((location["id"], building["id"], zone["id"]))
+
+    async def operation(self, client: LoadClient, rng: random.Random) -> None:
+        location_id, building_id, zone_id = rng.choice(self._zones)
+        await client.request("GET", f"/api/v1/locations/{location_id}", route="/api/v1/locations/{location_id}")
+        await client.request(
+            "GET",
+            f"/api/v1/locations/{location_id}/buildings",
+            route="/api/v1/locations/{location_id}/buildings",
+        )
+        await client.request(
+            "GET",
+            f"/api/v1/locations/{location_id}/buildings/{building_id}/zones",
+            route="/api/v1/locations/{location_id}/buildings/{building_id}/zones",
+        )
+        await client.request(
+            "GET",
+            f"/api/v1/locations/{location_id}/buildings/{building_id}/zones/{zone_id}/areas",
+            route="/api/v1/locations/{location_id}/buildings/{building_id}/zones/{zone_id}/areas",
+        )
+
+
+class DeviceRegistration(Scenario):
+    name = "device_registration"
+
+    def __init__(self) -> None:
+        self._ids = itertools.count()
+        self._run_id = 0
+
+    async def setup(self, client: LoadClient, rng: random.Random) -> None:
+        self._run_id = rng.randrange(1 << 30)
+
+    async def operation(self, client: LoadClient, rng: random.Random) -> None:
+        device_number = next(self._ids)
+        await client.request(
+            "POST",
+            "/api/devices",
+            headers={"Authorization": f"Bearer user_load{device_number % 100}"},
+            json={"device_id": f"load-{self._run_id}-{device_number}", "name": "Load Device"},
+        )
+
+
+class CommandFanOut(Scenario):
+    """Resolve every device in a zone and address each one concurrently.
+
+    The API has no command endpoint yet, so each per-device GET stands in for the
+    command dispatch; the shape (one list call fanning out to N parallel calls) is
+    what matters for tail latency.
+    """
+
+    name = "command_fanout"
+
+    def __init__(self, devices: int = 25) -> None:
+        self._devices = devices
+        self._zone_path = ""
+
+    async def setup(self, client: LoadClient, rng: random.Random) -> None:
+        location = (await client.request("POST", "/api/v1/locations", json={"name": "Fan-out Site"})).json()
+        base = f"/api/v1/locations/{location['id']}/buildings"
+        building = (await client.request("POST", base, json={"name": "Plant"})).json()
+        zone = (await client.request("POST", f"{base}/{building['id']}/zones", json={"name": "Line 1"})).json()
+        self._zone_path = f"{base}/{building['id']}/zones/{zone['id']}/devices"
+        for index in range(self._devices):
+            await client.request("POST", self._zone_path, json={"device_id": f"actuator-{index}", "name": "Actuator"})
+
+    async def operation(self, client: LoadClient, rng: random.Random) -> None:
+        route = "/api/v1/locations/{location_id}/buildings/{building_id}/zones/{zone_id}/devices"
+        devices = (await client.request("GET", self._zone_path, route=route)).json()
+        await asyncio.gather(
+            *(
+                client.request("GET", f"{self._zone_path}/{device['device_id']}", route=route + "/{device_id}")
+                for device in devices
+            )
+        )
+
+
+SCENARIOS: Dict[str, Callable[[], Scenario]] = {
+    LoginStorm.name: LoginStorm,
+    HierarchyBrowse.name: HierarchyBrowse,
+    DeviceRegistration.name: DeviceRegistration,
+    CommandFanOut.name: CommandFanOut,
+}
+
+
+@asynccontextmanager
+async def _http_client(url: str | None, max_connections: int) -> AsyncIterator[httpx.AsyncClient]:
+    if url:
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+            yield client
+        return
+
+    from backend.app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=30) as client:
+            yield client
+
+
+async def run_open_loop(
+    operation: Callable[[], Awaitable[None]],
+    rate: float,
+    duration: float,
+    recorder: LoadRecorder,
+) -> float:
+    """Start ``operation`` every ``1 / rate`` seconds for ``duration`` seconds."""
+    interval = 1.0 / rate
+    total = int(rate * duration)
+    loop = asyncio.get_running_loop()
+    pending: set[asyncio.Task] = set()
+
+    async def timed(intended_start: float) -> None:
+        try:
+            await operation()
+        except Exception:
+            recorder.errors += 1
+        recorder.operations.record(int((loop.time() - intended_start) * 1_000_000))
+
+    started = loop.time()
+    for index in range(total):
+        intended_start = started + index * interval
+        delay = intended_start - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        elif delay < -interval:
+            recorder.late_starts += 1
+        task = asyncio.create_task(timed(intended_start))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.gather(*pending)
+    return loop.time() - started
+
+
+async def run(
+    scenario_name: str,
+    rate: float,
+    duration: float,
+    url: str | None = None,
+    seed: int = 7,
+    max_connections: int = 200,
+) -> dict:
+    scenario = SCENARIOS[scenario_name]()
+    rng = random.Random(seed)
+    async with _http_client(url, max_connections) as http:
+        await scenario.setup(LoadClient(http, LoadRecorder()), rng)
+        recorder = LoadRecorder()
+        client = LoadClient(http, recorder)
+        elapsed = await run_open_loop(lambda: scenario.operation(client, rng), rate, duration, recorder)
+    return {
+        "scenario": scenario_name,
+        "target": url or "asgi",
+        "offered_rate": rate,
+        "achieved_rate": round(recorder.operations.count / elapsed, 1) if elapsed else 0,
+        "duration_seconds": round(elapsed, 3),
+        "errors": recorder.errors,
+        "late_starts": recorder.late_starts,
+        "statuses": recorder.statuses,
+        "operation_latency_us": recorder.operations.summary(),
+        "route_latency_us": {route: hist.summary() for route, hist in sorted(recorder.routes.items())},
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="hierarchy_browse")
+    parser.add_argument("--rate", type=float, default=200.0, help="operations started per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of scheduled load")
+    parser.add_argument("--url", help="base URL of a running server; omit to drive the app in-process")
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    report = asyncio.run(run(args.scenario, args.rate, args.duration, args.url, args.seed, args.max_connections))
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""Bytes-per-entity comparison of the legacy and compact in-memory representations.
+
+Run with ``python -m backend.benchmarks.memory_footprint --count 100000``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, List
+from uuid import uuid4
+
+from backend.app.models import Device
+from backend.app.repositories.memory import (
+    InMemoryAreaRepository,
+    InMemoryBuildingRepository,
+    InMemoryDataStore,
+    InMemoryLocationRepository,
+    InMemoryZoneRepository,
+)
+from backend.app.repositories.zone_device_repository import InMemoryZoneDeviceRepository
+
+
+@dataclass
+class LegacyArea:
+    id: str
+    name: str
+    zone_id: str
+
+
+@dataclass
+class LegacyZone:
+    id: str
+    name: str
+    building_id: str
+    areas: List[LegacyArea] = field(default_factory=list)
+
+
+def _measure(build: Callable[[], object], count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    retained = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del retained
+    return allocated / count
+
+
+def _legacy_areas(count: int, zones: int) -> Callable[[], object]:
+    def build() -> object:
+        zone_ids = [str(uuid4()) for _ in range(zones)]
+        store = {zone_id: LegacyZone(id=zone_id, name="Zone", building_id=str(uuid4())) for zone_id in zone_ids}
+        areas = {}
+        for index in range(count):
+            # Path parameters arrive as fresh strings per request, so each area held its own copy.
+            zone_id = "".join(zone_ids[index % zones])
+            area = LegacyArea(id=str(uuid4()), name=f"Area {index}", zone_id=zone_id)
+            areas[area.id] = area
+            store[zone_ids[index % zones]].areas.append(area)
+        return store, areas
+
+    return build
+
+
+def _compact_areas(count: int, zones: int) -> Callable[[], object]:
+    def build() -> object:
+        data = InMemoryDataStore()
+        location = InMemoryLocationRepository(data).create("Site")
+        building = InMemoryBuildingRepository(data).create("Tower", location.id)
+        zone_repo = InMemoryZoneRepository(data)
+        zone_ids = [zone_repo.create("Zone", building.id).id for _ in range(zones)]
+        area_repo = InMemoryAreaRepository(data)
+        for index in range(count):
+            area_repo.create(f"Area {index}", "".join(zone_ids[index % zones]))
+        return data
+
+    return build
+
+
+def _legacy_devices(count: int, zones: int) -> Callable[[], object]:
+    def build() -> object:
+        zone_ids = [str(uuid4()) for _ in range(zones)]
+        devices: dict[str, dict[str, Device]] = {}
+        for index in range(count):
+            zone_id = "".join(zone_ids[index % zones])
+            device = Device(id=f"dev-{index}", name=f"Device {index}", zone_id=zone_id)
+            devices.setdefault(zone_id, {})[device.id] = device
+        return devices
+
+    return build
+
+
+def _compact_devices(count: int, zones: int) -> Callable[[], object]:
+    def build() -> object:
+        zone_ids = [str(uuid4()) for _ in range(zones)]
+        repo = InMemoryZoneDeviceRepository()
+        for index in range(count):
+            zone_id = "".join(zone_ids[index % zones])
+            repo.add(Device(id=f"dev-{index}", name=f"Device {index}", zone_id=zone_id))
+        return repo
+
+    return build
+
+
+def run(count: int, zones: int) -> dict:
+    return {
+        "count": count,
+        "zones": zones,
+        "area_bytes": {
+            "legacy": round(_measure(_legacy_areas(count, zones), count), 1),
+            "compact": round(_measure(_compact_areas(count, zones), count), 1),
+        },
+        "device_bytes": {
+            "legacy": round(_measure(_legacy_devices(count, zones), count), 1),
+            "compact": round(_measure(_compact_devices(count, zones), count), 1),
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--zones", type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(run(args.count, args.zones), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Deterministic synthetic building portfolios for benchmarks.
+
+A portfolio mirrors the API hierarchy: locations -> buildings -> zones -> areas, with
+devices attached to zones. Per-parent fan-out varies around the configured mean so
+that trees look like real campuses rather than perfect grids, but the same seed always
+yields the same portfolio.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from typing import List
+
+from backend.app.models import Device
+from backend.app.repositories.base import RepositoryProvider
+
+_SITE_NAMES = ["HQ", "Campus", "Plant", "Depot", "Clinic", "Office Park", "Residence", "Lab"]
+_BUILDING_NAMES = ["North Tower", "South Tower", "Annex", "Main Hall", "Warehouse", "Block"]
+_ZONE_NAMES = ["Ground Floor", "Floor", "Basement", "Roof", "Wing"]
+_AREA_NAMES = ["Meeting Room", "Office", "Kitchen", "Lobby", "Storage", "Lab", "Restroom", "Server Room"]
+_DEVICE_NAMES = ["Ceiling Light", "Thermostat", "Motion Sensor", "Door Lock", "Smart Plug", "CO2 Sensor"]
+
+
+@dataclass(frozen=True)
+class PortfolioSpec:
+    locations: int = 5
+    buildings_per_location: int = 4
+    zones_per_building: int = 5
+    areas_per_zone: int = 8
+    devices_per_zone: int = 6
+    seed: int = 1234
+
+    @classmethod
+    def scaled(cls, scale: float, seed: int = 1234) -> PortfolioSpec:
+        base = cls(seed=seed)
+        return cls(
+            locations=max(1, round(base.locations * scale)),
+            buildings_per_location=base.buildings_per_location,
+            zones_per_building=base.zones_per_building,
+            areas_per_zone=base.areas_per_zone,
+            devices_per_zone=base.devices_per_zone,
+            seed=seed,
+        )
+
+
+@dataclass
+class ZonePlan:
+    name: str
+    areas: List[str] = field(default_factory=list)
+    devices: List[tuple[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class BuildingPlan:
+    name: str
+    zones: List[ZonePlan] = field(default_factory=list)
+
+
+@dataclass
+class LocationPlan:
+    name: str
+    buildings: List[BuildingPlan] = field(default_factory=list)
+
+
+@dataclass
+class Portfolio:
+    spec: PortfolioSpec
+    locations: List[LocationPlan]
+
+    def counts(self) -> dict[str, int]:
+        buildings = [b for loc in self.locations for b in loc.buildings]
+        zones = [z for b in buildings for z in b.zones]
+        return {
+            "locations": len(self.locations),
+            "buildings": len(buildings),
+            "zones": len(zones),
+            "areas": sum(len(z.areas) for z in zones),
+            "devices": sum(len(z.devices) for z in zones),
+        }
+
+
+@dataclass
+class PopulatedPortfolio:
+    location_ids: List[str] = field(default_factory=list)
+    building_ids: List[str] = field(default_factory=list)
+    zone_ids: List[str] = field(default_factory=list)
+    area_ids: List[str] = field(default_factory=list)
+    devices: List[tuple[str, str]] = field(default_factory=list)
+
+
+def _fan_out(rng: random.Random, mean: int) -> int:
+    if mean <= 1:
+        return mean
+    return max(1, round(rng.gauss(mean, mean / 4)))
+
+
+def generate(spec: PortfolioSpec) -> Portfolio:
+    rng = random.Random(spec.seed)
+    device_counter = 0
+    locations: List[LocationPlan] = []
+    for loc_index in range(spec.locations):
+        location = LocationPlan(name=f"{rng.choice(_SITE_NAMES)} {loc_index + 1}")
+        for b_index in range(_fan_out(rng, spec.buildings_per_location)):
+            building = BuildingPlan(name=f"{rng.choice(_BUILDING_NAMES)} {chr(ord('A') + b_index % 26)}")
+            for z_index in range(_fan_out(rng, spec.zones_per_building)):
+                zone = ZonePlan(name=f"{rng.choice(_ZONE_NAMES)} {z_index}")
+                for a_index in range(_fan_out(rng, spec.areas_per_zone)):
+                    zone.areas.append(f"{rng.choice(_AREA_NAMES)} {z_index}{chr(ord('A') + a_index % 26)}")
+                for _ in range(_fan_out(rng, spec.devices_per_zone)):
+                    device_counter += 1
+                    zone.devices.append((f"dev-{device_counter:08d}", rng.choice(_DEVICE_NAMES)))
+                building.zones.append(zone)
+            location.buildings.append(building)
+        locations.append(location)
+    return Portfolio(spec=spec, locations=locations)
+
+
+def populate(provider: RepositoryProvider, portfolio: Portfolio) -> PopulatedPortfolio:
+    populated = PopulatedPortfolio()
+    for location_plan in portfolio.locations:
+        location = provider.locations.create(location_plan.name)
+        populated.location_ids.append(location.id)
+        for building_plan in location_plan.buildings:
+            building = provider.buildings.create(building_plan.name, location.id)
+            populated.building_ids.append(building.id)
+            for zone_plan in building_plan.zones:
+                zone = provider.zones.create(zone_plan.name, building.id)
+                populated.zone_ids.append(zone.id)
+                for area_name in zone_plan.areas:
+                    populated.area_ids.append(provider.areas.create(area_name, zone.id).id)
+                for device_id, device_name in zone_plan.devices:
+                    provider.zone_devices.add(Device(id=device_id, name=device_name, zone_id=zone.id))
+                    populated.devices.append((zone.id, device_id))
+    return populated
+
+
+__all__ = ["Portfolio", "PortfolioSpec", "PopulatedPortfolio", "generate", "populate"]
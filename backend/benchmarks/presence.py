@@ -0,0 +1,201 @@
+"""Presence expiry for a million heartbeating devices: a timing wheel versus a per-tick scan.
+
+Examples::
+
+    python -m backend.benchmarks.presence
+    python -m backend.benchmarks.presence --devices 100000 --strategy wheel --seconds 300
+
+The run simulates ``--seconds`` of a fleet of ``--devices`` spread over zones of
+50 devices. Each device heartbeats every ``--interval`` seconds at its own phase,
+so 1/30 of the fleet heartbeats in every second by default. A ``--dropout``
+fraction of devices goes silent at a point spread over the run and should expire
+``--timeout`` seconds later. The clock is simulated, so a run takes as long as
+its work, not ``--seconds``.
+
+Every simulated second the strategy first expires due devices (timed as one tick)
+and then takes that second's heartbeats (timed per batch and reported per
+heartbeat). At the end, both strategies report their online count next to the
+expected one: every device minus those silent for longer than the timeout.
+
+Strategies:
+
+* ``wheel``: ``PresenceTracker``, whose tick pops only the wheel slots that fell due;
+* ``scan``: last-seen times in a dict, with every tick scanning all of them for
+  expired devices, the approach the wheel replaces.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from backend.app.presence import Key, PresenceTracker
+
+from .histogram import LatencyHistogram
+
+STRATEGIES = ("wheel", "scan")
+ZONE_SIZE = 50
+
+
+class SimulatedClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ScanPresence:
+    """Last-seen times with per-zone counts; each tick scans every online device."""
+
+    def __init__(self, timeout_seconds: float, clock: SimulatedClock) -> None:
+        self.timeout_seconds = timeout_seconds
+        self._clock = clock
+        self._seen: Dict[Key, float] = {}
+        self._online: Dict[str, int] = {}
+
+    def heartbeat(self, key: Key) -> None:
+        if key not in self._seen:
+            self._online[key[0]] = self._online.get(key[0], 0) + 1
+        self._seen[key] = self._clock()
+
+    def advance(self) -> int:
+        cutoff = self._clock() - self.timeout_seconds
+        expired = [key for key, seen in self._seen.items() if seen <= cutoff]
+        for key in expired:
+            del self._seen[key]
+            self._online[key[0]] -= 1
+        return len(expired)
+
+    def counts(self) -> dict[str, int]:
+        return {"online": len(self._seen)}
+
+
+def _build(strategy: str, timeout: float, clock: SimulatedClock):
+    if strategy == "wheel":
+        return PresenceTracker(timeout, 1.0, clock)
+    return ScanPresence(timeout, clock)
+
+
+def _fleet(devices: int) -> List[Key]:
+    return [(f"z{index // ZONE_SIZE}", f"d{index}") for index in range(devices)]
+
+
+def _silent_from(devices: int, dropout: float, seconds: int) -> Dict[int, int]:
+    """Device index -> the simulated second it stops heartbeating, for the dropped devices."""
+    if dropout <= 0:
+        return {}
+    step = max(1, round(1 / dropout))
+    return {index: index * 7919 % seconds for index in range(0, devices, step)}
+
+
+def _online_at_end(index: int, stopped: int, seconds: int, interval: int, timeout: float) -> bool:
+    """Whether a device silent from ``stopped`` on is still within the timeout of its last heartbeat."""
+    phase = index % interval
+    if stopped <= phase:
+        return False  # never heartbeated
+    last = phase + (stopped - 1 - phase) // interval * interval
+    return last + timeout > seconds
+
+
+def _memory_bytes(strategy: str, keys: List[Key], timeout: float) -> int:
+    clock = SimulatedClock()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        presence = _build(strategy, timeout, clock)
+        for key in keys:
+            presence.heartbeat(key)
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(strategy: str, devices: int, seconds: int, interval: int, timeout: float, dropout: float) -> dict:
+    keys = _fleet(devices)
+    silent = _silent_from(devices, dropout, seconds)
+    clock = SimulatedClock()
+    presence = _build(strategy, timeout, clock)
+    ticks = LatencyHistogram()
+    heartbeats, heartbeat_ns, expired, busiest = 0, 0, 0, 0
+    for second in range(seconds):
+        clock.now = float(second)
+        began = time.perf_counter_ns()
+        due = presence.advance()
+        ticks.record((time.perf_counter_ns() - began) // 1000)
+        expired += due
+        busiest = max(busiest, due)
+        batch: List[Tuple[str, str]] = [
+            keys[index]
+            for index in range(second % interval, devices, interval)
+            if silent.get(index, seconds) > second
+        ]
+        began = time.perf_counter_ns()
+        for key in batch:
+            presence.heartbeat(key)
+        heartbeat_ns += time.perf_counter_ns() - began
+        heartbeats += len(batch)
+    clock.now = float(seconds)
+    presence.advance()
+    offline = sum(not _online_at_end(index, stopped, seconds, interval, timeout) for index, stopped in silent.items())
+    return {
+        "heartbeats": heartbeats,
+        "heartbeat_ns": round(heartbeat_ns / max(heartbeats, 1)),
+        "expired": expired,
+        "max_expired_per_tick": busiest,
+        "online": presence.counts()["online"],
+        "online_expected": devices - offline,
+        "memory_bytes": _memory_bytes(strategy, keys, timeout),
+        "tick_latency_us": ticks.summary(),
+    }
+
+
+def run(strategies: List[str], sizes: List[int], seconds: int, interval: int, timeout: float, dropout: float) -> dict:
+    results: Dict[str, Dict[str, dict]] = {}
+    for strategy in strategies:
+        for devices in sizes:
+            results.setdefault(strategy, {})[str(devices)] = run_case(
+                strategy, devices, seconds, interval, timeout, dropout
+            )
+    return {
+        "seconds": seconds,
+        "interval_seconds": interval,
+        "timeout_seconds": timeout,
+        "dropout": dropout,
+        "results": results,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategy", action="append", choices=STRATEGIES, dest="strategies")
+    parser.add_argument("--devices", action="append", type=int, dest="sizes")
+    parser.add_argument("--seconds", type=int, default=180, help="simulated seconds to run")
+    parser.add_argument("--interval", type=int, default=30, help="seconds between a device's heartbeats")
+    parser.add_argument("--timeout", type=float, default=90.0, help="presence timeout in seconds")
+    parser.add_argument("--dropout", type=float, default=0.01, help="fraction of devices that go silent")
+    parser.add_argument("--output", type=Path, help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.strategies or list(STRATEGIES),
+        args.sizes or [1_000_000],
+        args.seconds,
+        args.interval,
+        args.timeout,
+        args.dropout,
+    )
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload)
+    print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
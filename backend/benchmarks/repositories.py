@@ -0,0 +1,234 @@
+"""Time every ``RepositoryProvider`` operation on the memory and SQLite backends.
+
+Examples::
+
+    python -m backend.benchmarks.repositories --scale 1 --output bench.json
+    python -m backend.benchmarks.repositories --baseline bench.json --tolerance 0.25
+
+With ``--baseline`` the run exits non-zero when any operation's median is slower than
+the stored median by more than the tolerance.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List
+
+from backend.app.domain.entities import Area, Building, Location, Zone
+from backend.app.models import Device
+from backend.app.repositories import create_in_memory_provider, create_sqlite_provider
+from backend.app.repositories.base import RepositoryProvider
+
+from .portfolio import PopulatedPortfolio, PortfolioSpec, generate, populate
+
+Operation = Callable[[], Callable[[], object]]
+
+
+def _operations(provider: RepositoryProvider, ids: PopulatedPortfolio, rng: random.Random) -> Dict[str, Operation]:
+    """Each entry prepares one iteration (untimed) and returns the call to time."""
+    counter = iter(range(10**9))
+
+    def pick(values: List[str]) -> str:
+        return rng.choice(values)
+
+    def fresh_location() -> str:
+        return provider.locations.create(f"Bench Location {next(counter)}").id
+
+    def fresh_building() -> str:
+        return provider.buildings.create(f"Bench Building {next(counter)}", pick(ids.location_ids)).id
+
+    def fresh_zone() -> str:
+        return provider.zones.create(f"Bench Zone {next(counter)}", pick(ids.building_ids)).id
+
+    def fresh_area() -> str:
+        return provider.areas.create(f"Bench Area {next(counter)}", pick(ids.zone_ids)).id
+
+    def fresh_device() -> tuple[str, str]:
+        zone_id = pick(ids.zone_ids)
+        device_id = f"bench-{next(counter)}"
+        provider.zone_devices.add(Device(id=device_id, name="Bench Device", zone_id=zone_id))
+        return zone_id, device_id
+
+    def renamed_location() -> Location:
+        location = provider.locations.get(pick(ids.location_ids))
+        return Location(id=location.id, name=f"Renamed {next(counter)}", buildings=location.buildings)
+
+    def renamed_building() -> Building:
+        building = provider.buildings.get(pick(ids.building_ids))
+        return Building(id=building.id, name=f"Renamed {next(counter)}", location_id=building.location_id, zones=building.zones)
+
+    def renamed_zone() -> Zone:
+        zone = provider.zones.get(pick(ids.zone_ids))
+        return Zone(id=zone.id, name=f"Renamed {next(counter)}", building_id=zone.building_id, areas=zone.areas)
+
+    def renamed_area() -> Area:
+        area = provider.areas.get(pick(ids.area_ids))
+        return Area(id=area.id, name=f"Renamed {next(counter)}", zone_id=area.zone_id)
+
+    def with_arg(prepare: Callable[[], object], call: Callable[[object], object]) -> Operation:
+        def setup() -> Callable[[], object]:
+            value = prepare()
+            return lambda: call(value)
+
+        return setup
+
+    def device_call(call: Callable[[str, str], object]) -> Operation:
+        return with_arg(fresh_device, lambda key: call(*key))
+
+    return {
+        "locations.create": lambda: lambda: provider.locations.create("Bench Location"),
+        "locations.get": with_arg(lambda: pick(ids.location_ids), provider.locations.get),
+        "locations.list": lambda: provider.locations.list,
+        "locations.update": with_arg(renamed_location, provider.locations.update),
+        "locations.delete": with_arg(fresh_location, provider.locations.delete),
+        "buildings.create": with_arg(lambda: pick(ids.location_ids), lambda loc: provider.buildings.create("Bench", loc)),
+        "buildings.get": with_arg(lambda: pick(ids.building_ids), provider.buildings.get),
+        "buildings.list_for_location": with_arg(lambda: pick(ids.location_ids), provider.buildings.list_for_location),
+        "buildings.update": with_arg(renamed_building, provider.buildings.update),
+        "buildings.delete": with_arg(fresh_building, provider.buildings.delete),
+        "zones.create": with_arg(lambda: pick(ids.building_ids), lambda b: provider.zones.create("Bench", b)),
+        "zones.get": with_arg(lambda: pick(ids.zone_ids), provider.zones.get),
+        "zones.list_for_building": with_arg(lambda: pick(ids.building_ids), provider.zones.list_for_building),
+        "zones.update": with_arg(renamed_zone, provider.zones.update),
+        "zones.delete": with_arg(fresh_zone, provider.zones.delete),
+        "areas.create": with_arg(lambda: pick(ids.zone_ids), lambda z: provider.areas.create("Bench", z)),
+        "areas.get": with_arg(lambda: pick(ids.area_ids), provider.areas.get),
+        "areas.list_for_zone": with_arg(lambda: pick(ids.zone_ids), provider.areas.list_for_zone),
+        "areas.update": with_arg(renamed_area, provider.areas.update),
+        "areas.delete": with_arg(fresh_area, provider.areas.delete),
+        "zone_devices.add": with_arg(
+            lambda: Device(id=f"bench-add-{next(counter)}", name="Bench", zone_id=pick(ids.zone_ids)),
+            provider.zone_devices.add,
+        ),
+        "zone_devices.get": with_arg(lambda: rng.choice(ids.devices), lambda key: provider.zone_devices.get(*key)),
+        "zone_devices.list_by_zone": with_arg(lambda: pick(ids.zone_ids), provider.zone_devices.list_by_zone),
+        "zone_devices.delete": device_call(provider.zone_devices.delete),
+        "zone_devices.delete_by_zone": with_arg(fresh_zone, provider.zone_devices.delete_by_zone),
+    }
+
+
+def _summarize(samples_ns: List[int]) -> dict:
+    ordered = sorted(samples_ns)
+
+    def pct(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] / 1000
+
+    mean_us = statistics.fmean(ordered) / 1000
+    return {
+        "iterations": len(ordered),
+        "mean_us": round(mean_us, 2),
+        "p50_us": round(pct(0.50), 2),
+        "p95_us": round(pct(0.95), 2),
+        "p99_us": round(pct(0.99), 2),
+        "ops_per_sec": round(1_000_000 / mean_us, 1) if mean_us else None,
+    }
+
+
+def bench_provider(
+    provider: RepositoryProvider,
+    spec: PortfolioSpec,
+    iterations: int,
+    only: Iterable[str] | None = None,
+) -> dict:
+    portfolio = generate(spec)
+    started = time.perf_counter()
+    ids = populate(provider, portfolio)
+    populate_seconds = time.perf_counter() - started
+    rng = random.Random(spec.seed)
+    results: dict = {}
+    for name, setup in _operations(provider, ids, rng).items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        samples: List[int] = []
+        for _ in range(iterations):
+            call = setup()
+            start = time.perf_counter_ns()
+            call()
+            samples.append(time.perf_counter_ns() - start)
+        results[name] = _summarize(samples)
+    return {"populate_seconds": round(populate_seconds, 3), "counts": portfolio.counts(), "operations": results}
+
+
+def _providers(backends: Iterable[str], workdir: Path) -> Dict[str, Callable[[], RepositoryProvider]]:
+    factories: Dict[str, Callable[[], RepositoryProvider]] = {
+        "memory": create_in_memory_provider,
+        "sqlite": lambda: create_sqlite_provider(f"sqlite:///{workdir / 'bench.sqlite'}"),
+    }
+    return {name: factories[name] for name in backends}
+
+
+def run(spec: PortfolioSpec, iterations: int, backends: Iterable[str], only: Iterable[str] | None = None) -> dict:
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "spec": spec.__dict__,
+            "iterations": iterations,
+        },
+        "backends": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, factory in _providers(backends, Path(tmp)).items():
+            report["backends"][name] = bench_provider(factory(), spec, iterations, only)
+    return report
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[dict]:
+    """Return operations whose p50 regressed by more than ``tolerance`` (0.25 = 25%)."""
+    regressions = []
+    for backend, result in current["backends"].items():
+        base_ops = baseline.get("backends", {}).get(backend, {}).get("operations", {})
+        for name, stats in result["operations"].items():
+            base = base_ops.get(name)
+            if not base or not base["p50_us"]:
+                continue
+            ratio = stats["p50_us"] / base["p50_us"]
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    {
+                        "backend": backend,
+                        "operation": name,
+                        "baseline_p50_us": base["p50_us"],
+                        "current_p50_us": stats["p50_us"],
+                        "ratio": round(ratio, 2),
+                    }
+                )
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier on the default portfolio size")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--backend", action="append", choices=["memory", "sqlite"], dest="backends")
+    parser.add_argument("--only", action="append", help="operation name prefix, e.g. 'zones.' (repeatable)")
+    parser.add_argument("--output", type=Path, help="write the JSON report to this path")
+    parser.add_argument("--baseline", type=Path, help="compare against a previously stored report")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    spec = PortfolioSpec.scaled(args.scale, seed=args.seed)
+    report = run(spec, args.iterations, args.backends or ["memory", "sqlite"], args.only)
+    exit_code = 0
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        report["regressions"] = regressions
+        exit_code = 1 if regressions else 0
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload)
+    print(payload)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Refresh-token revocation checks with a large revoked set: Bloom filter versus storage.
+
+Examples::
+
+    python -m backend.benchmarks.revocation
+    python -m backend.benchmarks.revocation --revoked 1000000 --refreshes 5000 --output revocation.json
+
+Fills a SQLite user store with ``--revoked`` random ids, loads the revocation
+Bloom filter from it, then measures:
+
+* ``check``: revocation checks for ids that are not revoked (the common case) through
+  the filter, versus a primary-key lookup in the store for every check;
+* ``refresh``: the full refresh path (JWT decode, family check, marking the token
+  used, minting two tokens), with the family check through each of the two.
+
+It also reports the filter's size and its observed false-positive rate.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import secrets
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from backend.app.auth import create_access_token, create_refresh_token, decode_token
+from backend.app.revocation import RevocationList
+from backend.app.user_repository import SQLiteUserRepository
+
+
+def fill_store(store: SQLiteUserRepository, count: int, batch: int = 100_000) -> None:
+    expires_at = time.time() + 14 * 86400
+    conn = store._connect()
+    try:
+        for start in range(0, count, batch):
+            rows = ((secrets.token_hex(8), expires_at) for _ in range(min(batch, count - start)))
+            conn.executemany("INSERT OR IGNORE INTO revoked_tokens (token_id, expires_at) VALUES (?, ?)", rows)
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def _rate(operation: Callable[[str], object], ids: List[str]) -> float:
+    started = time.perf_counter()
+    for token_id in ids:
+        operation(token_id)
+    return round(len(ids) / (time.perf_counter() - started), 1)
+
+
+def run(revoked: int, checks: int, refreshes: int, error_rate: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteUserRepository(Path(tmp) / "users.db")
+        started = time.perf_counter()
+        fill_store(store, revoked)
+        fill_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        revocations = RevocationList(store, capacity=revoked, error_rate=error_rate)
+        load_seconds = time.perf_counter() - started
+
+        live = [secrets.token_hex(8) for _ in range(checks)]
+        false_positives = sum(token_id in revocations._bloom for token_id in live)
+        check = {
+            "bloom_per_second": _rate(revocations.is_revoked, live),
+            "storage_per_second": _rate(store.is_token_revoked, live),
+        }
+
+        def refresh_with(is_revoked: Callable[[str], bool]) -> Callable[[str], object]:
+            def refresh(token: str) -> str:
+                payload = decode_token(token)
+                if is_revoked(payload["fam"]) or not store.spend_token(payload["jti"], payload["exp"]):
+                    raise RuntimeError("unexpected revocation")
+                create_access_token(payload["sub"])
+                return create_refresh_token(payload["sub"], payload["fam"])
+
+            return refresh
+
+        refresh = {}
+        for name, is_revoked in (("bloom", revocations.is_revoked), ("storage", store.is_token_revoked)):
+            tokens = [create_refresh_token("bench-user") for _ in range(refreshes)]
+            refresh[f"{name}_per_second"] = _rate(refresh_with(is_revoked), tokens)
+
+    return {
+        "revoked_ids": revoked,
+        "fill_seconds": round(fill_seconds, 2),
+        "bloom_load_seconds": round(load_seconds, 2),
+        "bloom_bytes": revocations.counts()["bloom_bytes"],
+        "bloom_hashes": revocations._bloom.hashes,
+        "target_false_positive_rate": error_rate,
+        "observed_false_positive_rate": round(false_positives / checks, 5),
+        "check": check,
+        "refresh": refresh,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--revoked", type=int, default=10_000_000)
+    parser.add_argument("--checks", type=int, default=100_000)
+    parser.add_argument("--refreshes", type=int, default=5_000)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--output", type=Path, help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    report = run(args.revoked, args.checks, args.refreshes, args.error_rate)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload)
+    print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""Name search latency over a million hierarchy names: SQLite FTS5 versus the in-memory index.
+
+Examples::
+
+    python -m backend.benchmarks.search
+    python -m backend.benchmarks.search --names 100000 --backend memory --repeat 50
+
+The portfolio has 10 buildings per location ("Building 7"), 20 floors per
+building ("Floor 12") and 10 rooms per floor drawn from 20 room types with a
+floor-and-letter suffix ("Meeting Room 12C"). Each query in ``QUERIES`` runs
+``--repeat`` times through the backend's ``search`` and reports its latency and
+hit count. Queries range from narrow ("meeting room 12c") to a one-letter
+prefix that matches most of the portfolio.
+
+Index maintenance is timed too: the whole build, then ``--repeat`` single
+insert, rename and delete operations on the populated index.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from backend.app.repositories.path_index import path_text
+from backend.app.repositories.search_index import InMemorySearchIndex
+from backend.app.repositories.sqlite_profile import SQLiteProfile
+
+from .histogram import LatencyHistogram
+
+BACKENDS = ("memory", "sqlite")
+ROOM_TYPES = (
+    "Meeting Room", "Office", "Kitchen", "Lab", "Storage", "Conference Room", "Lobby", "Restroom", "Server Room",
+    "Break Room", "Open Space", "Phone Booth", "Workshop", "Classroom", "Gym", "Library", "Reception", "Copy Room",
+    "Lounge", "Studio",
+)  # fmt: skip
+QUERIES = (
+    "meeting room 12c",
+    "server room 3",
+    "conference room",
+    "kitchen 7",
+    "floor 12",
+    "building 4",
+    "lib",
+    "m",
+)
+_NODES_PER_LOCATION = 1 + 10 * (1 + 20 * (1 + 10))
+
+
+def _portfolio(names: int, seed: int = 1) -> Iterator[Tuple[Tuple[str, ...], str]]:
+    rng = random.Random(seed)
+    for loc in range(max(1, names // _NODES_PER_LOCATION)):
+        location = (f"l{loc}",)
+        yield location, f"Campus {loc}"
+        for b in range(10):
+            building = location + (f"l{loc}b{b}",)
+            yield building, f"Building {b}"
+            for floor in range(1, 21):
+                zone = building + (f"{building[-1]}f{floor}",)
+                yield zone, f"Floor {floor}"
+                for room in range(10):
+                    suffix = f"{floor}{rng.choice('ABCDEFGH')}"
+                    yield zone + (f"{zone[-1]}r{room}",), f"{rng.choice(ROOM_TYPES)} {suffix}"
+
+
+def _memory(names: int) -> Tuple[object, float, Callable[[Tuple[str, ...], str], None], Callable]:
+    index = InMemorySearchIndex()
+    started = time.perf_counter()
+    for path, name in _portfolio(names):
+        index.add(path, name)
+    return index, time.perf_counter() - started, index.add, index.discard
+
+
+def _sqlite(names: int, tmp: str):
+    from sqlalchemy import delete, insert, update
+
+    from backend.app.repositories import create_sqlite_provider
+    from backend.app.repositories.sqlalchemy import SearchNodeModel, search_words
+
+    provider = create_sqlite_provider(f"sqlite:///{Path(tmp) / 'search.sqlite'}", SQLiteProfile())
+    started = time.perf_counter()
+    batch: List[dict] = []
+    with provider.engine.begin() as conn:
+        for path, name in _portfolio(names):
+            batch.append({"path": path_text(path), "name": name, "words": search_words(name)})
+            if len(batch) == 50_000:
+                conn.execute(insert(SearchNodeModel), batch)
+                batch.clear()
+        if batch:
+            conn.execute(insert(SearchNodeModel), batch)
+    build = time.perf_counter() - started
+
+    def add(path: Tuple[str, ...], name: str) -> None:
+        with provider.engine.begin() as conn:
+            values = {"name": name, "words": search_words(name)}
+            stmt = update(SearchNodeModel).where(SearchNodeModel.path == path_text(path)).values(values)
+            if conn.execute(stmt).rowcount == 0:
+                conn.execute(insert(SearchNodeModel).values(path=path_text(path), **values))
+
+    def discard(path: Tuple[str, ...]) -> None:
+        with provider.engine.begin() as conn:
+            conn.execute(delete(SearchNodeModel).where(SearchNodeModel.path == path_text(path)))
+
+    return provider, build, add, discard
+
+
+def _time(call: Callable[[], object], repeat: int) -> Tuple[LatencyHistogram, object]:
+    histogram = LatencyHistogram()
+    result = None
+    for _ in range(repeat):
+        began = time.perf_counter_ns()
+        result = call()
+        histogram.record((time.perf_counter_ns() - began) // 1000)
+    return histogram, result
+
+
+def run_case(backend: str, names: int, repeat: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        if backend == "memory":
+            repository, build, add, discard = _memory(names)
+            search = repository.search
+        else:
+            provider, build, add, discard = _sqlite(names, tmp)
+            search = provider.search.search
+        try:
+            queries = {}
+            for query in QUERIES:
+                histogram, hits = _time(lambda: search(query), repeat)
+                queries[query] = {"hits": len(hits), "top": hits[0].name if hits else None, **histogram.summary()}
+            fresh, stale = iter(range(repeat)), iter(range(repeat))
+            inserts, _ = _time(lambda: add(("bench", f"r{next(fresh)}"), "Meeting Room 99Z"), repeat)
+            renames, _ = _time(lambda: add(("bench", "r0"), "Focus Room 98Y"), repeat)
+            deletes, _ = _time(lambda: discard(("bench", f"r{next(stale)}")), repeat)
+        finally:
+            if backend == "sqlite":
+                provider.close()
+    return {
+        "build_seconds": round(build, 2),
+        "query_latency_us": queries,
+        "maintenance_latency_us": {
+            "insert": inserts.summary(),
+            "rename": renames.summary(),
+            "delete": deletes.summary(),
+        },
+    }
+
+
+def run(backends: List[str], sizes: List[int], repeat: int) -> dict:
+    results: Dict[str, Dict[str, dict]] = {}
+    for backend in backends:
+        for names in sizes:
+            results.setdefault(backend, {})[str(names)] = run_case(backend, names, repeat)
+    return {"repeat": repeat, "results": results}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", action="append", choices=BACKENDS, dest="backends")
+    parser.add_argument("--names", action="append", type=int, dest="sizes")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", type=Path, help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    report = run(args.backends or list(BACKENDS), args.sizes or [1_000_000], args.repeat)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload)
+    print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
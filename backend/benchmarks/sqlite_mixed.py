@@ -0,0 +1,166 @@
+"""Mixed read/write load on SQLite: one shared connection pool versus a separate read pool.
+
+Examples::
+
+    python -m backend.benchmarks.sqlite_mixed
+    python -m backend.benchmarks.sqlite_mixed --clients 8 --clients 32 --mode process --write-ratio 0.1
+
+Every client loops over repository calls. With probability ``--write-ratio`` it
+creates a building. Otherwise it reads a random location's whole tree
+(``locations.get``), or a building or zone, in equal parts. ``--mode thread`` shares
+one provider between threads. ``--mode process`` gives each client its own process
+and provider, like launcher workers.
+
+Pools:
+
+* ``shared``: reads and writes share one engine (``read_pool_size=0``);
+* ``split``: reads use a pool of ``query_only`` connections, and the group-commit
+  writer keeps its own connection.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import multiprocessing
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from backend.app.repositories import create_sqlite_provider
+from backend.app.repositories.sqlite_profile import SQLiteProfile
+
+from .histogram import LatencyHistogram
+from .portfolio import PopulatedPortfolio, PortfolioSpec, generate, populate
+
+POOLS = {"shared": 0, "split": SQLiteProfile.read_pool_size}
+
+
+def _profile(pool: str) -> SQLiteProfile:
+    return dataclasses.replace(SQLiteProfile(), read_pool_size=POOLS[pool])
+
+
+def _client_loop(provider, ids: PopulatedPortfolio, write_ratio: float, deadline: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    reads, writes = LatencyHistogram(), LatencyHistogram()
+    errors = 0
+    while time.perf_counter() < deadline:
+        write = rng.random() < write_ratio
+        began = time.perf_counter_ns()
+        try:
+            if write:
+                provider.buildings.create("Bench Building", rng.choice(ids.location_ids))
+            else:
+                kind = rng.randrange(3)
+                if kind == 0:
+                    provider.locations.get(rng.choice(ids.location_ids))
+                elif kind == 1:
+                    provider.buildings.get(rng.choice(ids.building_ids))
+                else:
+                    provider.zones.get(rng.choice(ids.zone_ids))
+        except Exception:
+            errors += 1
+        (writes if write else reads).record((time.perf_counter_ns() - began) // 1000)
+    return {"reads": reads, "writes": writes, "errors": errors}
+
+
+def _process_client(args: tuple) -> dict:
+    url, pool, ids, write_ratio, start_at, duration, seed = args
+    provider = create_sqlite_provider(url, _profile(pool))
+    time.sleep(max(0.0, start_at - time.time()))
+    try:
+        return _client_loop(provider, ids, write_ratio, time.perf_counter() + duration, seed)
+    finally:
+        provider.close()
+
+
+def run_case(
+    seed_db: Path, ids: PopulatedPortfolio, pool: str, clients: int, mode: str, write_ratio: float, duration: float
+) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "mixed.sqlite"
+        shutil.copyfile(seed_db, path)
+        url = f"sqlite:///{path}"
+        if mode == "thread":
+            provider = create_sqlite_provider(url, _profile(pool))
+            results: List[dict] = []
+            deadline = time.perf_counter() + duration
+
+            def client(index: int) -> None:
+                results.append(_client_loop(provider, ids, write_ratio, deadline, index))
+
+            threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            provider.close()
+        else:
+            start_at = time.time() + 2.0  # let every process import and connect first
+            work = [(url, pool, ids, write_ratio, start_at, duration, index) for index in range(clients)]
+            with multiprocessing.get_context("spawn").Pool(clients) as workers:
+                results = workers.map(_process_client, work)
+    reads, writes = LatencyHistogram(), LatencyHistogram()
+    for result in results:
+        reads.merge(result["reads"])
+        writes.merge(result["writes"])
+    return {
+        "ops_per_second": round((reads.count + writes.count) / duration, 1),
+        "reads_per_second": round(reads.count / duration, 1),
+        "writes_per_second": round(writes.count / duration, 1),
+        "errors": sum(result["errors"] for result in results),
+        "read_latency_us": reads.summary(),
+        "write_latency_us": writes.summary(),
+    }
+
+
+def run(
+    pools: List[str], client_counts: List[int], mode: str, write_ratio: float, duration: float, scale: float
+) -> dict:
+    results: Dict[str, Dict[str, dict]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_db = Path(tmp) / "seed.sqlite"
+        provider = create_sqlite_provider(f"sqlite:///{seed_db}", SQLiteProfile(group_commit_window_ms=None))
+        ids = populate(provider, generate(PortfolioSpec.scaled(scale)))
+        provider.close()
+        for pool in pools:
+            for clients in client_counts:
+                case = run_case(seed_db, ids, pool, clients, mode, write_ratio, duration)
+                results.setdefault(pool, {})[str(clients)] = case
+    return {"mode": mode, "write_ratio": write_ratio, "duration_seconds": duration, "results": results}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pool", action="append", choices=sorted(POOLS), dest="pools")
+    parser.add_argument("--clients", action="append", type=int, dest="client_counts")
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--scale", type=float, default=1.0, help="portfolio size, see benchmarks.portfolio")
+    parser.add_argument("--output", type=Path, help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.pools or ["shared", "split"],
+        args.client_counts or [8, 32],
+        args.mode,
+        args.write_ratio,
+        args.duration,
+        args.scale,
+    )
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload)
+    print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""SQLite write throughput with 1/8/32 concurrent writers, untuned versus the storage profile.
+
+Examples::
+
+    python -m backend.benchmarks.sqlite_writes
+    python -m backend.benchmarks.sqlite_writes --writers 1 --writers 8 --writers 32 --mode process --duration 5
+
+Each writer loops over ``SQLiteRepositoryProvider`` writes: a building is created
+under a shared location and then renamed, which is two commits. ``--mode thread``
+runs the writers as threads sharing one provider, like one worker's threadpool.
+``--mode process`` gives every writer its own process and provider, like launcher
+workers. The second mode is where lock contention and ``database is locked``
+errors show up.
+
+Profiles:
+
+* ``driver``: ``create_engine`` defaults (rollback journal, ``synchronous=FULL``, no retry);
+* ``tuned``: :class:`~backend.app.repositories.sqlite_profile.SQLiteProfile` defaults
+  (WAL, ``synchronous=NORMAL``, mmap, page cache, background checkpoints, busy retry).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from backend.app.repositories import create_sqlite_provider
+from backend.app.repositories.sqlite_profile import SQLiteProfile
+
+from .histogram import LatencyHistogram
+
+PROFILES = {"driver": SQLiteProfile.driver_defaults, "tuned": SQLiteProfile}
+
+
+def _write_loop(provider, location_id: str, deadline: float, latency: LatencyHistogram) -> Dict[str, int]:
+    commits = errors = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter_ns()
+        try:
+            building = provider.buildings.create("Bench Building", location_id)
+            building.name = "Renamed Building"
+            provider.buildings.update(building)
+            commits += 2
+        except Exception:
+            errors += 1
+        latency.record((time.perf_counter_ns() - started) // 1000)
+    return {"commits": commits, "errors": errors}
+
+
+def _process_writer(args: tuple) -> dict:
+    url, profile, location_id, start_at, duration = args
+    provider = create_sqlite_provider(url, PROFILES[profile]())
+    latency = LatencyHistogram()
+    time.sleep(max(0.0, start_at - time.time()))
+    try:
+        result = _write_loop(provider, location_id, time.perf_counter() + duration, latency)
+    finally:
+        provider.close()
+    return dict(result, latency=latency)
+
+
+def run_case(profile: str, writers: int, mode: str, duration: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'writes.sqlite'}"
+        setup = create_sqlite_provider(url, PROFILES[profile]())
+        location_id = setup.locations.create("Bench Location").id
+        latency = LatencyHistogram()
+        started = time.perf_counter()
+        if mode == "thread":
+            results: List[dict] = []
+            deadline = time.perf_counter() + duration
+
+            def writer() -> None:
+                own = LatencyHistogram()
+                results.append(dict(_write_loop(setup, location_id, deadline, own), latency=own))
+
+            threads = [threading.Thread(target=writer) for _ in range(writers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        else:
+            start_at = time.time() + 2.0  # let every process import and connect first
+            with multiprocessing.get_context("spawn").Pool(writers) as pool:
+                results = pool.map(_process_writer, [(url, profile, location_id, start_at, duration)] * writers)
+            started = start_at - time.time() + time.perf_counter()
+        elapsed = time.perf_counter() - started
+        setup.close()
+    for result in results:
+        latency.merge(result["latency"])
+    commits = sum(result["commits"] for result in results)
+    return {
+        "commits": commits,
+        "errors": sum(result["errors"] for result in results),
+        "commits_per_second": round(commits / elapsed, 1),
+        "latency_us": latency.summary(),
+    }
+
+
+def run(profiles: List[str], writer_counts: List[int], mode: str, duration: float) -> dict:
+    results: Dict[str, Dict[str, dict]] = {}
+    for profile in profiles:
+        for writers in writer_counts:
+            results.setdefault(profile, {})[str(writers)] = run_case(profile, writers, mode, duration)
+    return {"mode": mode, "duration_seconds": duration, "results": results}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES), dest="profiles")
+    parser.add_argument("--writers", action="append", type=int, dest="writer_counts")
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--output", type=Path, help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    report = run(args.profiles or ["driver", "tuned"], args.writer_counts or [1, 8, 32], args.mode, args.duration)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload)
+    print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
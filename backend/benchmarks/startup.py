@@ -0,0 +1,160 @@
+"""Cold-start cost of the API: ``-X importtime`` breakdown and time to first request.
+
+Examples::
+
+    python -m backend.benchmarks.startup
+    python -m backend.benchmarks.startup --storage sqlite --runs 10 --target-ms 300
+
+Every run spawns a fresh interpreter that imports ``backend.app.main``, calls
+``create_app()``, runs the lifespan startup and serves one request straight
+through the ASGI interface. The reported ``first_request_ms`` is wall time from
+spawning the process to that response, i.e. what an autoscaled pod pays. The run
+exits non-zero when the median exceeds ``--target-ms`` or when one of the lazily
+loaded dependencies (SQLAlchemy, httpx, jose, passlib) was imported before the
+first request.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFERRED_PACKAGES = ("sqlalchemy", "httpx", "jose", "passlib")
+
+_CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+from backend.app.main import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+preloaded = sorted(name for name in {deferred!r} if name in sys.modules)
+
+async def first_request():
+    messages = []
+
+    async def receive():
+        return {{"type": "http.request", "body": b"", "more_body": False}}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {{
+        "type": "http", "asgi": {{"version": "3.0"}}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": {path!r}, "raw_path": {path!r}.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"localhost")], "client": ("127.0.0.1", 1),
+        "server": ("localhost", 80),
+    }}
+    async with app.router.lifespan_context(app):
+        await app(scope, receive, send)
+    return messages[0]["status"]
+
+status = asyncio.run(first_request())
+served = time.perf_counter()
+print(json.dumps({{
+    "status": status,
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "request_ms": (served - created) * 1000,
+    "preloaded": preloaded,
+}}))
+"""
+
+
+def _environment(storage: str, workdir: Path) -> Dict[str, str]:
+    env = dict(os.environ, STORAGE_BACKEND=storage)
+    if storage == "sqlite":
+        env["SQLITE_DB_PATH"] = str(workdir / "startup.sqlite")
+    return env
+
+
+def cold_start(path: str, env: Dict[str, str]) -> dict:
+    script = _CHILD.format(deferred=DEFERRED_PACKAGES, path=path)
+    spawned = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", script], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["first_request_ms"] = (time.perf_counter() - spawned) * 1000
+    return result
+
+
+def import_breakdown(env: Dict[str, str], top: int) -> List[dict]:
+    """Self time per package under ``python -X importtime``; ``backend.app`` is split per module."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.app.main"],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    totals: Dict[str, int] = defaultdict(int)
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = (part.strip() for part in line[len("import time:") :].split("|"))
+        if not self_us.isdigit():
+            continue
+        parts = name.split(".")
+        group = ".".join(parts[:3]) if parts[:2] == ["backend", "app"] else parts[0]
+        totals[group] += int(self_us)
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    return [{"module": name, "self_ms": round(micros / 1000, 2)} for name, micros in ranked[:top]]
+
+
+def run(path: str, runs: int, storage: str, top: int) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        env = _environment(storage, Path(workdir))
+        cold_start(path, env)  # populate __pycache__ so every measured run is a warm-disk cold start
+        samples = [cold_start(path, env) for _ in range(runs)]
+        breakdown = import_breakdown(env, top)
+    summary = {
+        key: round(statistics.median(sample[key] for sample in samples), 2)
+        for key in ("import_ms", "create_app_ms", "request_ms", "first_request_ms")
+    }
+    return {
+        "python": platform.python_version(),
+        "storage": storage,
+        "path": path,
+        "runs": runs,
+        "status": samples[-1]["status"],
+        "median": summary,
+        "preloaded": sorted({name for sample in samples for name in sample["preloaded"]}),
+        "imports": breakdown,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--storage", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--path", default="/api/v1/locations", help="GET path served as the first request")
+    parser.add_argument("--top", type=int, default=15, help="rows in the import-time breakdown")
+    parser.add_argument("--target-ms", type=float, default=300.0)
+    parser.add_argument("--output", type=Path, help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    report = run(args.path, args.runs, args.storage, args.top)
+    report["target_ms"] = args.target_ms
+    report["within_target"] = report["median"]["first_request_ms"] <= args.target_ms
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload)
+    print(payload)
+    return 0 if report["within_target"] and not report["preloaded"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Time deleting one location's subtree as the subtree grows.
+
+Examples::
+
+    python -m backend.benchmarks.subtree_delete
+    python -m backend.benchmarks.subtree_delete --areas 1000 --areas 50000 --strategy set --strategy fk
+
+Each case builds a fresh database with one large location (``--areas`` areas, 10
+per zone, 25 zones per building, ``--devices-per-zone`` zone devices) and one small
+sibling location, then deletes the large one. The write lock is held for the whole
+delete, so the time is also how long other writers wait.
+
+Strategies:
+
+* ``orm``: the previous behaviour. Load the subtree into the session, delete the
+  rows one by one (``session.delete`` per object) and commit. The parent-id indexes
+  added with the set-based delete help this path too;
+* ``fk``: a single ``DELETE FROM locations`` with ``PRAGMA foreign_keys=ON``, so
+  SQLite's ``ON DELETE CASCADE`` removes the rest;
+* ``set``: ``SQLiteLocationRepository.delete``, one set-based DELETE per table;
+* ``memory``: the in-memory backend.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from backend.app.models import Device
+from backend.app.repositories import create_in_memory_provider, create_sqlite_provider
+from backend.app.repositories.sqlite_profile import SQLiteProfile
+
+AREAS_PER_ZONE = 10
+ZONES_PER_BUILDING = 25
+STRATEGIES = ("orm", "fk", "set", "memory")
+
+
+def _shape(areas: int) -> tuple[int, int]:
+    zones = max(1, areas // AREAS_PER_ZONE)
+    return max(1, zones // ZONES_PER_BUILDING), zones
+
+
+def _populate_sql(provider, areas: int, devices_per_zone: int) -> str:
+    from sqlalchemy import insert
+
+    from backend.app.repositories.sqlalchemy import AreaModel, BuildingModel, LocationModel, ZoneDeviceModel, ZoneModel
+
+    building_count, zone_count = _shape(areas)
+    now = datetime.now(timezone.utc)
+    rows: Dict[object, List[dict]] = {model: [] for model in (BuildingModel, ZoneModel, AreaModel, ZoneDeviceModel)}
+    for b in range(building_count):
+        rows[BuildingModel].append({"id": f"b{b}", "name": f"Building {b}", "location_id": "big"})
+    for z in range(zone_count):
+        rows[ZoneModel].append({"id": f"z{z}", "name": f"Zone {z}", "building_id": f"b{z % building_count}"})
+        for d in range(devices_per_zone):
+            rows[ZoneDeviceModel].append({"zone_id": f"z{z}", "id": f"d{d}", "name": "Device", "created_at": now})
+    for a in range(zone_count * AREAS_PER_ZONE):
+        rows[AreaModel].append({"id": f"a{a}", "name": f"Area {a}", "zone_id": f"z{a // AREAS_PER_ZONE}"})
+    with provider.engine.begin() as conn:
+        conn.execute(insert(LocationModel), [{"id": "big", "name": "Campus"}, {"id": "small", "name": "Kiosk"}])
+        conn.execute(insert(BuildingModel), [{"id": "small-b", "name": "Kiosk", "location_id": "small"}])
+        for model, batch in rows.items():
+            if batch:
+                conn.execute(insert(model), batch)
+    return "big"
+
+
+def _delete_orm(provider, location_id: str) -> None:
+    from sqlalchemy import text
+    from sqlalchemy.orm import selectinload
+
+    from backend.app.repositories.sqlalchemy import BuildingModel, LocationModel, ZoneDeviceModel, ZoneModel
+
+    with provider._session_factory() as session:
+        # Row-by-row deletes only, as before; no help from ON DELETE CASCADE.
+        session.execute(text("PRAGMA foreign_keys=OFF"))
+        tree = selectinload(LocationModel.buildings).selectinload(BuildingModel.zones).selectinload(ZoneModel.areas)
+        location = session.get(LocationModel, location_id, options=[tree])
+        zone_ids = [zone.id for building in location.buildings for zone in building.zones]
+        devices = session.query(ZoneDeviceModel).filter(ZoneDeviceModel.zone_id.in_(zone_ids)).all()
+        for device in devices:
+            session.delete(device)
+        for building in location.buildings:
+            for zone in building.zones:
+                for area in zone.areas:
+                    session.delete(area)
+                session.delete(zone)
+            session.delete(building)
+        session.delete(location)
+        session.commit()
+
+
+def _delete_fk(provider, location_id: str) -> None:
+    with provider.engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM locations WHERE id = ?", (location_id,))
+
+
+def run_case(strategy: str, areas: int, devices_per_zone: int) -> dict:
+    if strategy == "memory":
+        provider = create_in_memory_provider()
+        location = provider.locations.create("Campus")
+        provider.locations.create("Kiosk")
+        building_count, zone_count = _shape(areas)
+        buildings = [provider.buildings.create(f"Building {b}", location.id) for b in range(building_count)]
+        for z in range(zone_count):
+            zone = provider.zones.create(f"Zone {z}", buildings[z % building_count].id)
+            for a in range(AREAS_PER_ZONE):
+                provider.areas.create(f"Area {a}", zone.id)
+            for d in range(devices_per_zone):
+                provider.zone_devices.add(Device(id=f"d{d}", name="Device", zone_id=zone.id))
+        started = time.perf_counter()
+        provider.locations.delete(location.id)
+        return {"seconds": round(time.perf_counter() - started, 4)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        provider = create_sqlite_provider(f"sqlite:///{Path(tmp) / 'delete.sqlite'}", SQLiteProfile())
+        try:
+            location_id = _populate_sql(provider, areas, devices_per_zone)
+            started = time.perf_counter()
+            if strategy == "orm":
+                _delete_orm(provider, location_id)
+            elif strategy == "fk":
+                _delete_fk(provider, location_id)
+            else:
+                provider.locations.delete(location_id)
+            elapsed = time.perf_counter() - started
+            with provider.engine.connect() as conn:
+                left = conn.exec_driver_sql("SELECT (SELECT count(*) FROM areas) + (SELECT count(*) FROM zone_devices)")
+                leftover = left.scalar()
+        finally:
+            provider.close()
+    return {"seconds": round(elapsed, 4), "rows_left": leftover}
+
+
+def run(strategies: List[str], sizes: List[int], devices_per_zone: int) -> dict:
+    results: Dict[str, Dict[str, dict]] = {}
+    for strategy in strategies:
+        for areas in sizes:
+            results.setdefault(strategy, {})[str(areas)] = run_case(strategy, areas, devices_per_zone)
+    return {"devices_per_zone": devices_per_zone, "results": results}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategy", action="append", choices=STRATEGIES, dest="strategies")
+    parser.add_argument("--areas", action="append", type=int, dest="sizes")
+    parser.add_argument("--devices-per-zone", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    report = run(args.strategies or list(STRATEGIES), args.sizes or [1_000, 10_000, 50_000], args.devices_per_zone)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload)
+    print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""List every device of a large campus: one call per zone versus keyset pages of the path index.
+
+Examples::
+
+    python -m backend.benchmarks.subtree_devices
+    python -m backend.benchmarks.subtree_devices --devices 10000 --backend sqlite --page-size 100
+
+Each case fills one location with ``--devices`` zone devices (20 per zone, 20 zones
+per building) and lists them all, the way a dashboard does:
+
+* ``per-zone``: ``zones.list_under`` for the zone ids, then ``list_by_zone`` per zone;
+* ``paged``: ``page_under`` pages of ``--page-size``, each resuming at the previous
+  page's cursor, as ``GET /locations/{id}/devices`` and its NDJSON stream do.
+
+Page latencies show whether a late page costs more than the first one.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from backend.app.models import Device
+from backend.app.repositories import create_in_memory_provider, create_sqlite_provider
+from backend.app.repositories.path_index import path_text
+from backend.app.repositories.sqlite_profile import SQLiteProfile
+
+from .histogram import LatencyHistogram
+
+DEVICES_PER_ZONE = 20
+ZONES_PER_BUILDING = 20
+BACKENDS = ("memory", "sqlite")
+
+
+def _populate_memory(provider, devices: int) -> str:
+    location = provider.locations.create("Campus")
+    building = None
+    for z in range(max(1, devices // DEVICES_PER_ZONE)):
+        if z % ZONES_PER_BUILDING == 0:
+            building = provider.buildings.create(f"Building {z}", location.id)
+        zone = provider.zones.create(f"Zone {z}", building.id)
+        for d in range(DEVICES_PER_ZONE):
+            provider.zone_devices.add(Device(id=f"d{d}", name="Device", zone_id=zone.id))
+    return location.id
+
+
+def _populate_sql(provider, devices: int) -> str:
+    from sqlalchemy import insert
+
+    from backend.app.repositories.sqlalchemy import BuildingModel, LocationModel, ZoneDeviceModel, ZoneModel
+
+    now = datetime.now(timezone.utc)
+    rows: Dict[object, List[dict]] = {model: [] for model in (BuildingModel, ZoneModel, ZoneDeviceModel)}
+    for z in range(max(1, devices // DEVICES_PER_ZONE)):
+        building = f"b{z // ZONES_PER_BUILDING}"
+        if z % ZONES_PER_BUILDING == 0:
+            rows[BuildingModel].append(
+                {"id": building, "name": building, "location_id": "campus", "path": path_text(("campus", building))}
+            )
+        zone_path = path_text(("campus", building, f"z{z}"))
+        rows[ZoneModel].append({"id": f"z{z}", "name": f"Zone {z}", "building_id": building, "path": zone_path})
+        for d in range(DEVICES_PER_ZONE):
+            rows[ZoneDeviceModel].append(
+                {"zone_id": f"z{z}", "id": f"d{d}", "name": "Device", "created_at": now, "path": f"{zone_path}/d{d}"}
+            )
+    with provider.engine.begin() as conn:
+        conn.execute(insert(LocationModel), [{"id": "campus", "name": "Campus"}])
+        for model, batch in rows.items():
+            conn.execute(insert(model), batch)
+    return "campus"
+
+
+def _per_zone(provider, location_id: str, page_size: int) -> dict:
+    calls = LatencyHistogram()
+    started = time.perf_counter()
+    zones = provider.zones.list_under((location_id,))
+    listed = 0
+    for zone in zones:
+        began = time.perf_counter_ns()
+        listed += len(provider.zone_devices.list_by_zone(zone.id))
+        calls.record((time.perf_counter_ns() - began) // 1000)
+    return {"seconds": round(time.perf_counter() - started, 3), "devices": listed, "call_latency_us": calls.summary()}
+
+
+def _paged(provider, location_id: str, page_size: int) -> dict:
+    pages = LatencyHistogram()
+    started = time.perf_counter()
+    listed, after, last_page_us = 0, None, 0
+    while True:
+        began = time.perf_counter_ns()
+        devices, after = provider.zone_devices.page_under((location_id,), after, page_size)
+        last_page_us = (time.perf_counter_ns() - began) // 1000
+        pages.record(last_page_us)
+        listed += len(devices)
+        if after is None:
+            break
+    return {
+        "seconds": round(time.perf_counter() - started, 3),
+        "devices": listed,
+        "page_latency_us": pages.summary(),
+        "last_page_us": last_page_us,
+    }
+
+
+STRATEGIES = {"per-zone": _per_zone, "paged": _paged}
+
+
+def run_case(backend: str, devices: int, page_size: int) -> dict:
+    if backend == "memory":
+        provider = create_in_memory_provider()
+        location_id = _populate_memory(provider, devices)
+        return {name: strategy(provider, location_id, page_size) for name, strategy in STRATEGIES.items()}
+    with tempfile.TemporaryDirectory() as tmp:
+        provider = create_sqlite_provider(f"sqlite:///{Path(tmp) / 'devices.sqlite'}", SQLiteProfile())
+        try:
+            location_id = _populate_sql(provider, devices)
+            return {name: strategy(provider, location_id, page_size) for name, strategy in STRATEGIES.items()}
+        finally:
+            provider.close()
+
+
+def run(backends: List[str], sizes: List[int], page_size: int) -> dict:
+    results: Dict[str, Dict[str, dict]] = {}
+    for backend in backends:
+        for devices in sizes:
+            results.setdefault(backend, {})[str(devices)] = run_case(backend, devices, page_size)
+    return {"page_size": page_size, "results": results}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", action="append", choices=BACKENDS, dest="backends")
+    parser.add_argument("--devices", action="append", type=int, dest="sizes")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--output", type=Path, help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    report = run(args.backends or list(BACKENDS), args.sizes or [100_000], args.page_size)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload)
+    print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
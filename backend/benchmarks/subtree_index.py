@@ -0,0 +1,204 @@
+"""Subtree reads on a large hierarchy: walking parent ids versus the materialized-path index.
+
+Examples::
+
+    python -m backend.benchmarks.subtree_index
+    python -m backend.benchmarks.subtree_index --nodes 100000 --strategy sql-path --strategy memory-path
+
+Each case builds a forest of ``--nodes`` buildings, zones and areas: 10 buildings
+per location, 20 zones per building and 10 areas per zone. It then times
+``--queries`` random "every area under this node" reads at each level (location,
+building, zone). It also reports how long the build took, since the path index is
+maintained on every insert.
+
+Strategies:
+
+* ``sql-walk``: the areas joined to their zones and buildings through the parent-id
+  indexes, filtered on the ancestor's id;
+* ``sql-path``: ``areas.list_under``, one range scan of the ``path`` index;
+* ``memory-walk``: scan every area and keep those whose zone is in the subtree,
+  like ``list_for_zone`` does;
+* ``memory-path``: ``areas.list_under``, walking the in-memory ``ChildIndex`` levels down from the node.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from backend.app.repositories import create_in_memory_provider, create_sqlite_provider
+from backend.app.repositories.path_index import path_text
+from backend.app.repositories.sqlite_profile import SQLiteProfile
+
+from .histogram import LatencyHistogram
+
+BUILDINGS_PER_LOCATION = 10
+ZONES_PER_BUILDING = 20
+AREAS_PER_ZONE = 10
+STRATEGIES = ("sql-walk", "sql-path", "memory-walk", "memory-path")
+LEVELS = ("location", "building", "zone")
+_NODES_PER_LOCATION = BUILDINGS_PER_LOCATION * (1 + ZONES_PER_BUILDING * (1 + AREAS_PER_ZONE))
+
+
+def _forest(nodes: int):
+    """Yield ``(location, building, zone, areas)`` id tuples for ``nodes`` nodes below the locations."""
+    for loc in range(max(1, nodes // _NODES_PER_LOCATION)):
+        for b in range(BUILDINGS_PER_LOCATION):
+            for z in range(ZONES_PER_BUILDING):
+                areas = [f"l{loc}b{b}z{z}a{a}" for a in range(AREAS_PER_ZONE)]
+                yield f"l{loc}", f"l{loc}b{b}", f"l{loc}b{b}z{z}", areas
+
+
+def _populate_sql(provider, nodes: int) -> Dict[str, List[tuple]]:
+    from sqlalchemy import insert
+
+    from backend.app.repositories.sqlalchemy import AreaModel, BuildingModel, LocationModel, ZoneModel
+
+    paths: Dict[str, List[tuple]] = {level: [] for level in LEVELS}
+    rows: Dict[object, List[dict]] = {model: [] for model in (LocationModel, BuildingModel, ZoneModel, AreaModel)}
+    with provider.engine.begin() as conn:
+        for location, building, zone, areas in _forest(nodes):
+            if not paths["location"] or paths["location"][-1] != (location,):
+                paths["location"].append((location,))
+                rows[LocationModel].append({"id": location, "name": location})
+            if not paths["building"] or paths["building"][-1] != (location, building):
+                paths["building"].append((location, building))
+                row = {"id": building, "name": building, "location_id": location}
+                rows[BuildingModel].append({**row, "path": path_text((location, building))})
+            paths["zone"].append((location, building, zone))
+            zone_path = path_text((location, building, zone))
+            rows[ZoneModel].append({"id": zone, "name": zone, "building_id": building, "path": zone_path})
+            for area in areas:
+                rows[AreaModel].append({"id": area, "name": area, "zone_id": zone, "path": f"{zone_path}/{area}"})
+            if len(rows[AreaModel]) >= 50_000:
+                for model, batch in rows.items():
+                    if batch:
+                        conn.execute(insert(model), batch)
+                        batch.clear()
+        for model, batch in rows.items():
+            if batch:
+                conn.execute(insert(model), batch)
+    return paths
+
+
+def _populate_memory(provider, nodes: int) -> Dict[str, List[tuple]]:
+    paths: Dict[str, List[tuple]] = {level: [] for level in LEVELS}
+    ids: Dict[str, str] = {}
+    for location, building, zone, areas in _forest(nodes):
+        if location not in ids:
+            ids[location] = provider.locations.create(location).id
+            paths["location"].append((ids[location],))
+        if building not in ids:
+            ids[building] = provider.buildings.create(building, ids[location]).id
+            paths["building"].append((ids[location], ids[building]))
+        zone_id = provider.zones.create(zone, ids[building]).id
+        paths["zone"].append((ids[location], ids[building], zone_id))
+        for area in areas:
+            provider.areas.create(area, zone_id)
+    return paths
+
+
+def _sql_walk(provider):
+    from sqlalchemy import select
+
+    from backend.app.repositories.sqlalchemy import AreaModel, BuildingModel, ZoneModel
+
+    columns = (BuildingModel.location_id, ZoneModel.building_id, AreaModel.zone_id)
+    base = select(AreaModel).join(ZoneModel, AreaModel.zone_id == ZoneModel.id)
+    base = base.join(BuildingModel, ZoneModel.building_id == BuildingModel.id)
+
+    def query(path: tuple) -> int:
+        with provider._session_factory() as session:
+            return len(session.execute(base.where(columns[len(path) - 1] == path[-1])).scalars().all())
+
+    return query
+
+
+def _memory_walk(provider):
+    store = provider._store
+
+    def query(path: tuple) -> int:
+        if len(path) == 3:
+            zone_ids = {path[-1]}
+        elif len(path) == 2:
+            zone_ids = {zone.id for zone in store.zones.values() if zone.building_id == path[-1]}
+        else:
+            building_ids = {b.id for b in store.buildings.values() if b.location_id == path[-1]}
+            zone_ids = {zone.id for zone in store.zones.values() if zone.building_id in building_ids}
+        return len([area for area in store.areas.values() if area.zone_id in zone_ids])
+
+    return query
+
+
+def _list_under(provider):
+    return lambda path: len(provider.areas.list_under(path))
+
+
+def _time_queries(query, paths: Dict[str, List[tuple]], queries: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    report = {}
+    for level in LEVELS:
+        histogram = LatencyHistogram()
+        rows = 0
+        for _ in range(queries):
+            path = rng.choice(paths[level])
+            began = time.perf_counter_ns()
+            rows = query(path)
+            histogram.record((time.perf_counter_ns() - began) // 1000)
+        report[level] = {"areas": rows, "latency_us": histogram.summary()}
+    return report
+
+
+def run_case(strategy: str, nodes: int, queries: int) -> dict:
+    started = time.perf_counter()
+    if strategy.startswith("memory"):
+        provider = create_in_memory_provider()
+        paths = _populate_memory(provider, nodes)
+        build_seconds = time.perf_counter() - started
+        query = _memory_walk(provider) if strategy == "memory-walk" else _list_under(provider)
+        return {"build_seconds": round(build_seconds, 2), "levels": _time_queries(query, paths, queries, nodes)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        provider = create_sqlite_provider(f"sqlite:///{Path(tmp) / 'tree.sqlite'}", SQLiteProfile())
+        try:
+            paths = _populate_sql(provider, nodes)
+            build_seconds = time.perf_counter() - started
+            query = _sql_walk(provider) if strategy == "sql-walk" else _list_under(provider)
+            levels = _time_queries(query, paths, queries, nodes)
+        finally:
+            provider.close()
+    return {"build_seconds": round(build_seconds, 2), "levels": levels}
+
+
+def run(strategies: List[str], sizes: List[int], queries: int) -> dict:
+    results: Dict[str, Dict[str, dict]] = {}
+    for strategy in strategies:
+        for nodes in sizes:
+            results.setdefault(strategy, {})[str(nodes)] = run_case(strategy, nodes, queries)
+    return {"queries_per_level": queries, "results": results}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategy", action="append", choices=STRATEGIES, dest="strategies")
+    parser.add_argument("--nodes", action="append", type=int, dest="sizes")
+    parser.add_argument("--queries", type=int, default=50, help="queries per level")
+    parser.add_argument("--output", type=Path, help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    report = run(args.strategies or list(STRATEGIES), args.sizes or [1_000_000], args.queries)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload)
+    print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Closed-loop throughput of the dev server versus the production launcher.
+
+Examples::
+
+    python -m backend.benchmarks.throughput
+    python -m backend.benchmarks.throughput --config dev --config launcher --workers 4 --duration 15
+
+Each configuration is started as a real server on a free local port:
+
+* ``dev``: what ``make dev`` runs, ``uvicorn backend.app.main:app --reload`` (one process);
+* ``asyncio-h11``: one uvicorn process with the pure-Python event loop and HTTP parser;
+* ``launcher``: ``python -m backend.app.launcher --workers N`` (prefork, uvloop/httptools, warmup).
+
+Load comes from ``--clients`` separate processes, each keeping ``--concurrency`` requests
+in flight over keep-alive connections, cycling through a read-only request mix. A single
+Python client process cannot saturate several workers, hence the process fan-out; keep
+``clients * concurrency`` the same across runs you compare.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import httpx
+
+from .histogram import LatencyHistogram
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+REQUEST_MIX = (
+    ("GET", "/healthz", {}),
+    ("GET", "/api/v1/locations", {}),
+    ("GET", "/api/profile", {"Authorization": "Bearer user_bench"}),
+    ("GET", "/api/devices", {"Authorization": "Bearer user_bench"}),
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_command(config: str, port: int, workers: int) -> List[str]:
+    uvicorn = [sys.executable, "-m", "uvicorn", "backend.app.main:app", "--host", "127.0.0.1", "--port", str(port)]
+    if config == "dev":
+        return uvicorn + ["--reload", "--reload-dir", str(REPO_ROOT / "backend" / "app")]
+    if config == "asyncio-h11":
+        return uvicorn + ["--loop", "asyncio", "--http", "h11", "--no-access-log"]
+    if config == "launcher":
+        return [
+            sys.executable, "-m", "backend.app.launcher",
+            "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+        ]  # fmt: skip
+    raise ValueError(f"Unknown configuration: {config}")
+
+
+@contextmanager
+def running_server(config: str, workers: int, startup_timeout: float = 30.0) -> Iterator[str]:
+    port = _free_port()
+    env = dict(os.environ, APP_TRACING_SAMPLE_RATE="0")
+    process = subprocess.Popen(
+        server_command(config, port, workers),
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            try:
+                if httpx.get(f"{url}/healthz", timeout=1).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"{config} server did not start")
+            time.sleep(0.1)
+        yield url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def _drive(url: str, concurrency: int, duration: float) -> dict:
+    latency = LatencyHistogram()
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker(offset: int) -> None:
+            nonlocal errors
+            index = offset
+            while time.perf_counter() < deadline:
+                method, path, headers = REQUEST_MIX[index % len(REQUEST_MIX)]
+                index += 1
+                started = time.perf_counter_ns()
+                try:
+                    response = await client.request(method, path, headers=headers)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latency.record((time.perf_counter_ns() - started) // 1000)
+
+        await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    return {"latency": latency, "errors": errors}
+
+
+def _client_process(args: tuple) -> dict:
+    return asyncio.run(_drive(*args))
+
+
+def measure(url: str, clients: int, concurrency: int, duration: float) -> dict:
+    with multiprocessing.get_context("spawn").Pool(clients) as pool:
+        pool.map(_client_process, [(url, concurrency, min(duration, 2.0))] * clients)  # connection + JIT warmup
+        started = time.perf_counter()
+        results = pool.map(_client_process, [(url, concurrency, duration)] * clients)
+        elapsed = time.perf_counter() - started
+    latency = LatencyHistogram()
+    for result in results:
+        latency.merge(result["latency"])
+    return {
+        "requests": latency.count,
+        "errors": sum(result["errors"] for result in results),
+        "requests_per_second": round(latency.count / elapsed, 1),
+        "latency_us": latency.summary(),
+    }
+
+
+def run(configs: List[str], workers: int, clients: int, concurrency: int, duration: float) -> dict:
+    report: Dict[str, dict] = {}
+    for config in configs:
+        with running_server(config, workers) as url:
+            report[config] = measure(url, clients, concurrency, duration)
+    baseline = report.get("dev")
+    if baseline and baseline["requests_per_second"]:
+        for result in report.values():
+            result["speedup_vs_dev"] = round(result["requests_per_second"] / baseline["requests_per_second"], 2)
+    return {
+        "cpus": os.cpu_count(),
+        "workers": workers,
+        "clients": clients,
+        "concurrency_per_client": concurrency,
+        "duration_seconds": duration,
+        "results": report,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", action="append", choices=["dev", "asyncio-h11", "launcher"], dest="configs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="launcher workers")
+    parser.add_argument("--clients", type=int, default=4, help="load-generating processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight per client process")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--output", type=Path, help="write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    report = run(args.configs or ["dev", "launcher"], args.workers, args.clients, args.concurrency, args.duration)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(payload)
+    print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
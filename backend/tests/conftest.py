@@ -1,4 +1,3 @@
-import importlib
 from typing import AsyncGenerator, Dict, Generator
 
 import httpx
@@ -6,7 +5,11 @@ import pytest
 from fastapi.testclient import TestClient
 from httpx import ASGITransport
 
+from backend.app import config
+from backend.app.config import Settings
 from backend.app.container import reset_repositories
+from backend.app.main import build_device_repository, create_app
+from backend.app.presence import build_tracker
 from backend.app.store import device_store
 
 
@@ -36,22 +39,9 @@ def set_env(monkeypatch: pytest.MonkeyPatch) -> None:
     yield
 
 
-def _reload_app():
-    import backend.app.settings as settings_module
-    import backend.app.config as config_module
-    import backend.app.auth as auth_module
-    import backend.app.main as main_module
-
-    importlib.reload(settings_module)
-    importlib.reload(config_module)
-    importlib.reload(auth_module)
-    importlib.reload(main_module)
-    return main_module.app
-
-
 @pytest.fixture
 def fastapi_app():
-    return _reload_app()
+    return create_app(Settings())
 
 
 @pytest.fixture
@@ -62,10 +52,9 @@ def api_client(fastapi_app) -> Generator[TestClient, None, None]:
 
 @pytest.fixture
 async def async_api_client(fastapi_app) -> AsyncGenerator[httpx.AsyncClient, None]:
-    from backend.app.main import build_device_repository
-
     if not hasattr(fastapi_app.state, "device_repository"):
         fastapi_app.state.device_repository = build_device_repository()
+        fastapi_app.state.device_presence = build_tracker()
     await fastapi_app.router.startup()
     transport = ASGITransport(app=fastapi_app)
     async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
@@ -83,6 +72,12 @@ def reset_state(fastapi_app) -> None:
         repository.clear()
 
 
+@pytest.fixture
+def admin_header(monkeypatch) -> Dict[str, str]:
+    monkeypatch.setattr(config.settings, "admin_token", "admin-secret")
+    return {"Authorization": "Bearer admin-secret"}
+
+
 @pytest.fixture
 def auth_header() -> Dict[str, str]:
     return {"Authorization": "Bearer user_alice"}
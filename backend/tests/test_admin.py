@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.app import config
+from backend.app.observability.context import RequestContextMiddleware, run_in_threadpool
+from backend.app.observability.profiler import SamplingProfiler, collapse
+from backend.app.observability.slow_queries import SlowQueryLog, parameter_shape, slow_query_log
+from backend.app.observability.sql import track_queries
+from backend.app.repositories import create_sqlite_provider
+
+
+def test_admin_routes_require_token(api_client, monkeypatch) -> None:
+    assert api_client.get("/admin/slow-queries").status_code == 404
+
+    monkeypatch.setattr(config.settings, "admin_token", "admin-secret")
+    assert api_client.get("/admin/slow-queries").status_code == 403
+    assert api_client.get("/admin/slow-queries", headers={"Authorization": "Bearer nope"}).status_code == 403
+
+
+def test_slow_query_capture_includes_query_plan(tmp_path) -> None:
+    provider = create_sqlite_provider(f"sqlite:///{tmp_path / 'slow.sqlite'}")
+    location = provider.locations.create("HQ")
+    building = provider.buildings.create("Tower", location.id)
+    log = SlowQueryLog(max_entries=2)
+
+    with track_queries() as stats:
+        provider.zones.list_for_building(building.id)
+    record = log.capture("GET", "/zones", 0.5, stats)
+
+    assert record["query_count"] == stats.count
+    statement = record["statements"][0]
+    assert statement["parameters"] == "(str)"
+    assert any("zones" in line for line in statement["plan"])
+    assert log.entries() == [record]
+
+
+def test_slow_query_endpoint_lists_and_clears(api_client, admin_header) -> None:
+    slow_query_log.clear()
+    with track_queries() as stats:
+        stats.record("SELECT 1", 0.3)
+    slow_query_log.capture("GET", "/demo", 0.4, stats)
+
+    listed = api_client.get("/admin/slow-queries", headers=admin_header)
+    assert listed.status_code == 200
+    assert listed.json()[0]["route"] == "/demo"
+
+    assert api_client.delete("/admin/slow-queries", headers=admin_header).status_code == 204
+    assert api_client.get("/admin/slow-queries", headers=admin_header).json() == []
+
+
+def test_parameter_shape_hides_values() -> None:
+    assert parameter_shape(("secret", 3)) == "(str, int)"
+    assert parameter_shape([("a",), ("b",)]) == "2x(str)"
+
+
+def _burn(seconds: float) -> None:
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+def test_profiler_attributes_loop_samples_to_route() -> None:
+    async def endpoint(scope, receive, send) -> None:
+        started.set()
+        _burn(0.4)
+
+    scope = {"type": "http", "method": "GET", "route": SimpleNamespace(path="/busy")}
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    worker = threading.Thread(
+        target=lambda: loop.run_until_complete(RequestContextMiddleware(endpoint)(scope, None, None))
+    )
+    worker.start()
+    started.wait(2)
+    stacks = SamplingProfiler(interval=0.002).run(0.2, loop, worker.ident)
+    worker.join()
+    loop.close()
+
+    busy = [stack for stack in stacks if stack.startswith("GET /busy;")]
+    assert busy
+    assert any(stack.endswith("test_admin:_burn") for stack in busy)
+    assert collapse({"a;b": 3}) == "a;b 3\n"
+
+
+def test_profiler_attributes_threadpool_samples_to_the_calling_route() -> None:
+    async def endpoint(scope, receive, send) -> None:
+        await run_in_threadpool(_burn, 0.4)
+
+    scope = {"type": "http", "method": "POST", "route": SimpleNamespace(path="/write")}
+    loop = asyncio.new_event_loop()
+    worker = threading.Thread(
+        target=lambda: loop.run_until_complete(RequestContextMiddleware(endpoint)(scope, None, None))
+    )
+    worker.start()
+    time.sleep(0.05)
+    stacks = SamplingProfiler(interval=0.002).run(0.2, loop, worker.ident)
+    worker.join()
+    loop.close()
+
+    assert any(stack.startswith("POST /write;") and stack.endswith("test_admin:_burn") for stack in stacks)
+    assert not any(stack.startswith("thread:") and stack.endswith("test_admin:_burn") for stack in stacks)
+
+
+def test_profile_endpoint_returns_collapsed_stacks(api_client, admin_header) -> None:
+    response = api_client.post("/admin/profile?seconds=0.1&interval_ms=5", headers=admin_header)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert int(response.headers["x-profile-samples"]) > 0
+
+
+def test_heap_snapshot_diff_and_object_census(api_client, admin_header) -> None:
+    first = api_client.post("/admin/heap/snapshots?label=before", headers=admin_header)
+    assert first.status_code == 201
+    location = api_client.post("/api/v1/locations", json={"name": "HQ"}).json()
+    api_client.post(f"/api/v1/locations/{location['id']}/buildings", json={"name": "Tower"})
+    second = api_client.post("/admin/heap/snapshots?label=after", headers=admin_header).json()
+
+    diff = api_client.get(
+        f"/admin/heap/diff?base={first.json()['id']}&target={second['id']}&group_by=module",
+        headers=admin_header,
+    )
+    assert diff.status_code == 200
+    assert diff.json() and {"location", "size_diff", "count_diff"} <= set(diff.json()[0])
+    assert api_client.get("/admin/heap/diff?base=1&target=999", headers=admin_header).status_code == 404
+
+    census = api_client.get("/admin/heap/objects", headers=admin_header).json()
+    assert census["entities"]["backend.app.domain.entities.Location"] >= 1
+    assert census["stores"]["repositories"]["hierarchy"]["buildings"] >= 1
+    assert "users" in census["stores"]["user_repository"]
+
+    assert api_client.delete("/admin/heap/snapshots", headers=admin_header).status_code == 204
+    assert api_client.get("/admin/heap/snapshots", headers=admin_header).json() == []
+
+
+def test_bulk_user_import_then_login(api_client, admin_header) -> None:
+    from backend.app.auth import hash_password
+
+    users = [
+        {"id": f"imported-{index}", "username": f"Tenant{index}", "hashed_password": hash_password("migrated")}
+        for index in range(3)
+    ]
+    response = api_client.post("/admin/users/import", json=users, headers=admin_header)
+    assert response.json() == {"imported": 3, "skipped": 0}
+    assert api_client.post("/admin/users/import", json=users, headers=admin_header).status_code == 409
+    skipped = api_client.post("/admin/users/import?skip_existing=true", json=users, headers=admin_header)
+    assert skipped.json() == {"imported": 0, "skipped": 3}
+
+    login = api_client.post("/api/auth/login", json={"username": "tenant1", "password": "migrated"})
+    assert login.status_code == 200
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.admission import ClassLimits, ConcurrencyGate, Rejected, ShardedTokenBuckets, classify
+from backend.app.config import Settings
+from backend.app.main import create_app
+from backend.app.observability.metrics import admission_shed_total
+
+
+def test_gate_queues_hands_over_and_sheds() -> None:
+    async def scenario() -> None:
+        gate = ConcurrencyGate("test", ClassLimits(concurrency=1, queue=1, timeout_ms=50))
+        await gate.acquire()
+
+        waiter = asyncio.ensure_future(gate.acquire())
+        await asyncio.sleep(0)
+        assert gate.queued == 1
+        with pytest.raises(Rejected) as full:
+            await gate.acquire()
+        assert full.value.reason == "queue_full"
+
+        gate.release()
+        await waiter
+        assert gate.active == 1 and gate.queued == 0
+
+        with pytest.raises(Rejected) as late:
+            await gate.acquire()
+        assert late.value.reason == "timeout"
+        assert gate.queued == 0
+
+        gate.release()
+        assert gate.active == 0
+        await gate.acquire()
+        assert gate.active == 1
+
+    asyncio.run(scenario())
+
+
+def test_token_buckets_refill_at_rate() -> None:
+    buckets = ShardedTokenBuckets(rate=2.0, burst=2, shards=4)
+    assert buckets.take("alice", now=0.0) == 0
+    assert buckets.take("alice", now=0.0) == 0
+    assert buckets.take("alice", now=0.0) == pytest.approx(0.5)
+    assert buckets.take("bob", now=0.0) == 0
+    assert buckets.take("alice", now=0.5) == 0
+
+
+def test_middleware_sheds_expensive_class_and_rate_limits_per_user() -> None:
+    assert classify("/api/auth/login") == "auth"
+    assert classify("/api/auth/mqtt") == "default"
+    assert classify("/healthz") == "exempt"
+
+    settings = Settings(
+        admission_limits={"auth": {"concurrency": 0, "queue": 0}},
+        rate_limit_per_second=0.001,
+        rate_limit_burst=2,
+    )
+    shed = admission_shed_total.labels("auth", "queue_full")
+    before = shed.value
+    with TestClient(create_app(settings)) as client:
+        response = client.post("/api/auth/login", json={"username": "alice", "password": "secret"})
+        assert response.status_code == 503
+        assert int(response.headers["retry-after"]) >= 1
+        assert shed.value == before + 1
+
+        headers = {"Authorization": "Bearer user_alice"}
+        assert [client.get("/api/profile", headers=headers).status_code for _ in range(3)] == [200, 200, 429]
+        assert client.get("/api/profile", headers={"Authorization": "Bearer user_bob"}).status_code == 200
+        assert all(client.get("/healthz").status_code == 200 for _ in range(5))
@@ -53,6 +53,26 @@ async def test_authentication_and_profile(async_api_client) -> None:
     assert headers["Authorization"].startswith("Bearer ")
 
 
+@pytest.mark.anyio
+async def test_refresh_tokens_rotate_and_reuse_revokes_the_family(async_api_client) -> None:
+    first = (await _register_and_login(async_api_client))["refresh"]
+
+    rotated = await async_api_client.post("/api/auth/refresh", json={"refresh_token": first})
+    assert rotated.status_code == 200
+    second = rotated.json()["refresh_token"]
+
+    replay = await async_api_client.post("/api/auth/refresh", json={"refresh_token": first})
+    assert replay.status_code == 401
+    assert replay.json()["detail"] == "Refresh token reuse detected"
+    revoked = await async_api_client.post("/api/auth/refresh", json={"refresh_token": second})
+    assert revoked.status_code == 401
+
+    login = await async_api_client.post("/api/auth/login", json={"username": "alice", "password": "secret123"})
+    fresh = login.json()["refresh_token"]
+    assert (await async_api_client.post("/api/auth/logout", json={"refresh_token": fresh})).status_code == 204
+    assert (await async_api_client.post("/api/auth/refresh", json={"refresh_token": fresh})).status_code == 401
+
+
 @pytest.mark.anyio
 async def test_issue_mqtt_credentials(async_api_client) -> None:
     headers = await _register_and_login(async_api_client)
@@ -39,6 +39,23 @@ def test_device_crud_flow(api_client, auth_header, sample_device_payload) -> Non
     assert list_after.json()["devices"] == []
 
 
+def test_heartbeats_mark_registered_devices_online(api_client, auth_header, admin_header, sample_device_payload) -> None:
+    api_client.post("/api/devices", headers=auth_header, json=sample_device_payload)
+    assert api_client.get("/api/devices", headers=auth_header).json()["devices"][0]["online"] is False
+
+    assert api_client.post("/api/devices/lamp-1/heartbeat", headers=auth_header).status_code == 204
+    assert api_client.post("/api/devices/nope/heartbeat", headers=auth_header).status_code == 404
+    assert api_client.get("/api/devices", headers=auth_header).json()["devices"][0]["online"] is True
+
+    api_client.delete("/api/devices/lamp-1", headers=auth_header)
+    api_client.post("/api/devices", headers=auth_header, json=sample_device_payload)
+    topics = ["users/alice/devices/lamp-1/state", "users/alice/devices/ghost/state", "sensors/raw"]
+    bridged = api_client.post("/admin/presence/heartbeats", headers=admin_header, json={"topics": topics})
+
+    assert bridged.json() == {"accepted": 1, "ignored": 2}
+    assert api_client.get("/api/devices", headers=auth_header).json()["devices"][0]["online"] is True
+
+
 def test_duplicate_device_returns_error(api_client, auth_header, sample_device_payload) -> None:
     first = api_client.post("/api/devices", headers=auth_header, json=sample_device_payload)
     assert first.status_code == 201
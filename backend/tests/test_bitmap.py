@@ -0,0 +1,37 @@
+import random
+
+from backend.app.repositories.bitmap import ARRAY_MAX, Bitmap
+
+
+def test_set_algebra_matches_python_sets_across_container_kinds() -> None:
+    rng = random.Random(11)
+    # Dense chunks become bitsets, sparse ones stay arrays; both kinds meet in every operation.
+    dense = {rng.randrange(1 << 17) for _ in range(3 * ARRAY_MAX)}
+    sparse = {rng.randrange(1 << 18) for _ in range(500)} | set(list(dense)[:100])
+    a, b = Bitmap(dense), Bitmap(sparse)
+
+    assert list(a) == sorted(dense) and len(a) == len(dense)
+    assert list(a & b) == sorted(dense & sparse)
+    assert list(a | b) == sorted(dense | sparse)
+    assert list(a - b) == sorted(dense - sparse)
+    assert list(b - a) == sorted(sparse - dense)
+    start = sorted(dense)[len(dense) // 2]
+    assert list(a.iter_from(start)) == sorted(value for value in dense if value >= start)
+
+
+def test_discard_shrinks_and_in_place_updates_keep_membership() -> None:
+    values = set(range(0, 3 * ARRAY_MAX, 1)) | {1 << 20}
+    bitmap = Bitmap(values)
+    for value in range(0, 3 * ARRAY_MAX, 2):
+        bitmap.discard(value)
+        values.discard(value)
+    other = Bitmap(range(1, 200, 2))
+
+    bitmap -= other
+    values -= set(range(1, 200, 2))
+
+    assert list(bitmap) == sorted(values)
+    assert (1 << 20) in bitmap and 1 not in bitmap
+    bitmap |= other
+    assert len(bitmap) == len(values | set(range(1, 200, 2)))
+    assert not Bitmap([5]) - Bitmap([5])
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import time
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi.testclient import TestClient
+from jose import jwk, jwt
+
+from backend.app.config import Settings
+from backend.app.google_auth import JWKSCache, google_keys
+from backend.app.main import create_app
+
+CLIENT_ID = "web-client.apps.googleusercontent.com"
+
+
+class StubIssuer:
+    """Plays Google's JWKS and token endpoints for an in-process httpx client."""
+
+    def __init__(self) -> None:
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        public_pem = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        self.jwk = dict(jwk.construct(public_pem, "RS256").to_dict(), kid="stub-1", use="sig")
+        self.requests: list[str] = []
+
+    def id_token(self, sub: str = "google-123", audience: str = CLIENT_ID, **claims) -> str:
+        now = int(time.time())
+        payload = {"iss": "https://accounts.google.com", "aud": audience, "sub": sub, "iat": now, "exp": now + 600}
+        payload.update(claims)
+        return jwt.encode(payload, self.private_pem, algorithm="RS256", headers={"kid": "stub-1"})
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request.url.path)
+        if request.url.path == "/oauth2/v3/certs":
+            return httpx.Response(200, json={"keys": [self.jwk]}, headers={"Cache-Control": "public, max-age=3600"})
+        if request.url.path == "/token":
+            token = self.id_token(sub="google-callback", email="carol@example.com")
+            return httpx.Response(200, content=json.dumps({"access_token": "ya29", "id_token": token}))
+        return httpx.Response(404)
+
+
+def test_google_id_tokens_are_verified_locally_with_cached_keys() -> None:
+    issuer = StubIssuer()
+    app = create_app(Settings(google_client_id=CLIENT_ID, google_client_secret="secret"))
+    app.state.http_client = httpx.AsyncClient(transport=httpx.MockTransport(issuer.handler))
+
+    with TestClient(app) as client:
+        first = client.post("/api/auth/google", json={"id_token": issuer.id_token(email="dana@example.com")})
+        assert first.status_code == 200
+        again = client.post("/api/auth/google", json={"id_token": issuer.id_token(email="dana@example.com")})
+        assert again.status_code == 200
+        access = {"Authorization": f"Bearer {again.json()['access_token']}"}
+        assert client.get("/api/profile", headers=access).json()["username"] == "dana"
+
+        assert client.post("/api/auth/google", json={"id_token": issuer.id_token(audience="other")}).status_code == 401
+        assert client.post("/api/auth/google", json={"id_token": "not-a-jwt"}).status_code == 401
+
+        callback = client.get("/api/auth/google/callback", params={"code": "abc"})
+        assert callback.status_code == 200
+
+    # One key fetch (the startup prefetch) served every sign-in; only the code exchange hit "Google".
+    assert issuer.requests.count("/oauth2/v3/certs") == 1
+    assert issuer.requests.count("/token") == 1
+    assert google_keys.fetches == 1
+
+
+def test_failed_key_refresh_backs_off_and_keeps_serving_stale_keys() -> None:
+    issuer = StubIssuer()
+    keys = JWKSCache("https://www.googleapis.com/oauth2/v3/certs", 3600)
+    calls = []
+
+    def down(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(503)
+
+    async def scenario() -> list:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(issuer.handler)) as client:
+            await keys.refresh(client)
+        keys._expires_at = 0.0  # the cached set has expired and Google is down
+        async with httpx.AsyncClient(transport=httpx.MockTransport(down)) as client:
+            found = await asyncio.gather(*(keys.get_key(client, "stub-1") for _ in range(5)))
+            found.append(await keys.get_key(client, "stub-1"))
+        return found
+
+    found = asyncio.run(scenario())
+
+    assert [key["kid"] for key in found] == ["stub-1"] * 6
+    assert len(calls) == 1 and keys.expires_in > 0
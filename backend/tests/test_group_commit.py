@@ -0,0 +1,78 @@
+import sqlite3
+import threading
+
+import pytest
+
+from backend.app.repositories import SQLiteProfile, create_sqlite_provider
+from backend.app.repositories.sqlalchemy import LocationModel
+
+
+@pytest.fixture
+def provider(tmp_path):
+    profile = SQLiteProfile(group_commit_window_ms=200)
+    provider = create_sqlite_provider(f"sqlite:///{tmp_path / 'group.sqlite'}", profile)
+    yield provider
+    provider.close()
+
+
+def _insert(location_id: str):
+    def work(session):
+        session.add(LocationModel(id=location_id, name=location_id))
+        session.flush()
+        return location_id
+
+    return work
+
+
+def test_batch_commits_together_and_isolates_a_failing_write(provider, tmp_path) -> None:
+    visible = []
+
+    def on_done(_future) -> None:
+        # Runs on the writer thread right after COMMIT: a separate connection sees both rows.
+        with sqlite3.connect(tmp_path / "group.sqlite") as conn:
+            visible.append(conn.execute("SELECT count(*) FROM locations").fetchone()[0])
+
+    def missing(session):
+        raise KeyError("Location not found")
+
+    first = provider.writer.submit(_insert("a"))
+    first.add_done_callback(on_done)
+    failed = provider.writer.submit(missing)
+    last = provider.writer.submit(_insert("b"))
+
+    assert first.result() == "a" and last.result() == "b"
+    with pytest.raises(KeyError):
+        failed.result()
+    assert visible == [2]
+    assert {location.id for location in provider.locations.list()} == {"a", "b"}
+
+
+def test_concurrent_repository_writes_all_land(provider) -> None:
+    location = provider.locations.create("HQ")
+    errors = []
+
+    def create() -> None:
+        try:
+            provider.buildings.create("Tower", location.id)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=create) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(provider.buildings.list_for_location(location.id)) == 20
+    with pytest.raises(ValueError):
+        provider.buildings.create("Orphan", "missing")
+
+
+def test_close_commits_queued_writes(provider) -> None:
+    pending = provider.writer.submit(_insert("queued"))
+    provider.close()
+
+    assert pending.result(timeout=0) == "queued"
+    with pytest.raises(RuntimeError):
+        provider.writer.submit(_insert("late"))
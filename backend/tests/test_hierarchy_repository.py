@@ -0,0 +1,291 @@
+import pytest
+
+from backend.app.models import Device
+from backend.app.repositories import create_in_memory_provider, create_sqlite_provider
+from backend.app.repositories.search_index import InMemorySearchIndex
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def provider(request, tmp_path):
+    if request.param == "memory":
+        yield create_in_memory_provider()
+        return
+    provider = create_sqlite_provider(f"sqlite:///{tmp_path / 'tree.sqlite'}")
+    yield provider
+    provider.close()
+
+
+def _tree(provider, name: str):
+    location = provider.locations.create(name)
+    zone_ids = []
+    for b in range(2):
+        building = provider.buildings.create(f"{name} B{b}", location.id)
+        for z in range(2):
+            zone = provider.zones.create(f"{name} Z{z}", building.id)
+            zone_ids.append(zone.id)
+            provider.areas.create(f"{name} A", zone.id)
+            provider.zone_devices.add(Device(id="lamp", name="Lamp", zone_id=zone.id))
+    return location, zone_ids
+
+
+def test_deleting_a_location_removes_its_subtree_and_devices_only(provider) -> None:
+    doomed, doomed_zones = _tree(provider, "Doomed")
+    kept, kept_zones = _tree(provider, "Kept")
+
+    provider.locations.delete(doomed.id)
+
+    assert provider.locations.get(doomed.id) is None
+    assert provider.buildings.list_for_location(doomed.id) == []
+    for zone_id in doomed_zones:
+        assert provider.zones.get(zone_id) is None
+        assert provider.areas.list_for_zone(zone_id) == []
+        assert provider.zone_devices.list_by_zone(zone_id) == []
+    assert len(provider.locations.get(kept.id).buildings) == 2
+    assert all(provider.zone_devices.get(zone_id, "lamp") is not None for zone_id in kept_zones)
+    with pytest.raises(KeyError):
+        provider.locations.delete(doomed.id)
+
+
+def test_deleting_a_zone_keeps_its_siblings(provider) -> None:
+    location, zone_ids = _tree(provider, "Site")
+
+    provider.zones.delete(zone_ids[0])
+
+    assert provider.zone_devices.list_by_zone(zone_ids[0]) == []
+    assert [area.zone_id for area in provider.areas.list_for_zone(zone_ids[1])] == [zone_ids[1]]
+    assert sum(len(building.zones) for building in provider.locations.get(location.id).buildings) == 3
+
+
+def test_list_under_returns_each_level_of_a_subtree(provider) -> None:
+    location, zone_ids = _tree(provider, "Site")
+    _tree(provider, "Other")
+    building = provider.buildings.list_for_location(location.id)[0]
+
+    assert {b.id for b in provider.buildings.list_under((location.id,))} == {
+        b.id for b in provider.buildings.list_for_location(location.id)
+    }
+    assert {zone.id for zone in provider.zones.list_under((location.id,))} == set(zone_ids)
+    assert {zone.building_id for zone in provider.zones.list_under((location.id, building.id))} == {building.id}
+    assert len(provider.areas.list_under((location.id,))) == 4
+    assert [area.zone_id for area in provider.areas.list_under((location.id, building.id, zone_ids[0]))] == [
+        zone_ids[0]
+    ]
+    assert {device.zone_id for device in provider.zone_devices.list_under((location.id,))} == set(zone_ids)
+    assert provider.areas.list_under(("Other", building.id)) == []
+
+    provider.zones.delete(zone_ids[0])
+
+    assert len(provider.areas.list_under((location.id,))) == 3
+    assert len(provider.zone_devices.list_under((location.id, building.id))) == 1
+
+
+def test_sqlite_backfills_paths_labels_and_search_for_existing_databases(tmp_path) -> None:
+    url = f"sqlite:///{tmp_path / 'legacy.sqlite'}"
+    provider = create_sqlite_provider(url)
+    location, zone_ids = _tree(provider, "Legacy")
+    with provider.engine.begin() as conn:
+        for table in ("zone_devices", "areas", "zones", "buildings"):
+            conn.exec_driver_sql(f"DROP INDEX ix_{table}_path")
+            conn.exec_driver_sql(f"ALTER TABLE {table} DROP COLUMN path")
+        conn.exec_driver_sql("ALTER TABLE zone_devices DROP COLUMN tags")
+        conn.exec_driver_sql("ALTER TABLE zone_devices DROP COLUMN capabilities")
+        conn.exec_driver_sql("DROP TRIGGER zone_devices_labels_ad")
+        conn.exec_driver_sql("DROP TABLE zone_device_labels")
+        conn.exec_driver_sql("DROP TABLE search_names")
+        conn.exec_driver_sql("DROP TABLE search_nodes")
+    provider.close()
+
+    provider = create_sqlite_provider(url)
+    try:
+        assert {area.zone_id for area in provider.areas.list_under((location.id,))} == set(zone_ids)
+        assert [device.tags for device in provider.zone_devices.list_under((location.id,))] == [[]] * 4
+        provider.zone_devices.add(Device(id="dimmer", name="Dimmer", zone_id=zone_ids[0], tags=["lighting"]))
+        assert provider.zone_devices.match_under((location.id,), ["lighting"])[1] == 1
+        assert [hit.path[0][1] for hit in provider.search.search("legacy a")] == ["Legacy"] * 4
+    finally:
+        provider.close()
+
+
+def test_sqlite_gives_rowid_keyed_device_tables_an_ordinal_the_labels_keep_pointing_at(tmp_path) -> None:
+    url = f"sqlite:///{tmp_path / 'legacy.sqlite'}"
+    provider = create_sqlite_provider(url)
+    location, zone_ids = _tree(provider, "Legacy")
+    for zone_id in zone_ids:
+        provider.zone_devices.add(Device(id="dimmer", name="Dimmer", zone_id=zone_id, tags=["lighting"]))
+    with provider.engine.begin() as conn:
+        conn.exec_driver_sql("DROP TRIGGER zone_devices_labels_ad")
+        conn.exec_driver_sql(
+            "CREATE TABLE legacy (zone_id VARCHAR NOT NULL REFERENCES zones (id) ON DELETE CASCADE,"
+            " id VARCHAR NOT NULL, name VARCHAR NOT NULL, owner_id VARCHAR, created_at DATETIME NOT NULL,"
+            " path VARCHAR NOT NULL, tags JSON NOT NULL, capabilities JSON NOT NULL, PRIMARY KEY (zone_id, id))"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO legacy (rowid, zone_id, id, name, owner_id, created_at, path, tags, capabilities)"
+            " SELECT ordinal, zone_id, id, name, owner_id, created_at, path, tags, capabilities FROM zone_devices"
+        )
+        conn.exec_driver_sql("DROP TABLE zone_devices")
+        conn.exec_driver_sql("ALTER TABLE legacy RENAME TO zone_devices")
+        conn.exec_driver_sql(
+            "CREATE TRIGGER zone_devices_labels_ad AFTER DELETE ON zone_devices BEGIN"
+            " DELETE FROM zone_device_labels WHERE device = old.rowid; END"
+        )
+    provider.close()
+
+    provider = create_sqlite_provider(url)
+    try:
+        matched, count, _ = provider.zone_devices.match_under((location.id,), ["lighting"])
+        assert count == 4 and sorted(device.zone_id for device in matched) == sorted(zone_ids)
+        provider.zone_devices.delete(zone_ids[0], "dimmer")
+        provider.zone_devices.add(Device(id="spot", name="Spot", zone_id=zone_ids[0], tags=["lighting"]))
+        matched, count, _ = provider.zone_devices.match_under((location.id,), ["lighting"])
+        assert count == 4 and [device.id for device in matched][-1] == "spot"
+        assert provider.zone_devices.get(zone_ids[1], "lamp").name == "Lamp"
+    finally:
+        provider.close()
+
+
+def test_memory_device_churn_reuses_freed_ordinals() -> None:
+    provider = create_in_memory_provider()
+    location, zone_ids = _tree(provider, "Churn")
+    devices = provider.zone_devices
+    for round_ in range(20):
+        for n in range(10):
+            devices.add(Device(id=f"d{n}", name="Dimmer", zone_id=zone_ids[n % 4], tags=["lighting"]))
+        for n in range(10):
+            devices.delete(zone_ids[n % 4], f"d{n}")
+
+    assert len(devices._records) == 14
+    devices.add(Device(id="spot", name="Spot", zone_id=zone_ids[1], tags=["lighting"]))
+    matched, count, _ = devices.match_under((location.id,), ["lighting"])
+    assert count == 1 and [(d.id, d.zone_id) for d in matched] == [("spot", zone_ids[1])]
+    assert sorted(d.id for d in devices.list_under((location.id,))) == ["lamp"] * 4 + ["spot"]
+
+
+def test_page_under_resumes_after_the_cursor_with_filters(provider) -> None:
+    location, zone_ids = _tree(provider, "Site")
+    for zone_id in zone_ids:
+        provider.zone_devices.add(Device(id="fan", name="Fan", owner_id="ops", zone_id=zone_id))
+
+    first, after = provider.zone_devices.page_under((location.id,), limit=3)
+    rest, end = provider.zone_devices.page_under((location.id,), after, limit=10)
+    owned, _ = provider.zone_devices.page_under((location.id,), owner_id="ops", name_prefix="F")
+
+    assert len(first) == 3 and after is not None and end is None
+    assert len({(d.zone_id, d.id) for d in first + rest}) == 8
+    assert sorted((d.zone_id, d.id) for d in owned) == sorted((zone_id, "fan") for zone_id in zone_ids)
+    assert provider.zone_devices.page_under((location.id,), name_prefix="f")[0] == []
+
+
+def test_search_follows_creates_renames_and_deletes(provider) -> None:
+    location, zone_ids = _tree(provider, "Campus")
+    zone = provider.zones.get(zone_ids[1])
+    room = provider.areas.create("Meeting Room 3B", zone.id)
+    provider.areas.create("Meeting Room 3", zone.id)
+    provider.areas.create("Kitchen", zone.id)
+
+    hits = provider.search.search("meeting room 3")
+    assert [hit.name for hit in hits] == ["Meeting Room 3", "Meeting Room 3B"]
+    building = provider.buildings.get(zone.building_id)
+    assert [name for _, name in hits[1].path] == ["Campus", building.name, zone.name, "Meeting Room 3B"]
+    assert [node_id for node_id, _ in hits[1].path] == [location.id, building.id, zone.id, room.id]
+    assert [hit.name for hit in provider.search.search("MÉET")] == ["Meeting Room 3", "Meeting Room 3B"]
+
+    provider.areas.update(type(room)(id=room.id, name="Boardroom", zone_id=zone.id))
+    assert [hit.name for hit in provider.search.search("board")] == ["Boardroom"]
+    assert [hit.name for hit in provider.search.search("meeting room 3b")] == []
+
+    provider.zones.delete(zone.id)
+    assert provider.search.search("boardroom") == []
+    assert len(provider.search.search("campus z")) == 3
+    provider.locations.delete(location.id)
+    assert provider.search.search("campus") == []
+
+
+def test_search_folds_case_and_compatibility_forms_the_same_in_both_backends(provider) -> None:
+    location = provider.locations.create("Lange Straße")
+    provider.buildings.create("Ｆinance Ｄžungla", location.id)
+    provider.buildings.create("ﬁnance Große Halle", location.id)
+
+    assert [hit.name for hit in provider.search.search("STRASSE")] == ["Lange Straße"]
+    assert len(provider.search.search("finance")) == len(provider.search.search("fi")) == 2
+    assert [hit.name for hit in provider.search.search("grosse")] == ["ﬁnance Große Halle"]
+    assert [hit.name for hit in provider.search.search("dž")] == ["Ｆinance Ｄžungla"]
+    assert [hit.name for hit in provider.search.search("ǅu")] == ["Ｆinance Ｄžungla"]
+
+
+def test_memory_search_index_renumbers_and_keeps_paths_through_churn() -> None:
+    index = InMemorySearchIndex()
+    index.add(("loc",), "Campus")
+    index.add(("loc", "bld"), "Tower")
+    for round_ in range(50):
+        for n in range(10):
+            index.add(("loc", "bld", f"z{n}"), f"Zone {n} round {round_}")
+    index.add(("loc", "bld"), "Annex")
+
+    assert len(index) == 12 and len(index._names) < 40
+    hits = index.search("zone 7 round")
+    assert [hit.name for hit in hits] == ["Zone 7 round 49"]
+    assert hits[0].path == [("loc", "Campus"), ("bld", "Annex"), ("z7", "Zone 7 round 49")]
+    assert index.search("round 30") == [] and len(index.search("round 49")) == 10
+
+    index.discard(("loc", "bld", "z7"))
+    assert index.search("zone 7") == [] and index.search("tower") == []
+
+
+def test_sqlite_rebuilds_a_search_index_tokenized_by_sqlite(tmp_path) -> None:
+    url = f"sqlite:///{tmp_path / 'legacy.sqlite'}"
+    provider = create_sqlite_provider(url)
+    provider.locations.create("Große Halle")
+    with provider.engine.begin() as conn:
+        for trigger in ("search_nodes_ai", "search_nodes_ad", "search_nodes_au"):
+            conn.exec_driver_sql(f"DROP TRIGGER {trigger}")
+        conn.exec_driver_sql("DROP TABLE search_names")
+        conn.exec_driver_sql("ALTER TABLE search_nodes DROP COLUMN words")
+        conn.exec_driver_sql(
+            "CREATE VIRTUAL TABLE search_names USING fts5(name, content='search_nodes', content_rowid='id',"
+            " tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')"
+        )
+        conn.exec_driver_sql("INSERT INTO search_names(search_names) VALUES ('rebuild')")
+    provider.close()
+
+    provider = create_sqlite_provider(url)
+    try:
+        assert [hit.name for hit in provider.search.search("grosse")] == ["Große Halle"]
+        provider.locations.create("Straße")
+        assert [hit.name for hit in provider.search.search("strasse")] == ["Straße"]
+    finally:
+        provider.close()
+
+
+def test_match_under_combines_labels_subtrees_and_exclusions(provider) -> None:
+    location, zone_ids = _tree(provider, "Site")
+    other, other_zones = _tree(provider, "Other")
+    for zone_id in zone_ids + other_zones:
+        provider.zone_devices.add(
+            Device(id="dimmer", name="Dimmer", zone_id=zone_id, tags=["lighting"], capabilities=["dimmable"])
+        )
+        provider.zone_devices.add(Device(id="spot", name="Spot", zone_id=zone_id, tags=["lighting"]))
+    building = provider.buildings.get(provider.zones.get(zone_ids[0]).building_id)
+    excluded = (location.id, building.id, zone_ids[0])
+
+    in_building, count, end = provider.zone_devices.match_under(
+        (location.id, building.id), ["lighting"], ["dimmable"], [excluded]
+    )
+    first, _, after = provider.zone_devices.match_under((location.id,), [], ["dimmable"], [excluded], limit=2)
+    rest, total, end_of_location = provider.zone_devices.match_under(
+        (location.id,), [], ["dimmable"], [excluded], after=after, limit=2
+    )
+
+    assert count == 1 and end is None
+    assert [(d.id, d.zone_id, d.capabilities) for d in in_building] == [("dimmer", zone_ids[1], ["dimmable"])]
+    assert total == 3 and len(first) == 2 and len(rest) == 1 and end_of_location is None
+    assert {d.zone_id for d in first + rest} == set(zone_ids[1:])
+    assert provider.zone_devices.match_under((location.id,), ["lighting"])[1] == 8
+    assert provider.zone_devices.match_under((location.id,), ["heating"])[:2] == ([], 0)
+
+    provider.zone_devices.delete(zone_ids[1], "dimmer")
+    provider.zones.delete(zone_ids[2])
+    assert provider.zone_devices.match_under((location.id,), [], ["dimmable"])[1] == 2
+    provider.locations.delete(location.id)
+    assert provider.zone_devices.match_under((other.id,), ["lighting"], ["dimmable"])[1] == 4
+    assert provider.zone_devices.match_under((location.id,), ["lighting"])[1] == 0
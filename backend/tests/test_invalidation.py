@@ -0,0 +1,159 @@
+import multiprocessing
+import time
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from backend.app.auth import USER_TOPIC, AccessTokenCache
+from backend.app.invalidation import InvalidationBus, SQLiteInvalidationBus
+from backend.app.models import User
+from backend.app.repositories import create_sqlite_provider
+from backend.app.consistency import HEADER, ConsistencyMiddleware
+from backend.app.repositories.cached import CachingRepositoryProvider
+from backend.app.revocation import REVOCATION_TOPIC
+
+
+def _eventually(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+def test_sqlite_bus_delivers_to_other_instances_only_once(tmp_path) -> None:
+    path = str(tmp_path / "bus.sqlite")
+    first, second = SQLiteInvalidationBus(path, 0.001), SQLiteInvalidationBus(path, 0.001)
+    seen_first, seen_second = [], []
+    first.subscribe("users", lambda topic, key: seen_first.append(key))
+    second.subscribe("users", lambda topic, key: seen_second.append(key))
+    try:
+        first.publish("users", "u1")
+        assert seen_first == ["u1"]
+        assert _eventually(lambda: seen_second == ["u1"])
+        time.sleep(0.02)
+        assert seen_first == ["u1"]
+    finally:
+        first.close()
+        second.close()
+
+
+def test_access_token_cache_drops_a_users_tokens_on_invalidation(monkeypatch) -> None:
+    bus = InvalidationBus()
+    monkeypatch.setattr("backend.app.auth.get_bus", lambda: bus)
+    cache = AccessTokenCache(max_entries=10, ttl_seconds=60)
+    alice, bob = User(id="alice", username="alice"), User(id="bob", username="bob")
+    cache.put("token-a", alice)
+    cache.put("token-b", bob, family="login-1")
+    cache.put("token-b2", bob, family="login-2")
+
+    generation = cache.generation
+    bus.publish(USER_TOPIC, "alice")
+    bus.publish(REVOCATION_TOPIC, "login-1")
+    cache.put("token-a2", alice, generation=generation)
+
+    assert cache.get("token-a") is None
+    assert cache.get("token-a2") is None
+    assert cache.get("token-b") is None
+    assert cache.get("token-b2") == bob
+
+
+def test_cached_reads_hand_out_copies(tmp_path) -> None:
+    db_url = f"sqlite:///{tmp_path / 'app.sqlite'}"
+    provider = CachingRepositoryProvider(create_sqlite_provider(db_url), InvalidationBus())
+    location = provider.locations.create("HQ")
+    provider.buildings.create("North", location.id)
+
+    for _ in range(2):  # a miss, then a hit
+        read = provider.locations.get(location.id)
+        read.name = "edited"
+        read.buildings[0].name = "edited"
+
+    again = provider.locations.get(location.id)
+    assert again.name == "HQ" and [b.name for b in again.buildings] == ["North"]
+    assert provider.cache.counts()["entries"] == 1
+
+
+def _worker(index, db_url, bus_path, location_id, rounds, barrier, results) -> None:
+    bus = SQLiteInvalidationBus(bus_path, 0.002)
+    storage = create_sqlite_provider(db_url)
+    provider = CachingRepositoryProvider(storage, bus)
+    provider.locations.get(location_id)
+    barrier.wait()
+    for round_ in range(rounds):
+        current = provider.locations.get(location_id)
+        provider.locations.update(type(current)(id=current.id, name=f"w{index}-{round_}", buildings=current.buildings))
+    barrier.wait()
+    truth = storage.locations.get(location_id).name
+    started = time.monotonic()
+    converged = _eventually(lambda: provider.locations.get(location_id).name == truth)
+    results.put(
+        {
+            "index": index,
+            "converged": converged,
+            "lag_ms": (time.monotonic() - started) * 1000,
+            "name": provider.locations.get(location_id).name,
+            "truth": truth,
+        }
+    )
+    bus.close()
+
+
+def test_workers_converge_on_concurrent_writes(tmp_path) -> None:
+    db_url = f"sqlite:///{tmp_path / 'app.sqlite'}"
+    bus_path = str(tmp_path / "bus.sqlite")
+    location = create_sqlite_provider(db_url).locations.create("HQ")
+    SQLiteInvalidationBus(bus_path).close()
+
+    workers = 3
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(workers), context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(i, db_url, bus_path, location.id, 20, barrier, results))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    reports = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join(timeout=10)
+
+    final = create_sqlite_provider(db_url).locations.get(location.id).name
+    assert all(report["converged"] for report in reports), reports
+    assert {report["name"] for report in reports} == {final}
+    assert all(report["lag_ms"] < 500 for report in reports), reports
+
+
+def test_consistency_token_bypasses_a_worker_cache_that_lags_the_write(tmp_path) -> None:
+    db_url = f"sqlite:///{tmp_path / 'tree.sqlite'}"
+    bus_path = str(tmp_path / "bus.sqlite")
+    # Two "workers"; the reader's bus is never polled during the test.
+    writer_bus, reader_bus = SQLiteInvalidationBus(bus_path, 0.001), SQLiteInvalidationBus(bus_path, 3600)
+    writer = CachingRepositoryProvider(create_sqlite_provider(db_url), writer_bus)
+    reader = CachingRepositoryProvider(create_sqlite_provider(db_url), reader_bus)
+    location = writer.locations.create("Old name")
+
+    async def rename(request):
+        current = writer.locations.get(location.id)
+        current.name = "New name"
+        writer.locations.update(current)
+        return PlainTextResponse("")
+
+    async def read(request):
+        return PlainTextResponse(reader.locations.get(location.id).name)
+
+    app = ConsistencyMiddleware(Starlette(routes=[Route("/rename", rename, methods=["POST"]), Route("/read", read)]))
+    try:
+        with TestClient(app) as client:
+            assert client.get("/read").text == "Old name"  # now cached by the reader
+            token = client.post("/rename").headers[HEADER]
+
+            assert client.get("/read").text == "Old name"
+            assert client.get("/read", headers={HEADER: token}).text == "New name"
+    finally:
+        for provider, bus in ((writer, writer_bus), (reader, reader_bus)):
+            provider.close()
+            bus.close()
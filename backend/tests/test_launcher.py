@@ -0,0 +1,83 @@
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from backend.app import launcher
+from backend.app.config import Settings
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def test_zero_workers_means_one_per_cpu(monkeypatch) -> None:
+    monkeypatch.setattr(launcher.os, "cpu_count", lambda: 6)
+
+    assert launcher.parse_args(["--workers", "0"]).workers == 6
+    assert launcher.parse_args(["--workers", "3", "--port", "0"]).workers == 3
+    monkeypatch.setattr(launcher.os, "cpu_count", lambda: None)
+    assert launcher.parse_args(["--workers", "0"]).workers == 1
+
+
+def test_shared_state_points_workers_at_one_bus(monkeypatch, caplog) -> None:
+    monkeypatch.delenv("APP_INVALIDATION_BUS_PATH", raising=False)
+    cleanups = []
+    monkeypatch.setattr(launcher.atexit, "register", lambda func, *args: cleanups.append((func, args)))
+
+    with caplog.at_level("WARNING", logger="backend.launcher"):
+        launcher._prepare_shared_state(Settings(storage_backend="memory", invalidation_bus_path=""))
+
+    path = os.environ["APP_INVALIDATION_BUS_PATH"]
+    assert path.endswith(f"backend-invalidation-{os.getpid()}.sqlite")
+    assert cleanups == [(launcher._remove_bus_files, (path,))]
+    assert "separate copy" in caplog.text
+
+    monkeypatch.setenv("APP_INVALIDATION_BUS_PATH", "/tmp/explicit.sqlite")
+    launcher._prepare_shared_state(
+        Settings(storage_backend="sqlite", user_repository_backend="sqlite", invalidation_bus_path="/tmp/explicit.sqlite")
+    )
+    assert os.environ["APP_INVALIDATION_BUS_PATH"] == "/tmp/explicit.sqlite" and len(cleanups) == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="the launcher pre-forks workers")
+def test_master_serves_and_drains_on_sigterm() -> None:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "backend.app.launcher", "--workers", "1", "--host", "127.0.0.1", "--port", "0"],
+        cwd=REPO_ROOT,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        port = None
+        for line in process.stderr:
+            match = re.search(r"listening on 127\.0\.0\.1:(\d+)", line)
+            if match:
+                port = int(match.group(1))
+                break
+        assert port
+
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1) as response:
+                    assert response.status == 200
+                    break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+
+        process.send_signal(signal.SIGTERM)
+        _, errors = process.communicate(timeout=30)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.communicate()
+
+    assert process.returncode == 0
+    assert "draining 1 workers" in errors and "exited with 0" in errors
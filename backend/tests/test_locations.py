@@ -1,5 +1,12 @@
+import json
+import threading
+
 from fastapi.testclient import TestClient
 
+from backend.app.config import Settings
+from backend.app.main import create_app
+from backend.app.presence import PresenceTracker
+
 
 def test_location_building_zone_area_flow(api_client: TestClient) -> None:
     location_resp = api_client.post("/api/v1/locations", json={"name": "Home"})
@@ -131,3 +138,174 @@ def test_update_requires_fields(api_client: TestClient) -> None:
 
     empty_update = api_client.put(f"/api/v1/locations/{location_id}", json={})
     assert empty_update.status_code == 400
+
+
+def test_subtree_device_listing_pages_filters_and_streams(api_client: TestClient) -> None:
+    location_id = api_client.post("/api/v1/locations", json={"name": "Campus"}).json()["id"]
+    base = f"/api/v1/locations/{location_id}"
+    building_ids = []
+    for b in range(2):
+        building_id = api_client.post(f"{base}/buildings", json={"name": f"B{b}"}).json()["id"]
+        building_ids.append(building_id)
+        for z in range(2):
+            zone = api_client.post(f"{base}/buildings/{building_id}/zones", json={"name": f"Z{z}"}).json()
+            for d in range(3):
+                api_client.post(
+                    f"{base}/buildings/{building_id}/zones/{zone['id']}/devices",
+                    json={"device_id": f"d{d}", "name": "Lamp" if d else "Sensor"},
+                )
+
+    items, cursor = [], None
+    while True:
+        page = api_client.get(f"{base}/devices", params={"limit": 5, **({"cursor": cursor} if cursor else {})}).json()
+        items.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    seen = [(item["zone_id"], item["device_id"]) for item in items]
+    assert len(seen) == len(set(seen)) == 12
+
+    building_devices = api_client.get(f"{base}/buildings/{building_ids[0]}/devices", params={"name_prefix": "Lamp"})
+    assert len(building_devices.json()["items"]) == 4
+
+    streamed = api_client.get(f"{base}/devices", headers={"Accept": "application/x-ndjson"})
+    assert streamed.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in streamed.text.splitlines()] == items
+
+    assert api_client.get("/api/v1/locations/missing/devices").status_code == 404
+    assert api_client.get(f"{base}/buildings/missing/devices").status_code == 404
+    assert api_client.get(f"{base}/devices", params={"cursor": "bogus"}).status_code == 400
+
+
+def test_device_query_targets_labels_within_a_building_minus_a_zone(api_client: TestClient) -> None:
+    location_id = api_client.post("/api/v1/locations", json={"name": "Campus"}).json()["id"]
+    base = f"/api/v1/locations/{location_id}/buildings"
+    building_id = api_client.post(base, json={"name": "Tower"}).json()["id"]
+    zone_ids = []
+    for z in range(3):
+        zone_id = api_client.post(f"{base}/{building_id}/zones", json={"name": f"Z{z}"}).json()["id"]
+        zone_ids.append(zone_id)
+        for device_id, capabilities in (("dimmer", ["Dimmable", "dimmable"]), ("switch", [])):
+            created = api_client.post(
+                f"{base}/{building_id}/zones/{zone_id}/devices",
+                json={"device_id": device_id, "name": "Light", "tags": ["lighting"], "capabilities": capabilities},
+            )
+            assert created.status_code == 201
+    assert created.json()["tags"] == ["lighting"]
+
+    query = f"{base}/{building_id}/devices/query"
+    params = {"tag": "lighting", "capability": "dimmable", "exclude_zone_id": zone_ids[0], "limit": 1}
+    first = api_client.get(query, params=params).json()
+    second = api_client.get(query, params={**params, "cursor": first["next_cursor"]}).json()
+
+    assert first["count"] == 2 and second["next_cursor"] is None
+    assert [item["zone_id"] for item in first["items"] + second["items"]] == zone_ids[1:]
+    assert second["items"][0]["capabilities"] == ["dimmable"]
+    assert api_client.get(f"/api/v1/locations/{location_id}/devices/query", params={"tag": "lighting"}).json()[
+        "count"
+    ] == 6
+    assert api_client.get(query, params={"exclude_zone_id": "missing"}).status_code == 404
+    assert api_client.get(query, params={"cursor": "bogus"}).status_code == 400
+    bad_label = {"device_id": "x", "name": "X", "tags": ["no spaces"]}
+    assert api_client.post(f"{base}/{building_id}/zones/{zone_ids[0]}/devices", json=bad_label).status_code == 422
+
+
+def test_heartbeats_mark_zone_devices_online_and_count_per_zone(api_client: TestClient) -> None:
+    location_id = api_client.post("/api/v1/locations", json={"name": "Campus"}).json()["id"]
+    base = f"/api/v1/locations/{location_id}/buildings"
+    building_id = api_client.post(base, json={"name": "Tower"}).json()["id"]
+    zones = [api_client.post(f"{base}/{building_id}/zones", json={"name": f"Z{z}"}).json()["id"] for z in range(2)]
+    for zone_id in zones:
+        for device_id in ("a", "b"):
+            api_client.post(f"{base}/{building_id}/zones/{zone_id}/devices", json={"device_id": device_id, "name": "D"})
+    devices = f"{base}/{building_id}/zones/{zones[0]}/devices"
+
+    assert api_client.post(f"{devices}/a/heartbeat").status_code == 204
+    assert api_client.post(f"{devices}/a/heartbeat").status_code == 204
+    assert api_client.post(f"{devices}/missing/heartbeat").status_code == 404
+
+    assert [d["online"] for d in api_client.get(devices).json()] == [True, False]
+    assert api_client.get(f"{devices}/a").json()["online"] is True
+    listed = api_client.get(f"/api/v1/locations/{location_id}/devices").json()["items"]
+    assert [(d["zone_id"], d["device_id"]) for d in listed if d["online"]] == [(zones[0], "a")]
+    presence = api_client.get(f"{base}/{building_id}/presence").json()
+    assert presence["online"] == 1
+    assert sorted((zone["zone_id"], zone["online"]) for zone in presence["zones"]) == sorted(
+        [(zones[0], 1), (zones[1], 0)]
+    )
+
+    api_client.delete(f"{devices}/a")
+    assert api_client.get(f"/api/v1/locations/{location_id}/presence").json()["online"] == 0
+    assert api_client.get(f"{base}/missing/presence").status_code == 404
+
+
+def test_sqlite_device_deletes_race_heartbeats_and_presence_reads(tmp_path, monkeypatch) -> None:
+    # SQLite deletes run in the threadpool; the tracker is not thread-safe, so every call must stay on the loop.
+    callers = set()
+    for method in ("heartbeat", "forget", "advance"):
+        original = getattr(PresenceTracker, method)
+
+        def recorded(self, *args, _original=original):
+            callers.add(threading.get_ident())
+            return _original(self, *args)
+
+        monkeypatch.setattr(PresenceTracker, method, recorded)
+    settings = Settings(
+        storage_backend="sqlite",
+        sqlite_db_path=str(tmp_path / "app.sqlite"),
+        presence_timeout_seconds=0.05,
+        presence_tick_seconds=0.001,
+    )
+    with TestClient(create_app(settings)) as client:
+        location_id = client.post("/api/v1/locations", json={"name": "Campus"}).json()["id"]
+        base = f"/api/v1/locations/{location_id}/buildings"
+        building_id = client.post(base, json={"name": "Tower"}).json()["id"]
+        zone_id = client.post(f"{base}/{building_id}/zones", json={"name": "Z"}).json()["id"]
+        devices = f"{base}/{building_id}/zones/{zone_id}/devices"
+        device_ids = [f"d{index}" for index in range(60)]
+        for device_id in device_ids:
+            client.post(devices, json={"device_id": device_id, "name": "D"})
+        done = threading.Event()
+        statuses = set()
+
+        def churn() -> None:
+            while not done.is_set():
+                for device_id in device_ids:
+                    statuses.add(client.post(f"{devices}/{device_id}/heartbeat").status_code)
+                statuses.add(client.get(f"{base}/{building_id}/presence").status_code)
+
+        reader = threading.Thread(target=churn)
+        reader.start()
+        try:
+            for device_id in device_ids:
+                assert client.delete(f"{devices}/{device_id}").status_code == 204
+        finally:
+            done.set()
+            reader.join()
+
+        assert statuses <= {200, 204, 404}
+        assert len(callers) == 1
+        assert client.get(f"{base}/{building_id}/presence").json()["online"] == 0
+
+
+def test_search_returns_ranked_hits_with_their_path(api_client: TestClient) -> None:
+    location_id = api_client.post("/api/v1/locations", json={"name": "HQ"}).json()["id"]
+    base = f"/api/v1/locations/{location_id}/buildings"
+    building_id = api_client.post(base, json={"name": "Tower"}).json()["id"]
+    zone_id = api_client.post(f"{base}/{building_id}/zones", json={"name": "Floor 3"}).json()["id"]
+    for name in ("Meeting Room 3B", "Meeting Room 3"):
+        api_client.post(f"{base}/{building_id}/zones/{zone_id}/areas", json={"name": name})
+
+    response = api_client.get("/api/v1/search", params={"q": "meeting room 3"})
+
+    assert response.status_code == 200
+    hits = response.json()
+    assert [hit["name"] for hit in hits] == ["Meeting Room 3", "Meeting Room 3B"]
+    assert [(segment["kind"], segment["name"]) for segment in hits[1]["path"]] == [
+        ("location", "HQ"),
+        ("building", "Tower"),
+        ("zone", "Floor 3"),
+        ("area", "Meeting Room 3B"),
+    ]
+    assert api_client.get("/api/v1/search", params={"q": "?!"}).json() == []
+    assert api_client.get("/api/v1/search").status_code == 422
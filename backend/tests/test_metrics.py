@@ -0,0 +1,82 @@
+import pytest
+
+from backend.app import config
+from backend.app.auth import access_token_cache
+from backend.app.observability.metrics import MetricsRegistry, auth_cache_events_total
+
+
+@pytest.fixture
+def token_cache():
+    access_token_cache.configure(100, 60)
+    yield access_token_cache
+    access_token_cache.configure(config.settings.auth_cache_max_entries, 0)
+
+
+def test_metrics_endpoint_reports_routes_and_repositories(api_client, admin_header) -> None:
+    location = api_client.post("/api/v1/locations", json={"name": "HQ"}).json()
+    assert api_client.get(f"/api/v1/locations/{location['id']}").status_code == 200
+    assert api_client.get("/api/v1/locations/missing").status_code == 404
+
+    response = api_client.get("/metrics", headers=admin_header)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/api/v1/locations/{location_id}",status="200"}' in body
+    assert 'http_requests_total{method="GET",route="/api/v1/locations/{location_id}",status="404"}' in body
+    assert 'http_request_duration_seconds_bucket{method="POST",route="/api/v1/locations",le="+Inf"}' in body
+    assert 'repository_calls_total{repository="locations",method="create",outcome="ok"}' in body
+    assert "http_requests_in_flight" in body
+
+
+def test_metrics_need_the_admin_token_unless_public(api_client, admin_header, monkeypatch) -> None:
+    assert api_client.get("/metrics").status_code == 403
+    assert api_client.get("/metrics", headers={"Authorization": "Bearer user_alice"}).status_code == 403
+
+    monkeypatch.setattr(config.settings, "metrics_public", True)
+    assert api_client.get("/metrics").status_code == 200
+
+
+def test_auth_cache_hits_on_repeated_token(api_client, token_cache) -> None:
+    tokens = api_client.post(
+        "/api/auth/register",
+        json={"username": "carol", "password": "secret123", "email": "carol@example.com"},
+    ).json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    hits_before = auth_cache_events_total.labels("hit").value
+    assert api_client.get("/api/profile", headers=headers).status_code == 200
+    assert api_client.get("/api/profile", headers=headers).status_code == 200
+
+    assert auth_cache_events_total.labels("hit").value == hits_before + 1
+
+
+def test_logout_revokes_cached_access_tokens(api_client, token_cache) -> None:
+    tokens = api_client.post(
+        "/api/auth/register",
+        json={"username": "dave", "password": "secret123", "email": "dave@example.com"},
+    ).json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert api_client.get("/api/profile", headers=headers).status_code == 200
+
+    assert api_client.post("/api/auth/logout", json={"refresh_token": tokens["refresh_token"]}).status_code == 204
+
+    assert api_client.get("/api/profile", headers=headers).status_code == 401
+    token_cache.configure(100, 0)
+    assert api_client.get("/api/profile", headers=headers).status_code == 401
+
+
+def test_histogram_render_is_cumulative() -> None:
+    registry = MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    histogram.labels("/a").observe(0.05)
+    histogram.labels("/a").observe(0.5)
+    histogram.labels("/a").observe(5)
+
+    lines = registry.render().splitlines()
+
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{route="/a"} 3' in lines
+    assert 'demo_seconds_sum{route="/a"} 5.55' in lines
@@ -0,0 +1,46 @@
+import random
+
+from backend.app.repositories.path_index import ChildIndex, PathIndex, path_text, text_range
+
+
+def test_scan_and_discard_under_match_a_sorted_list() -> None:
+    rng = random.Random(7)
+    index = PathIndex(chunk_size=4)
+    paths = {(f"l{rng.randrange(3)}", f"b{rng.randrange(5)}", f"z{rng.randrange(50)}") for _ in range(400)}
+    for path in paths:
+        index.add(path)
+    index.add(next(iter(paths)))
+
+    assert len(index) == len(paths)
+    assert list(index.scan(("l1", "b2"))) == sorted(p for p in paths if p[:2] == ("l1", "b2"))
+
+    removed = index.discard_under(("l1",))
+
+    assert removed == sorted(p for p in paths if p[0] == "l1")
+    assert list(index.scan(())) == sorted(p for p in paths if p[0] != "l1")
+    assert len(index) == len(paths) - len(removed)
+
+
+def test_child_index_keeps_children_sorted_per_parent() -> None:
+    index = ChildIndex()
+    for child in ("z3", "z1", "z2", "z1"):
+        index.add("b1", child)
+    index.add("b2", "z9")
+
+    assert list(index.get("b1")) == ["z1", "z2", "z3"]
+    assert index.contains("b1", "z2") and not index.contains("b2", "z2") and not index.contains("b3", "z2")
+
+    index.discard("b1", "z2")
+    index.discard("b1", "missing")
+    index.discard("b2", "z9")
+    assert list(index.get("b1")) == ["z1", "z3"] and list(index.get("b2")) == []
+    assert index.pop("b1") == ["z1", "z3"] and index.pop("b1") == []
+
+
+def test_text_range_covers_descendants_only() -> None:
+    low, high = text_range(("loc", "b1"))
+    inside = [path_text(("loc", "b1", "z")), path_text(("loc", "b1", "z", "a"))]
+    outside = [path_text(("loc", "b1")), path_text(("loc", "b10", "z")), path_text(("loc", "b2"))]
+
+    assert all(low <= path < high for path in inside)
+    assert not any(low <= path < high for path in outside)
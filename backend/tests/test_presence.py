@@ -0,0 +1,63 @@
+from backend.app.presence import PresenceTracker, record_heartbeat, topic_device
+from backend.app.repositories.device_repository import InMemoryDeviceRepository
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_devices_expire_a_timeout_after_their_last_heartbeat() -> None:
+    clock = Clock()
+    tracker = PresenceTracker(timeout_seconds=30, tick_seconds=1, clock=clock)
+    assert tracker.heartbeat(("z1", "a")) and tracker.heartbeat(("z1", "b")) and tracker.heartbeat(("z2", "c"))
+    clock.now += 20
+    assert not tracker.heartbeat(("z1", "a"))
+    assert tracker.online_counts(["z1", "z2", "z3"]) == {"z1": 2, "z2": 1, "z3": 0}
+
+    clock.now += 10.5  # b and c are 30.5 s stale, a only 10.5 s
+    assert tracker.advance() == 2
+    assert tracker.is_online(("z1", "a")) and not tracker.is_online(("z1", "b"))
+    assert tracker.online_count("z1") == 1 and tracker.online_count("z2") == 0
+
+    tracker.forget(("z1", "a"))
+    assert tracker.counts() == {"online": 0, "groups": 0}
+
+
+def test_a_gap_longer_than_the_wheel_expires_everything_once() -> None:
+    clock = Clock()
+    tracker = PresenceTracker(timeout_seconds=10, tick_seconds=1, clock=clock)
+    for index in range(100):
+        clock.now += 0.05
+        tracker.heartbeat(("z", str(index)))
+    clock.now += 3600
+
+    assert tracker.advance() == 100 and tracker.advance() == 0
+    assert tracker.heartbeat(("z", "0")) and tracker.online_count("z") == 1
+
+
+def test_topic_device_reads_registered_device_topics() -> None:
+    assert topic_device("users/alice/devices/lamp-1/state") == ("alice", "lamp-1")
+    assert topic_device("users/alice/devices/lamp-1") == ("alice", "lamp-1")
+    assert topic_device("users/alice/things/lamp-1/state") is None
+    assert topic_device("users//devices/lamp-1/state") is None
+
+
+def test_record_heartbeat_looks_up_only_devices_coming_online() -> None:
+    repository = InMemoryDeviceRepository()
+    repository.create_device("alice", "lamp-1", "Lamp")
+    lookups = []
+    get_device = repository.get_device
+    repository.get_device = lambda owner_id, device_id: lookups.append(device_id) or get_device(owner_id, device_id)
+    tracker = PresenceTracker(timeout_seconds=30, tick_seconds=1, clock=Clock())
+
+    assert record_heartbeat(tracker, repository, "alice", "lamp-1")
+    assert record_heartbeat(tracker, repository, "alice", "lamp-1")
+    assert not record_heartbeat(tracker, repository, "alice", "lamp-2")
+    assert not record_heartbeat(tracker, repository, "bob", "lamp-1")
+
+    assert lookups == ["lamp-1", "lamp-2", "lamp-1"]
+    assert tracker.counts() == {"online": 1, "groups": 1}
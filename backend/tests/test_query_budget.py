@@ -0,0 +1,96 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.config import Settings
+from backend.app.dto.structures import AreaCreateRequest
+from backend.app.main import create_app
+from backend.app.observability.sql import (
+    QueryStatsMiddleware,
+    assert_max_queries,
+    query_count_from_response,
+    statement_shape,
+)
+from backend.app.repositories import create_sqlite_provider
+from backend.app.services.area_service import AreaService
+
+
+@pytest.fixture
+def sqlite_provider(tmp_path):
+    return create_sqlite_provider(f"sqlite:///{tmp_path / 'budget.sqlite'}")
+
+
+def _seed(provider):
+    location = provider.locations.create("HQ")
+    building = provider.buildings.create("Tower", location.id)
+    zone = provider.zones.create("Lobby", building.id)
+    return location, building, zone
+
+
+def test_service_call_stays_within_query_budget(sqlite_provider) -> None:
+    location, building, zone = _seed(sqlite_provider)
+    service = AreaService(
+        sqlite_provider.locations, sqlite_provider.buildings, sqlite_provider.zones, sqlite_provider.areas
+    )
+
+    with assert_max_queries(12) as stats:
+        service.create_area(location.id, building.id, zone.id, AreaCreateRequest(name="Desk"))
+
+    assert stats.count > 0
+    assert stats.duration > 0
+
+
+def test_budget_violation_lists_statement_shapes(sqlite_provider) -> None:
+    location, _, _ = _seed(sqlite_provider)
+
+    with pytest.raises(AssertionError, match="Expected at most 1 queries"):
+        with assert_max_queries(1):
+            for _ in range(3):
+                sqlite_provider.locations.get(location.id)
+
+
+def test_repeated_shapes_are_flagged(sqlite_provider, caplog) -> None:
+    _, _, zone = _seed(sqlite_provider)
+    middleware = QueryStatsMiddleware(app=None, repeat_threshold=3)
+
+    with assert_max_queries(100) as stats:
+        for _ in range(3):
+            sqlite_provider.areas.list_for_zone(zone.id)
+
+    with caplog.at_level(logging.WARNING, logger="backend.sql"):
+        middleware._report({"method": "GET"}, stats)
+
+    assert "possible N+1" in caplog.text
+
+
+def test_statement_shape_collapses_in_lists() -> None:
+    assert statement_shape("SELECT a\n FROM t WHERE id IN (?, ?, ?)") == "SELECT a FROM t WHERE id IN (?, ...)"
+
+
+def test_responses_carry_server_timing(api_client) -> None:
+    response = api_client.get("/api/v1/locations")
+
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert query_count_from_response(response.headers) == 0
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_http_requests_stay_within_query_budget(backend, tmp_path) -> None:
+    app = create_app(Settings(storage_backend=backend, sqlite_db_path=str(tmp_path / "http.sqlite")))
+    with TestClient(app) as client:
+        location_id = client.post("/api/v1/locations", json={"name": "HQ"}).json()["id"]
+        building_id = client.post(f"/api/v1/locations/{location_id}/buildings", json={"name": "Tower"}).json()["id"]
+        zones = f"/api/v1/locations/{location_id}/buildings/{building_id}/zones"
+        zone_id = client.post(zones, json={"name": "Lobby"}).json()["id"]
+        created = client.post(f"{zones}/{zone_id}/areas", json={"name": "Desk"})
+        listed = client.get(f"{zones}/{zone_id}/areas")
+        cached = client.get(f"{zones}/{zone_id}/areas")
+
+    assert created.status_code == 201 and listed.json()[0]["name"] == "Desk"
+    counts = [query_count_from_response(response.headers) for response in (created, listed, cached)]
+    if backend == "memory":
+        assert counts == [0, 0, 0]
+    else:
+        # The first read after a write misses the hierarchy cache; the repeat is served from it.
+        assert 0 < counts[0] <= 12 and 0 < counts[1] <= 10 and counts[2] == 0
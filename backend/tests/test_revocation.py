@@ -0,0 +1,45 @@
+import time
+
+from backend.app.revocation import BloomFilter, RevocationList
+from backend.app.user_repository import SQLiteUserRepository
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives() -> None:
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    for index in range(10_000):
+        bloom.add(f"revoked-{index}")
+    assert all(f"revoked-{index}" in bloom for index in range(10_000))
+    false_positives = sum(f"live-{index}" in bloom for index in range(10_000))
+    assert false_positives < 300
+
+
+def test_revocation_list_loads_from_store_and_grows(tmp_path) -> None:
+    store = SQLiteUserRepository(tmp_path / "users.db")
+    expires = time.time() + 60
+    store.revoke_token("old-family", expires)
+    store.revoke_token("expired", time.time() - 1)
+
+    revocations = RevocationList(store, capacity=4)
+    assert revocations.is_revoked("old-family")
+    assert not revocations.is_revoked("expired")
+    assert not revocations.is_revoked("live")
+
+    assert revocations.revoke("jti-1", expires)
+    assert not revocations.revoke("jti-1", expires)
+    for index in range(10):
+        revocations.revoke(f"jti-extra-{index}", expires)
+    assert revocations.counts()["bloom_entries"] == 12
+    assert all(revocations.is_revoked(f"jti-extra-{index}") for index in range(10))
+    assert RevocationList(store, capacity=4).is_revoked("jti-1")
+
+
+def test_spent_tokens_stay_out_of_the_filter(tmp_path) -> None:
+    store = SQLiteUserRepository(tmp_path / "users.db")
+    revocations = RevocationList(store, capacity=4)
+    expires = time.time() + 60
+
+    assert all(revocations.spend(f"jti-{index}", expires) for index in range(10))
+    assert not revocations.spend("jti-3", expires)
+    assert store.spend_token("long-gone", time.time() - 1) and store.spend_token("long-gone", expires)
+    assert revocations.counts()["bloom_entries"] == 0
+    assert list(store.revoked_token_ids()) == []
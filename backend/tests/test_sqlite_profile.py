@@ -0,0 +1,84 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from backend.app.repositories import create_sqlite_provider
+from backend.app.repositories.sqlite_profile import BusyRetry, SQLiteProfile, WalCheckpointer, is_busy_error
+
+
+def test_profile_pragmas_apply_to_every_connection(tmp_path) -> None:
+    provider = create_sqlite_provider(f"sqlite:///{tmp_path / 'tuned.sqlite'}", SQLiteProfile(mmap_size_mb=8))
+    try:
+        with provider.engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+            assert conn.execute(text("PRAGMA mmap_size")).scalar() == 8 * 1024 * 1024
+        assert provider.checkpointer is not None
+    finally:
+        provider.close()
+
+    untuned = create_sqlite_provider(f"sqlite:///{tmp_path / 'plain.sqlite'}", SQLiteProfile.driver_defaults())
+    with untuned.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+    assert untuned.checkpointer is None
+
+
+def test_busy_errors_are_retried_and_others_are_not(monkeypatch) -> None:
+    monkeypatch.setattr("backend.app.repositories.sqlite_profile.time.sleep", lambda _: None)
+    retry = BusyRetry(attempts=3)
+    calls = []
+
+    def flaky() -> str:
+        calls.append(1)
+        if len(calls) < 3:
+            raise OperationalError("INSERT", {}, sqlite3.OperationalError("database is locked"))
+        return "ok"
+
+    assert retry.run(flaky, is_busy_error) == "ok"
+    assert len(calls) == 3
+
+    def broken() -> None:
+        calls.append(1)
+        raise OperationalError("SELECT", {}, sqlite3.OperationalError("no such table: t"))
+
+    with pytest.raises(OperationalError):
+        retry.run(broken, is_busy_error)
+    assert len(calls) == 4
+
+
+def test_checkpointer_truncates_a_long_wal(tmp_path) -> None:
+    path = str(tmp_path / "wal.sqlite")
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=wal")
+    conn.execute("PRAGMA wal_autocheckpoint=0")
+    conn.execute("CREATE TABLE t (v BLOB)")
+    for _ in range(50):
+        conn.execute("INSERT INTO t VALUES (randomblob(4000))")
+
+    checkpointer = WalCheckpointer(path, interval=3600, truncate_pages=10)
+    try:
+        checkpointer.checkpoint(sqlite3.connect(path, isolation_level=None))
+    finally:
+        checkpointer.stop()
+    assert (tmp_path / "wal.sqlite-wal").stat().st_size == 0
+    assert conn.execute("SELECT count(*) FROM t").fetchone()[0] == 50
+
+
+def test_reads_use_a_query_only_pool_and_see_committed_writes(tmp_path) -> None:
+    provider = create_sqlite_provider(f"sqlite:///{tmp_path / 'pool.sqlite'}", SQLiteProfile(read_pool_size=2))
+    try:
+        assert provider.read_engine is not provider.engine
+        with provider.read_engine.connect() as conn:
+            assert conn.execute(text("PRAGMA query_only")).scalar() == 1
+            with pytest.raises(OperationalError, match="readonly"):
+                conn.execute(text("DELETE FROM locations"))
+
+        assert provider.locations.list() == []  # leaves a warm connection in the read pool
+        location = provider.locations.create("HQ")
+        assert [item.id for item in provider.locations.list()] == [location.id]
+    finally:
+        provider.close()
@@ -0,0 +1,71 @@
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import config, container
+from backend.app.config import Settings
+from backend.app.main import create_app
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def test_importing_the_app_defers_heavy_dependencies() -> None:
+    script = (
+        "import sys\n"
+        "from backend.app.main import create_app\n"
+        "create_app()\n"
+        "print(','.join(sorted(n for n in ('sqlalchemy', 'httpx', 'jose', 'passlib') if n in sys.modules)))\n"
+    )
+    completed = subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+
+    assert completed.stdout.strip() == ""
+
+
+def test_create_app_applies_settings_and_builds_services_on_first_use(tmp_path) -> None:
+    settings = Settings(admin_token="factory-secret", storage_backend="sqlite", sqlite_db_path=str(tmp_path / "app.db"))
+    app = create_app(settings)
+
+    assert config.settings is settings
+    assert not container.is_initialized()
+    with TestClient(app) as client:
+        assert client.post("/api/v1/locations", json={"name": "HQ"}).status_code == 201
+        traces = client.get("/admin/traces", headers={"Authorization": "Bearer factory-secret"})
+    assert traces.status_code == 200
+    assert container.is_initialized()
+    assert (tmp_path / "app.db").exists()
+
+
+def test_warmup_hits_every_route_without_side_effects(api_client) -> None:
+    from backend.app.observability.metrics import http_requests_total
+    from backend.app.warmup import warmup
+
+    before = http_requests_total.labels("GET", "/healthz", "200").value
+    results = api_client.portal.call(warmup, api_client.app)
+
+    assert results["GET /healthz"] == 200
+    assert results["POST /api/v1/locations"] == 422
+    assert all(status < 500 for status in results.values())
+    assert api_client.get("/api/v1/locations").json() == []
+    assert http_requests_total.labels("GET", "/healthz", "200").value == before
+
+
+def test_failed_warmup_cancels_background_tasks(monkeypatch) -> None:
+    from backend.app import main
+
+    async def broken(app):
+        raise RuntimeError("warmup failed")
+
+    async def start() -> list:
+        app = create_app(Settings(warmup_on_startup=True, metrics_enabled=True))
+        with pytest.raises(RuntimeError):
+            async with main.lifespan(app):
+                pass
+        await asyncio.sleep(0)
+        return [task for task in asyncio.all_tasks() if "monitor_event_loop_lag" in repr(task.get_coro())]
+
+    monkeypatch.setattr(main, "warmup", broken)
+    assert asyncio.run(start()) == []
@@ -0,0 +1,50 @@
+from backend.app.observability import sql
+from backend.app.observability.tracing import Tracer, export_otlp, parse_traceparent, tracer
+from backend.app.repositories import create_sqlite_provider
+
+TRACEPARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+def test_sampled_request_records_service_and_repository_spans(api_client, admin_header) -> None:
+    tracer.clear()
+    response = api_client.post("/api/v1/locations", json={"name": "HQ"}, headers={"traceparent": TRACEPARENT})
+    assert response.status_code == 201
+    assert response.headers["x-trace-id"] == "0af7651916cd43dd8448eb211c80319c"
+
+    exported = api_client.get("/admin/traces", headers=admin_header).json()
+    spans = exported["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    by_name = {span["name"]: span for span in spans}
+
+    root = by_name["POST /api/v1/locations"]
+    service = by_name["LocationService.create_location"]
+    repository = by_name["locations.create"]
+    assert root["parentSpanId"] == "b7ad6b7169203331"
+    assert service["parentSpanId"] == root["spanId"]
+    assert repository["parentSpanId"] == service["spanId"]
+    assert {"key": "http.status_code", "value": {"intValue": "201"}} in root["attributes"]
+
+
+def test_unsampled_requests_are_not_recorded(api_client) -> None:
+    tracer.clear()
+    api_client.get("/api/v1/locations", headers={"traceparent": TRACEPARENT[:-2] + "00"})
+
+    assert tracer.traces() == []
+
+
+def test_sql_statements_become_child_spans(tmp_path, monkeypatch) -> None:
+    provider = create_sqlite_provider(f"sqlite:///{tmp_path / 'trace.sqlite'}")
+    local = Tracer(sample_rate=1.0)
+    monkeypatch.setattr(sql, "tracer", local)
+    with local.trace("job"):
+        provider.locations.create("HQ")
+
+    (spans,) = local.traces()
+    statements = [span for span in spans if span.name == "sqlite query"]
+    assert statements and all(span.parent_id == spans[0].span_id for span in statements)
+    otlp = export_otlp([spans])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(otlp) == len(spans)
+
+
+def test_parse_traceparent_rejects_malformed_values() -> None:
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(TRACEPARENT) == ("0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331", True)
@@ -0,0 +1,110 @@
+import sqlite3
+import time
+
+import pytest
+
+from backend.app.models import UserInDB
+from backend.app.user_repository import InMemoryUserRepository, SQLiteUserRepository
+
+
+def _user(username: str, email: str | None = None, user_id: str | None = None) -> UserInDB:
+    return UserInDB(id=user_id or f"id-{username}", username=username, email=email, hashed_password="x")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def repo(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryUserRepository()
+    return SQLiteUserRepository(tmp_path / "users.db")
+
+
+def test_lookups_and_uniqueness_ignore_case(repo) -> None:
+    repo.create_user(_user("Alice", "Alice@Example.com"))
+
+    assert repo.get_by_username("aLICE").id == "id-Alice"
+    assert repo.get_by_email("alice@example.COM").username == "Alice"
+    with pytest.raises(ValueError):
+        repo.create_user(_user("ALICE", user_id="other"))
+    with pytest.raises(ValueError):
+        repo.create_user(_user("alice2", "ALICE@example.com"))
+
+
+def test_allocate_username_skips_taken_suffixes(repo) -> None:
+    assert repo.allocate_username("john") == "john"
+    repo.import_users([_user(name) for name in ("John", "john1", "john2", "johnny", "john007", "john4")])
+
+    assert repo.allocate_username("john") == "john3"
+    repo.create_user(_user("john3"))
+    assert repo.allocate_username("John") == "John5"
+    assert repo.allocate_username("jo") == "jo"
+
+
+def test_import_users_is_all_or_nothing_unless_skipping(repo) -> None:
+    repo.create_user(_user("taken"))
+    batch = [_user("new1"), _user("TAKEN", user_id="dup"), _user("new2")]
+
+    with pytest.raises(ValueError):
+        repo.import_users(batch)
+    assert repo.get_by_username("new1") is None
+
+    assert repo.import_users(batch, skip_existing=True) == 2
+    assert repo.get_by_username("new2") is not None
+
+
+def test_spent_tokens_expire_even_when_spent_out_of_expiry_order(repo, monkeypatch) -> None:
+    now = time.time()
+    assert repo.spend_token("late", now + 100)
+    assert repo.spend_token("early", now + 1)
+    assert not repo.spend_token("early", now + 1)
+
+    monkeypatch.setattr("backend.app.user_repository.time.time", lambda: now + 2)
+
+    assert repo.spend_token("early", now + 50)
+    assert not repo.spend_token("late", now + 100)
+
+
+def test_sqlite_schema_upgrade_backfills_case_insensitive_keys(tmp_path) -> None:
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE users (id TEXT PRIMARY KEY, username TEXT UNIQUE NOT NULL, email TEXT, "
+        "hashed_password TEXT NOT NULL, google_sub TEXT UNIQUE)"
+    )
+    conn.execute("INSERT INTO users VALUES ('u1', 'Bob', 'Bob@Example.com', 'x', NULL)")
+    conn.commit()
+    conn.close()
+
+    repo = SQLiteUserRepository(path)
+    assert repo.get_by_username("bob").id == "u1"
+    assert repo.get_by_email("bob@example.com").id == "u1"
+
+
+def test_sqlite_schema_upgrade_survives_case_clashes_and_refills_missing_keys(tmp_path, caplog) -> None:
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE users (id TEXT PRIMARY KEY, username TEXT UNIQUE NOT NULL, email TEXT, "
+        "hashed_password TEXT NOT NULL, google_sub TEXT UNIQUE)"
+    )
+    conn.executemany(
+        "INSERT INTO users VALUES (?, ?, ?, 'x', NULL)",
+        [("u1", "Bob", "bob@example.com"), ("u2", "bob", "BOB@example.com"), ("u3", "Eve", None)],
+    )
+    conn.commit()
+    conn.close()
+
+    with caplog.at_level("WARNING", logger="backend.user_repository"):
+        repo = SQLiteUserRepository(path)
+    assert "u2" in caplog.text
+    assert repo.get_by_username("BOB").id == "u1" and repo.get_by_username("bob").id == "u2"
+    assert repo.get_by_email("Bob@Example.com").id == "u1"
+    with pytest.raises(ValueError):
+        repo.create_user(_user("BOB", user_id="u4"))
+
+    # Keys lost to an interrupted upgrade (columns present, values NULL) are filled on the next start.
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE users SET username_key=NULL, email_key=NULL WHERE id IN ('u1', 'u3')")
+    conn.commit()
+    conn.close()
+    repo = SQLiteUserRepository(path)
+    assert repo.get_by_username("eve").id == "u3" and repo.get_by_email("bob@EXAMPLE.com").id == "u1"